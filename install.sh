@@ -309,7 +309,6 @@ REACT_APP_API_URL=http://$SERVER_IP:8000
 # =============================================================================
 # Processor Configuration
 PROCESSOR_REPLICAS=4
-PROCESSOR_WORKERS=8
 PROCESSOR_BATCH_SIZE=200
 
 # Receiver Configuration
@@ -9,6 +9,7 @@ OPENSEARCH_PORT="${OPENSEARCH_PORT:-9200}"
 OPENSEARCH_URL="http://${OPENSEARCH_HOST}:${OPENSEARCH_PORT}"
 INDEX_PREFIX="${OPENSEARCH_INDEX_PREFIX:-cybersentinel-logs}"
 RETENTION_DAYS="${LOG_RETENTION_DAYS:-180}"
+LOW_RETENTION_DAYS="${LOW_VALUE_LOG_RETENTION_DAYS:-14}"
 
 echo "=========================================="
 echo "OpenSearch ILM Policy Setup"
@@ -103,6 +104,51 @@ curl -X PUT "${OPENSEARCH_URL}/_plugins/_ism/policies/${INDEX_PREFIX}-retention-
 echo "✓ ISM policy created"
 echo ""
 
+# Short retention for the low-value index family (processor index routing)
+echo "Creating ISM policy: ${INDEX_PREFIX}-low-retention-policy"
+LOW_ISM_POLICY='{
+  "policy": {
+    "description": "Short retention policy for low-value CyberSentinel logs",
+    "default_state": "hot",
+    "states": [
+      {
+        "name": "hot",
+        "actions": [],
+        "transitions": [
+          {
+            "state_name": "delete",
+            "conditions": {
+              "min_index_age": "'${LOW_RETENTION_DAYS}'d"
+            }
+          }
+        ]
+      },
+      {
+        "name": "delete",
+        "actions": [
+          {
+            "delete": {}
+          }
+        ],
+        "transitions": []
+      }
+    ],
+    "ism_template": [
+      {
+        "index_patterns": ["'${INDEX_PREFIX}'-low-*"],
+        "priority": 200
+      }
+    ]
+  }
+}'
+
+curl -X PUT "${OPENSEARCH_URL}/_plugins/_ism/policies/${INDEX_PREFIX}-low-retention-policy" \
+  -H 'Content-Type: application/json' \
+  -d "${LOW_ISM_POLICY}" 2>/dev/null || true
+
+echo "✓ Low-value ISM policy created (${LOW_RETENTION_DAYS}-day retention)"
+echo ""
+
 # Create index template with settings optimized for 180-day retention
 echo "Creating index template: ${INDEX_PREFIX}-template"
 INDEX_TEMPLATE='{
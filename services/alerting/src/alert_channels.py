@@ -1,22 +1,202 @@
 """
-Alert delivery channels (Email, Slack, PagerDuty).
+Alert delivery channels (Email, Slack, generic webhooks and PagerDuty).
 """
 import asyncio
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Optional
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
 import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import aiohttp
+from delivery import DeliveryQueue, RedisDeliveryJournal
 from logger import get_logger
-from metrics import alerts_sent_total, alert_delivery_duration_seconds
+from metrics import (
+    alerts_sent_total,
+    alert_delivery_duration_seconds,
+    alert_endpoint_latency_seconds,
+    alert_delivery_throttled_total,
+)
 
 logger = get_logger(__name__)
 
+# Longest server-requested pause honoured
+_MAX_RETRY_AFTER = 3600.0
+
+
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """
+    Parse a Retry-After header.
+
+    Args:
+        value: Header value, in seconds or as an HTTP date
+        default: Delay used when the header is missing or malformed
+
+    Returns:
+        Seconds to wait, at most one hour
+    """
+    if not value:
+        return default
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return default
+    return min(max(delay, 0.0), _MAX_RETRY_AFTER)
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter for async callers.
+
+    Allows ``rate`` calls per second on average and bursts of ``burst``.
+    ``pause`` empties the bucket and blocks every caller for a while, for
+    servers that asked us to back off. Waiting callers are served in order.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize token bucket.
+
+        Args:
+            rate: Calls per second (0 for no limit)
+            burst: Maximum calls in a burst
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """
+        Block calls for a while and empty the bucket.
+
+        Args:
+            seconds: Seconds to block
+        """
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self) -> None:
+        """Wait until a call is allowed."""
+        if self.rate <= 0 and not self._blocked_until:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                if self.rate <= 0:
+                    return
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HttpTransport:
+    """
+    Long-lived pooled HTTP client of a channel, with rate limiting.
+
+    The session and its connection pool are created on first use and kept,
+    so alerts reuse open (TLS) connections. Every request first takes a
+    token from the channel's bucket; a 429 (or a 503 with Retry-After)
+    pauses the bucket for as long as the server asked, so retries do not
+    hammer a throttling endpoint. Latency is recorded per endpoint host.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        rate: float = 1.0,
+        burst: int = 5,
+        timeout: float = 10.0,
+        max_connections: int = 10,
+    ):
+        """
+        Initialize HTTP transport.
+
+        Args:
+            channel: Channel name used in logs and metrics
+            rate: Requests per second (0 for no limit)
+            burst: Maximum requests in a burst
+            timeout: Total request timeout in seconds
+            max_connections: Size of the connection pool
+        """
+        self.channel = channel
+        self.limiter = TokenBucket(rate, burst)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def post(self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> int:
+        """
+        POST a JSON payload.
+
+        Args:
+            url: Endpoint URL
+            payload: JSON body
+            headers: Extra request headers
+
+        Returns:
+            HTTP status code
+
+        Raises:
+            aiohttp.ClientError: If the request fails
+            asyncio.TimeoutError: If the request times out
+        """
+        await self.limiter.acquire()
+        endpoint = urlsplit(url).netloc
+        started = time.perf_counter()
+        try:
+            async with self._get_session().post(url, json=payload, headers=headers) as resp:
+                await resp.read()
+                status = resp.status
+                retry_after = resp.headers.get("Retry-After")
+        finally:
+            alert_endpoint_latency_seconds.labels(channel=self.channel, endpoint=endpoint).observe(
+                time.perf_counter() - started
+            )
+
+        if status == 429 or (status == 503 and retry_after):
+            delay = parse_retry_after(retry_after)
+            self.limiter.pause(delay)
+            alert_delivery_throttled_total.labels(channel=self.channel).inc()
+            logger.warning("alert_endpoint_throttled", channel=self.channel, endpoint=endpoint, retry_after=delay)
+        return status
+
+    async def close(self) -> None:
+        """Close the session and its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
 
 class EmailChannel:
     """Email alert channel."""
 
+    name = "email"
+
+    async def close(self) -> None:
+        """Nothing to release; every email uses its own SMTP connection."""
+
     def __init__(
         self,
         smtp_host: str,
@@ -146,14 +326,23 @@ Threat Indicators: {', '.join(alert['log_data'].get('threat_keywords', [])) or '
 class SlackChannel:
     """Slack alert channel."""
 
-    def __init__(self, webhook_url: str):
+    name = "slack"
+
+    def __init__(self, webhook_url: str, transport: Optional[HttpTransport] = None):
         """
         Initialize Slack channel.
 
         Args:
             webhook_url: Slack webhook URL
+            transport: HTTP transport (defaults to one limited to Slack's
+                one message per second)
         """
         self.webhook_url = webhook_url
+        self.transport = transport or HttpTransport(self.name, rate=1.0, burst=5)
+
+    async def close(self) -> None:
+        """Close the HTTP transport."""
+        await self.transport.close()
 
     async def send(self, alert: Dict[str, Any]) -> bool:
         """
@@ -228,20 +417,19 @@ class SlackChannel:
                 }
 
                 # Send to Slack
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(self.webhook_url, json=payload, timeout=10) as resp:
-                        if resp.status == 200:
-                            logger.info("slack_alert_sent", rule_name=alert["rule_name"])
-                            alerts_sent_total.labels(channel="slack", status="success").inc()
-                            return True
-                        else:
-                            logger.error(
-                                "slack_alert_failed",
-                                status=resp.status,
-                                rule_name=alert["rule_name"],
-                            )
-                            alerts_sent_total.labels(channel="slack", status="failed").inc()
-                            return False
+                status = await self.transport.post(self.webhook_url, payload)
+                if status == 200:
+                    logger.info("slack_alert_sent", rule_name=alert["rule_name"])
+                    alerts_sent_total.labels(channel="slack", status="success").inc()
+                    return True
+                else:
+                    logger.error(
+                        "slack_alert_failed",
+                        status=status,
+                        rule_name=alert["rule_name"],
+                    )
+                    alerts_sent_total.labels(channel="slack", status="failed").inc()
+                    return False
 
             except Exception as e:
                 logger.error("slack_alert_exception", error=str(e), rule_name=alert["rule_name"])
@@ -249,41 +437,247 @@ class SlackChannel:
                 return False
 
 
+class WebhookChannel:
+    """Generic webhook channel posting the alert document as JSON."""
+
+    def __init__(
+        self,
+        url: str,
+        name: str = "webhook",
+        headers: Optional[Dict[str, str]] = None,
+        transport: Optional[HttpTransport] = None,
+    ):
+        """
+        Initialize webhook channel.
+
+        Args:
+            url: Webhook URL
+            name: Channel name used in logs and metrics
+            headers: Extra request headers (e.g. authorization)
+            transport: HTTP transport (defaults to 10 requests per second)
+        """
+        self.url = url
+        self.name = name
+        self.headers = headers or {}
+        self.transport = transport or HttpTransport(name, rate=10.0, burst=20)
+
+    def payload(self, alert: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the request body.
+
+        Args:
+            alert: Alert data
+
+        Returns:
+            JSON body
+        """
+        return alert
+
+    async def send(self, alert: Dict[str, Any]) -> bool:
+        """
+        Post alert to the webhook.
+
+        Args:
+            alert: Alert data
+
+        Returns:
+            True if the endpoint accepted it (2xx), False otherwise
+        """
+        with alert_delivery_duration_seconds.labels(channel=self.name).time():
+            try:
+                status = await self.transport.post(self.url, self.payload(alert), self.headers)
+            except Exception as e:
+                logger.error(
+                    "webhook_alert_exception",
+                    channel=self.name,
+                    error=str(e) or type(e).__name__,
+                    rule_name=alert["rule_name"],
+                )
+                alerts_sent_total.labels(channel=self.name, status="failed").inc()
+                return False
+
+        if 200 <= status < 300:
+            logger.info("webhook_alert_sent", channel=self.name, rule_name=alert["rule_name"])
+            alerts_sent_total.labels(channel=self.name, status="success").inc()
+            return True
+        logger.error("webhook_alert_failed", channel=self.name, status=status, rule_name=alert["rule_name"])
+        alerts_sent_total.labels(channel=self.name, status="failed").inc()
+        return False
+
+    async def close(self) -> None:
+        """Close the HTTP transport."""
+        await self.transport.close()
+
+
+class PagerDutyChannel(WebhookChannel):
+    """PagerDuty channel using the Events API v2."""
+
+    EVENTS_URL = "https://events.pagerduty.com/v2/enqueue"
+    SEVERITIES = {"critical": "critical", "high": "error", "medium": "warning", "low": "info"}
+
+    def __init__(self, routing_key: str, url: str = EVENTS_URL, transport: Optional[HttpTransport] = None):
+        """
+        Initialize PagerDuty channel.
+
+        Args:
+            routing_key: Integration (routing) key of the PagerDuty service
+            url: Events API URL
+            transport: HTTP transport (defaults to 10 requests per second)
+        """
+        super().__init__(url, name="pagerduty", transport=transport)
+        self.routing_key = routing_key
+
+    def payload(self, alert: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build a trigger event.
+
+        Args:
+            alert: Alert data
+
+        Returns:
+            Events API v2 body
+        """
+        log = alert["log_data"]
+        return {
+            "routing_key": self.routing_key,
+            "event_action": "trigger",
+            "payload": {
+                "summary": f"{alert['rule_name']}: {alert['description']}"[:1024],
+                "severity": self.SEVERITIES.get(alert["severity"], "warning"),
+                "source": log.get("hostname") or log.get("source_ip") or "cybersentinel",
+                "timestamp": alert["timestamp"],
+                "custom_details": {key: value for key, value in alert.items() if key != "log_data"},
+            },
+        }
+
+
 class AlertChannelManager:
-    """Manage multiple alert channels."""
+    """
+    Manage multiple alert channels.
+
+    Every channel gets its own delivery queue and workers, so a slow or
+    failing endpoint only delays its own alerts.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 10000,
+        workers: int = 2,
+        max_attempts: int = 6,
+        retry_base: float = 2.0,
+        retry_max: float = 300.0,
+        journal: Optional[RedisDeliveryJournal] = None,
+    ):
+        """
+        Initialize alert channel manager.
 
-    def __init__(self):
-        """Initialize alert channel manager."""
+        Args:
+            queue_size: Maximum pending deliveries per channel
+            workers: Concurrent sends per channel
+            max_attempts: Sends tried before an alert is given up on
+            retry_base: Backoff before the first retry in seconds
+            retry_max: Maximum backoff in seconds
+            journal: Optional journal persisting pending deliveries
+        """
+        self.queue_size = queue_size
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.journal = journal
         self.channels = []
+        self.queues: List[DeliveryQueue] = []
+
+    @classmethod
+    def from_settings(cls, settings, journal: Optional[RedisDeliveryJournal] = None) -> "AlertChannelManager":
+        """
+        Build a channel manager from service settings.
+
+        Args:
+            settings: Alerting settings
+            journal: Optional journal persisting pending deliveries
+
+        Returns:
+            Configured channel manager
+        """
+        return cls(
+            queue_size=settings.alerting_delivery_queue_size,
+            workers=settings.alerting_delivery_workers,
+            max_attempts=settings.alerting_delivery_max_attempts,
+            retry_base=settings.alerting_delivery_retry_base,
+            retry_max=settings.alerting_delivery_retry_max,
+            journal=journal,
+        )
 
     def add_channel(self, channel) -> None:
         """
         Add an alert channel.
 
         Args:
-            channel: Alert channel instance
+            channel: Alert channel instance (with a ``name``, an async
+                ``send`` returning True on success and an async ``close``)
         """
         self.channels.append(channel)
-
-    async def send_alert(self, alert: Dict[str, Any]) -> None:
+        self.queues.append(DeliveryQueue(
+            channel,
+            max_size=self.queue_size,
+            workers=self.workers,
+            max_attempts=self.max_attempts,
+            retry_base=self.retry_base,
+            retry_max=self.retry_max,
+            journal=self.journal,
+        ))
+
+    async def start(self) -> None:
+        """Queue the deliveries left pending by a previous run and start the workers."""
+        for queue in self.queues:
+            if self.journal is not None:
+                try:
+                    restored = await self.journal.load(queue.name)
+                except Exception as e:
+                    logger.error("delivery_journal_load_failed", channel=queue.name, error=str(e))
+                    restored = []
+                for delivery in restored:
+                    queue.submit(delivery.alert, delivery)
+                if restored:
+                    logger.info("alert_deliveries_restored", channel=queue.name, count=len(restored))
+            queue.start()
+
+    def send_alert(self, alert: Dict[str, Any]) -> int:
         """
-        Send alert through all configured channels.
+        Queue an alert for delivery through all configured channels.
 
         Args:
             alert: Alert data
+
+        Returns:
+            Number of channels the alert was queued for
         """
-        if not self.channels:
+        if not self.queues:
             logger.warning("no_alert_channels_configured")
-            return
-
-        # Send to all channels in parallel
-        tasks = [channel.send(alert) for channel in self.channels]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+            return 0
 
-        success_count = sum(1 for r in results if r is True)
-        logger.info(
-            "alert_sent_to_channels",
+        queued = sum(queue.submit(alert) for queue in self.queues)
+        logger.debug(
+            "alert_queued_for_channels",
             rule_name=alert["rule_name"],
-            total_channels=len(self.channels),
-            successful=success_count,
+            total_channels=len(self.queues),
+            queued=queued,
         )
+        return queued
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Deliver what is queued, up to a timeout, and stop the workers.
+
+        Args:
+            timeout: Seconds to wait for queued deliveries
+        """
+        pending = await asyncio.gather(*(queue.stop(timeout) for queue in self.queues))
+        for queue, count in zip(self.queues, pending):
+            if count:
+                logger.warning("alert_deliveries_pending", channel=queue.name, count=count)
+        if self.journal is not None:
+            await self.journal.flush()
+        for channel in self.channels:
+            await channel.close()
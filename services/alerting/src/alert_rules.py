@@ -1,30 +1,161 @@
 """
 Alert rule definitions and evaluation.
 """
-from typing import Dict, Any, List, Callable
+import time
+from typing import Dict, Any, List, Callable, Optional, Tuple
 from dataclasses import dataclass
 from logger import get_logger
+from rule_compiler import (
+    CompiledRules,
+    Condition,
+    FieldEquals,
+    FieldExists,
+    FieldRange,
+    ListContains,
+    MessageContains,
+    TagPresent,
+    Truthy,
+)
+from anomaly import AnomalySpec, RateBaseline
+from correlation import Correlator, SequenceSpec
+from distinct_counter import DistinctCounter, DistinctSpec
+from top_k import HeavyHitters, TopKSpec
+from window_counter import SlidingWindowCounter, WindowSpec
 
 logger = get_logger(__name__)
 
 
 @dataclass
 class AlertRule:
-    """Alert rule definition."""
+    """
+    Alert rule definition.
+
+    Rules with a declarative ``match`` condition are compiled and evaluated
+    together in one pass; rules with only a ``condition`` callable are
+    evaluated one by one. ``source`` tells where the rule came from
+    (builtin, custom or a rules file path) and ``version`` identifies its
+    definition. Rules with a ``window`` only fire when more than
+    ``window.threshold`` matching logs share a key within the window;
+    rules with ``distinct`` when more than ``distinct.threshold`` distinct
+    values of a field share a key within the window; rules with ``top_k``
+    when the most frequent values of a field change as ``top_k.trigger``
+    describes; rules with ``anomaly`` when a key's rate of matching logs
+    deviates from its learned baseline; rules with ``sequence`` when logs
+    sharing a key match the sequence steps in order within its time limit.
+    """
     name: str
     description: str
     severity: str  # critical, high, medium, low
-    condition: Callable[[Dict[str, Any]], bool]
+    condition: Optional[Callable[[Dict[str, Any]], bool]] = None
     enabled: bool = True
+    match: Optional[Condition] = None
+    version: str = "1"
+    source: str = "builtin"
+    window: Optional[WindowSpec] = None
+    distinct: Optional[DistinctSpec] = None
+    top_k: Optional[TopKSpec] = None
+    anomaly: Optional[AnomalySpec] = None
+    sequence: Optional[SequenceSpec] = None
+
+    def __post_init__(self):
+        if self.condition is None and self.match is None:
+            raise ValueError(f"Alert rule {self.name} needs a condition or a match")
+        specs = (self.window, self.distinct, self.top_k, self.anomaly, self.sequence)
+        if sum(spec is not None for spec in specs) > 1:
+            raise ValueError(
+                f"Alert rule {self.name} can only have one of window, distinct, top_k, anomaly and sequence"
+            )
+
+    @property
+    def aggregation(self) -> Optional[Any]:
+        """The rule's window or distinct-count definition, if any."""
+        return self.window or self.distinct
 
 
 class AlertRuleEngine:
     """Evaluate logs against alert rules."""
 
-    def __init__(self):
-        """Initialize alert rule engine."""
+    def __init__(
+        self,
+        error_spike_threshold: int = 10,
+        error_spike_window: float = 60.0,
+        window_max_keys: int = 100000,
+        top_k_dimensions: Tuple[str, ...] = (),
+        top_k: int = 20,
+        top_k_interval: float = 60.0,
+        anomaly_interval: float = 60.0,
+        anomaly_z: float = 4.0,
+        anomaly_warmup: int = 30,
+        correlation_max_states: int = 100000,
+    ):
+        """
+        Initialize alert rule engine.
+
+        Args:
+            error_spike_threshold: Error logs per host tolerated in the
+                error_spike window
+            error_spike_window: error_spike window in seconds
+            window_max_keys: Maximum keys tracked per windowed or
+                distinct-count rule
+            top_k_dimensions: Fields whose most frequent values are
+                tracked for every log
+            top_k: Number of top values reported per dimension
+            top_k_interval: Length of a top-k interval in seconds
+            anomaly_interval: Interval of the host_rate_anomaly baselines
+                in seconds
+            anomaly_z: Standard deviations from the baseline at which
+                host_rate_anomaly fires
+            anomaly_warmup: Intervals a host is observed before
+                host_rate_anomaly can fire for it
+            correlation_max_states: Maximum sequence state machines kept
+                across all sequence rules
+        """
+        self.error_spike_threshold = error_spike_threshold
+        self.error_spike_window = error_spike_window
+        self.window_max_keys = window_max_keys
+        self.anomaly_interval = anomaly_interval
+        self.anomaly_z = anomaly_z
+        self.anomaly_warmup = anomaly_warmup
+        self.windows: Dict[str, Any] = {}
+        self.correlator = Correlator(correlation_max_states)
+        self.dimensions: Dict[str, HeavyHitters] = {
+            field: HeavyHitters(TopKSpec(field, k=top_k, seconds=top_k_interval, trigger=None))
+            for field in top_k_dimensions
+        }
         self.rules: List[AlertRule] = []
+        # (rules, compiled rules, interpreted rules with their
+        # [evaluated, matched] counts), replaced as a whole
+        self._program: Tuple[List[AlertRule], CompiledRules, List[Tuple[int, AlertRule, List[int]]]] = (
+            [], CompiledRules([]), []
+        )
+        # Counts of rules compiled into earlier programs, keyed by rule name
+        self._retired_stats: Dict[str, Dict[str, int]] = {}
         self._initialize_default_rules()
+        self.compile_rules()
+
+    @classmethod
+    def from_settings(cls, settings) -> "AlertRuleEngine":
+        """
+        Build a rule engine from service settings.
+
+        Args:
+            settings: Alerting settings
+
+        Returns:
+            Configured rule engine
+        """
+        return cls(
+            error_spike_threshold=settings.alerting_error_spike_threshold,
+            error_spike_window=settings.alerting_error_spike_window,
+            window_max_keys=settings.alerting_window_max_keys,
+            top_k_dimensions=tuple(settings.top_k_dimensions_list),
+            top_k=settings.alerting_top_k,
+            top_k_interval=settings.alerting_top_k_interval,
+            anomaly_interval=settings.alerting_anomaly_interval,
+            anomaly_z=settings.alerting_anomaly_z_threshold,
+            anomaly_warmup=settings.alerting_anomaly_warmup,
+            correlation_max_states=settings.alerting_correlation_max_states,
+        )
 
     def _initialize_default_rules(self) -> None:
         """Initialize default alert rules."""
@@ -34,7 +165,7 @@ class AlertRuleEngine:
             name="critical_severity",
             description="Alert on critical severity logs (emergency, alert, critical)",
             severity="critical",
-            condition=lambda log: log.get("severity", 7) <= 2,
+            match=FieldRange("severity", max=2, default=7),
         ))
 
         # Rule 2: High threat score
@@ -42,7 +173,7 @@ class AlertRuleEngine:
             name="high_threat_score",
             description="Alert on logs with high threat score",
             severity="high",
-            condition=lambda log: log.get("threat_score", 0) >= 50,
+            match=FieldRange("threat_score", min=50, default=0),
         ))
 
         # Rule 3: Authentication failures
@@ -50,10 +181,9 @@ class AlertRuleEngine:
             name="auth_failure",
             description="Alert on authentication failures",
             severity="medium",
-            condition=lambda log: (
-                "authentication" in log.get("tags", []) and
-                any(word in log.get("message", "").lower()
-                    for word in ["failed", "failure", "denied", "rejected"])
+            match=(
+                TagPresent("authentication") &
+                MessageContains(["failed", "failure", "denied", "rejected"])
             ),
         ))
 
@@ -62,20 +192,19 @@ class AlertRuleEngine:
             name="security_event",
             description="Alert on security-related events",
             severity="high",
-            condition=lambda log: (
-                "security" in log.get("tags", []) or
-                log.get("has_threat_indicators", False)
-            ),
+            match=TagPresent("security") | Truthy("has_threat_indicators"),
         ))
 
         # Rule 5: Multiple errors from same host
         self.rules.append(AlertRule(
             name="error_spike",
-            description="Alert on error severity from specific host",
+            description="Alert on a burst of error severity logs from one host",
             severity="medium",
-            condition=lambda log: (
-                log.get("severity_name") == "error" and
-                log.get("hostname") is not None
+            match=FieldEquals("severity_name", "error") & FieldExists("hostname"),
+            window=WindowSpec(
+                threshold=self.error_spike_threshold,
+                seconds=self.error_spike_window,
+                group_by=("hostname",),
             ),
         ))
 
@@ -84,9 +213,9 @@ class AlertRuleEngine:
             name="brute_force",
             description="Alert on potential brute force attempts",
             severity="high",
-            condition=lambda log: (
-                "brute force" in log.get("message", "").lower() or
-                "brute_force" in log.get("threat_keywords", [])
+            match=(
+                MessageContains(["brute force"]) |
+                ListContains("threat_keywords", "brute_force")
             ),
         ))
 
@@ -95,10 +224,7 @@ class AlertRuleEngine:
             name="malware_detected",
             description="Alert on malware-related keywords",
             severity="critical",
-            condition=lambda log: any(
-                keyword in log.get("message", "").lower()
-                for keyword in ["malware", "ransomware", "trojan", "virus"]
-            ),
+            match=MessageContains(["malware", "ransomware", "trojan", "virus"]),
         ))
 
         # Rule 8: Unauthorized access
@@ -106,10 +232,7 @@ class AlertRuleEngine:
             name="unauthorized_access",
             description="Alert on unauthorized access attempts",
             severity="high",
-            condition=lambda log: any(
-                keyword in log.get("message", "").lower()
-                for keyword in ["unauthorized", "forbidden", "access denied"]
-            ),
+            match=MessageContains(["unauthorized", "forbidden", "access denied"]),
         ))
 
         # Rule 9: SQL injection attempts
@@ -117,11 +240,9 @@ class AlertRuleEngine:
             name="sql_injection",
             description="Alert on potential SQL injection attempts",
             severity="critical",
-            condition=lambda log: (
-                "sql injection" in log.get("message", "").lower() or
-                "sql_injection" in log.get("threat_keywords", []) or
-                any(pattern in log.get("message", "").lower()
-                    for pattern in ["union select", "' or '1'='1", "drop table"])
+            match=(
+                MessageContains(["sql injection", "union select", "' or '1'='1", "drop table"]) |
+                ListContains("threat_keywords", "sql_injection")
             ),
         ))
 
@@ -130,12 +251,97 @@ class AlertRuleEngine:
             name="ddos_attack",
             description="Alert on DDoS attack indicators",
             severity="critical",
-            condition=lambda log: (
-                "ddos" in log.get("message", "").lower() or
-                "ddos" in log.get("threat_keywords", [])
+            match=MessageContains(["ddos"]) | ListContains("threat_keywords", "ddos"),
+        ))
+
+        # Rule 11: Hosts that get much louder or go quiet
+        self.rules.append(AlertRule(
+            name="host_rate_anomaly",
+            description="Alert when a host's log rate deviates sharply from its baseline or stops",
+            severity="medium",
+            match=FieldExists("hostname"),
+            anomaly=AnomalySpec(
+                group_by=("hostname",),
+                interval=self.anomaly_interval,
+                z=self.anomaly_z,
+                warmup=self.anomaly_warmup,
             ),
         ))
 
+    def compile_rules(self) -> None:
+        """
+        Compile the enabled declarative rules for one-pass evaluation.
+
+        Called by the methods that change rules; call it after modifying
+        ``rules`` directly. The new program replaces the old one in a single
+        assignment, so evaluation never sees a half-built rule set.
+        """
+        rules = list(self.rules)
+        compiled = []
+        interpreted = []
+        for index, rule in enumerate(rules):
+            if not rule.enabled:
+                continue
+            if rule.match is not None:
+                compiled.append((index, rule.match))
+            else:
+                interpreted.append((index, rule, [0, 0]))
+
+        program = CompiledRules(compiled)
+        windows = {}
+        sequences = {}
+        for rule in rules:
+            if rule.sequence and rule.enabled:
+                # One correlator holds the state machines of every sequence rule
+                sequences[rule.name] = (rule.version, rule.sequence)
+                windows[rule.name] = self.correlator
+                continue
+            spec = rule.aggregation or rule.top_k or rule.anomaly
+            if spec is None or not rule.enabled:
+                continue
+            counter = self.windows.get(rule.name)
+            if counter is None or counter.spec != spec:
+                if rule.top_k:
+                    counter = HeavyHitters(spec)
+                elif rule.anomaly:
+                    counter = RateBaseline(spec, self.window_max_keys, rule.name)
+                else:
+                    counter_class = SlidingWindowCounter if rule.window else DistinctCounter
+                    counter = counter_class(spec, self.window_max_keys, rule.name)
+            windows[rule.name] = counter
+
+        self._retired_stats = self.rule_stats()
+        self.correlator.set_rules(sequences)
+        self._program = (rules, program, interpreted)
+        self.windows = windows
+        logger.debug(
+            "alert_rules_compiled",
+            compiled_rules=len(compiled),
+            interpreted_rules=len(interpreted),
+            atoms=program.atom_count,
+        )
+
+    def replace_rules(self, source: str, rules: List[AlertRule]) -> None:
+        """
+        Atomically replace all rules loaded from a source.
+
+        Rules from other sources are kept, except those with the same name
+        as a new rule, which the new rule replaces.
+
+        Args:
+            source: Rule source (e.g. the rules file path)
+            rules: New rules from that source
+        """
+        names = {rule.name for rule in rules}
+        for rule in rules:
+            rule.source = source
+        self.rules = [
+            rule for rule in self.rules
+            if rule.source != source and rule.name not in names
+        ] + list(rules)
+        self.compile_rules()
+        logger.info("alert_rules_replaced", source=source, count=len(rules), total=len(self.rules))
+
     def add_rule(self, rule: AlertRule) -> None:
         """
         Add a custom alert rule.
@@ -143,7 +349,10 @@ class AlertRuleEngine:
         Args:
             rule: Alert rule to add
         """
+        if rule.source == "builtin":
+            rule.source = "custom"
         self.rules.append(rule)
+        self.compile_rules()
         logger.info("alert_rule_added", rule_name=rule.name)
 
     def remove_rule(self, rule_name: str) -> bool:
@@ -159,6 +368,7 @@ class AlertRuleEngine:
         for i, rule in enumerate(self.rules):
             if rule.name == rule_name:
                 del self.rules[i]
+                self.compile_rules()
                 logger.info("alert_rule_removed", rule_name=rule_name)
                 return True
         return False
@@ -176,6 +386,7 @@ class AlertRuleEngine:
         for rule in self.rules:
             if rule.name == rule_name:
                 rule.enabled = True
+                self.compile_rules()
                 logger.info("alert_rule_enabled", rule_name=rule_name)
                 return True
         return False
@@ -193,44 +404,199 @@ class AlertRuleEngine:
         for rule in self.rules:
             if rule.name == rule_name:
                 rule.enabled = False
+                self.compile_rules()
                 logger.info("alert_rule_disabled", rule_name=rule_name)
                 return True
         return False
 
-    def evaluate(self, log: Dict[str, Any]) -> List[AlertRule]:
+    def evaluate(self, log: Dict[str, Any], now: Optional[float] = None) -> List[AlertRule]:
         """
         Evaluate a log against all enabled rules.
 
         Args:
             log: Log data to evaluate
+            now: Time used by windowed rules (defaults to the current time)
 
         Returns:
             List of triggered alert rules
         """
-        triggered_rules = []
-
-        for rule in self.rules:
-            if not rule.enabled:
-                continue
-
-            try:
-                if rule.condition(log):
-                    triggered_rules.append(rule)
-                    logger.debug(
-                        "alert_rule_triggered",
+        rules, compiled, interpreted = self._program
+        try:
+            matched = compiled.matches(log)
+        except Exception as e:
+            logger.error("alert_rule_evaluation_failed", rule_name="compiled", error=str(e))
+            matched = []
+
+        if interpreted:
+            for index, rule, counts in interpreted:
+                counts[0] += 1
+                try:
+                    if rule.condition(log):
+                        matched.append(index)
+                        counts[1] += 1
+                except Exception as e:
+                    logger.error(
+                        "alert_rule_evaluation_failed",
                         rule_name=rule.name,
-                        severity=rule.severity,
-                        log_id=log.get("fingerprint", "unknown"),
+                        error=str(e),
                     )
-            except Exception as e:
-                logger.error(
-                    "alert_rule_evaluation_failed",
-                    rule_name=rule.name,
-                    error=str(e),
-                )
+            matched.sort()
+
+        triggered_rules = [rules[index] for index in matched]
+        if self.windows or self.dimensions:
+            now = time.time() if now is None else now
+            for tracker in self.dimensions.values():
+                tracker.observe(log, now)
+            if self.windows:
+                triggered_rules = self._apply_windows(triggered_rules, log, now)
+        for rule in triggered_rules:
+            logger.debug(
+                "alert_rule_triggered",
+                rule_name=rule.name,
+                severity=rule.severity,
+                log_id=log.get("fingerprint", "unknown"),
+            )
 
         return triggered_rules
 
+    def _apply_windows(self, rules: List[AlertRule], log: Dict[str, Any], now: float) -> List[AlertRule]:
+        triggered = []
+        for rule in rules:
+            counter = self.windows.get(rule.name)
+            if counter is None:
+                triggered.append(rule)
+                continue
+            if rule.top_k:
+                if counter.observe(log, now) is not None:
+                    triggered.append(rule)
+                continue
+            if rule.sequence:
+                key = rule.sequence.key_of(log)
+                if key is not None and counter.advance(rule.name, key, log, now) is not None:
+                    triggered.append(rule)
+                continue
+            key = counter.spec.key_of(log)
+            if key is None:
+                continue
+            if rule.distinct:
+                value = log.get(rule.distinct.field)
+                if value is None or counter.add(key, value, now) is None:
+                    continue
+            elif rule.anomaly:
+                if counter.add(key, now) is None:
+                    continue
+            elif counter.add(key, now) is None:
+                continue
+            triggered.append(rule)
+        return triggered
+
+    def distinct_counters(self) -> Dict[str, DistinctCounter]:
+        """
+        Get the state of the enabled distinct-count rules.
+
+        Returns:
+            Rule name mapped to its distinct counter
+        """
+        return {name: c for name, c in self.windows.items() if isinstance(c, DistinctCounter)}
+
+    def window_count(self, rule: AlertRule, log: Dict[str, Any], now: Optional[float] = None) -> int:
+        """
+        Get the current window count of a windowed or distinct-count rule
+        for a log's key.
+
+        Args:
+            rule: Windowed or distinct-count alert rule
+            log: Log document
+            now: Current time (defaults to the current time)
+
+        Returns:
+            Number of matching logs (or distinct values) with the same key
+            in the window
+        """
+        counter = self.windows.get(rule.name) if rule.aggregation else None
+        key = counter.spec.key_of(log) if counter is not None else None
+        if counter is None or key is None:
+            return 0
+        return counter.count(key, time.time() if now is None else now)
+
+    def rule_event(self, rule: AlertRule) -> Optional[Dict[str, Any]]:
+        """
+        Get what made a top-k, anomaly or sequence rule fire last.
+
+        Args:
+            rule: Top-k, anomaly or sequence alert rule
+
+        Returns:
+            Event description (see HeavyHitters.describe,
+            RateBaseline.add and Correlator.advance), or None
+        """
+        if rule.sequence:
+            return self.correlator.last_events.get(rule.name)
+        tracker = self.windows.get(rule.name) if rule.top_k or rule.anomaly else None
+        return tracker.last_event if tracker is not None else None
+
+    def check_anomalies(self, now: Optional[float] = None) -> List[Tuple[AlertRule, Dict[str, Any]]]:
+        """
+        Close finished intervals of the anomaly rules, finding keys whose
+        rate dropped or that went silent.
+
+        Args:
+            now: Current time (defaults to the current time)
+
+        Returns:
+            (rule, anomaly event) pairs
+        """
+        now = time.time() if now is None else now
+        rules, _, _ = self._program
+        windows = self.windows
+        found = []
+        for rule in rules:
+            baseline = windows.get(rule.name) if rule.anomaly else None
+            if baseline is not None:
+                found.extend((rule, event) for event in baseline.check(now))
+        return found
+
+    def top_k_report(self) -> Dict[str, Any]:
+        """
+        Get the current top-k of every tracked dimension and top-k rule.
+
+        Returns:
+            ``dimensions`` and ``rules``, each mapping a field or rule name
+            to its rankings (see HeavyHitters.report)
+        """
+        return {
+            "dimensions": {field: tracker.report() for field, tracker in list(self.dimensions.items())},
+            "rules": {
+                name: tracker.report()
+                for name, tracker in list(self.windows.items()) if isinstance(tracker, HeavyHitters)
+            },
+        }
+
+    def rule_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get per-rule evaluation counts.
+
+        A rule is only evaluated for logs its pre-filter index lets through,
+        so ``evaluated`` falling short of the number of logs shows the
+        work the index saved. Counts survive recompilation.
+
+        Returns:
+            Mapping of rule name to its evaluated and matched counts
+        """
+        stats = {name: dict(counts) for name, counts in self._retired_stats.items()}
+
+        def add(name: str, evaluated: int, matched: int) -> None:
+            counts = stats.setdefault(name, {"evaluated": 0, "matched": 0})
+            counts["evaluated"] += evaluated
+            counts["matched"] += matched
+
+        rules, compiled, interpreted = self._program
+        for (index, _), evaluated, matched in zip(compiled.programs, compiled.evaluated, compiled.matched):
+            add(rules[index].name, evaluated, matched)
+        for index, rule, (evaluated, matched) in interpreted:
+            add(rule.name, evaluated, matched)
+        return stats
+
     def get_all_rules(self) -> List[Dict[str, Any]]:
         """
         Get all alert rules.
@@ -244,6 +610,39 @@ class AlertRuleEngine:
                 "description": rule.description,
                 "severity": rule.severity,
                 "enabled": rule.enabled,
+                "version": rule.version,
+                "source": rule.source,
+                "window": {
+                    "threshold": rule.window.threshold,
+                    "seconds": rule.window.seconds,
+                    "group_by": list(rule.window.group_by),
+                } if rule.window else None,
+                "distinct": {
+                    "field": rule.distinct.field,
+                    "threshold": rule.distinct.threshold,
+                    "seconds": rule.distinct.seconds,
+                    "group_by": list(rule.distinct.group_by),
+                    "error": rule.distinct.error,
+                } if rule.distinct else None,
+                "top_k": {
+                    "field": rule.top_k.field,
+                    "k": rule.top_k.k,
+                    "seconds": rule.top_k.seconds,
+                    "trigger": rule.top_k.trigger,
+                    "min_rate": rule.top_k.min_rate,
+                } if rule.top_k else None,
+                "anomaly": {
+                    "group_by": list(rule.anomaly.group_by),
+                    "interval": rule.anomaly.interval,
+                    "z": rule.anomaly.z,
+                    "warmup": rule.anomaly.warmup,
+                    "direction": rule.anomaly.direction,
+                } if rule.anomaly else None,
+                "sequence": {
+                    "within": rule.sequence.within,
+                    "group_by": list(rule.sequence.group_by),
+                    "steps": [{"name": step.name, "count": step.count} for step in rule.sequence.steps],
+                } if rule.sequence else None,
             }
             for rule in self.rules
         ]
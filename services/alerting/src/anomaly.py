@@ -0,0 +1,333 @@
+"""
+Per-key event rate baselines (EWMA) and rate anomaly detection.
+"""
+import math
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from metrics import window_keys, window_key_evictions_total
+from window_counter import group_key
+
+DIRECTIONS = ("both", "spike", "drop")
+
+# Idle keys checked for eviction per counted event
+_IDLE_CHECKS_PER_EVENT = 2
+
+# Per-key flags
+_SPIKE_FIRED = 1
+_SILENCE_FIRED = 2
+
+
+@dataclass(frozen=True)
+class AnomalySpec:
+    """
+    Fire when a key's events per ``interval`` deviate from its baseline by
+    more than ``z`` standard deviations.
+
+    The baseline is an exponentially weighted mean and variance of past
+    interval counts (weight ``alpha`` for the newest interval). A key can
+    only fire after ``warmup`` intervals, and is forgotten after
+    ``retention`` intervals without events. ``direction`` limits firing to
+    rate spikes or to drops and silence.
+    """
+    group_by: Tuple[str, ...] = ("hostname",)
+    interval: float = 60.0
+    alpha: float = 0.1
+    z: float = 4.0
+    warmup: int = 10
+    direction: str = "both"
+    retention: int = 60
+
+    def key_of(self, log: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the baseline key of a log.
+
+        Args:
+            log: Log document
+
+        Returns:
+            Key built from the group_by fields, or None if any is missing
+        """
+        return group_key(log, self.group_by)
+
+    def group_of(self, key: str) -> Dict[str, str]:
+        """
+        Split a baseline key into its group_by fields.
+
+        Args:
+            key: Baseline key
+
+        Returns:
+            Field name mapped to value
+        """
+        return dict(zip(self.group_by, key.split("|", len(self.group_by) - 1)))
+
+
+class RateBaseline:
+    """
+    Per-key EWMA baselines of event counts per interval, with bounded memory.
+
+    Each key owns one slot in flat arrays (current interval and count, last
+    event interval, mean, variance, intervals seen, flags: about 41 bytes)
+    and no history: closing an interval folds its count into the mean and
+    variance in O(1). The standard deviation used for z-scores never drops
+    below the Poisson noise of the mean (or 1), so keys with steady low
+    rates do not fire on single events.
+
+    Anomalies are reported once each:
+
+    - spike: while an interval is running, as soon as its count exceeds
+      the baseline (from ``add``)
+    - drop: when an interval closes with a count far below the baseline
+    - silent: when consecutive empty intervals make up a significant drop
+      against the rate before the silence started, reported once per quiet
+      spell
+
+    Intervals of keys that send nothing are only closed by ``check``, which
+    the service calls periodically.
+    """
+
+    def __init__(self, spec: AnomalySpec, max_keys: int = 100000, name: str = ""):
+        """
+        Initialize rate baselines.
+
+        Args:
+            spec: Anomaly definition
+            max_keys: Maximum number of keys tracked at once
+            name: Rule name used as metrics label
+        """
+        self.spec = spec
+        self.max_keys = max_keys
+        self._decay = 1.0 - spec.alpha
+        self._spikes = spec.direction in ("both", "spike")
+        self._drops = spec.direction in ("both", "drop")
+        self.last_event: Optional[Dict[str, Any]] = None
+
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._epochs = array("q")
+        self._last = array("q")
+        self._counts = array("I")
+        self._quiet = array("I")
+        self._seen = array("I")
+        self._means = array("d")
+        self._vars = array("d")
+        self._flags = bytearray()
+
+        self._keys_gauge = window_keys.labels(rule_name=name)
+        self._idle_evictions = window_key_evictions_total.labels(rule_name=name, reason="idle")
+        self._capacity_evictions = window_key_evictions_total.labels(rule_name=name, reason="capacity")
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _allocate(self, key: str, bucket: int) -> int:
+        if len(self._slots) >= self.max_keys:
+            _, slot = self._slots.popitem(last=False)
+            self._free.append(slot)
+            self._capacity_evictions.inc()
+
+        if self._free:
+            slot = self._free.pop()
+            self._epochs[slot] = bucket
+            self._last[slot] = bucket
+            self._counts[slot] = 0
+            self._quiet[slot] = 0
+            self._seen[slot] = 0
+            self._means[slot] = 0.0
+            self._vars[slot] = 0.0
+            self._flags[slot] = 0
+        else:
+            slot = len(self._epochs)
+            self._epochs.append(bucket)
+            self._last.append(bucket)
+            self._counts.append(0)
+            self._quiet.append(0)
+            self._seen.append(0)
+            self._means.append(0.0)
+            self._vars.append(0.0)
+            self._flags.append(0)
+
+        self._slots[key] = slot
+        self._keys_gauge.set(len(self._slots))
+        return slot
+
+    def _std(self, mean: float, var: float) -> float:
+        return max(math.sqrt(var), math.sqrt(mean), 1.0)
+
+    def _event(self, key: str, slot: int, reason: str, count: int, mean: float, std: float) -> Dict[str, Any]:
+        interval = self.spec.interval
+        self.last_event = {
+            "key": key,
+            "group": self.spec.group_of(key),
+            "reason": reason,
+            "count": count,
+            "expected": round(mean, 3),
+            "std": round(std, 3),
+            "z": round((count - mean) / std, 2),
+            "interval": interval,
+            "interval_start": self._epochs[slot] * interval,
+            "quiet_intervals": self._quiet[slot],
+        }
+        return self.last_event
+
+    def _observe(self, key: str, slot: int, count: int) -> Optional[Dict[str, Any]]:
+        """Fold a closed interval's count into the baseline."""
+        seen = self._seen[slot]
+        if seen == 0:
+            self._means[slot] = float(count)
+            self._seen[slot] = 1
+            return None
+
+        mean = self._means[slot]
+        var = self._vars[slot]
+        event = None
+        if count == 0:
+            quiet = self._quiet[slot] + 1
+            self._quiet[slot] = quiet
+            if self._drops and seen >= self.spec.warmup and not self._flags[slot] & _SILENCE_FIRED:
+                # Rate before the silence: undo the decay of the empty intervals
+                base = mean / self._decay ** (quiet - 1)
+                std = self._std(base * quiet, var * quiet)
+                if base * quiet >= self.spec.z * std:
+                    self._flags[slot] |= _SILENCE_FIRED
+                    event = self._event(key, slot, "silent", 0, base * quiet, std)
+        elif self._drops and seen >= self.spec.warmup:
+            std = self._std(mean, var)
+            if (mean - count) / std >= self.spec.z:
+                event = self._event(key, slot, "drop", count, mean, std)
+
+        diff = count - mean
+        increment = self.spec.alpha * diff
+        self._means[slot] = mean + increment
+        self._vars[slot] = self._decay * (var + diff * increment)
+        if seen < 0xFFFFFFFF:
+            self._seen[slot] = seen + 1
+        return event
+
+    def _close(self, key: str, slot: int, bucket: int) -> Optional[Dict[str, Any]]:
+        """Close the intervals of a key up to (not including) bucket."""
+        closed = bucket - self._epochs[slot]
+        event = self._observe(key, slot, self._counts[slot])
+        # Later intervals were empty; past retention the key is evicted anyway
+        for _ in range(1, min(closed, self.spec.retention + 1)):
+            self._epochs[slot] += 1
+            event = self._observe(key, slot, 0) or event
+        self._epochs[slot] = bucket
+        self._counts[slot] = 0
+        self._flags[slot] &= ~_SPIKE_FIRED
+        return event
+
+    def evict_idle(self, now: float, limit: Optional[int] = None) -> int:
+        """
+        Evict keys without events for ``retention`` intervals.
+
+        Args:
+            now: Current time (seconds)
+            limit: Maximum keys to evict (all idle keys if None)
+
+        Returns:
+            Number of keys evicted
+        """
+        oldest = int(now // self.spec.interval) - self.spec.retention
+        evicted = 0
+        while self._slots and (limit is None or evicted < limit):
+            key, slot = next(iter(self._slots.items()))
+            if self._last[slot] > oldest:
+                break
+            del self._slots[key]
+            self._free.append(slot)
+            evicted += 1
+        if evicted:
+            self._idle_evictions.inc(evicted)
+            self._keys_gauge.set(len(self._slots))
+        return evicted
+
+    def baseline(self, key: str) -> Optional[Tuple[float, float, int]]:
+        """
+        Get the baseline of a key.
+
+        Args:
+            key: Baseline key
+
+        Returns:
+            (mean, standard deviation, intervals seen), or None if the key
+            is not tracked
+        """
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        mean = self._means[slot]
+        return mean, math.sqrt(self._vars[slot]), self._seen[slot]
+
+    def add(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        """
+        Count an event.
+
+        Args:
+            key: Baseline key
+            now: Event time (seconds)
+
+        Returns:
+            Anomaly event (key, reason, count, expected, std, z, interval,
+            interval_start, quiet_intervals) if this event revealed one,
+            else None
+        """
+        bucket = int(now // self.spec.interval)
+        slot = self._slots.get(key)
+        event = None
+        if slot is None:
+            slot = self._allocate(key, bucket)
+        else:
+            self._slots.move_to_end(key)
+            epoch = self._epochs[slot]
+            if bucket > epoch:
+                event = self._close(key, slot, bucket)
+            elif bucket < epoch:
+                # Late event of a closed interval
+                return None
+
+        self._last[slot] = bucket
+        self._quiet[slot] = 0
+        self._flags[slot] &= ~_SILENCE_FIRED
+        count = self._counts[slot] + 1
+        self._counts[slot] = count
+
+        self.evict_idle(now, _IDLE_CHECKS_PER_EVENT)
+
+        if (
+            event is None and self._spikes
+            and not self._flags[slot] & _SPIKE_FIRED
+            and self._seen[slot] >= self.spec.warmup
+        ):
+            mean = self._means[slot]
+            std = self._std(mean, self._vars[slot])
+            if count - mean > self.spec.z * std:
+                self._flags[slot] |= _SPIKE_FIRED
+                event = self._event(key, slot, "spike", count, mean, std)
+        return event
+
+    def check(self, now: float) -> List[Dict[str, Any]]:
+        """
+        Close finished intervals of every key and evict idle keys.
+
+        Reports the drops and silences of keys that have not sent events
+        since; call it at least once per interval.
+
+        Args:
+            now: Current time (seconds)
+
+        Returns:
+            Anomaly events found
+        """
+        bucket = int(now // self.spec.interval)
+        events = []
+        epochs = self._epochs
+        for key, slot in list(self._slots.items()):
+            if epochs[slot] < bucket:
+                event = self._close(key, slot, bucket)
+                if event is not None:
+                    events.append(event)
+        self.evict_idle(now)
+        return events
@@ -30,6 +30,7 @@ class Settings(BaseSettings):
     redis_port: int = 6379
     redis_db: int = 0
     redis_password: str = ""
+    redis_max_connections: int = 50
 
     # Alerting settings
     alerting_check_interval: int = 60
@@ -41,6 +42,40 @@ class Settings(BaseSettings):
     alerting_to_emails: str = "admin@example.com,security@example.com"
     alerting_slack_webhook_url: str = ""
     alerting_pagerduty_api_key: str = ""
+    alerting_webhook_url: str = ""
+    alerting_webhook_auth_header: str = ""
+    alerting_slack_rate_limit: float = 1.0
+    alerting_slack_burst: int = 5
+    alerting_webhook_rate_limit: float = 10.0
+    alerting_webhook_burst: int = 20
+    alerting_http_timeout: float = 10.0
+    alerting_http_max_connections: int = 10
+    alerting_rules_file: str = ""
+    alerting_rules_reload_interval: float = 5.0
+    alerting_error_spike_threshold: int = 10
+    alerting_error_spike_window: float = 60.0
+    alerting_window_max_keys: int = 100000
+    alerting_distinct_persist_interval: float = 60.0
+    alerting_top_k_dimensions: str = "source_ip,hostname,app_name,threat_keywords"
+    alerting_top_k: int = 20
+    alerting_top_k_interval: float = 60.0
+    alerting_anomaly_interval: float = 60.0
+    alerting_anomaly_z_threshold: float = 4.0
+    alerting_anomaly_warmup: int = 30
+    alerting_anomaly_check_interval: float = 10.0
+    alerting_correlation_max_states: int = 100000
+    alerting_correlation_snapshot_interval: float = 30.0
+    alerting_batch_size: int = 500
+    alerting_dedup_local_size: int = 100000
+    alerting_dedup_timeout: float = 0.25
+    alerting_dedup_retry_interval: float = 5.0
+    alerting_delivery_queue_size: int = 10000
+    alerting_delivery_workers: int = 2
+    alerting_delivery_max_attempts: int = 6
+    alerting_delivery_retry_base: float = 2.0
+    alerting_delivery_retry_max: float = 300.0
+    alerting_delivery_persist_interval: float = 1.0
+    alerting_delivery_drain_timeout: float = 10.0
 
     # Monitoring
     prometheus_port: int = 9103
@@ -55,6 +90,11 @@ class Settings(BaseSettings):
         """Parse recipient emails into a list."""
         return [e.strip() for e in self.alerting_to_emails.split(",") if e.strip()]
 
+    @property
+    def top_k_dimensions_list(self) -> List[str]:
+        """Parse top-k dimension fields into a list."""
+        return [f.strip() for f in self.alerting_top_k_dimensions.split(",") if f.strip()]
+
 
 # Global settings instance
 settings = Settings()
@@ -0,0 +1,399 @@
+"""
+Multi-event correlation: per-key state machines for sequence rules.
+"""
+import json
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from metrics import correlation_states, correlation_state_evictions_total
+from rule_compiler import CompiledRules, Condition
+from window_counter import group_key
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class SequenceStep:
+    """``count`` logs matching ``condition`` (not necessarily consecutive)."""
+    condition: Condition
+    count: int = 1
+    name: str = ""
+
+
+@dataclass(frozen=True)
+class SequenceSpec:
+    """Fire when logs sharing a ``group_by`` key complete ``steps`` in order within ``within`` seconds."""
+    steps: Tuple[SequenceStep, ...]
+    within: float
+    group_by: Tuple[str, ...] = ("source_ip",)
+
+    def key_of(self, log: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the correlation key of a log.
+
+        Args:
+            log: Log document
+
+        Returns:
+            Key built from the group_by fields, or None if any is missing
+        """
+        return group_key(log, self.group_by)
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel for deadlines.
+
+    Deadlines are rounded up to ``tick`` seconds and hashed into ``slots``
+    buckets, so scheduling and cancelling are O(1) and advancing the clock
+    only visits the buckets of the ticks that passed. Deadlines more than
+    one revolution ahead stay in their bucket until their tick comes.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512):
+        """
+        Initialize timer wheel.
+
+        Args:
+            tick: Timer resolution in seconds
+            slots: Number of buckets
+        """
+        self.tick = tick
+        self._slots: List[Dict[Hashable, None]] = [{} for _ in range(slots)]
+        self._deadlines: Dict[Hashable, int] = {}
+        self._current: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """
+        Set (or move) the deadline of a key.
+
+        Args:
+            key: Timer key
+            deadline: Expiry time (seconds)
+        """
+        self.cancel(key)
+        tick = math.ceil(deadline / self.tick)
+        if self._current is not None and tick <= self._current:
+            tick = self._current + 1
+        self._deadlines[key] = tick
+        self._slots[tick % len(self._slots)][key] = None
+
+    def cancel(self, key: Hashable) -> None:
+        """
+        Remove the deadline of a key, if any.
+
+        Args:
+            key: Timer key
+        """
+        tick = self._deadlines.pop(key, None)
+        if tick is not None:
+            del self._slots[tick % len(self._slots)][key]
+
+    def advance(self, now: float) -> List[Hashable]:
+        """
+        Move the clock forward and collect the keys that expired.
+
+        Args:
+            now: Current time (seconds)
+
+        Returns:
+            Keys whose deadline is at or before now
+        """
+        tick = int(now // self.tick)
+        current = self._current
+        if current is not None and tick <= current:
+            return []
+        self._current = tick
+
+        n = len(self._slots)
+        if current is None or tick - current >= n:
+            indexes = range(n)
+        else:
+            indexes = (t % n for t in range(current + 1, tick + 1))
+
+        expired = []
+        deadlines = self._deadlines
+        for index in indexes:
+            bucket = self._slots[index]
+            if not bucket:
+                continue
+            due = [key for key in bucket if deadlines[key] <= tick]
+            for key in due:
+                del bucket[key]
+                del deadlines[key]
+            expired.extend(due)
+        return expired
+
+
+class _State:
+    """Progress of one key through a sequence."""
+
+    __slots__ = ("stage", "count", "started", "deadline")
+
+    def __init__(self, stage: int, count: int, started: float, deadline: float):
+        self.stage = stage
+        self.count = count
+        self.started = started
+        self.deadline = deadline
+
+
+class Correlator:
+    """
+    Per-key finite state machines for sequence rules, with a state ceiling.
+
+    A key's machine starts at the first log matching step 0 and moves to
+    the next step once a step has seen its count of matching logs; logs
+    matching other steps are ignored. Completing the last step fires the
+    rule and resets the key. A machine that does not complete within the
+    rule's ``within`` seconds of its first log expires; deadlines live in a
+    timer wheel, so expiry costs nothing for machines that are not due.
+
+    At most ``max_states`` machines are kept across all rules. When full,
+    the least recently updated machine still on its first step is evicted,
+    and only if there is none, the least recently updated advanced one, so
+    a flood of new keys cannot push out sequences that are under way.
+    """
+
+    def __init__(self, max_states: int = 100000, tick: float = 1.0):
+        """
+        Initialize correlator.
+
+        Args:
+            max_states: Maximum number of state machines kept
+            tick: Expiry resolution in seconds
+        """
+        self.max_states = max_states
+        self.last_events: Dict[str, Dict[str, Any]] = {}
+        self._rules: Dict[str, Tuple[str, SequenceSpec, CompiledRules]] = {}
+        self._early: "OrderedDict[Tuple[str, str], _State]" = OrderedDict()
+        self._advanced: "OrderedDict[Tuple[str, str], _State]" = OrderedDict()
+        self._wheel = TimerWheel(tick)
+
+    def __len__(self) -> int:
+        return len(self._early) + len(self._advanced)
+
+    def _publish(self) -> None:
+        correlation_states.labels(stage="first").set(len(self._early))
+        correlation_states.labels(stage="advanced").set(len(self._advanced))
+
+    def _get(self, state_key: Tuple[str, str]) -> Optional[_State]:
+        state = self._early.get(state_key)
+        return state if state is not None else self._advanced.get(state_key)
+
+    def _remove(self, state_key: Tuple[str, str]) -> None:
+        if self._early.pop(state_key, None) is None:
+            self._advanced.pop(state_key, None)
+        self._wheel.cancel(state_key)
+
+    def _insert(self, state_key: Tuple[str, str], state: _State) -> None:
+        if len(self) >= self.max_states:
+            queue = self._early or self._advanced
+            victim, _ = queue.popitem(last=False)
+            self._wheel.cancel(victim)
+            correlation_state_evictions_total.labels(reason="capacity").inc()
+        (self._early if state.stage == 0 else self._advanced)[state_key] = state
+        self._wheel.schedule(state_key, state.deadline)
+
+    def set_rules(self, rules: Dict[str, Tuple[str, SequenceSpec]]) -> None:
+        """
+        Replace the sequence rules, keeping the state of unchanged ones.
+
+        Args:
+            rules: Rule name mapped to (version, sequence definition)
+        """
+        updated = {}
+        for name, (version, spec) in rules.items():
+            known = self._rules.get(name)
+            if known is not None and known[0] == version and known[1] == spec:
+                updated[name] = known
+            else:
+                steps = CompiledRules([(i, step.condition) for i, step in enumerate(spec.steps)])
+                updated[name] = (version, spec, steps)
+        stale = [
+            state_key for queue in (self._early, self._advanced) for state_key in queue
+            if updated.get(state_key[0]) is not self._rules.get(state_key[0])
+        ]
+        for state_key in stale:
+            self._remove(state_key)
+        self._rules = updated
+        self.last_events = {name: e for name, e in self.last_events.items() if name in updated}
+        self._publish()
+
+    def expire(self, now: float) -> int:
+        """
+        Drop machines whose deadline passed.
+
+        Args:
+            now: Current time (seconds)
+
+        Returns:
+            Number of machines dropped
+        """
+        expired = self._wheel.advance(now)
+        for state_key in expired:
+            if self._early.pop(state_key, None) is None:
+                self._advanced.pop(state_key, None)
+        if expired:
+            correlation_state_evictions_total.labels(reason="expired").inc(len(expired))
+            self._publish()
+        return len(expired)
+
+    def advance(self, rule_name: str, key: str, log: Dict[str, Any], now: float) -> Optional[Dict[str, Any]]:
+        """
+        Feed a log to a key's machine of a rule.
+
+        Args:
+            rule_name: Sequence rule name
+            key: Correlation key
+            log: Log document (already matching the rule)
+            now: Event time (seconds)
+
+        Returns:
+            Completed sequence (rule, key, group, started, completed,
+            duration and steps) if this log completed it, else None
+        """
+        self.expire(now)
+        known = self._rules.get(rule_name)
+        if known is None:
+            return None
+        _, spec, steps = known
+        matched = steps.matches(log)
+        if not matched:
+            return None
+
+        state_key = (rule_name, key)
+        state = self._get(state_key)
+        if state is not None and state.deadline < now:
+            self._remove(state_key)
+            state = None
+        if state is None:
+            if matched[0] != 0:
+                return None
+            state = _State(0, 0, now, now + spec.within)
+            self._insert(state_key, state)
+        elif state.stage not in matched:
+            return None
+        elif state.stage == 0:
+            self._early.move_to_end(state_key)
+        else:
+            self._advanced.move_to_end(state_key)
+
+        state.count += 1
+        if state.count < spec.steps[state.stage].count:
+            return None
+        state.stage += 1
+        state.count = 0
+        if state.stage == 1 and len(spec.steps) > 1:
+            self._advanced[state_key] = self._early.pop(state_key)
+            self._publish()
+        if state.stage < len(spec.steps):
+            return None
+
+        self._remove(state_key)
+        self._publish()
+        event = {
+            "rule_name": rule_name,
+            "key": key,
+            "group": dict(zip(spec.group_by, key.split("|", len(spec.group_by) - 1))),
+            "started": state.started,
+            "completed": now,
+            "duration": round(now - state.started, 3),
+            "steps": [{"name": step.name, "count": step.count} for step in spec.steps],
+        }
+        self.last_events[rule_name] = event
+        return event
+
+    def snapshot(self) -> bytes:
+        """
+        Serialize every machine.
+
+        Returns:
+            JSON document with the rule versions and the machines in
+            eviction order
+        """
+        states = [
+            [rule_name, key, s.stage, s.count, s.started, s.deadline]
+            for queue in (self._early, self._advanced)
+            for (rule_name, key), s in list(queue.items())
+        ]
+        return json.dumps({
+            "version": SNAPSHOT_VERSION,
+            "rules": {name: version for name, (version, _, _) in self._rules.items()},
+            "states": states,
+        }).encode("utf-8")
+
+    def restore(self, data: bytes, now: float) -> int:
+        """
+        Load machines from a snapshot, skipping expired ones and those of
+        rules that are gone or changed version.
+
+        Args:
+            data: Output of snapshot()
+            now: Current time (seconds)
+
+        Returns:
+            Number of machines restored
+
+        Raises:
+            ValueError: If the snapshot is malformed
+        """
+        document = json.loads(data)
+        if document.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported correlation snapshot version {document.get('version')!r}")
+        versions = document.get("rules", {})
+        restored = 0
+        for rule_name, key, stage, count, started, deadline in document.get("states", []):
+            known = self._rules.get(rule_name)
+            if known is None or versions.get(rule_name) != known[0] or deadline < now:
+                continue
+            if not 0 <= stage < len(known[1].steps):
+                continue
+            state_key = (rule_name, key)
+            self._remove(state_key)
+            self._insert(state_key, _State(stage, count, started, deadline))
+            restored += 1
+        self._publish()
+        return restored
+
+
+class RedisCorrelationStore:
+    """
+    Persist correlation snapshots as one Redis string.
+
+    Only does I/O, so callers can take the snapshot on the event loop and
+    run save and load in an executor.
+    """
+
+    def __init__(self, redis_client, key: str = "alerting:correlation"):
+        """
+        Initialize correlation store.
+
+        Args:
+            redis_client: Synchronous Redis client
+            key: Redis key of the snapshot
+        """
+        self.redis = redis_client
+        self.key = key
+
+    def save(self, data: bytes, ttl: int = 86400) -> None:
+        """
+        Replace the stored snapshot.
+
+        Args:
+            data: Output of Correlator.snapshot()
+            ttl: Seconds the snapshot is kept
+        """
+        self.redis.set(self.key, data, ex=ttl)
+
+    def load(self) -> Optional[bytes]:
+        """
+        Read the stored snapshot.
+
+        Returns:
+            Snapshot, or None if there is none
+        """
+        return self.redis.get(self.key)
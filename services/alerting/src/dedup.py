@@ -0,0 +1,221 @@
+"""
+Alert deduplication: an in-process TTL cache in front of atomic Redis claims.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Sequence, Tuple
+import redis.asyncio as aioredis
+from logger import get_logger
+from metrics import alert_dedup_checks_total, alert_dedup_degraded
+
+logger = get_logger(__name__)
+
+
+class TTLCache:
+    """Bounded set of keys that expire after a per-key TTL, oldest evicted first."""
+
+    def __init__(self, max_size: int = 100000):
+        """
+        Initialize TTL cache.
+
+        Args:
+            max_size: Maximum number of keys kept
+        """
+        self.max_size = max_size
+        self._expiry: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def __contains__(self, key: Hashable) -> bool:
+        expires_at = self._expiry.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._expiry[key]
+            return False
+        return True
+
+    def add(self, key: Hashable, ttl: float) -> None:
+        """
+        Add a key, evicting the oldest key when full.
+
+        Args:
+            key: Cache key
+            ttl: Time-to-live in seconds
+        """
+        self._expiry[key] = time.monotonic() + ttl
+        self._expiry.move_to_end(key)
+        while len(self._expiry) > self.max_size:
+            self._expiry.popitem(last=False)
+
+
+class AlertDeduplicator:
+    """
+    Decide which alerts are new, shared across alerting instances via Redis.
+
+    An alert key is claimed with ``SET key 1 NX EX ttl``, which checks and
+    records it in one atomic step; the keys of a batch are claimed in one
+    pipeline, with a ``PTTL`` per key so keys someone else claimed are
+    cached only for their remaining lifetime. Keys known to be claimed are
+    kept in an in-process TTL cache and answered without a round trip.
+
+    Redis calls are bounded by ``timeout``. When Redis fails or is slow the
+    deduplicator turns degraded: for ``retry_interval`` seconds it only
+    uses the local cache (so an alert storm is still deduplicated within
+    this instance) and consumption never waits on Redis.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[aioredis.Redis] = None,
+        local_max_size: int = 100000,
+        timeout: float = 0.25,
+        retry_interval: float = 5.0,
+    ):
+        """
+        Initialize alert deduplicator.
+
+        Args:
+            redis_client: Async Redis client (None for local-only deduplication)
+            local_max_size: Maximum keys in the in-process cache
+            timeout: Seconds a Redis round trip may take
+            retry_interval: Seconds Redis is skipped after a failure
+        """
+        self.redis = redis_client
+        self.local = TTLCache(local_max_size)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._retry_at = 0.0
+        alert_dedup_degraded.set(0)
+
+    @classmethod
+    def from_settings(cls, settings) -> "AlertDeduplicator":
+        """
+        Build a deduplicator from service settings.
+
+        Args:
+            settings: Alerting settings
+
+        Returns:
+            Configured alert deduplicator
+        """
+        pool = aioredis.ConnectionPool(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            password=settings.redis_password or None,
+            max_connections=settings.redis_max_connections,
+            decode_responses=True,
+            socket_timeout=2,
+            socket_connect_timeout=2,
+        )
+        return cls(
+            redis_client=aioredis.Redis(connection_pool=pool),
+            local_max_size=settings.alerting_dedup_local_size,
+            timeout=settings.alerting_dedup_timeout,
+            retry_interval=settings.alerting_dedup_retry_interval,
+        )
+
+    @property
+    def degraded(self) -> bool:
+        """Whether Redis is currently skipped after a failure."""
+        return self._retry_at > time.monotonic()
+
+    def _fail(self, error: Exception) -> None:
+        if not self._retry_at:
+            logger.warning("alert_dedup_degraded", error=str(error) or type(error).__name__)
+        self._retry_at = time.monotonic() + self.retry_interval
+        alert_dedup_degraded.set(1)
+
+    async def ping(self) -> bool:
+        """
+        Check that Redis answers, turning degraded if it does not.
+
+        Returns:
+            True if Redis is reachable
+        """
+        if self.redis is None:
+            return False
+        try:
+            await asyncio.wait_for(self.redis.ping(), self.timeout * 4)
+            return True
+        except Exception as e:
+            self._fail(e)
+            return False
+
+    async def claim(self, entries: Sequence[Tuple[str, int]]) -> List[bool]:
+        """
+        Claim a batch of alert keys.
+
+        Args:
+            entries: (alert key, TTL in seconds) pairs
+
+        Returns:
+            For each entry, True if the alert is new and should be sent,
+            False if it is a duplicate (including repeats within the batch)
+        """
+        fresh = [False] * len(entries)
+        pending: List[int] = []
+        seen = set()
+        for i, (key, _) in enumerate(entries):
+            if key in seen or key in self.local:
+                continue
+            seen.add(key)
+            pending.append(i)
+        alert_dedup_checks_total.labels(result="local").inc(len(entries) - len(pending))
+        if not pending:
+            return fresh
+
+        results = None
+        if self.redis is not None and not self.degraded:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for i in pending:
+                        key, ttl = entries[i]
+                        pipe.set(key, "1", nx=True, ex=max(int(ttl), 1))
+                        pipe.pttl(key)
+                    results = await asyncio.wait_for(pipe.execute(), self.timeout)
+            except Exception as e:
+                self._fail(e)
+            else:
+                if self._retry_at:
+                    self._retry_at = 0.0
+                    alert_dedup_degraded.set(0)
+                    logger.info("alert_dedup_recovered")
+
+        if results is None:
+            # Without Redis, only this instance's history counts
+            for i in pending:
+                key, ttl = entries[i]
+                self.local.add(key, ttl)
+                fresh[i] = True
+            alert_dedup_checks_total.labels(result="degraded" if self.redis is not None else "new").inc(
+                len(pending)
+            )
+            return fresh
+
+        duplicates = 0
+        for n, i in enumerate(pending):
+            key, ttl = entries[i]
+            claimed, remaining_ms = results[2 * n], results[2 * n + 1]
+            if claimed:
+                self.local.add(key, ttl)
+                fresh[i] = True
+                continue
+            duplicates += 1
+            if remaining_ms and remaining_ms > 0:
+                self.local.add(key, remaining_ms / 1000)
+        alert_dedup_checks_total.labels(result="redis").inc(duplicates)
+        alert_dedup_checks_total.labels(result="new").inc(len(pending) - duplicates)
+        return fresh
+
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        if self.redis is None:
+            return
+        try:
+            await self.redis.aclose()
+        except Exception as e:
+            logger.error("alert_dedup_close_failed", error=str(e))
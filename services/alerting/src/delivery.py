@@ -0,0 +1,306 @@
+"""
+Asynchronous alert delivery: per-channel queues with workers, retries and a
+persisted pending list.
+"""
+import asyncio
+import heapq
+import json
+import random
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from logger import get_logger
+from metrics import (
+    alert_delivery_dropped_total,
+    alert_delivery_queue_depth,
+    alert_delivery_retries_total,
+)
+
+logger = get_logger(__name__)
+
+
+class Delivery:
+    """One alert on its way to one channel."""
+
+    __slots__ = ("id", "alert", "attempts")
+
+    def __init__(self, id: str, alert: Dict[str, Any], attempts: int = 0):
+        self.id = id
+        self.alert = alert
+        self.attempts = attempts
+
+
+class RedisDeliveryJournal:
+    """
+    Pending deliveries kept in one Redis hash per channel.
+
+    Changes are buffered and written by ``flush`` in a single pipeline, so
+    queueing an alert never waits on Redis; a crash loses at most the
+    changes since the last flush. Deliveries are removed once sent or
+    given up on, so whatever the hash holds at startup still has to go out.
+    """
+
+    def __init__(self, redis_client, prefix: str = "alerting:delivery"):
+        """
+        Initialize delivery journal.
+
+        Args:
+            redis_client: Async Redis client with decode_responses
+            prefix: Key prefix of the per-channel hashes
+        """
+        self.redis = redis_client
+        self.prefix = prefix
+        # (channel, delivery id) mapped to the serialized delivery, or None to delete
+        self._changes: Dict[Tuple[str, str], Optional[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+    def record(self, channel: str, delivery: Delivery) -> None:
+        """
+        Add or update a pending delivery.
+
+        Args:
+            channel: Channel name
+            delivery: Pending delivery
+        """
+        self._changes[(channel, delivery.id)] = json.dumps(
+            {"alert": delivery.alert, "attempts": delivery.attempts}, default=str
+        )
+
+    def forget(self, channel: str, delivery_id: str) -> None:
+        """
+        Remove a delivery that was sent or given up on.
+
+        Args:
+            channel: Channel name
+            delivery_id: Delivery id
+        """
+        self._changes[(channel, delivery_id)] = None
+
+    async def flush(self) -> int:
+        """
+        Write the buffered changes.
+
+        Returns:
+            Number of changes written
+        """
+        changes, self._changes = self._changes, {}
+        if not changes:
+            return 0
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for (channel, delivery_id), data in changes.items():
+                    if data is None:
+                        pipe.hdel(f"{self.prefix}:{channel}", delivery_id)
+                    else:
+                        pipe.hset(f"{self.prefix}:{channel}", delivery_id, data)
+                await pipe.execute()
+        except Exception as e:
+            # Keep the changes for the next flush unless newer ones replaced them
+            for key, data in changes.items():
+                self._changes.setdefault(key, data)
+            logger.error("delivery_journal_flush_failed", error=str(e), changes=len(changes))
+            return 0
+        return len(changes)
+
+    async def load(self, channel: str) -> List[Delivery]:
+        """
+        Read the pending deliveries of a channel.
+
+        Args:
+            channel: Channel name
+
+        Returns:
+            Pending deliveries (malformed entries are skipped)
+        """
+        entries = await self.redis.hgetall(f"{self.prefix}:{channel}")
+        deliveries = []
+        for delivery_id, data in entries.items():
+            try:
+                entry = json.loads(data)
+                deliveries.append(Delivery(delivery_id, entry["alert"], int(entry["attempts"])))
+            except (ValueError, KeyError, TypeError):
+                self.forget(channel, delivery_id)
+        return deliveries
+
+
+class DeliveryQueue:
+    """
+    Bounded delivery queue of one channel, drained by worker tasks.
+
+    ``submit`` only enqueues, so evaluation never waits on a slow endpoint.
+    A failed send is retried after an exponential backoff with jitter
+    (``retry_base`` seconds doubling per attempt, capped at ``retry_max``)
+    until ``max_attempts`` sends failed; waiting retries sit in a delay heap
+    and do not hold a worker. Alerts beyond ``max_size`` pending ones
+    (queued, in flight or waiting to retry) are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        channel,
+        max_size: int = 10000,
+        workers: int = 2,
+        max_attempts: int = 6,
+        retry_base: float = 2.0,
+        retry_max: float = 300.0,
+        journal: Optional[RedisDeliveryJournal] = None,
+    ):
+        """
+        Initialize delivery queue.
+
+        Args:
+            channel: Alert channel with a ``name`` and an async ``send``
+                returning True on success
+            max_size: Maximum pending deliveries
+            workers: Number of concurrent sends
+            max_attempts: Sends tried before an alert is given up on
+            retry_base: Backoff before the first retry in seconds
+            retry_max: Maximum backoff in seconds
+            journal: Optional journal persisting pending deliveries
+        """
+        self.channel = channel
+        self.name = channel.name
+        self.max_size = max_size
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.journal = journal
+
+        self._ready: "asyncio.Queue[Delivery]" = asyncio.Queue()
+        self._delayed: List[Tuple[float, int, Delivery]] = []
+        self._sequence = 0
+        self._pending = 0
+        self._in_flight = 0
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._depth = alert_delivery_queue_depth.labels(channel=self.name)
+        self._depth.set(0)
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def submit(self, alert: Dict[str, Any], delivery: Optional[Delivery] = None) -> bool:
+        """
+        Queue an alert for delivery.
+
+        Args:
+            alert: Alert data
+            delivery: Delivery restored from the journal (instead of alert)
+
+        Returns:
+            True if queued, False if the queue is full
+        """
+        if self._pending >= self.max_size:
+            alert_delivery_dropped_total.labels(channel=self.name, reason="queue_full").inc()
+            logger.warning("alert_delivery_queue_full", channel=self.name, rule_name=alert.get("rule_name"))
+            if delivery is not None and self.journal is not None:
+                self.journal.forget(self.name, delivery.id)
+            return False
+
+        if delivery is None:
+            delivery = Delivery(uuid.uuid4().hex, alert)
+            if self.journal is not None:
+                self.journal.record(self.name, delivery)
+        self._pending += 1
+        self._depth.set(self._pending)
+        self._ready.put_nowait(delivery)
+        return True
+
+    def backoff(self, attempts: int) -> float:
+        """
+        Get the delay before retrying.
+
+        Args:
+            attempts: Failed sends so far
+
+        Returns:
+            Delay in seconds, between half and all of the exponential backoff
+        """
+        delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _finish(self, delivery: Delivery) -> None:
+        self._pending -= 1
+        self._depth.set(self._pending)
+        if self.journal is not None:
+            self.journal.forget(self.name, delivery.id)
+
+    async def _work(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            delivery = await self._ready.get()
+            self._in_flight += 1
+            try:
+                try:
+                    sent = await self.channel.send(delivery.alert)
+                except Exception as e:
+                    logger.error("alert_delivery_exception", channel=self.name, error=str(e))
+                    sent = False
+            finally:
+                self._in_flight -= 1
+
+            delivery.attempts += 1
+            if sent:
+                self._finish(delivery)
+            elif delivery.attempts >= self.max_attempts:
+                alert_delivery_dropped_total.labels(channel=self.name, reason="attempts_exhausted").inc()
+                logger.error(
+                    "alert_delivery_abandoned",
+                    channel=self.name,
+                    rule_name=delivery.alert.get("rule_name"),
+                    attempts=delivery.attempts,
+                )
+                self._finish(delivery)
+            else:
+                alert_delivery_retries_total.labels(channel=self.name).inc()
+                if self.journal is not None:
+                    self.journal.record(self.name, delivery)
+                self._sequence += 1
+                due = loop.time() + self.backoff(delivery.attempts)
+                heapq.heappush(self._delayed, (due, self._sequence, delivery))
+                self._wakeup.set()
+
+    async def _schedule(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while self._delayed and self._delayed[0][0] <= now:
+                self._ready.put_nowait(heapq.heappop(self._delayed)[2])
+            timeout = self._delayed[0][0] - now if self._delayed else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Start the worker and retry scheduler tasks."""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(max(self.workers, 1))]
+        self._tasks.append(asyncio.create_task(self._schedule()))
+
+    async def stop(self, timeout: float = 10.0) -> int:
+        """
+        Send what is queued, up to a timeout, then stop the workers.
+
+        Deliveries waiting to be retried are not waited for; with a journal
+        they are picked up again after a restart.
+
+        Args:
+            timeout: Seconds to wait for queued deliveries
+
+        Returns:
+            Number of deliveries still pending
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (not self._ready.empty() or self._in_flight) and loop.time() < deadline and self._tasks:
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        return self._pending
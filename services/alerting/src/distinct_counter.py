@@ -0,0 +1,379 @@
+"""
+Distinct-count alert rules backed by per-key HyperLogLog sketches.
+"""
+import struct
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from hyperloglog import HyperLogLog, hash64, precision_for_error
+from metrics import distinct_sketch_bytes, window_keys, window_key_evictions_total
+from window_counter import group_key
+
+# Idle keys checked for eviction per counted event
+_IDLE_CHECKS_PER_EVENT = 2
+
+# Persisted key state: epoch, fired flag, bucket count
+_HEADER = struct.Struct("<qBH")
+_LENGTH = struct.Struct("<I")
+
+
+@dataclass(frozen=True)
+class DistinctSpec:
+    """Fire when more than ``threshold`` distinct ``field`` values share a key within ``seconds``."""
+    field: str
+    threshold: int
+    seconds: float
+    group_by: Tuple[str, ...] = ("source_ip",)
+    buckets: int = 5
+    error: float = 0.05
+
+    @property
+    def precision(self) -> int:
+        """Sketch precision meeting the configured standard error."""
+        return precision_for_error(self.error)
+
+    def key_of(self, log: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the counting key of a log.
+
+        Args:
+            log: Log document
+
+        Returns:
+            Key built from the group_by fields, or None if any is missing
+        """
+        return group_key(log, self.group_by)
+
+
+class _KeyState:
+    """Bucket sketches of one key and their running union."""
+
+    __slots__ = ("epoch", "sketches", "union", "fired")
+
+    def __init__(self, epoch: int, buckets: int, precision: int):
+        self.epoch = epoch
+        self.sketches: List[Optional[HyperLogLog]] = [None] * buckets
+        self.union = HyperLogLog(precision)
+        self.fired = False
+
+    @property
+    def nbytes(self) -> int:
+        return self.union.nbytes + sum(s.nbytes for s in self.sketches if s is not None)
+
+
+class DistinctCounter:
+    """
+    Per-key distinct-value counts over a sliding window.
+
+    Every key keeps one HyperLogLog sketch per time bucket plus the union of
+    its live buckets, so counting an event updates two sketches and reads
+    the union's estimate in O(1). When buckets expire the union is rebuilt
+    from the remaining ones. Sketches stay sparse (exact, 8 bytes per
+    value) until they would outgrow their registers, so keys that only see
+    a few values stay small. Keys are evicted when idle for a whole window
+    or, past ``max_keys``, least recently updated first.
+
+    ``add`` reports a key once when its distinct count first exceeds the
+    threshold and re-arms after it falls back to the threshold or below.
+    """
+
+    def __init__(self, spec: DistinctSpec, max_keys: int = 100000, name: str = ""):
+        """
+        Initialize distinct counter.
+
+        Args:
+            spec: Distinct-count definition
+            max_keys: Maximum number of keys tracked at once
+            name: Rule name used as metrics label
+        """
+        self.spec = spec
+        self.max_keys = max_keys
+        self.buckets = max(spec.buckets, 1)
+        self.bucket_width = spec.seconds / self.buckets
+        self.precision = spec.precision
+
+        self._keys: "OrderedDict[str, _KeyState]" = OrderedDict()
+        self._bytes = 0
+
+        self._keys_gauge = window_keys.labels(rule_name=name)
+        self._bytes_gauge = distinct_sketch_bytes.labels(rule_name=name)
+        self._idle_evictions = window_key_evictions_total.labels(rule_name=name, reason="idle")
+        self._capacity_evictions = window_key_evictions_total.labels(rule_name=name, reason="capacity")
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes of sketch data held for all keys."""
+        return self._bytes
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get memory use and accuracy of the tracked keys.
+
+        Returns:
+            Key count, sketch bytes in total and per key, precision and
+            relative standard error
+        """
+        keys = len(self._keys)
+        return {
+            "keys": keys,
+            "bytes": self._bytes,
+            "bytes_per_key": self._bytes / keys if keys else 0.0,
+            "precision": self.precision,
+            "error": HyperLogLog(self.precision).error,
+        }
+
+    def _publish(self) -> None:
+        self._keys_gauge.set(len(self._keys))
+        self._bytes_gauge.set(self._bytes)
+
+    def _drop(self, key: str) -> None:
+        self._bytes -= self._keys.pop(key).nbytes
+
+    def _allocate(self, key: str, bucket: int) -> _KeyState:
+        if len(self._keys) >= self.max_keys:
+            self._drop(next(iter(self._keys)))
+            self._capacity_evictions.inc()
+        state = _KeyState(bucket, self.buckets, self.precision)
+        self._keys[key] = state
+        self._publish()
+        return state
+
+    def _advance(self, state: _KeyState, bucket: int) -> None:
+        n = self.buckets
+        expired = False
+        for b in range(max(state.epoch + 1, bucket - n + 1), bucket + 1):
+            sketch = state.sketches[b % n]
+            if sketch is not None:
+                self._bytes -= sketch.nbytes
+                state.sketches[b % n] = None
+                expired = True
+        state.epoch = bucket
+
+        if expired:
+            self._bytes -= state.union.nbytes
+            state.union = HyperLogLog(self.precision)
+            for sketch in state.sketches:
+                if sketch is not None:
+                    state.union.merge(sketch)
+            self._bytes += state.union.nbytes
+            self._bytes_gauge.set(self._bytes)
+
+    def evict_idle(self, now: float, limit: Optional[int] = None) -> int:
+        """
+        Evict keys with no events inside the window.
+
+        Args:
+            now: Current time (seconds)
+            limit: Maximum keys to evict (all idle keys if None)
+
+        Returns:
+            Number of keys evicted
+        """
+        oldest = int(now // self.bucket_width) - self.buckets
+        evicted = 0
+        while self._keys and (limit is None or evicted < limit):
+            key, state = next(iter(self._keys.items()))
+            if state.epoch > oldest:
+                break
+            self._drop(key)
+            evicted += 1
+        if evicted:
+            self._idle_evictions.inc(evicted)
+            self._publish()
+        return evicted
+
+    def count(self, key: str, now: float) -> int:
+        """
+        Estimate the distinct values seen for a key within the window.
+
+        Args:
+            key: Counting key
+            now: Current time (seconds)
+
+        Returns:
+            Distinct count estimate
+        """
+        state = self._keys.get(key)
+        if state is None:
+            return 0
+        bucket = int(now // self.bucket_width)
+        if bucket > state.epoch:
+            self._advance(state, bucket)
+        return state.union.count()
+
+    def add(self, key: str, value: Any, now: float) -> Optional[int]:
+        """
+        Count a value for a key.
+
+        Args:
+            key: Counting key
+            value: Value whose distinct occurrences are counted
+            now: Event time (seconds)
+
+        Returns:
+            The distinct count if this value took the key over the
+            threshold (once per crossing), else None
+        """
+        bucket = int(now // self.bucket_width)
+        state = self._keys.get(key)
+        if state is None:
+            state = self._allocate(key, bucket)
+        else:
+            self._keys.move_to_end(key)
+            if bucket > state.epoch:
+                self._advance(state, bucket)
+            elif bucket <= state.epoch - self.buckets:
+                # Older than the window
+                return None
+
+        h = hash64(value)
+        index = bucket % self.buckets
+        sketch = state.sketches[index]
+        if sketch is None:
+            sketch = state.sketches[index] = HyperLogLog(self.precision)
+        before = sketch.nbytes + state.union.nbytes
+        sketch.add_hash(h)
+        state.union.add_hash(h)
+        self._bytes += sketch.nbytes + state.union.nbytes - before
+
+        self.evict_idle(now, _IDLE_CHECKS_PER_EVENT)
+
+        distinct = state.union.count()
+        if distinct > self.spec.threshold:
+            if not state.fired:
+                state.fired = True
+                self._bytes_gauge.set(self._bytes)
+                return distinct
+        elif state.fired:
+            state.fired = False
+        return None
+
+    def snapshot(self) -> Dict[str, bytes]:
+        """
+        Serialize every key's bucket sketches.
+
+        Returns:
+            Key mapped to its serialized state
+        """
+        encoded = {}
+        for key, state in self._keys.items():
+            parts = [_HEADER.pack(state.epoch, state.fired, self.buckets)]
+            for sketch in state.sketches:
+                data = sketch.to_bytes() if sketch is not None else b""
+                parts.append(_LENGTH.pack(len(data)))
+                parts.append(data)
+            encoded[key] = b"".join(parts)
+        return encoded
+
+    def restore(self, encoded: Dict[str, bytes]) -> int:
+        """
+        Load keys from a snapshot, skipping entries that do not fit this
+        rule's buckets or precision.
+
+        Args:
+            encoded: Output of snapshot()
+
+        Returns:
+            Number of keys restored
+        """
+        restored = 0
+        for key, data in encoded.items():
+            if isinstance(key, bytes):
+                key = key.decode()
+            try:
+                epoch, fired, buckets = _HEADER.unpack_from(data)
+                if buckets != self.buckets:
+                    continue
+                offset = _HEADER.size
+                sketches: List[Optional[HyperLogLog]] = []
+                for _ in range(buckets):
+                    (length,) = _LENGTH.unpack_from(data, offset)
+                    offset += _LENGTH.size
+                    chunk = data[offset:offset + length]
+                    offset += length
+                    sketches.append(HyperLogLog.from_bytes(chunk) if chunk else None)
+            except (struct.error, ValueError):
+                continue
+            if any(s is not None and s.precision != self.precision for s in sketches):
+                continue
+
+            if key in self._keys:
+                self._drop(key)
+            state = self._allocate(key, epoch)
+            state.fired = bool(fired)
+            state.sketches = sketches
+            for sketch in sketches:
+                if sketch is not None:
+                    state.union.merge(sketch)
+            self._bytes += state.nbytes
+            restored += 1
+        self._publish()
+        return restored
+
+
+class RedisSketchStore:
+    """
+    Persist distinct-count state in Redis hashes (one per rule).
+
+    Needs a synchronous Redis client without decode_responses, as sketches
+    are binary. Only does I/O, so callers can take snapshots on the event
+    loop and run save and load in an executor. Hashes expire after twice
+    the rule window, so state of removed rules does not linger.
+    """
+
+    def __init__(self, redis_client, prefix: str = "alerting:distinct"):
+        """
+        Initialize sketch store.
+
+        Args:
+            redis_client: Synchronous Redis client
+            prefix: Key prefix of the per-rule hashes
+        """
+        self.redis = redis_client
+        self.prefix = prefix
+
+    def _key(self, rule_name: str) -> str:
+        return f"{self.prefix}:{rule_name}"
+
+    def save(self, rule_name: str, encoded: Dict[str, bytes], seconds: float, batch_size: int = 1000) -> int:
+        """
+        Replace the stored state of a rule.
+
+        Args:
+            rule_name: Rule name
+            encoded: Output of DistinctCounter.snapshot()
+            seconds: Rule window in seconds
+            batch_size: Hash fields written per command
+
+        Returns:
+            Number of keys saved
+        """
+        key = self._key(rule_name)
+        tmp_key = f"{key}:tmp"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(tmp_key)
+        items = list(encoded.items())
+        for start in range(0, len(items), batch_size):
+            pipe.hset(tmp_key, mapping=dict(items[start:start + batch_size]))
+        if items:
+            pipe.expire(tmp_key, max(int(seconds * 2), 1))
+            pipe.rename(tmp_key, key)
+        else:
+            pipe.delete(key)
+        pipe.execute()
+        return len(items)
+
+    def load(self, rule_name: str) -> Dict[bytes, bytes]:
+        """
+        Read the stored state of a rule.
+
+        Args:
+            rule_name: Rule name
+
+        Returns:
+            Serialized key states, for DistinctCounter.restore()
+        """
+        return self.redis.hgetall(self._key(rule_name))
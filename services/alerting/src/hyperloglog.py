@@ -0,0 +1,224 @@
+"""
+HyperLogLog distinct-count sketches.
+"""
+import hashlib
+import math
+from array import array
+from typing import Any
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+_SPARSE = b"S"
+_DENSE = b"D"
+
+
+def hash64(value: Any) -> int:
+    """
+    Hash a value to 64 bits.
+
+    Args:
+        value: Value to hash (strings as-is, anything else via str())
+
+    Returns:
+        Unsigned 64-bit hash
+    """
+    data = value if isinstance(value, str) else str(value)
+    return int.from_bytes(hashlib.blake2b(data.encode(), digest_size=8).digest(), "little")
+
+
+def precision_for_error(error: float) -> int:
+    """
+    Get the smallest precision whose standard error is at most ``error``.
+
+    Args:
+        error: Relative standard error (e.g. 0.05 for 5%)
+
+    Returns:
+        Precision p (the sketch has 2**p registers)
+    """
+    registers = (1.04 / error) ** 2
+    return min(max(math.ceil(math.log2(registers)), MIN_PRECISION), MAX_PRECISION)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch with a sparse exact phase.
+
+    A new sketch stores the 64-bit hashes it has seen, which is exact and
+    smaller than the registers while few values arrived; past ``2**p / 8``
+    hashes it switches to ``2**p`` one-byte registers. The dense estimate
+    is maintained incrementally, so count() is O(1) in both phases.
+    """
+
+    __slots__ = ("precision", "_hashes", "_registers", "_sum", "_zeros")
+
+    def __init__(self, precision: int = 10):
+        """
+        Initialize sketch.
+
+        Args:
+            precision: Number of index bits p (4-16); standard error is
+                1.04 / sqrt(2**p)
+
+        Raises:
+            ValueError: If the precision is out of range
+        """
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"HyperLogLog precision must be {MIN_PRECISION}-{MAX_PRECISION}")
+        self.precision = precision
+        self._hashes = array("Q")
+        self._registers = None
+        self._sum = 0.0
+        self._zeros = 0
+
+    @property
+    def error(self) -> float:
+        """Relative standard error of dense estimates."""
+        return 1.04 / math.sqrt(1 << self.precision)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the sketch data."""
+        if self._registers is None:
+            return self._hashes.itemsize * len(self._hashes)
+        return len(self._registers)
+
+    @property
+    def is_sparse(self) -> bool:
+        """Whether the sketch still stores exact hashes."""
+        return self._registers is None
+
+    def _densify(self) -> None:
+        m = 1 << self.precision
+        self._registers = bytearray(m)
+        self._sum = float(m)
+        self._zeros = m
+        hashes = self._hashes
+        self._hashes = array("Q")
+        for h in hashes:
+            self._update(h)
+
+    def _update(self, h: int) -> None:
+        p = self.precision
+        index = h >> (64 - p)
+        rest = h & ((1 << (64 - p)) - 1)
+        rank = (64 - p) - rest.bit_length() + 1
+        old = self._registers[index]
+        if rank > old:
+            self._registers[index] = rank
+            self._sum += 2.0 ** -rank - 2.0 ** -old
+            if old == 0:
+                self._zeros -= 1
+
+    def add_hash(self, h: int) -> None:
+        """
+        Add a value by its 64-bit hash.
+
+        Args:
+            h: Unsigned 64-bit hash (see hash64)
+        """
+        if self._registers is not None:
+            self._update(h)
+        elif h not in self._hashes:
+            self._hashes.append(h)
+            if len(self._hashes) > (1 << self.precision) // 8:
+                self._densify()
+
+    def add(self, value: Any) -> None:
+        """
+        Add a value.
+
+        Args:
+            value: Value to count
+        """
+        self.add_hash(hash64(value))
+
+    def count(self) -> int:
+        """
+        Estimate the number of distinct values added.
+
+        Returns:
+            Exact count in the sparse phase, else the HyperLogLog estimate
+        """
+        if self._registers is None:
+            return len(self._hashes)
+        m = 1 << self.precision
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / self._sum
+        if estimate <= 2.5 * m and self._zeros:
+            estimate = m * math.log(m / self._zeros)
+        return int(round(estimate))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        Add every value of another sketch of the same precision.
+
+        Args:
+            other: Sketch to merge in
+
+        Raises:
+            ValueError: If the precisions differ
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        if other._registers is None:
+            for h in other._hashes:
+                self.add_hash(h)
+            return
+        if self._registers is None:
+            self._densify()
+        self._registers = bytearray(map(max, self._registers, other._registers))
+        self._sum = sum(2.0 ** -r for r in self._registers)
+        self._zeros = self._registers.count(0)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the sketch.
+
+        Returns:
+            Precision, phase marker and sketch data
+        """
+        if self._registers is None:
+            return bytes([self.precision]) + _SPARSE + self._hashes.tobytes()
+        return bytes([self.precision]) + _DENSE + bytes(self._registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        """
+        Deserialize a sketch.
+
+        Args:
+            data: Output of to_bytes()
+
+        Returns:
+            Sketch
+
+        Raises:
+            ValueError: If the data is malformed
+        """
+        if len(data) < 2:
+            raise ValueError("Truncated HyperLogLog data")
+        sketch = cls(data[0])
+        body = data[2:]
+        marker = data[1:2]
+        if marker == _SPARSE:
+            if len(body) % 8:
+                raise ValueError("Truncated HyperLogLog data")
+            sketch._hashes.frombytes(body)
+        elif marker == _DENSE:
+            if len(body) != 1 << sketch.precision:
+                raise ValueError("Truncated HyperLogLog data")
+            sketch._registers = bytearray(body)
+            sketch._sum = sum(2.0 ** -r for r in body)
+            sketch._zeros = sketch._registers.count(0)
+        else:
+            raise ValueError("Unknown HyperLogLog encoding")
+        return sketch
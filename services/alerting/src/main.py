@@ -4,7 +4,8 @@ Main entry point for Alerting Service.
 import asyncio
 import signal
 import sys
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
 from aiokafka.errors import KafkaError
@@ -17,9 +18,23 @@ from metrics import (
     logs_evaluated_total,
     alerts_triggered_total,
     alert_processing_duration_seconds,
+    alert_rules_loaded,
+    register_rule_stats,
 )
 from alert_rules import AlertRuleEngine
-from alert_channels import EmailChannel, SlackChannel, AlertChannelManager
+from rule_loader import RuleFileWatcher
+from correlation import RedisCorrelationStore
+from dedup import AlertDeduplicator
+from delivery import RedisDeliveryJournal
+from distinct_counter import RedisSketchStore
+from alert_channels import (
+    AlertChannelManager,
+    EmailChannel,
+    HttpTransport,
+    PagerDutyChannel,
+    SlackChannel,
+    WebhookChannel,
+)
 
 # Configure logging
 configure_logging(settings.log_level)
@@ -33,55 +48,140 @@ class AlertingService:
         """Initialize the service."""
         self.consumer: Optional[AIOKafkaConsumer] = None
         self.producer: Optional[AIOKafkaProducer] = None
-        self.redis_client: Optional[redis.Redis] = None
+        self.deduplicator: Optional[AlertDeduplicator] = None
         self.rule_engine: Optional[AlertRuleEngine] = None
+        self.rule_watcher: Optional[RuleFileWatcher] = None
+        self.sketch_store: Optional[RedisSketchStore] = None
+        self.correlation_store: Optional[RedisCorrelationStore] = None
         self.channel_manager: Optional[AlertChannelManager] = None
+        self.delivery_journal: Optional[RedisDeliveryJournal] = None
         self.shutdown_event = asyncio.Event()
 
-    def _initialize_redis(self) -> None:
-        """Initialize Redis client for alert deduplication."""
-        try:
-            self.redis_client = redis.Redis(
-                host=settings.redis_host,
-                port=settings.redis_port,
-                db=settings.redis_db,
-                password=settings.redis_password if settings.redis_password else None,
-                decode_responses=True,
-                socket_timeout=5,
-                socket_connect_timeout=5,
-            )
-            # Test connection
-            self.redis_client.ping()
+    async def _initialize_redis(self) -> bool:
+        """
+        Initialize the Redis-backed alert deduplicator.
+
+        Returns:
+            True if Redis is reachable
+        """
+        self.deduplicator = AlertDeduplicator.from_settings(settings)
+        if await self.deduplicator.ping():
             logger.info("redis_connected")
+            return True
+        # Deduplication falls back to the local cache and retries Redis later
+        logger.warning("redis_connection_failed")
+        return False
+
+    def _initialize_state_stores(self) -> None:
+        """Initialize Redis persistence of distinct-count sketches and correlation state."""
+        # Sketches are binary, so they need a client without decode_responses
+        state_redis = redis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            password=settings.redis_password if settings.redis_password else None,
+            socket_timeout=5,
+            socket_connect_timeout=5,
+        )
+        if settings.alerting_distinct_persist_interval > 0:
+            self.sketch_store = RedisSketchStore(state_redis)
+        if settings.alerting_correlation_snapshot_interval > 0:
+            self.correlation_store = RedisCorrelationStore(state_redis)
+        if not self.sketch_store and not self.correlation_store:
+            state_redis.close()
+
+    async def load_state(self) -> None:
+        """Restore distinct-count and correlation state saved by a previous run."""
+        loop = asyncio.get_running_loop()
+        if self.sketch_store:
+            for rule_name, counter in self.rule_engine.distinct_counters().items():
+                try:
+                    encoded = await loop.run_in_executor(None, self.sketch_store.load, rule_name)
+                    restored = counter.restore(encoded) if encoded else 0
+                    logger.info("distinct_state_restored", rule_name=rule_name, keys=restored)
+                except Exception as e:
+                    logger.error("distinct_state_restore_failed", rule_name=rule_name, error=str(e))
+
+        if self.correlation_store:
+            try:
+                data = await loop.run_in_executor(None, self.correlation_store.load)
+                restored = self.rule_engine.correlator.restore(data, time.time()) if data else 0
+                logger.info("correlation_state_restored", states=restored)
+            except Exception as e:
+                logger.error("correlation_state_restore_failed", error=str(e))
+
+    async def save_sketches(self) -> None:
+        """Save distinct-count state to Redis without blocking the loop."""
+        if not self.sketch_store:
+            return
+        loop = asyncio.get_running_loop()
+        for rule_name, counter in self.rule_engine.distinct_counters().items():
+            try:
+                # Snapshot on the loop, where the counter is updated; only the I/O runs in the executor
+                encoded = counter.snapshot()
+                saved = await loop.run_in_executor(
+                    None, self.sketch_store.save, rule_name, encoded, counter.spec.seconds
+                )
+                logger.debug("distinct_state_saved", rule_name=rule_name, keys=saved, **counter.stats())
+            except Exception as e:
+                logger.error("distinct_state_save_failed", rule_name=rule_name, error=str(e))
+
+    async def save_correlations(self) -> None:
+        """Save a correlation state snapshot to Redis without blocking the loop."""
+        if not self.correlation_store:
+            return
+        correlator = self.rule_engine.correlator
+        try:
+            # Sequences only expire on new events otherwise; keep idle ones out of the snapshot
+            correlator.expire(time.time())
+            data = correlator.snapshot()
+            await asyncio.get_running_loop().run_in_executor(None, self.correlation_store.save, data)
+            logger.debug("correlation_state_saved", states=len(correlator), bytes=len(data))
         except Exception as e:
-            logger.warning("redis_connection_failed", error=str(e))
-            self.redis_client = None
+            logger.error("correlation_state_save_failed", error=str(e))
 
-    def _is_duplicate_alert(self, alert_key: str, ttl: int = 3600) -> bool:
+    async def persist_state(self, save, interval: float) -> None:
         """
-        Check if alert is duplicate using Redis.
+        Save state periodically until shutdown.
 
         Args:
-            alert_key: Unique alert key
-            ttl: Time-to-live in seconds
+            save: Coroutine function saving the state
+            interval: Seconds between saves
+        """
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(interval)
+            await save()
 
-        Returns:
-            True if duplicate, False otherwise
+    def _http_transport(self, channel: str, rate: float, burst: int) -> HttpTransport:
         """
-        if not self.redis_client:
-            return False
+        Build the pooled, rate-limited HTTP transport of a channel.
 
-        try:
-            if self.redis_client.exists(alert_key):
-                return True
+        Args:
+            channel: Channel name
+            rate: Requests per second
+            burst: Maximum requests in a burst
 
-            # Set key with TTL
-            self.redis_client.setex(alert_key, ttl, "1")
-            return False
+        Returns:
+            HTTP transport
+        """
+        return HttpTransport(
+            channel,
+            rate=rate,
+            burst=burst,
+            timeout=settings.alerting_http_timeout,
+            max_connections=settings.alerting_http_max_connections,
+        )
+
+    def top_k_report(self) -> Dict[str, Any]:
+        """
+        Get the current top-k rankings (served at /topk on the metrics port).
 
-        except Exception as e:
-            logger.error("redis_duplicate_check_failed", error=str(e))
-            return False
+        Returns:
+            Rankings of the tracked dimensions and top-k rules
+        """
+        if not self.rule_engine:
+            return {"dimensions": {}, "rules": {}}
+        return self.rule_engine.top_k_report()
 
     async def start_consumer(self) -> None:
         """Start Kafka consumer."""
@@ -145,72 +245,189 @@ class AlertingService:
                 else:
                     raise
 
-    async def process_log(self, log: Dict[str, Any]) -> None:
+    def build_alerts(self, log: Dict[str, Any]) -> List[Tuple[Any, Dict[str, Any], str, int]]:
         """
-        Process a log and trigger alerts if needed.
+        Evaluate a log and build the alerts of the rules it triggers.
 
         Args:
             log: Log data
+
+        Returns:
+            (rule, alert, dedup key, dedup TTL) for each triggered rule
         """
-        with alert_processing_duration_seconds.labels(operation="evaluation").time():
-            logs_evaluated_total.inc()
-
-            # Evaluate against all rules
-            triggered_rules = self.rule_engine.evaluate(log)
-
-            for rule in triggered_rules:
-                # Create alert
-                alert = {
-                    "rule_name": rule.name,
-                    "description": rule.description,
-                    "severity": rule.severity,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "log_data": log,
+        pending = []
+        for rule in self.rule_engine.evaluate(log):
+            # Create alert
+            alert = {
+                "rule_name": rule.name,
+                "description": rule.description,
+                "severity": rule.severity,
+                "timestamp": datetime.utcnow().isoformat(),
+                "log_data": log,
+            }
+
+            # Deduplication key; windowed rules alert once per key and window
+            aggregation = rule.aggregation
+            if rule.anomaly:
+                alert, alert_key, ttl = self._anomaly_alert(rule, self.rule_engine.rule_event(rule), log)
+            elif rule.top_k:
+                event = self.rule_engine.rule_event(rule)
+                alert["top_k"] = event
+                # Fires at most once per value (or once for a change) per interval
+                alert_key = f"alert:{rule.name}:{event['key'] or ''}:{event['interval_start']}"
+                ttl = max(int(rule.top_k.seconds), 1)
+            elif rule.sequence:
+                event = self.rule_engine.rule_event(rule)
+                alert["sequence"] = event
+                # One alert per completed sequence
+                alert_key = f"alert:{rule.name}:{event['key']}:{event['started']}"
+                ttl = max(int(rule.sequence.within), 1)
+            elif aggregation:
+                window_key = aggregation.key_of(log)
+                alert["window"] = {
+                    "key": window_key,
+                    "count": self.rule_engine.window_count(rule, log),
+                    "threshold": aggregation.threshold,
+                    "seconds": aggregation.seconds,
                 }
-
-                # Check for duplicates
+                if rule.distinct:
+                    alert["window"]["distinct_field"] = rule.distinct.field
+                alert_key = f"alert:{rule.name}:{window_key}"
+                ttl = max(int(aggregation.seconds), 1)
+            else:
                 alert_key = f"alert:{rule.name}:{log.get('fingerprint', 'unknown')}"
-                if self._is_duplicate_alert(alert_key, ttl=3600):
-                    logger.debug("alert_deduplicated", rule_name=rule.name, alert_key=alert_key)
-                    continue
-
-                # Record alert
-                alerts_triggered_total.labels(
-                    rule_name=rule.name,
-                    severity=rule.severity,
-                ).inc()
-
-                logger.info(
-                    "alert_triggered",
-                    rule_name=rule.name,
-                    severity=rule.severity,
-                    hostname=log.get("hostname"),
-                    source_ip=log.get("source_ip"),
-                )
+                ttl = 3600
+            pending.append((rule, alert, alert_key, ttl))
+        return pending
 
-                # Send alert through channels
-                await self.channel_manager.send_alert(alert)
+    async def process_logs(self, logs: List[Dict[str, Any]]) -> None:
+        """
+        Evaluate a batch of logs and send the new alerts.
 
-                # Publish to alerts topic
+        Args:
+            logs: Log data
+        """
+        pending = []
+        with alert_processing_duration_seconds.labels(operation="evaluation").time():
+            for log in logs:
                 try:
-                    await self.producer.send(settings.kafka_topic_alerts, value=alert)
+                    pending.extend(self.build_alerts(log))
                 except Exception as e:
-                    logger.error("alert_publish_failed", error=str(e), rule_name=rule.name)
+                    logger.error("log_processing_failed", error=str(e))
+        logs_evaluated_total.inc(len(logs))
+        await self.send_alerts(pending)
+
+    def _anomaly_alert(self, rule, event: Dict[str, Any], log: Dict[str, Any]):
+        """
+        Build an anomaly rule's alert.
+
+        Args:
+            rule: Anomaly alert rule
+            event: Anomaly event (see RateBaseline.add)
+            log: Log that revealed the anomaly, or the key's fields for
+                drops and silences found by the periodic check
+
+        Returns:
+            (alert, dedup key, dedup TTL)
+        """
+        alert = {
+            "rule_name": rule.name,
+            "description": rule.description,
+            "severity": rule.severity,
+            "timestamp": datetime.utcnow().isoformat(),
+            "log_data": log,
+            "anomaly": event,
+        }
+        alert_key = f"alert:{rule.name}:{event['key']}:{event['reason']}:{event['interval_start']}"
+        return alert, alert_key, max(int(rule.anomaly.interval), 1)
+
+    async def send_alerts(self, pending: List[Tuple[Any, Dict[str, Any], str, int]]) -> None:
+        """
+        Deliver the alerts that are not duplicates.
+
+        The keys of all alerts are checked in one Redis round trip.
+
+        Args:
+            pending: (rule, alert, dedup key, dedup TTL) tuples
+        """
+        if not pending:
+            return
+        with alert_processing_duration_seconds.labels(operation="dedup").time():
+            fresh = await self.deduplicator.claim([(alert_key, ttl) for _, _, alert_key, ttl in pending])
+        for (rule, alert, alert_key, _), new in zip(pending, fresh):
+            if not new:
+                logger.debug("alert_deduplicated", rule_name=rule.name, alert_key=alert_key)
+                continue
+            await self.deliver_alert(rule, alert)
+
+    async def deliver_alert(self, rule, alert: Dict[str, Any]) -> None:
+        """
+        Record an alert and send it through the channels and the alerts topic.
+
+        Args:
+            rule: Triggered alert rule
+            alert: Alert document
+        """
+        # Record alert
+        alerts_triggered_total.labels(
+            rule_name=rule.name,
+            severity=rule.severity,
+        ).inc()
+
+        log = alert["log_data"]
+        logger.info(
+            "alert_triggered",
+            rule_name=rule.name,
+            severity=rule.severity,
+            hostname=log.get("hostname"),
+            source_ip=log.get("source_ip"),
+        )
+
+        # Queue alert for the channels; delivery happens in their workers
+        self.channel_manager.send_alert(alert)
+
+        # Publish to alerts topic
+        try:
+            await self.producer.send(settings.kafka_topic_alerts, value=alert)
+        except Exception as e:
+            logger.error("alert_publish_failed", error=str(e), rule_name=rule.name)
+
+    async def watch_anomalies(self, interval: float) -> None:
+        """
+        Periodically close rate intervals and alert on drops and silences.
+
+        Args:
+            interval: Seconds between checks
+        """
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(interval)
+            try:
+                with alert_processing_duration_seconds.labels(operation="anomaly_check").time():
+                    found = self.rule_engine.check_anomalies()
+                await self.send_alerts([
+                    (rule, *self._anomaly_alert(rule, event, event["group"])) for rule, event in found
+                ])
+            except Exception as e:
+                logger.error("anomaly_check_failed", error=str(e))
 
     async def consume_and_evaluate(self) -> None:
         """Main consumption loop."""
         logger.info("starting_alerting_loop")
 
         try:
-            async for msg in self.consumer:
-                if self.shutdown_event.is_set():
-                    break
+            while not self.shutdown_event.is_set():
+                records = await self.consumer.getmany(
+                    timeout_ms=1000,
+                    max_records=settings.alerting_batch_size,
+                )
+                logs = [msg.value for messages in records.values() for msg in messages]
+                if not logs:
+                    continue
 
                 try:
-                    log_data = msg.value
-                    await self.process_log(log_data)
+                    await self.process_logs(logs)
                 except Exception as e:
-                    logger.error("log_processing_failed", error=str(e))
+                    logger.error("alert_batch_failed", error=str(e), logs=len(logs))
 
         except KafkaError as e:
             logger.error("kafka_consumption_error", error=str(e))
@@ -223,17 +440,29 @@ class AlertingService:
 
         try:
             # Start metrics server
-            start_metrics_server(settings.prometheus_port)
+            start_metrics_server(settings.prometheus_port, routes={"/topk": self.top_k_report})
 
             # Initialize Redis
-            self._initialize_redis()
+            redis_connected = await self._initialize_redis()
 
             # Initialize rule engine
-            self.rule_engine = AlertRuleEngine()
+            self.rule_engine = AlertRuleEngine.from_settings(settings)
+            if settings.alerting_rules_file:
+                self.rule_watcher = RuleFileWatcher(self.rule_engine, settings.alerting_rules_file)
+                await self.rule_watcher.reload(force=True)
+            alert_rules_loaded.set(len(self.rule_engine.rules))
+            register_rule_stats(self.rule_engine.rule_stats)
+
+            # Restore distinct-count and correlation state
+            if redis_connected:
+                self._initialize_state_stores()
+            await self.load_state()
             logger.info("alert_rules_loaded", count=len(self.rule_engine.rules))
 
-            # Initialize alert channels
-            self.channel_manager = AlertChannelManager()
+            # Initialize alert channels; pending deliveries survive restarts in Redis
+            if redis_connected and settings.alerting_delivery_persist_interval > 0:
+                self.delivery_journal = RedisDeliveryJournal(self.deduplicator.redis)
+            self.channel_manager = AlertChannelManager.from_settings(settings, self.delivery_journal)
 
             # Add email channel
             if settings.to_emails_list:
@@ -251,11 +480,41 @@ class AlertingService:
             # Add Slack channel
             if settings.alerting_slack_webhook_url:
                 slack_channel = SlackChannel(
-                    webhook_url=settings.alerting_slack_webhook_url
+                    webhook_url=settings.alerting_slack_webhook_url,
+                    transport=self._http_transport(
+                        "slack", settings.alerting_slack_rate_limit, settings.alerting_slack_burst
+                    ),
                 )
                 self.channel_manager.add_channel(slack_channel)
                 logger.info("slack_channel_configured")
 
+            # Add generic webhook channel
+            if settings.alerting_webhook_url:
+                webhook_channel = WebhookChannel(
+                    url=settings.alerting_webhook_url,
+                    headers=(
+                        {"Authorization": settings.alerting_webhook_auth_header}
+                        if settings.alerting_webhook_auth_header else None
+                    ),
+                    transport=self._http_transport(
+                        "webhook", settings.alerting_webhook_rate_limit, settings.alerting_webhook_burst
+                    ),
+                )
+                self.channel_manager.add_channel(webhook_channel)
+                logger.info("webhook_channel_configured")
+
+            # Add PagerDuty channel
+            if settings.alerting_pagerduty_api_key:
+                pagerduty_channel = PagerDutyChannel(
+                    routing_key=settings.alerting_pagerduty_api_key,
+                    transport=self._http_transport(
+                        "pagerduty", settings.alerting_webhook_rate_limit, settings.alerting_webhook_burst
+                    ),
+                )
+                self.channel_manager.add_channel(pagerduty_channel)
+                logger.info("pagerduty_channel_configured")
+            await self.channel_manager.start()
+
             # Start Kafka components
             await self.start_consumer()
             await self.start_producer()
@@ -278,9 +537,20 @@ class AlertingService:
             if self.producer:
                 await self.producer.stop()
 
-            # Close Redis connection
-            if self.redis_client:
-                self.redis_client.close()
+            # Deliver queued alerts and save the ones still pending
+            if self.channel_manager:
+                await self.channel_manager.stop(settings.alerting_delivery_drain_timeout)
+
+            # Save distinct-count and correlation state for the next run
+            await self.save_sketches()
+            await self.save_correlations()
+
+            # Close Redis connections
+            if self.deduplicator:
+                await self.deduplicator.close()
+            state_store = self.sketch_store or self.correlation_store
+            if state_store:
+                state_store.redis.close()
 
             logger.info("service_stopped")
 
@@ -292,17 +562,48 @@ class AlertingService:
         await self.start()
 
         # Start alerting loop
-        alerting_task = asyncio.create_task(self.consume_and_evaluate())
+        tasks = [asyncio.create_task(self.consume_and_evaluate())]
+
+        # Watch the rules file for changes
+        if self.rule_watcher:
+            tasks.append(asyncio.create_task(
+                self.rule_watcher.run(settings.alerting_rules_reload_interval, self.shutdown_event)
+            ))
+
+        # Alert on hosts whose rate dropped or that went silent
+        tasks.append(asyncio.create_task(
+            self.watch_anomalies(settings.alerting_anomaly_check_interval)
+        ))
+
+        # Persist distinct-count state
+        if self.sketch_store:
+            tasks.append(asyncio.create_task(
+                self.persist_state(self.save_sketches, settings.alerting_distinct_persist_interval)
+            ))
+
+        # Snapshot correlation state so restarts resume sequences
+        if self.correlation_store:
+            tasks.append(asyncio.create_task(
+                self.persist_state(self.save_correlations, settings.alerting_correlation_snapshot_interval)
+            ))
+
+        # Persist pending alert deliveries
+        if self.delivery_journal:
+            tasks.append(asyncio.create_task(
+                self.persist_state(self.delivery_journal.flush, settings.alerting_delivery_persist_interval)
+            ))
 
         # Wait for shutdown signal
         await self.shutdown_event.wait()
 
-        # Cancel alerting task
-        alerting_task.cancel()
-        try:
-            await alerting_task
-        except asyncio.CancelledError:
-            pass
+        # Cancel background tasks
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
 
         await self.stop()
 
@@ -1,7 +1,13 @@
 """
 Prometheus metrics for monitoring.
 """
-from prometheus_client import Counter, Histogram, start_http_server
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, make_wsgi_app, start_http_server
+from prometheus_client.core import CounterMetricFamily
+from prometheus_client.exposition import ThreadingWSGIServer
 from logger import get_logger
 
 logger = get_logger(__name__)
@@ -36,17 +42,184 @@ alert_delivery_duration_seconds = Histogram(
     ["channel"]
 )
 
+alert_endpoint_latency_seconds = Histogram(
+    "alerting_endpoint_latency_seconds",
+    "HTTP request latency of alert deliveries per endpoint host",
+    ["channel", "endpoint"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+alert_delivery_throttled_total = Counter(
+    "alerting_delivery_throttled_total",
+    "Rate-limit responses (429, or 503 with Retry-After) from alert endpoints",
+    ["channel"]
+)
+
+alert_delivery_queue_depth = Gauge(
+    "alerting_delivery_queue_depth",
+    "Alerts waiting for delivery (queued, in flight or waiting to retry)",
+    ["channel"]
+)
+
+alert_delivery_retries_total = Counter(
+    "alerting_delivery_retries_total",
+    "Failed alert deliveries scheduled for another attempt",
+    ["channel"]
+)
+
+alert_delivery_dropped_total = Counter(
+    "alerting_delivery_dropped_total",
+    "Alerts not delivered to a channel",
+    ["channel", "reason"]
+)
+
+alert_rules_loaded = Gauge(
+    "alerting_rules_loaded",
+    "Number of alert rules currently loaded",
+)
 
-def start_metrics_server(port: int) -> None:
+alert_rule_reloads_total = Counter(
+    "alerting_rule_reloads_total",
+    "Total number of rules file reload attempts",
+    ["result"]
+)
+
+window_keys = Gauge(
+    "alerting_window_keys",
+    "Keys currently tracked by a windowed threshold rule",
+    ["rule_name"]
+)
+
+window_key_evictions_total = Counter(
+    "alerting_window_key_evictions_total",
+    "Keys evicted from windowed threshold rules",
+    ["rule_name", "reason"]
+)
+
+distinct_sketch_bytes = Gauge(
+    "alerting_distinct_sketch_bytes",
+    "Bytes of HyperLogLog sketch data held by a distinct-count rule",
+    ["rule_name"]
+)
+
+alert_dedup_checks_total = Counter(
+    "alerting_dedup_checks_total",
+    "Alert keys checked for duplicates, by where the answer came from",
+    ["result"]
+)
+
+alert_dedup_degraded = Gauge(
+    "alerting_dedup_degraded",
+    "Whether deduplication runs on the local cache only because Redis failed (1) or not (0)",
+)
+
+correlation_states = Gauge(
+    "alerting_correlation_states",
+    "Sequence rule state machines currently kept, by step reached",
+    ["stage"]
+)
+
+correlation_state_evictions_total = Counter(
+    "alerting_correlation_state_evictions_total",
+    "Sequence rule state machines dropped before completing",
+    ["reason"]
+)
+
+
+class RuleStatsCollector:
+    """
+    Expose per-rule evaluated/matched counts kept by the rule engine.
+
+    The engine counts with plain integers on the hot path; they are only
+    turned into metrics when Prometheus scrapes.
+    """
+
+    def __init__(self, stats: Callable[[], Dict[str, Dict[str, int]]]):
+        """
+        Initialize collector.
+
+        Args:
+            stats: Returns rule name -> {"evaluated": n, "matched": n}
+        """
+        self.stats = stats
+
+    def collect(self):
+        evaluated = CounterMetricFamily(
+            "alerting_rule_evaluations",
+            "Logs that reached a rule after pre-filtering",
+            labels=["rule_name"],
+        )
+        matched = CounterMetricFamily(
+            "alerting_rule_matches",
+            "Logs that matched a rule",
+            labels=["rule_name"],
+        )
+        for rule_name, counts in self.stats().items():
+            evaluated.add_metric([rule_name], counts["evaluated"])
+            matched.add_metric([rule_name], counts["matched"])
+        yield evaluated
+        yield matched
+
+
+def register_rule_stats(stats: Callable[[], Dict[str, Dict[str, int]]]) -> None:
+    """
+    Publish per-rule evaluation counts.
+
+    Args:
+        stats: Returns rule name -> {"evaluated": n, "matched": n}
+    """
+    REGISTRY.register(RuleStatsCollector(stats))
+
+
+class _QuietHandler(WSGIRequestHandler):
+    """Request handler that does not log every request to stderr."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _routes_app(routes: Dict[str, Callable[[], Any]]):
+    metrics_app = make_wsgi_app()
+
+    def app(environ, start_response):
+        handler = routes.get(environ.get("PATH_INFO", "/").rstrip("/"))
+        if handler is None:
+            return metrics_app(environ, start_response)
+        try:
+            body = json.dumps(handler(), default=str).encode("utf-8")
+            status = "200 OK"
+        except Exception as e:
+            logger.error("metrics_route_failed", path=environ.get("PATH_INFO"), error=str(e))
+            body = json.dumps({"error": str(e)}).encode("utf-8")
+            status = "500 Internal Server Error"
+        start_response(status, [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(body))),
+        ])
+        return [body]
+
+    return app
+
+
+def start_metrics_server(port: int, routes: Optional[Dict[str, Callable[[], Any]]] = None) -> None:
     """
     Start Prometheus metrics HTTP server.
 
+    Handlers in ``routes`` run on the server's threads, so they must only
+    read state that is safe to read while the service updates it.
+
     Args:
         port: Port to listen on
+        routes: Extra JSON endpoints, path (e.g. "/topk") mapped to a
+            function returning the response document
     """
     try:
-        start_http_server(port)
-        logger.info("metrics_server_started", port=port)
+        if routes:
+            server = make_server("", port, _routes_app(routes), ThreadingWSGIServer, handler_class=_QuietHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        else:
+            start_http_server(port)
+        logger.info("metrics_server_started", port=port, routes=sorted(routes or []))
     except Exception as e:
         logger.error("metrics_server_start_failed", error=str(e), port=port)
         raise
@@ -0,0 +1,590 @@
+"""
+Compilation of declarative alert rule conditions into one-pass evaluation.
+
+Run as a script for a micro-benchmark of evaluation cost by rule count:
+
+    python rule_compiler.py [iterations]
+"""
+import operator
+import re
+import sys
+import timeit
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class Condition:
+    """Base class for declarative rule conditions."""
+
+    def __and__(self, other: "Condition") -> "Condition":
+        return All((self, other))
+
+    def __or__(self, other: "Condition") -> "Condition":
+        return AnyOf((self, other))
+
+    def __invert__(self) -> "Condition":
+        return Not(self)
+
+
+@dataclass(frozen=True)
+class MessageContains(Condition):
+    """The lower-cased message contains any of the terms."""
+    terms: Tuple[str, ...]
+
+    def __init__(self, terms: Iterable[str]):
+        object.__setattr__(self, "terms", tuple(sorted({term.lower() for term in terms})))
+
+
+@dataclass(frozen=True)
+class FieldEquals(Condition):
+    """A field equals a value."""
+    field: str
+    value: Any
+
+
+@dataclass(frozen=True)
+class FieldIn(Condition):
+    """A field equals one of several values."""
+    field: str
+    values: frozenset
+
+    def __init__(self, field: str, values: Iterable[Any]):
+        object.__setattr__(self, "field", field)
+        object.__setattr__(self, "values", frozenset(values))
+
+
+@dataclass(frozen=True)
+class FieldRange(Condition):
+    """
+    A numeric field lies between min and max; missing fields use default.
+
+    Bounds are inclusive unless min_exclusive / max_exclusive are set.
+    """
+    field: str
+    min: Optional[float] = None
+    max: Optional[float] = None
+    default: Optional[float] = None
+    min_exclusive: bool = False
+    max_exclusive: bool = False
+
+
+@dataclass(frozen=True)
+class FieldMatches(Condition):
+    """A regular expression matches (searches) a field's string value."""
+    field: str
+    pattern: str
+    ignore_case: bool = False
+
+
+@dataclass(frozen=True)
+class TagPresent(Condition):
+    """The log carries a tag."""
+    tag: str
+
+
+@dataclass(frozen=True)
+class ListContains(Condition):
+    """A list field (e.g. threat_keywords) contains a value."""
+    field: str
+    value: Any
+
+
+@dataclass(frozen=True)
+class FieldExists(Condition):
+    """A field is present and not None."""
+    field: str
+
+
+@dataclass(frozen=True)
+class Truthy(Condition):
+    """A field is present and truthy."""
+    field: str
+
+
+@dataclass(frozen=True)
+class All(Condition):
+    """All conditions hold."""
+    conditions: Tuple[Condition, ...]
+
+
+@dataclass(frozen=True)
+class AnyOf(Condition):
+    """At least one condition holds."""
+    conditions: Tuple[Condition, ...]
+
+
+@dataclass(frozen=True)
+class Not(Condition):
+    """The condition does not hold."""
+    condition: Condition
+
+
+def field_predicate(atom: Condition) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Build the predicate function for a field condition.
+
+    Args:
+        atom: Field condition (anything but MessageContains and combinators)
+
+    Returns:
+        Function of a log returning whether the condition holds
+
+    Raises:
+        TypeError: If the condition is not a field condition
+    """
+    field = getattr(atom, "field", None)
+
+    if isinstance(atom, FieldEquals):
+        value = atom.value
+        return lambda log: log.get(field) == value
+    if isinstance(atom, FieldIn):
+        values = atom.values
+        return lambda log: log.get(field) in values
+    if isinstance(atom, FieldRange):
+        low, high, default = atom.min, atom.max, atom.default
+        above = operator.gt if atom.min_exclusive else operator.ge
+        below = operator.lt if atom.max_exclusive else operator.le
+
+        def in_range(log: Dict[str, Any]) -> bool:
+            value = log.get(field, default)
+            try:
+                return (low is None or above(value, low)) and (high is None or below(value, high))
+            except TypeError:
+                return False
+        return in_range
+    if isinstance(atom, FieldMatches):
+        search = re.compile(atom.pattern, re.IGNORECASE if atom.ignore_case else 0).search
+
+        def matches(log: Dict[str, Any]) -> bool:
+            value = log.get(field)
+            return value is not None and search(value if isinstance(value, str) else str(value)) is not None
+        return matches
+    if isinstance(atom, TagPresent):
+        tag = atom.tag
+        return lambda log: tag in (log.get("tags") or ())
+    if isinstance(atom, ListContains):
+        value = atom.value
+        return lambda log: value in (log.get(field) or ())
+    if isinstance(atom, FieldExists):
+        return lambda log: log.get(field) is not None
+    if isinstance(atom, Truthy):
+        return lambda log: bool(log.get(field))
+    raise TypeError(f"Not a field condition: {atom!r}")
+
+
+def trie_pattern(terms: Iterable[str]) -> str:
+    """
+    Build a regex matching any of the terms, with shared prefixes factored out.
+
+    At each position the regex engine walks one trie path instead of trying
+    every term, and longer terms are preferred over their prefixes.
+
+    Args:
+        terms: Literal terms
+
+    Returns:
+        Regular expression source
+    """
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class TermScanner:
+    """
+    Find which of many terms occur in a text with one regex scan.
+
+    Every match also reports the terms contained in it, so a scan finds the
+    same terms as separate substring tests except for terms that only
+    partially overlap each other.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        """
+        Initialize term scanner.
+
+        Args:
+            terms: Lower-case literal terms
+        """
+        self.terms = sorted(set(terms))
+        self._pattern = re.compile(trie_pattern(self.terms)) if self.terms else None
+        self._contained: Dict[str, Tuple[str, ...]] = {
+            term: tuple(other for other in self.terms if other in term) for term in self.terms
+        }
+
+    def scan(self, text: str) -> List[str]:
+        """
+        Find the terms occurring in a text.
+
+        Args:
+            text: Lower-cased text
+
+        Returns:
+            Matched terms (may contain duplicates)
+        """
+        if self._pattern is None:
+            return []
+        contained = self._contained
+        found: List[str] = []
+        for term in self._pattern.findall(text):
+            found.extend(contained[term])
+        return found
+
+
+def to_dnf(condition: Condition, bit_of: Callable[[Condition], int]) -> List[Tuple[int, int]]:
+    """
+    Lower a condition into disjunctive normal form over condition bits.
+
+    Args:
+        condition: Rule condition
+        bit_of: Maps an atomic condition to its bit
+
+    Returns:
+        Clauses as (required bits, forbidden bits); the condition holds if
+        any clause is satisfied
+    """
+    if isinstance(condition, AnyOf):
+        return [clause for c in condition.conditions for clause in to_dnf(c, bit_of)]
+    if isinstance(condition, All):
+        clauses = [(0, 0)]
+        for c in condition.conditions:
+            clauses = [
+                (pos | c_pos, neg | c_neg)
+                for pos, neg in clauses
+                for c_pos, c_neg in to_dnf(c, bit_of)
+                if not (pos | c_pos) & (neg | c_neg)
+            ]
+        return clauses
+    if isinstance(condition, Not):
+        inner = condition.condition
+        if isinstance(inner, Not):
+            return to_dnf(inner.condition, bit_of)
+        if isinstance(inner, All):
+            return to_dnf(AnyOf(tuple(Not(c) for c in inner.conditions)), bit_of)
+        if isinstance(inner, AnyOf):
+            return to_dnf(All(tuple(Not(c) for c in inner.conditions)), bit_of)
+        return [(0, bit_of(inner))]
+    return [(bit_of(condition), 0)]
+
+
+# Memoized range results are kept for at most this many values per field
+RANGE_CACHE_SIZE = 4096
+
+# Anchor preference by atom kind (lower is more selective)
+_TERM, _MEMBER, _VALUE, _RANGE = 0, 1, 1, 2
+
+_MISSING = object()
+
+
+class CompiledRules:
+    """
+    A set of rule conditions lowered to shared primitives and indexed.
+
+    Identical atomic conditions across rules share one bit. Index atoms are
+    looked up rather than tested: message terms (one regex scan over the
+    lower-cased message), list members such as tags (a dict lookup per list
+    entry), field equality (a dict lookup per field) and numeric ranges
+    (memoized per field value). Every clause is filed under one of its
+    required index atoms, preferring the most selective kind, so a log only
+    reaches clauses whose anchor it sets. The remaining atoms (regex,
+    existence and truthiness checks) are only evaluated when a candidate
+    clause refers to them.
+
+    ``evaluated`` and ``matched`` count, per condition, the logs that
+    reached its mask tests and the logs that satisfied it.
+    """
+
+    def __init__(self, conditions: Sequence[Tuple[Any, Condition]]):
+        """
+        Compile rule conditions.
+
+        Args:
+            conditions: (key, condition) pairs; keys are returned on match
+        """
+        self._bits: Dict[Condition, int] = {}
+        self._ranks: Dict[int, int] = {}
+        self._term_bits: Dict[str, int] = {}
+        self._member_bits: Dict[str, Dict[Any, int]] = {}
+        self._value_bits: Dict[str, Dict[Any, int]] = {}
+        self._ranges: Dict[str, List[Tuple[int, Callable[[Dict[str, Any]], bool]]]] = {}
+        self._range_cache: Dict[str, Dict[Any, int]] = {}
+        self._lazy: Dict[int, Callable[[Dict[str, Any]], bool]] = {}
+
+        self.programs: List[Tuple[Any, List[Tuple[int, int]]]] = [
+            (key, to_dnf(condition, self._bit_of)) for key, condition in conditions
+        ]
+        self.evaluated = [0] * len(self.programs)
+        self.matched = [0] * len(self.programs)
+        self.scanner = TermScanner(self._term_bits)
+        self._build_index()
+
+    def _bit_of(self, atom: Condition) -> int:
+        bit = self._bits.get(atom)
+        if bit is not None:
+            return bit
+
+        bit = 1 << len(self._bits)
+        self._bits[atom] = bit
+        if isinstance(atom, MessageContains):
+            for term in atom.terms:
+                self._term_bits[term] = self._term_bits.get(term, 0) | bit
+            self._ranks[bit] = _TERM
+        elif isinstance(atom, (TagPresent, ListContains)):
+            field, value = ("tags", atom.tag) if isinstance(atom, TagPresent) else (atom.field, atom.value)
+            members = self._member_bits.setdefault(field, {})
+            members[value] = members.get(value, 0) | bit
+            self._ranks[bit] = _MEMBER
+        elif isinstance(atom, (FieldEquals, FieldIn)):
+            values = self._value_bits.setdefault(atom.field, {})
+            for value in ((atom.value,) if isinstance(atom, FieldEquals) else atom.values):
+                values[value] = values.get(value, 0) | bit
+            self._ranks[bit] = _VALUE
+        elif isinstance(atom, FieldRange):
+            self._ranges.setdefault(atom.field, []).append((bit, field_predicate(atom)))
+            self._range_cache.setdefault(atom.field, {})
+            self._ranks[bit] = _RANGE
+        else:
+            self._lazy[bit] = field_predicate(atom)
+        return bit
+
+    def _build_index(self) -> None:
+        usage: Dict[int, int] = {}
+        for _, clauses in self.programs:
+            for required, _ in clauses:
+                for bit in _bits_of(required):
+                    usage[bit] = usage.get(bit, 0) + 1
+
+        lazy_mask = 0
+        for bit in self._lazy:
+            lazy_mask |= bit
+
+        self._by_bit: Dict[int, List[int]] = {}
+        self._always: List[int] = []
+        self._lazy_needed: List[int] = []
+        for index, (_, clauses) in enumerate(self.programs):
+            needed = 0
+            anchors = set()
+            for required, forbidden in clauses:
+                needed |= (required | forbidden) & lazy_mask
+                indexed = [bit for bit in _bits_of(required) if bit in self._ranks]
+                if not indexed:
+                    anchors.add(None)
+                else:
+                    anchors.add(min(indexed, key=lambda bit: (self._ranks[bit], usage[bit], bit)))
+            self._lazy_needed.append(needed)
+            for anchor in anchors:
+                if anchor is None:
+                    self._always.append(index)
+                else:
+                    self._by_bit.setdefault(anchor, []).append(index)
+
+    @property
+    def atom_count(self) -> int:
+        """Number of distinct atomic conditions."""
+        return len(self._bits)
+
+    def index_bits(self, log: Dict[str, Any]) -> int:
+        """
+        Look up every index atom for a log.
+
+        Args:
+            log: Log document
+
+        Returns:
+            Bitset of index atoms that hold
+        """
+        bits = 0
+        if self._term_bits:
+            message = log.get("message")
+            if message:
+                term_bits = self._term_bits
+                for term in self.scanner.scan(message.lower()):
+                    bits |= term_bits[term]
+
+        for field, members in self._member_bits.items():
+            values = log.get(field)
+            if not values:
+                continue
+            try:
+                if isinstance(values, str):
+                    raise TypeError
+                for value in values:
+                    bit = members.get(value)
+                    if bit:
+                        bits |= bit
+            except TypeError:
+                # Strings and unhashable entries: fall back to containment tests
+                for member, bit in members.items():
+                    try:
+                        if member in values:
+                            bits |= bit
+                    except TypeError:
+                        pass
+
+        for field, values in self._value_bits.items():
+            try:
+                bits |= values.get(log.get(field), 0)
+            except TypeError:
+                pass
+
+        for field, predicates in self._ranges.items():
+            value = log.get(field, _MISSING)
+            cache = self._range_cache[field]
+            try:
+                found = cache.get(value)
+                cacheable = True
+            except TypeError:
+                found, cacheable = None, False
+            if found is None:
+                found = 0
+                for bit, predicate in predicates:
+                    if predicate(log):
+                        found |= bit
+                if cacheable and len(cache) < RANGE_CACHE_SIZE:
+                    cache[value] = found
+            bits |= found
+        return bits
+
+    def condition_bits(self, log: Dict[str, Any]) -> int:
+        """
+        Evaluate every atomic condition against a log.
+
+        Args:
+            log: Log document
+
+        Returns:
+            Bitset of atomic conditions that hold
+        """
+        bits = self.index_bits(log)
+        for bit, predicate in self._lazy.items():
+            if predicate(log):
+                bits |= bit
+        return bits
+
+    def matches(self, log: Dict[str, Any]) -> List[Any]:
+        """
+        Get the keys of all conditions that hold for a log.
+
+        Args:
+            log: Log document
+
+        Returns:
+            Matching keys in compilation order
+        """
+        bits = self.index_bits(log)
+
+        candidates = set(self._always)
+        by_bit = self._by_bit
+        remaining = bits
+        while remaining:
+            low = remaining & -remaining
+            indexes = by_bit.get(low)
+            if indexes:
+                candidates.update(indexes)
+            remaining ^= low
+
+        if self._lazy:
+            needed = 0
+            lazy_needed = self._lazy_needed
+            for index in candidates:
+                needed |= lazy_needed[index]
+            lazy = self._lazy
+            while needed:
+                low = needed & -needed
+                if lazy[low](log):
+                    bits |= low
+                needed ^= low
+
+        matched = []
+        programs = self.programs
+        evaluated_counts = self.evaluated
+        matched_counts = self.matched
+        for index in sorted(candidates):
+            evaluated_counts[index] += 1
+            key, clauses = programs[index]
+            for required, forbidden in clauses:
+                if bits & required == required and not bits & forbidden:
+                    matched.append(key)
+                    matched_counts[index] += 1
+                    break
+        return matched
+
+
+def _bits_of(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low
+        mask ^= low
+
+
+def _synthetic_rules(count: int) -> List[Tuple[int, Condition, Callable[[Dict[str, Any]], bool]]]:
+    """Keyword, tag and regex rules, each with the equivalent plain function."""
+    words = ["malware", "trojan", "denied", "failed", "breach", "exploit", "scan", "timeout", "sudo"]
+    rules = []
+    for i in range(count):
+        word = f"{words[i % len(words)]}{i // len(words) or ''}"
+        high = i % 8
+        if i % 4 == 0:
+            app, pattern = f"app{i}", rf"{word} \d+"
+            condition = FieldEquals("app_name", app) & FieldMatches("message", pattern)
+
+            def func(log, a=app, p=re.compile(pattern)):
+                return log.get("app_name") == a and p.search(log.get("message", "")) is not None
+        elif i % 4 == 1:
+            tag = f"tag{i}"
+            condition = TagPresent(tag) & FieldRange("severity", max=high)
+
+            def func(log, t=tag, m=high):
+                return t in log.get("tags", []) and log.get("severity", 7) <= m
+        else:
+            condition = MessageContains([word]) & FieldRange("severity", max=high)
+
+            def func(log, w=word, m=high):
+                return w in log.get("message", "").lower() and log.get("severity", 7) <= m
+        rules.append((i, condition, func))
+    return rules
+
+
+def main(iterations: int = 2000) -> None:
+    """
+    Print per-log evaluation time for growing rule counts.
+
+    Args:
+        iterations: Evaluations per measurement
+    """
+    log = {
+        "message": "Failed password for invalid user admin from 203.0.113.7: access denied by policy",
+        "severity": 4,
+        "tags": ["authentication", "error"],
+        "app_name": "sshd",
+    }
+    for count in (10, 100, 1000):
+        rules = _synthetic_rules(count)
+        compiled = CompiledRules([(key, condition) for key, condition, _ in rules])
+        interpreted = [(key, func) for key, _, func in rules]
+
+        compiled_us = min(timeit.repeat(lambda: compiled.matches(log), number=iterations, repeat=3))
+        lambda_us = min(timeit.repeat(
+            lambda: [key for key, condition in interpreted if condition(log)], number=iterations, repeat=3
+        ))
+        candidates = sum(compiled.evaluated) / (iterations * 3)
+        print(
+            f"{count:5d} rules  compiled {compiled_us / iterations * 1e6:8.2f} us/log"
+            f" ({candidates:.1f} candidates)  lambdas {lambda_us / iterations * 1e6:8.2f} us/log"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,766 @@
+"""
+Declarative alert rules loaded from YAML or JSON files, with hot reload.
+
+A rules file holds a list of rules (optionally under a top-level ``rules``
+key)::
+
+    rules:
+      - name: ssh_root_login_failed
+        description: Failed SSH login as root
+        severity: high
+        version: 2
+        when:
+          all:
+            - tag: authentication
+            - contains_any: [failed, invalid]
+            - regex: "for (invalid user )?root "
+            - field: severity
+              lte: 5
+
+Conditions:
+
+- ``all: [...]``, ``any: [...]``, ``not: {...}``
+- ``contains_any: [terms]``: case-insensitive substring of the message, or
+  list membership when a ``field`` other than message is given
+- ``regex: pattern`` with optional ``field`` (default message) and
+  ``ignore_case``
+- ``tag: name`` or ``tag: [names]`` (any of them)
+- ``field: name`` with one of ``equals``, ``in``, ``exists``, ``truthy``, or
+  thresholds ``gt``/``gte``/``lt``/``lte`` (optionally with ``default``
+  for missing values)
+
+A rule with a ``window`` (``threshold``, ``seconds``, ``group_by`` fields,
+optional ``buckets``) only fires when more than ``threshold`` matching logs
+share the same group_by values within ``seconds``. A rule with ``distinct``
+(the same keys plus ``field`` and an optional relative ``error``) fires
+when more than ``threshold`` distinct values of ``field`` do. A rule with
+``top_k`` (``field``, ``k``, ``seconds``, ``trigger``, optional ``min_rate``
+in events per second and ``capacity``) tracks the ``k`` most frequent
+values of ``field`` among matching logs per ``seconds`` interval and fires
+when a value enters the top-k (``enter``), when the top-k changes between
+intervals (``change``) or when a value exceeds ``min_rate`` (``rate``). A
+rule with ``anomaly`` (``group_by``, ``interval``, ``z``, optional
+``alpha``, ``warmup``, ``direction`` and ``retention``) learns each
+group_by key's matching logs per ``interval`` and fires when a count
+deviates from it by more than ``z`` standard deviations or the key falls
+silent.
+
+A rule with ``sequence`` correlates several logs::
+
+      - name: ssh_brute_force_success
+        severity: critical
+        sequence:
+          group_by: [source_ip]
+          within: 600
+          steps:
+            - name: failures
+              count: 5
+              when: {contains_any: [failed password]}
+            - name: success
+              when: {contains_any: [accepted password]}
+
+It fires when logs sharing the group_by values match the steps in order
+(each ``count`` times, default 1) within ``within`` seconds of the first
+one. Its ``when`` is optional and, if given, must hold for every step.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from logger import get_logger
+from metrics import alert_rules_loaded, alert_rule_reloads_total
+from alert_rules import AlertRule, AlertRuleEngine
+from anomaly import DIRECTIONS, AnomalySpec
+from correlation import SequenceSpec, SequenceStep
+from distinct_counter import DistinctSpec
+from top_k import TRIGGERS, TopKSpec
+from window_counter import WindowSpec
+from rule_compiler import (
+    AnyOf,
+    All,
+    Condition,
+    FieldEquals,
+    FieldExists,
+    FieldIn,
+    FieldMatches,
+    FieldRange,
+    ListContains,
+    MessageContains,
+    Not,
+    TagPresent,
+    Truthy,
+)
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - optional dependency
+    yaml = None
+
+logger = get_logger(__name__)
+
+SEVERITIES = ("critical", "high", "medium", "low")
+
+_AGGREGATIONS = ("window", "distinct", "top_k", "anomaly", "sequence")
+_RULE_KEYS = {"name", "description", "severity", "enabled", "version", "when"} | set(_AGGREGATIONS)
+_WINDOW_KEYS = {"threshold", "seconds", "group_by", "buckets"}
+_DISTINCT_KEYS = _WINDOW_KEYS | {"field", "error"}
+_TOP_K_KEYS = {"field", "k", "seconds", "trigger", "min_rate", "capacity"}
+_ANOMALY_KEYS = {"group_by", "interval", "alpha", "z", "warmup", "direction", "retention"}
+_SEQUENCE_KEYS = {"group_by", "within", "steps"}
+_STEP_KEYS = {"name", "count", "when"}
+_MAX_STEPS = 16
+_THRESHOLDS = {"gt", "gte", "lt", "lte"}
+_FIELD_OPERATORS = {"equals", "in", "exists", "truthy", "contains_any", "regex"} | _THRESHOLDS
+
+
+class RuleValidationError(ValueError):
+    """A rules file could not be loaded; ``errors`` lists every problem found."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _number(value: Any, path: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RuleValidationError([f"{path}: expected a number, got {value!r}"])
+    return value
+
+
+def _string_list(value: Any, path: str) -> List[str]:
+    values = value if isinstance(value, list) else [value]
+    if not values or not all(isinstance(v, str) and v for v in values):
+        raise RuleValidationError([f"{path}: expected a non-empty string or list of strings"])
+    return values
+
+
+def parse_condition(spec: Any, path: str = "when") -> Condition:
+    """
+    Parse a declarative condition.
+
+    Args:
+        spec: Condition mapping
+        path: Location of the condition, used in error messages
+
+    Returns:
+        Rule condition
+
+    Raises:
+        RuleValidationError: If the condition is malformed
+    """
+    if not isinstance(spec, dict) or not spec:
+        raise RuleValidationError([f"{path}: expected a non-empty mapping"])
+
+    for combinator in ("all", "any"):
+        if combinator in spec:
+            if len(spec) != 1:
+                raise RuleValidationError([f"{path}: '{combinator}' cannot be combined with other keys"])
+            items = spec[combinator]
+            if not isinstance(items, list) or not items:
+                raise RuleValidationError([f"{path}.{combinator}: expected a non-empty list"])
+            conditions = tuple(
+                parse_condition(item, f"{path}.{combinator}[{i}]") for i, item in enumerate(items)
+            )
+            if len(conditions) == 1:
+                return conditions[0]
+            return All(conditions) if combinator == "all" else AnyOf(conditions)
+
+    if "not" in spec:
+        if len(spec) != 1:
+            raise RuleValidationError([f"{path}: 'not' cannot be combined with other keys"])
+        return Not(parse_condition(spec["not"], f"{path}.not"))
+
+    if "tag" in spec:
+        if len(spec) != 1:
+            raise RuleValidationError([f"{path}: 'tag' cannot be combined with other keys"])
+        tags = [TagPresent(tag) for tag in _string_list(spec["tag"], f"{path}.tag")]
+        return tags[0] if len(tags) == 1 else AnyOf(tuple(tags))
+
+    unknown = set(spec) - _FIELD_OPERATORS - {"field", "default", "ignore_case"}
+    if unknown:
+        raise RuleValidationError([f"{path}: unknown keys {sorted(unknown)}"])
+
+    field = spec.get("field", "message")
+    if not isinstance(field, str) or not field:
+        raise RuleValidationError([f"{path}.field: expected a field name"])
+
+    operators = set(spec) & (_FIELD_OPERATORS - _THRESHOLDS)
+    thresholds = set(spec) & _THRESHOLDS
+    if len(operators) + bool(thresholds) != 1:
+        raise RuleValidationError([
+            f"{path}: expected exactly one of {sorted(_FIELD_OPERATORS - _THRESHOLDS)} or thresholds"
+        ])
+    if ("gt" in spec and "gte" in spec) or ("lt" in spec and "lte" in spec):
+        raise RuleValidationError([f"{path}: conflicting lower or upper thresholds"])
+    if "default" in spec and not thresholds:
+        raise RuleValidationError([f"{path}: 'default' only applies to thresholds"])
+    if "ignore_case" in spec and "regex" not in spec:
+        raise RuleValidationError([f"{path}: 'ignore_case' only applies to regex"])
+
+    if thresholds:
+        low = spec.get("gt", spec.get("gte"))
+        high = spec.get("lt", spec.get("lte"))
+        default = spec.get("default")
+        return FieldRange(
+            field,
+            min=None if low is None else _number(low, f"{path}.{'gt' if 'gt' in spec else 'gte'}"),
+            max=None if high is None else _number(high, f"{path}.{'lt' if 'lt' in spec else 'lte'}"),
+            default=None if default is None else _number(default, f"{path}.default"),
+            min_exclusive="gt" in spec,
+            max_exclusive="lt" in spec,
+        )
+
+    operator = operators.pop()
+    value = spec[operator]
+    if operator == "equals":
+        if isinstance(value, (list, dict)):
+            raise RuleValidationError([f"{path}.equals: expected a scalar value"])
+        return FieldEquals(field, value)
+    if operator == "in":
+        if not isinstance(value, list) or not value:
+            raise RuleValidationError([f"{path}.in: expected a non-empty list"])
+        try:
+            return FieldIn(field, value)
+        except TypeError:
+            raise RuleValidationError([f"{path}.in: values must be scalars"])
+    if operator in ("exists", "truthy"):
+        if not isinstance(value, bool):
+            raise RuleValidationError([f"{path}.{operator}: expected true or false"])
+        atom = FieldExists(field) if operator == "exists" else Truthy(field)
+        return atom if value else Not(atom)
+    if operator == "contains_any":
+        terms = _string_list(value, f"{path}.contains_any")
+        if field == "message":
+            return MessageContains(terms)
+        contains = [ListContains(field, term) for term in terms]
+        return contains[0] if len(contains) == 1 else AnyOf(tuple(contains))
+
+    # regex
+    if not isinstance(value, str) or not value:
+        raise RuleValidationError([f"{path}.regex: expected a pattern"])
+    ignore_case = spec.get("ignore_case", False)
+    if not isinstance(ignore_case, bool):
+        raise RuleValidationError([f"{path}.ignore_case: expected true or false"])
+    try:
+        re.compile(value)
+    except re.error as e:
+        raise RuleValidationError([f"{path}.regex: invalid pattern: {e}"])
+    return FieldMatches(field, value, ignore_case)
+
+
+def _window_errors(spec: Dict[str, Any], path: str, keys: set, default_buckets: int) -> List[str]:
+    errors = []
+    unknown = set(spec) - keys
+    if unknown:
+        errors.append(f"{path}: unknown keys {sorted(unknown)}")
+    threshold = spec.get("threshold")
+    if isinstance(threshold, bool) or not isinstance(threshold, int) or threshold < 0:
+        errors.append(f"{path}.threshold: expected a non-negative integer")
+    seconds = spec.get("seconds")
+    if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or seconds <= 0:
+        errors.append(f"{path}.seconds: expected a positive number")
+    buckets = spec.get("buckets", default_buckets)
+    if isinstance(buckets, bool) or not isinstance(buckets, int) or not 1 <= buckets <= 1000:
+        errors.append(f"{path}.buckets: expected an integer between 1 and 1000")
+    try:
+        _string_list(spec.get("group_by", ["hostname"]), f"{path}.group_by")
+    except RuleValidationError as e:
+        errors.extend(e.errors)
+    return errors
+
+
+def parse_window(spec: Any, path: str = "window") -> WindowSpec:
+    """
+    Parse a threshold window (``threshold`` events per ``group_by`` key in
+    ``seconds``).
+
+    Args:
+        spec: Window mapping
+        path: Location of the window, used in error messages
+
+    Returns:
+        Window definition
+
+    Raises:
+        RuleValidationError: If the window is malformed
+    """
+    if not isinstance(spec, dict):
+        raise RuleValidationError([f"{path}: expected a mapping"])
+    errors = _window_errors(spec, path, _WINDOW_KEYS, 10)
+    if errors:
+        raise RuleValidationError(errors)
+    return WindowSpec(
+        threshold=spec["threshold"],
+        seconds=float(spec["seconds"]),
+        group_by=tuple(_string_list(spec.get("group_by", ["hostname"]), path)),
+        buckets=spec.get("buckets", 10),
+    )
+
+
+def parse_distinct(spec: Any, path: str = "distinct") -> DistinctSpec:
+    """
+    Parse a distinct count (more than ``threshold`` distinct ``field``
+    values per ``group_by`` key in ``seconds``, estimated within ``error``).
+
+    Args:
+        spec: Distinct-count mapping
+        path: Location of the distinct count, used in error messages
+
+    Returns:
+        Distinct-count definition
+
+    Raises:
+        RuleValidationError: If the distinct count is malformed
+    """
+    if not isinstance(spec, dict):
+        raise RuleValidationError([f"{path}: expected a mapping"])
+    errors = _window_errors(spec, path, _DISTINCT_KEYS, 5)
+    field = spec.get("field")
+    if not isinstance(field, str) or not field:
+        errors.append(f"{path}.field: expected a field name")
+    error = spec.get("error", 0.05)
+    if isinstance(error, bool) or not isinstance(error, (int, float)) or not 0.003 <= error <= 0.3:
+        errors.append(f"{path}.error: expected a relative error between 0.003 and 0.3")
+    if errors:
+        raise RuleValidationError(errors)
+    return DistinctSpec(
+        field=field,
+        threshold=spec["threshold"],
+        seconds=float(spec["seconds"]),
+        group_by=tuple(_string_list(spec.get("group_by", ["source_ip"]), path)),
+        buckets=spec.get("buckets", 5),
+        error=float(error),
+    )
+
+
+def parse_top_k(spec: Any, path: str = "top_k") -> TopKSpec:
+    """
+    Parse a top-k tracker (the ``k`` most frequent ``field`` values per
+    ``seconds`` interval, firing on ``trigger``).
+
+    Args:
+        spec: Top-k mapping
+        path: Location of the top-k tracker, used in error messages
+
+    Returns:
+        Top-k definition
+
+    Raises:
+        RuleValidationError: If the top-k tracker is malformed
+    """
+    if not isinstance(spec, dict):
+        raise RuleValidationError([f"{path}: expected a mapping"])
+    errors = []
+    unknown = set(spec) - _TOP_K_KEYS
+    if unknown:
+        errors.append(f"{path}: unknown keys {sorted(unknown)}")
+    field = spec.get("field")
+    if not isinstance(field, str) or not field:
+        errors.append(f"{path}.field: expected a field name")
+    k = spec.get("k", 10)
+    if isinstance(k, bool) or not isinstance(k, int) or not 1 <= k <= 1000:
+        errors.append(f"{path}.k: expected an integer between 1 and 1000")
+        k = 10
+    seconds = spec.get("seconds", 60)
+    if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or seconds <= 0:
+        errors.append(f"{path}.seconds: expected a positive number")
+    trigger = spec.get("trigger", "enter")
+    if trigger not in TRIGGERS:
+        errors.append(f"{path}.trigger: expected one of {list(TRIGGERS)}")
+    min_rate = spec.get("min_rate", 0)
+    if isinstance(min_rate, bool) or not isinstance(min_rate, (int, float)) or min_rate < 0:
+        errors.append(f"{path}.min_rate: expected a non-negative number")
+    elif trigger == "rate" and not min_rate:
+        errors.append(f"{path}.min_rate: required for the rate trigger")
+    capacity = spec.get("capacity", 0)
+    if isinstance(capacity, bool) or not isinstance(capacity, int) or (capacity and not k <= capacity <= 100000):
+        errors.append(f"{path}.capacity: expected an integer between k and 100000")
+    if errors:
+        raise RuleValidationError(errors)
+    return TopKSpec(
+        field=field,
+        k=k,
+        seconds=float(seconds),
+        trigger=trigger,
+        min_rate=float(min_rate),
+        capacity=capacity,
+    )
+
+
+def parse_anomaly(spec: Any, path: str = "anomaly") -> AnomalySpec:
+    """
+    Parse a rate anomaly detector (per ``group_by`` key, counts per
+    ``interval`` more than ``z`` standard deviations off the baseline).
+
+    Args:
+        spec: Anomaly mapping
+        path: Location of the anomaly detector, used in error messages
+
+    Returns:
+        Anomaly definition
+
+    Raises:
+        RuleValidationError: If the anomaly detector is malformed
+    """
+    if not isinstance(spec, dict):
+        raise RuleValidationError([f"{path}: expected a mapping"])
+    defaults = AnomalySpec()
+    errors = []
+    unknown = set(spec) - _ANOMALY_KEYS
+    if unknown:
+        errors.append(f"{path}: unknown keys {sorted(unknown)}")
+    try:
+        group_by = _string_list(spec.get("group_by", list(defaults.group_by)), f"{path}.group_by")
+    except RuleValidationError as e:
+        errors.extend(e.errors)
+    interval = spec.get("interval", defaults.interval)
+    if isinstance(interval, bool) or not isinstance(interval, (int, float)) or interval <= 0:
+        errors.append(f"{path}.interval: expected a positive number")
+    alpha = spec.get("alpha", defaults.alpha)
+    if isinstance(alpha, bool) or not isinstance(alpha, (int, float)) or not 0 < alpha < 1:
+        errors.append(f"{path}.alpha: expected a number between 0 and 1")
+    z = spec.get("z", defaults.z)
+    if isinstance(z, bool) or not isinstance(z, (int, float)) or z <= 0:
+        errors.append(f"{path}.z: expected a positive number")
+    for key, low in (("warmup", 1), ("retention", 1)):
+        value = spec.get(key, getattr(defaults, key))
+        if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= 100000:
+            errors.append(f"{path}.{key}: expected an integer between {low} and 100000")
+    direction = spec.get("direction", defaults.direction)
+    if direction not in DIRECTIONS:
+        errors.append(f"{path}.direction: expected one of {list(DIRECTIONS)}")
+    if errors:
+        raise RuleValidationError(errors)
+    return AnomalySpec(
+        group_by=tuple(group_by),
+        interval=float(interval),
+        alpha=float(alpha),
+        z=float(z),
+        warmup=spec.get("warmup", defaults.warmup),
+        direction=direction,
+        retention=spec.get("retention", defaults.retention),
+    )
+
+
+def parse_sequence(spec: Any, path: str = "sequence") -> SequenceSpec:
+    """
+    Parse a sequence (``steps`` matched in order by logs sharing the
+    ``group_by`` values within ``within`` seconds).
+
+    Args:
+        spec: Sequence mapping
+        path: Location of the sequence, used in error messages
+
+    Returns:
+        Sequence definition
+
+    Raises:
+        RuleValidationError: If the sequence is malformed
+    """
+    if not isinstance(spec, dict):
+        raise RuleValidationError([f"{path}: expected a mapping"])
+    errors = []
+    unknown = set(spec) - _SEQUENCE_KEYS
+    if unknown:
+        errors.append(f"{path}: unknown keys {sorted(unknown)}")
+    try:
+        group_by = _string_list(spec.get("group_by", "source_ip"), f"{path}.group_by")
+    except RuleValidationError as e:
+        errors.extend(e.errors)
+    within = spec.get("within")
+    if isinstance(within, bool) or not isinstance(within, (int, float)) or within <= 0:
+        errors.append(f"{path}.within: expected a positive number")
+
+    steps = []
+    items = spec.get("steps")
+    if not isinstance(items, list) or not 2 <= len(items) <= _MAX_STEPS:
+        errors.append(f"{path}.steps: expected a list of 2 to {_MAX_STEPS} steps")
+        items = []
+    for i, item in enumerate(items):
+        step_path = f"{path}.steps[{i}]"
+        if not isinstance(item, dict):
+            errors.append(f"{step_path}: expected a mapping")
+            continue
+        unknown = set(item) - _STEP_KEYS
+        if unknown:
+            errors.append(f"{step_path}: unknown keys {sorted(unknown)}")
+        name = item.get("name", "")
+        if not isinstance(name, str):
+            errors.append(f"{step_path}.name: expected a string")
+        count = item.get("count", 1)
+        if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= 100000:
+            errors.append(f"{step_path}.count: expected an integer between 1 and 100000")
+        if "when" not in item:
+            errors.append(f"{step_path}.when: required")
+            continue
+        try:
+            condition = parse_condition(item["when"], f"{step_path}.when")
+        except RuleValidationError as e:
+            errors.extend(e.errors)
+            continue
+        steps.append(SequenceStep(condition, count, name))
+    if errors:
+        raise RuleValidationError(errors)
+    return SequenceSpec(steps=tuple(steps), within=float(within), group_by=tuple(group_by))
+
+
+def parse_rule(spec: Any, path: str) -> AlertRule:
+    """
+    Parse one declarative rule.
+
+    Rules without an explicit version are versioned by a hash of their
+    definition, so any edit changes the version.
+
+    Args:
+        spec: Rule mapping
+        path: Location of the rule, used in error messages
+
+    Returns:
+        Alert rule with a compiled-form match condition
+
+    Raises:
+        RuleValidationError: If the rule is malformed
+    """
+    if not isinstance(spec, dict):
+        raise RuleValidationError([f"{path}: expected a mapping"])
+
+    errors = []
+    unknown = set(spec) - _RULE_KEYS
+    if unknown:
+        errors.append(f"{path}: unknown keys {sorted(unknown)}")
+    name = spec.get("name")
+    if not isinstance(name, str) or not name:
+        errors.append(f"{path}.name: required")
+    else:
+        path = f"{path} ({name})"
+    if spec.get("severity") not in SEVERITIES:
+        errors.append(f"{path}.severity: expected one of {list(SEVERITIES)}")
+    if not isinstance(spec.get("description", ""), str):
+        errors.append(f"{path}.description: expected a string")
+    if not isinstance(spec.get("enabled", True), bool):
+        errors.append(f"{path}.enabled: expected true or false")
+    match = None
+    if "when" not in spec:
+        if "sequence" not in spec:
+            errors.append(f"{path}.when: required")
+    else:
+        try:
+            match = parse_condition(spec["when"], f"{path}.when")
+        except RuleValidationError as e:
+            errors.extend(e.errors)
+    window = distinct = top_k = anomaly = sequence = None
+    aggregations = [key for key in _AGGREGATIONS if key in spec]
+    if len(aggregations) > 1:
+        errors.append(f"{path}: a rule can only have one of {list(_AGGREGATIONS)}")
+    elif "window" in spec:
+        try:
+            window = parse_window(spec["window"], f"{path}.window")
+        except RuleValidationError as e:
+            errors.extend(e.errors)
+    elif "distinct" in spec:
+        try:
+            distinct = parse_distinct(spec["distinct"], f"{path}.distinct")
+        except RuleValidationError as e:
+            errors.extend(e.errors)
+    elif "top_k" in spec:
+        try:
+            top_k = parse_top_k(spec["top_k"], f"{path}.top_k")
+        except RuleValidationError as e:
+            errors.extend(e.errors)
+    elif "anomaly" in spec:
+        try:
+            anomaly = parse_anomaly(spec["anomaly"], f"{path}.anomaly")
+        except RuleValidationError as e:
+            errors.extend(e.errors)
+    elif "sequence" in spec:
+        try:
+            sequence = parse_sequence(spec["sequence"], f"{path}.sequence")
+        except RuleValidationError as e:
+            errors.extend(e.errors)
+    if errors:
+        raise RuleValidationError(errors)
+
+    if sequence:
+        # Let through the logs of any step; the correlator tells them apart
+        steps = AnyOf(tuple(step.condition for step in sequence.steps))
+        match = steps if match is None else All((match, steps))
+
+    version = spec.get("version")
+    if version is None:
+        canonical = json.dumps(spec, sort_keys=True, default=str)
+        version = hashlib.blake2b(canonical.encode(), digest_size=6).hexdigest()
+
+    return AlertRule(
+        name=name,
+        description=spec.get("description", ""),
+        severity=spec["severity"],
+        enabled=spec.get("enabled", True),
+        match=match,
+        version=str(version),
+        window=window,
+        distinct=distinct,
+        top_k=top_k,
+        anomaly=anomaly,
+        sequence=sequence,
+    )
+
+
+def parse_rules(data: Any) -> List[AlertRule]:
+    """
+    Parse a rules document, collecting the errors of every rule.
+
+    Args:
+        data: Decoded rules file (a list, or a mapping with a ``rules`` list)
+
+    Returns:
+        Alert rules in file order
+
+    Raises:
+        RuleValidationError: If any rule is malformed or names repeat
+    """
+    if isinstance(data, dict) and set(data) == {"rules"}:
+        data = data["rules"]
+    if data is None:
+        return []
+    if not isinstance(data, list):
+        raise RuleValidationError(["expected a list of rules or a mapping with a 'rules' list"])
+
+    rules: List[AlertRule] = []
+    errors: List[str] = []
+    seen = set()
+    for i, spec in enumerate(data):
+        try:
+            rule = parse_rule(spec, f"rules[{i}]")
+        except RuleValidationError as e:
+            errors.extend(e.errors)
+            continue
+        if rule.name in seen:
+            errors.append(f"rules[{i}] ({rule.name}): duplicate rule name")
+        seen.add(rule.name)
+        rules.append(rule)
+
+    if errors:
+        raise RuleValidationError(errors)
+    return rules
+
+
+def load_rules_file(path: str) -> List[AlertRule]:
+    """
+    Read and parse a YAML (.yaml/.yml) or JSON rules file.
+
+    Args:
+        path: Rules file path
+
+    Returns:
+        Alert rules
+
+    Raises:
+        RuleValidationError: If the file cannot be decoded or is invalid
+        OSError: If the file cannot be read
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+
+    if path.endswith((".yaml", ".yml")):
+        if yaml is None:
+            raise RuntimeError("PyYAML is not installed")
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise RuleValidationError([f"invalid YAML: {e}"])
+    else:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise RuleValidationError([f"invalid JSON: {e}"])
+    return parse_rules(data)
+
+
+class RuleFileWatcher:
+    """
+    Keep an engine's rules in sync with a rules file.
+
+    The file is polled for modification time and size changes. Reading and
+    parsing happen off the event loop; the engine then compiles and swaps
+    in the new rules in one step, so consumption never pauses. A file that
+    fails validation is reported and the previous rules stay active.
+    """
+
+    def __init__(self, engine: AlertRuleEngine, path: str):
+        """
+        Initialize rule file watcher.
+
+        Args:
+            engine: Rule engine to update
+            path: Rules file path
+        """
+        self.engine = engine
+        self.path = path
+        self.errors: List[str] = []
+        self._signature: Optional[Tuple[float, int]] = None
+
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    async def reload(self, force: bool = False) -> bool:
+        """
+        Load the rules file if it changed since the last attempt.
+
+        Args:
+            force: Reload even if the file looks unchanged
+
+        Returns:
+            True if new rules were swapped in
+        """
+        signature = self._stat()
+        if not force and signature == self._signature:
+            return False
+        self._signature = signature
+
+        if signature is None:
+            alert_rule_reloads_total.labels(result="missing").inc()
+            logger.warning("alert_rules_file_missing", path=self.path)
+            return False
+
+        try:
+            loop = asyncio.get_running_loop()
+            rules = await loop.run_in_executor(None, load_rules_file, self.path)
+        except RuleValidationError as e:
+            self.errors = e.errors
+            alert_rule_reloads_total.labels(result="invalid").inc()
+            logger.error("alert_rules_invalid", path=self.path, errors=e.errors)
+            return False
+        except Exception as e:
+            self.errors = [str(e)]
+            alert_rule_reloads_total.labels(result="error").inc()
+            logger.error("alert_rules_load_failed", path=self.path, error=str(e))
+            return False
+
+        self.errors = []
+        self.engine.replace_rules(self.path, rules)
+        alert_rules_loaded.set(len(self.engine.rules))
+        alert_rule_reloads_total.labels(result="success").inc()
+        logger.info(
+            "alert_rules_reloaded",
+            path=self.path,
+            rules={rule.name: rule.version for rule in rules},
+        )
+        return True
+
+    async def run(self, interval: float, stop_event: Optional[asyncio.Event] = None) -> None:
+        """
+        Poll the rules file until cancelled or stop_event is set.
+
+        Args:
+            interval: Seconds between checks
+            stop_event: Optional event ending the loop
+        """
+        while stop_event is None or not stop_event.is_set():
+            await asyncio.sleep(interval)
+            await self.reload()
@@ -0,0 +1,356 @@
+"""
+Streaming heavy-hitter (top-K) tracking with Space-Saving sketches.
+"""
+import heapq
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+TRIGGERS = ("enter", "change", "rate")
+
+
+class SpaceSaving:
+    """
+    Approximate most frequent keys in O(capacity) memory.
+
+    At most ``capacity`` keys are tracked. A new key arriving when all slots
+    are taken replaces a key with the minimum count and inherits that count
+    as its error, so a reported count is never more than ``error`` above the
+    true one, and every key seen more than ``total / capacity`` times is
+    tracked. Keys are grouped by count, which makes every update O(1).
+    """
+
+    __slots__ = ("capacity", "total", "_counts", "_errors", "_buckets", "_min")
+
+    def __init__(self, capacity: int):
+        """
+        Initialize sketch.
+
+        Args:
+            capacity: Maximum number of keys tracked
+
+        Raises:
+            ValueError: If capacity is not positive
+        """
+        if capacity < 1:
+            raise ValueError("Space-Saving capacity must be positive")
+        self.capacity = capacity
+        self.total = 0
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        # Count -> keys with that count (insertion ordered)
+        self._buckets: Dict[int, Dict[str, None]] = {}
+        self._min = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._counts
+
+    def _unlink(self, key: str, count: int) -> bool:
+        bucket = self._buckets[count]
+        del bucket[key]
+        if bucket:
+            return False
+        del self._buckets[count]
+        return True
+
+    def add(self, key: str) -> int:
+        """
+        Count one occurrence of a key.
+
+        Args:
+            key: Key to count
+
+        Returns:
+            The key's count (an upper bound of its true count)
+        """
+        self.total += 1
+        count = self._counts.get(key)
+        if count is None:
+            if len(self._counts) < self.capacity:
+                count = 0
+                self._errors[key] = 0
+                self._min = 1
+            else:
+                count = self._min
+                victim = next(iter(self._buckets[count]))
+                if self._unlink(victim, count):
+                    self._min = count + 1
+                del self._counts[victim]
+                del self._errors[victim]
+                self._errors[key] = count
+        elif self._unlink(key, count) and count == self._min:
+            self._min = count + 1
+
+        count += 1
+        self._counts[key] = count
+        bucket = self._buckets.get(count)
+        if bucket is None:
+            bucket = self._buckets[count] = {}
+        bucket[key] = None
+        return count
+
+    def count(self, key: str) -> Tuple[int, int]:
+        """
+        Get the count of a key.
+
+        Args:
+            key: Key
+
+        Returns:
+            (count, error); the true count lies in [count - error, count].
+            (0, 0) if the key is not tracked
+        """
+        return self._counts.get(key, 0), self._errors.get(key, 0)
+
+    def top(self, n: int) -> List[Tuple[str, int, int]]:
+        """
+        Get the keys with the highest counts.
+
+        Safe to call from another thread while the sketch is updated; the
+        result then reflects a recent state.
+
+        Args:
+            n: Number of keys
+
+        Returns:
+            (key, count, error) tuples, highest count first
+        """
+        # Plain copies are atomic, iterating the live dicts is not
+        items = list(self._counts.items())
+        errors = dict(self._errors)
+        return [(key, count, errors.get(key, 0)) for key, count in heapq.nlargest(n, items, key=itemgetter(1))]
+
+
+@dataclass(frozen=True)
+class TopKSpec:
+    """
+    Track the ``k`` most frequent values of ``field`` per ``seconds`` interval.
+
+    ``trigger`` selects when a rule fires: ``enter`` when a value that was not
+    in the previous interval's top-k gets into the current one with more
+    events than the previous k-th value had, ``change`` when an interval's
+    top-k values differ from the interval before, ``rate`` when a value
+    averages more than ``min_rate`` events per second over an interval.
+    ``min_rate`` also gates ``enter``. None only tracks.
+    """
+    field: str
+    k: int = 10
+    seconds: float = 60.0
+    trigger: Optional[str] = "enter"
+    min_rate: float = 0.0
+    capacity: int = 0
+
+    @property
+    def slots(self) -> int:
+        """Keys tracked by the sketch (``capacity``, or 10 per top-k entry)."""
+        return max(self.capacity or self.k * 10, self.k)
+
+    def keys_of(self, log: Dict[str, Any]) -> List[str]:
+        """
+        Get the values of a log to count.
+
+        Args:
+            log: Log document
+
+        Returns:
+            The field's value, or each item of a list field
+        """
+        value = log.get(self.field)
+        if value is None:
+            return []
+        if isinstance(value, list):
+            return [v if isinstance(v, str) else str(v) for v in value if v is not None and v != ""]
+        if value == "":
+            return []
+        return [value if isinstance(value, str) else str(value)]
+
+
+class HeavyHitters:
+    """
+    Top-K values of one field over consecutive time intervals.
+
+    Counts of the running interval are kept in a Space-Saving sketch; when
+    an interval ends its top-k becomes the ``previous`` ranking and the
+    sketch starts over, so memory is O(capacity) however many distinct
+    values arrive. An idle gap of a whole interval or more resets the
+    ranking, so the first busy interval afterwards is a warm-up and does
+    not fire ``enter`` or ``change``.
+
+    Each value fires ``enter`` or ``rate`` at most once per interval, and
+    ``change`` fires once for the first log after the interval boundary.
+    """
+
+    def __init__(self, spec: TopKSpec):
+        """
+        Initialize heavy-hitter tracker.
+
+        Args:
+            spec: Top-K definition
+        """
+        self.spec = spec
+        self.current = SpaceSaving(spec.slots)
+        self.epoch: Optional[int] = None
+        self.previous: List[Tuple[str, int, int]] = []
+        self.warm = False
+        self.entered: List[str] = []
+        self.left: List[str] = []
+        self.last_event: Optional[Dict[str, Any]] = None
+
+        self._previous_keys: Dict[str, int] = {}
+        self._change_pending = False
+        self._floor = 0
+        self._reported: Dict[str, None] = {}
+
+    def _rollover(self, epoch: int) -> None:
+        k = self.spec.k
+        if self.epoch is not None and epoch == self.epoch + 1:
+            ranking = self.current.top(k)
+            keys = [key for key, _, _ in ranking]
+            if self._previous_keys:
+                current = set(keys)
+                self.entered = [key for key in keys if key not in self._previous_keys]
+                self.left = [key for key in self._previous_keys if key not in current]
+                self._change_pending = bool(self.entered or self.left)
+            self.warm = bool(ranking)
+        else:
+            ranking = []
+            self.warm = False
+            self.entered = []
+            self.left = []
+            self._change_pending = False
+
+        self.previous = ranking
+        self._previous_keys = {key: rank for rank, (key, _, _) in enumerate(ranking, 1)}
+        self.current = SpaceSaving(self.spec.slots)
+        self.epoch = epoch
+        self._floor = 0
+        self._reported = {}
+
+    def _in_top(self, key: str, count: int) -> bool:
+        k = self.spec.k
+        if len(self.current) <= k:
+            return True
+        # The k-th count never drops within an interval, so a stale floor
+        # is a safe lower bound
+        if count < self._floor:
+            return False
+        top = self.current.top(k)
+        self._floor = top[-1][1]
+        return any(key == top_key for top_key, _, _ in top)
+
+    def _report(self, key: Optional[str], now: float) -> Dict[str, Any]:
+        if key is not None:
+            self._reported[key] = None
+            if len(self._reported) > self.spec.slots:
+                self._reported = {k: None for k in self._reported if k in self.current}
+        self.last_event = self.describe(key, now)
+        return self.last_event
+
+    def observe(self, log: Dict[str, Any], now: float) -> Optional[Dict[str, Any]]:
+        """
+        Count a log's field values.
+
+        Args:
+            log: Log document
+            now: Event time (seconds)
+
+        Returns:
+            Event description (see describe) if the spec's trigger fired,
+            else None
+        """
+        keys = self.spec.keys_of(log)
+        if not keys:
+            return None
+        epoch = int(now // self.spec.seconds)
+        if self.epoch is None or epoch > self.epoch:
+            self._rollover(epoch)
+
+        trigger = self.spec.trigger
+        threshold = self.spec.min_rate * self.spec.seconds
+        if trigger == "enter" and self.previous:
+            threshold = max(threshold, self.previous[-1][1])
+
+        event = None
+        if trigger == "change" and self._change_pending:
+            self._change_pending = False
+            event = self._report(None, now)
+
+        for key in keys:
+            count = self.current.add(key)
+            if event is not None or trigger not in ("enter", "rate") or key in self._reported:
+                continue
+            lower = count - self.current.count(key)[1]
+            if lower <= threshold:
+                continue
+            if trigger == "rate":
+                event = self._report(key, now)
+            elif self.warm and key not in self._previous_keys and self._in_top(key, count):
+                event = self._report(key, now)
+        return event
+
+    def describe(self, key: Optional[str], now: float) -> Dict[str, Any]:
+        """
+        Describe a value's standing, or the last top-k change if key is None.
+
+        Args:
+            key: Field value
+            now: Current time (seconds)
+
+        Returns:
+            Field, key, interval start, rank and count in the running
+            interval, rank in the previous one, and the values that
+            entered and left the top-k at the last interval boundary
+        """
+        seconds = self.spec.seconds
+        event = {
+            "field": self.spec.field,
+            "key": key,
+            "trigger": self.spec.trigger,
+            "k": self.spec.k,
+            "seconds": seconds,
+            "interval_start": self.epoch * seconds if self.epoch is not None else None,
+            "entered": list(self.entered),
+            "left": list(self.left),
+        }
+        if key is not None:
+            count, error = self.current.count(key)
+            top = [top_key for top_key, _, _ in self.current.top(self.spec.k)]
+            elapsed = max(now - event["interval_start"], 1.0) if self.epoch is not None else seconds
+            event.update({
+                "rank": top.index(key) + 1 if key in top else None,
+                "previous_rank": self._previous_keys.get(key),
+                "count": count,
+                "error": error,
+                "rate": round(count / min(elapsed, seconds), 3),
+            })
+        return event
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the current and previous top-k rankings.
+
+        Returns:
+            Spec, running interval start and both rankings as lists of
+            key, count, error and events per second
+        """
+        seconds = self.spec.seconds
+
+        def ranking(entries: List[Tuple[str, int, int]]) -> List[Dict[str, Any]]:
+            return [
+                {"key": key, "count": count, "error": error, "rate": round(count / seconds, 3)}
+                for key, count, error in entries
+            ]
+
+        return {
+            "field": self.spec.field,
+            "k": self.spec.k,
+            "seconds": seconds,
+            "trigger": self.spec.trigger,
+            "interval_start": self.epoch * seconds if self.epoch is not None else None,
+            "tracked": len(self.current),
+            "current": ranking(self.current.top(self.spec.k)),
+            "previous": ranking(self.previous),
+        }
@@ -0,0 +1,221 @@
+"""
+Sliding-window event counting for threshold alert rules.
+"""
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from metrics import window_keys, window_key_evictions_total
+
+# Idle keys checked for eviction per counted event
+_IDLE_CHECKS_PER_EVENT = 2
+
+
+def group_key(log: Dict[str, Any], group_by: Tuple[str, ...]) -> Optional[str]:
+    """
+    Build the key a log is counted under.
+
+    Args:
+        log: Log document
+        group_by: Fields making up the key
+
+    Returns:
+        The field values joined with "|", or None if any is missing
+    """
+    values = []
+    for field in group_by:
+        value = log.get(field)
+        if value is None:
+            return None
+        values.append(value if isinstance(value, str) else str(value))
+    return values[0] if len(values) == 1 else "|".join(values)
+
+
+@dataclass(frozen=True)
+class WindowSpec:
+    """Fire when more than ``threshold`` matching events share a key within ``seconds``."""
+    threshold: int
+    seconds: float
+    group_by: Tuple[str, ...] = ("hostname",)
+    buckets: int = 10
+
+    def key_of(self, log: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the counting key of a log.
+
+        Args:
+            log: Log document
+
+        Returns:
+            Key built from the group_by fields, or None if any is missing
+        """
+        return group_key(log, self.group_by)
+
+
+class SlidingWindowCounter:
+    """
+    Per-key event counts over a sliding window, with bounded memory.
+
+    The window is split into ``buckets`` ring-buffer slots per key. All
+    rings live in shared flat arrays (4 bytes per bucket) and a key only
+    owns a slot number, so 100k keys with 10 buckets take roughly 4 MB of
+    counters plus the key table. Keys are kept in least-recently-updated
+    order: keys whose whole window has passed are evicted as new events
+    arrive, and when ``max_keys`` is reached the stalest key is evicted.
+
+    ``add`` reports a key once when its count first exceeds the threshold
+    and re-arms after the count falls back to the threshold or below.
+    """
+
+    def __init__(self, spec: WindowSpec, max_keys: int = 100000, name: str = ""):
+        """
+        Initialize window counter.
+
+        Args:
+            spec: Window definition
+            max_keys: Maximum number of keys tracked at once
+            name: Rule name used as metrics label
+        """
+        self.spec = spec
+        self.max_keys = max_keys
+        self.buckets = max(spec.buckets, 1)
+        self.bucket_width = spec.seconds / self.buckets
+
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._counts = array("I")
+        self._epochs = array("q")
+        self._totals = array("I")
+        self._fired = bytearray()
+        self._zeros = array("I", [0]) * self.buckets
+
+        self._keys_gauge = window_keys.labels(rule_name=name)
+        self._idle_evictions = window_key_evictions_total.labels(rule_name=name, reason="idle")
+        self._capacity_evictions = window_key_evictions_total.labels(rule_name=name, reason="capacity")
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _allocate(self, key: str, bucket: int) -> int:
+        if len(self._slots) >= self.max_keys:
+            _, slot = self._slots.popitem(last=False)
+            self._free.append(slot)
+            self._capacity_evictions.inc()
+
+        if self._free:
+            slot = self._free.pop()
+            start = slot * self.buckets
+            self._counts[start:start + self.buckets] = self._zeros
+            self._epochs[slot] = bucket
+            self._totals[slot] = 0
+            self._fired[slot] = 0
+        else:
+            slot = len(self._epochs)
+            self._counts.extend(self._zeros)
+            self._epochs.append(bucket)
+            self._totals.append(0)
+            self._fired.append(0)
+
+        self._slots[key] = slot
+        self._keys_gauge.set(len(self._slots))
+        return slot
+
+    def _advance(self, slot: int, bucket: int) -> None:
+        last = self._epochs[slot]
+        n = self.buckets
+        start = slot * n
+        if bucket - last >= n:
+            self._counts[start:start + n] = self._zeros
+            self._totals[slot] = 0
+        else:
+            counts = self._counts
+            total = self._totals[slot]
+            for b in range(last + 1, bucket + 1):
+                i = start + b % n
+                total -= counts[i]
+                counts[i] = 0
+            self._totals[slot] = total
+        self._epochs[slot] = bucket
+
+    def evict_idle(self, now: float, limit: Optional[int] = None) -> int:
+        """
+        Evict keys with no events inside the window.
+
+        Args:
+            now: Current time (seconds)
+            limit: Maximum keys to evict (all idle keys if None)
+
+        Returns:
+            Number of keys evicted
+        """
+        oldest = int(now // self.bucket_width) - self.buckets
+        evicted = 0
+        while self._slots and (limit is None or evicted < limit):
+            key, slot = next(iter(self._slots.items()))
+            if self._epochs[slot] > oldest:
+                break
+            del self._slots[key]
+            self._free.append(slot)
+            evicted += 1
+        if evicted:
+            self._idle_evictions.inc(evicted)
+            self._keys_gauge.set(len(self._slots))
+        return evicted
+
+    def count(self, key: str, now: float) -> int:
+        """
+        Get the number of events for a key within the window.
+
+        Args:
+            key: Counting key
+            now: Current time (seconds)
+
+        Returns:
+            Event count
+        """
+        slot = self._slots.get(key)
+        if slot is None:
+            return 0
+        bucket = int(now // self.bucket_width)
+        if bucket > self._epochs[slot]:
+            self._advance(slot, bucket)
+        return self._totals[slot]
+
+    def add(self, key: str, now: float) -> Optional[int]:
+        """
+        Count an event.
+
+        Args:
+            key: Counting key
+            now: Event time (seconds)
+
+        Returns:
+            The window count if this event took the key over the threshold
+            (once per crossing), else None
+        """
+        bucket = int(now // self.bucket_width)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._allocate(key, bucket)
+        else:
+            self._slots.move_to_end(key)
+            last = self._epochs[slot]
+            if bucket > last:
+                self._advance(slot, bucket)
+            elif bucket <= last - self.buckets:
+                # Older than the window
+                return None
+
+        self._counts[slot * self.buckets + bucket % self.buckets] += 1
+        total = self._totals[slot] + 1
+        self._totals[slot] = total
+
+        self.evict_idle(now, _IDLE_CHECKS_PER_EVENT)
+
+        if total > self.spec.threshold:
+            if not self._fired[slot]:
+                self._fired[slot] = 1
+                return total
+        elif self._fired[slot]:
+            self._fired[slot] = 0
+        return None
@@ -0,0 +1,128 @@
+"""
+Tests for EWMA rate baselines and anomaly rules.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from alert_rules import AlertRuleEngine
+from anomaly import AnomalySpec, RateBaseline
+from rule_loader import RuleValidationError, parse_rules
+
+
+def steady(baseline, key, per_interval, intervals, start=0):
+    """Send a constant number of events per 60s interval, returning any events."""
+    events = []
+    for i in range(start, start + intervals):
+        for j in range(per_interval):
+            event = baseline.add(key, i * 60 + j * 60 / per_interval)
+            if event:
+                events.append(event)
+    return events
+
+
+class TestRateBaseline:
+    """Test rate baselining and anomaly detection."""
+
+    def test_spike_fires_once_after_warmup(self):
+        """Test that a 10x louder interval fires once, early in the interval."""
+        baseline = RateBaseline(AnomalySpec(warmup=5))
+
+        assert steady(baseline, "web1", 10, 12) == []
+        events = steady(baseline, "web1", 100, 1, start=12)
+
+        assert len(events) == 1
+        assert events[0]["reason"] == "spike"
+        assert events[0]["count"] == 23
+        assert events[0]["expected"] == 10.0
+        assert events[0]["group"] == {"hostname": "web1"}
+
+    def test_no_alerts_during_warmup(self):
+        """Test that new keys do not fire before warm-up."""
+        baseline = RateBaseline(AnomalySpec(warmup=10))
+
+        assert steady(baseline, "web1", 1, 3) == []
+        assert steady(baseline, "web1", 100, 1, start=3) == []
+        assert baseline.check(20 * 60) == []
+
+    def test_silence_detected_by_check(self):
+        """Test that a busy host going quiet is reported once per quiet spell."""
+        baseline = RateBaseline(AnomalySpec(warmup=5))
+        steady(baseline, "web1", 20, 10)
+
+        events = baseline.check(11 * 60)
+
+        assert [e["reason"] for e in events] == ["silent"]
+        assert events[0]["expected"] == 20.0
+        assert baseline.check(12 * 60) == []
+        steady(baseline, "web1", 20, 15, start=12)
+        assert [e["reason"] for e in baseline.check(28 * 60)] == ["silent"]
+
+    def test_silence_of_quiet_host_needs_longer_spell(self):
+        """Test that a low-rate host is only reported once its silence is significant."""
+        baseline = RateBaseline(AnomalySpec(warmup=5))
+        steady(baseline, "db1", 2, 10)
+
+        quiet = [len(baseline.check(minute * 60)) for minute in range(11, 20)]
+
+        assert quiet == [0, 0, 0, 0, 0, 0, 0, 1, 0]
+
+    def test_drop_reported_on_close(self):
+        """Test that an interval far below the baseline is reported."""
+        baseline = RateBaseline(AnomalySpec(warmup=5, direction="drop"))
+        steady(baseline, "web1", 100, 10)
+        steady(baseline, "web1", 20, 1, start=10)
+
+        events = baseline.check(11 * 60)
+
+        assert [(e["reason"], e["count"]) for e in events] == [("drop", 20)]
+        assert events[0]["z"] == -8.0
+
+    def test_bounded_state(self):
+        """Test that keys are evicted at capacity and after retention."""
+        baseline = RateBaseline(AnomalySpec(retention=5), max_keys=2)
+        for key in ("a", "b", "c"):
+            baseline.add(key, 0.0)
+
+        assert len(baseline) == 2
+        assert baseline.baseline("a") is None
+
+        baseline.check(6 * 60)
+        assert len(baseline) == 0
+
+    def test_engine_anomaly_rules(self):
+        """Test the built-in host rule and a loaded host+severity rule."""
+        engine = AlertRuleEngine(anomaly_warmup=3)
+        engine.replace_rules("rules.yaml", parse_rules([{
+            "name": "host_severity_rate", "severity": "low", "when": {"field": "severity", "lte": 3},
+            "anomaly": {"group_by": ["hostname", "severity_name"], "warmup": 3, "direction": "drop"},
+        }]))
+        log = {"hostname": "web1", "severity": 3, "severity_name": "error"}
+        for minute in range(5):
+            for _ in range(30):
+                engine.evaluate(log, now=minute * 60.0)
+
+        fired = [(rule.name, event["group"]) for rule, event in engine.check_anomalies(now=6 * 60.0)]
+
+        assert fired == [
+            ("host_rate_anomaly", {"hostname": "web1"}),
+            ("host_severity_rate", {"hostname": "web1", "severity_name": "error"}),
+        ]
+        assert engine.get_all_rules()[-1]["anomaly"]["direction"] == "drop"
+
+    def test_loader_validation(self):
+        """Test that malformed anomaly blocks are rejected."""
+        with pytest.raises(RuleValidationError) as e:
+            parse_rules([{
+                "name": "bad", "severity": "low", "when": {"tag": "a"},
+                "anomaly": {"alpha": 1.5, "direction": "up", "group_by": []},
+            }])
+
+        assert len(e.value.errors) == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,149 @@
+"""
+Tests for sequence correlation rules.
+"""
+import json
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from alert_rules import AlertRuleEngine
+from correlation import Correlator, SequenceSpec, SequenceStep, TimerWheel
+from rule_compiler import MessageContains
+from rule_loader import RuleValidationError, parse_rules
+
+FAILED = {"source_ip": "10.0.0.1", "message": "Failed password for admin"}
+ACCEPTED = {"source_ip": "10.0.0.1", "message": "Accepted password for admin"}
+
+BRUTE_FORCE = SequenceSpec(
+    steps=(
+        SequenceStep(MessageContains(["failed password"]), count=5, name="failures"),
+        SequenceStep(MessageContains(["accepted password"]), name="success"),
+    ),
+    within=600.0,
+)
+
+
+def correlator(max_states=100, spec=BRUTE_FORCE, version="1"):
+    """Build a correlator with one brute-force rule."""
+    c = Correlator(max_states)
+    c.set_rules({"brute": (version, spec)})
+    return c
+
+
+def feed(c, key, logs, start=0.0, step=1.0):
+    """Advance a key with each log in turn, returning the completed events."""
+    events = []
+    for i, log in enumerate(logs):
+        event = c.advance("brute", key, log, start + i * step)
+        if event is not None:
+            events.append(event)
+    return events
+
+
+class TestCorrelation:
+    """Test sequence state machines and sequence rules."""
+
+    def test_sequence_fires_in_order(self):
+        """Test that the sequence fires after enough failures then a success, and only then."""
+        c = correlator()
+
+        assert feed(c, "10.0.0.1", [ACCEPTED] + [FAILED] * 4 + [ACCEPTED]) == []
+        events = feed(c, "10.0.0.1", [FAILED, ACCEPTED], start=10.0)
+
+        assert len(events) == 1
+        assert events[0]["group"] == {"source_ip": "10.0.0.1"}
+        assert events[0]["started"] == 1.0
+        assert events[0]["duration"] == 10.0
+        assert [s["name"] for s in events[0]["steps"]] == ["failures", "success"]
+        assert len(c) == 0
+
+    def test_sequence_expires(self):
+        """Test that a sequence not completed within its limit starts over."""
+        c = correlator()
+        feed(c, "10.0.0.1", [FAILED] * 5)
+
+        assert c.expire(606.0) == 1
+        assert feed(c, "10.0.0.1", [ACCEPTED], start=607.0) == []
+        assert feed(c, "10.0.0.1", [FAILED] * 5 + [ACCEPTED], start=700.0) != []
+
+    def test_timer_wheel(self):
+        """Test deadlines across several wheel revolutions and cancellation."""
+        wheel = TimerWheel(tick=1.0, slots=8)
+        wheel.schedule("a", 3.0)
+        wheel.schedule("b", 20.0)
+        wheel.schedule("c", 5.0)
+        wheel.cancel("c")
+
+        assert wheel.advance(2.0) == []
+        assert wheel.advance(12.0) == ["a"]
+        assert wheel.advance(19.0) == []
+        assert wheel.advance(20.0) == ["b"]
+        assert len(wheel) == 0
+
+    def test_eviction_prefers_first_step_states(self):
+        """Test that a full correlator evicts keys on the first step before advanced ones."""
+        c = correlator(max_states=3)
+        feed(c, "advanced", [FAILED] * 5)
+        for i in range(5):
+            feed(c, f"new{i}", [FAILED], start=10.0 + i)
+
+        assert len(c) == 3
+        assert feed(c, "advanced", [ACCEPTED], start=20.0) != []
+
+    def test_snapshot_restore(self):
+        """Test that restored machines resume, skipping expired ones and changed rules."""
+        c = correlator()
+        feed(c, "resume", [FAILED] * 5)
+        feed(c, "stale", [FAILED] * 2, start=-500.0)
+        data = c.snapshot()
+
+        restored = correlator()
+        assert restored.restore(data, now=150.0) == 1
+        assert feed(restored, "resume", [ACCEPTED], start=160.0) != []
+        assert correlator(version="2").restore(data, now=150.0) == 0
+        with pytest.raises(ValueError):
+            restored.restore(json.dumps({"version": 99}).encode(), now=0.0)
+
+    def test_engine_sequence_rules(self):
+        """Test a loaded sequence rule in the engine, and that reloads keep unchanged state."""
+        engine = AlertRuleEngine()
+        rules = [{
+            "name": "ssh_brute_force_success", "severity": "critical",
+            "when": {"field": "app_name", "equals": "sshd"},
+            "sequence": {"within": 600, "steps": [
+                {"count": 3, "when": {"contains_any": ["failed password"]}},
+                {"when": {"contains_any": ["accepted password"]}},
+            ]},
+        }]
+        engine.replace_rules("rules.yaml", parse_rules(rules))
+        log = dict(FAILED, app_name="sshd", severity=5)
+
+        def fired(log, now):
+            return "ssh_brute_force_success" in [r.name for r in engine.evaluate(log, now=now)]
+
+        assert [fired(log, float(t)) for t in range(3)] == [False, False, False]
+        engine.replace_rules("rules.yaml", parse_rules(rules))
+        assert fired(dict(ACCEPTED, app_name="cron", severity=5), 4.0) is False
+        assert fired(dict(ACCEPTED, app_name="sshd", severity=5), 5.0) is True
+        assert engine.rule_event(engine.rules[-1])["duration"] == 5.0
+        assert engine.get_all_rules()[-1]["sequence"]["steps"][0]["count"] == 3
+
+    def test_loader_validation(self):
+        """Test that malformed sequences are rejected and rules without them need a condition."""
+        with pytest.raises(RuleValidationError) as e:
+            parse_rules([
+                {"name": "short", "severity": "low", "sequence": {"within": 60, "steps": [{"when": {"tag": "a"}}]}},
+                {"name": "bad", "severity": "low", "sequence": {"within": 0, "steps": [
+                    {"count": 0, "when": {"tag": "a"}}, {"name": "no condition"},
+                ]}},
+                {"name": "plain", "severity": "low"},
+            ])
+
+        assert len(e.value.errors) == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,117 @@
+"""
+Tests for alert deduplication.
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dedup import AlertDeduplicator, TTLCache
+
+
+class FakePipeline:
+    """Minimal stand-in for an async Redis pipeline."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, nx=False, ex=None):
+        self.commands.append(("set", key, ex))
+
+    def pttl(self, key):
+        self.commands.append(("pttl", key, None))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        if self.redis.delay:
+            await asyncio.sleep(self.redis.delay)
+        results = []
+        for command, key, ex in self.commands:
+            if command == "set":
+                new = key not in self.redis.store
+                if new:
+                    self.redis.store[key] = ex * 1000
+                results.append(True if new else None)
+            else:
+                results.append(self.redis.store.get(key, -2))
+        return results
+
+
+class FakeRedis:
+    """In-memory Redis keeping key TTLs in milliseconds, with optional latency."""
+
+    def __init__(self, delay=0.0):
+        self.store = {}
+        self.round_trips = 0
+        self.delay = delay
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+class TestAlertDeduplicator:
+    """Test local and Redis-backed alert deduplication."""
+
+    def test_ttl_cache(self):
+        """Test expiry and eviction of the oldest key."""
+        cache = TTLCache(max_size=2)
+        cache.add("a", 60)
+        cache.add("b", 0)
+        cache.add("c", 60)
+
+        assert "a" not in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    @pytest.mark.asyncio
+    async def test_batch_claims_in_one_round_trip(self):
+        """Test that a batch costs one round trip and repeats are answered locally."""
+        redis = FakeRedis()
+        redis.store["alert:taken"] = 30000
+        dedup = AlertDeduplicator(redis)
+
+        fresh = await dedup.claim([("alert:a", 60), ("alert:taken", 60), ("alert:a", 60), ("alert:b", 60)])
+
+        assert fresh == [True, False, False, True]
+        assert redis.round_trips == 1
+        assert await dedup.claim([("alert:a", 60), ("alert:taken", 60)]) == [False, False]
+        assert redis.round_trips == 1
+
+    @pytest.mark.asyncio
+    async def test_degraded_mode(self):
+        """Test that a slow Redis is skipped and the local cache keeps deduplicating."""
+        redis = FakeRedis(delay=1.0)
+        dedup = AlertDeduplicator(redis, timeout=0.01, retry_interval=0.2)
+
+        assert await dedup.claim([("alert:a", 60)]) == [True]
+        assert dedup.degraded is True
+        assert await dedup.claim([("alert:a", 60), ("alert:b", 60)]) == [False, True]
+        assert redis.round_trips == 1
+
+        redis.delay = 0.0
+        await asyncio.sleep(0.25)
+        assert await dedup.claim([("alert:d", 60)]) == [True]
+        assert dedup.degraded is False
+        assert "alert:d" in redis.store
+
+    @pytest.mark.asyncio
+    async def test_local_only(self):
+        """Test deduplication without Redis."""
+        dedup = AlertDeduplicator(None)
+
+        assert await dedup.claim([("alert:a", 60), ("alert:a", 60)]) == [True, False]
+        assert await dedup.claim([("alert:a", 60)]) == [False]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
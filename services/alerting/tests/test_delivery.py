@@ -0,0 +1,172 @@
+"""
+Tests for asynchronous alert delivery.
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from alert_channels import AlertChannelManager
+from delivery import DeliveryQueue, RedisDeliveryJournal
+
+
+class ScriptedChannel:
+    """Channel whose sends fail a given number of times, optionally slowly."""
+
+    name = "scripted"
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.sent = []
+        self.attempts = 0
+
+    async def send(self, alert):
+        self.attempts += 1
+        await asyncio.sleep(self.delay)
+        if self.attempts <= self.failures:
+            return False
+        self.sent.append(alert["rule_name"])
+        return True
+
+    async def close(self):
+        pass
+
+
+class FakePipeline:
+    """Minimal stand-in for an async Redis pipeline."""
+
+    def __init__(self, hashes):
+        self.hashes = hashes
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def hset(self, key, field, value):
+        self.commands.append((key, field, value))
+
+    def hdel(self, key, field):
+        self.commands.append((key, field, None))
+
+    async def execute(self):
+        for key, field, value in self.commands:
+            if value is None:
+                self.hashes.get(key, {}).pop(field, None)
+            else:
+                self.hashes.setdefault(key, {})[field] = value
+
+
+class FakeRedis:
+    """In-memory Redis hashes."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self.hashes)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+
+def alert(name):
+    """Build a minimal alert."""
+    return {"rule_name": name, "severity": "high", "log_data": {}}
+
+
+async def wait_for(condition, timeout=2.0):
+    """Wait until a condition holds."""
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+class TestDelivery:
+    """Test delivery queues, retries and the pending journal."""
+
+    @pytest.mark.asyncio
+    async def test_submit_does_not_wait_for_slow_channel(self):
+        """Test that queueing returns at once and workers send concurrently."""
+        channel = ScriptedChannel(delay=0.2)
+        queue = DeliveryQueue(channel, workers=4)
+        queue.start()
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for i in range(4):
+            assert queue.submit(alert(f"r{i}")) is True
+        assert loop.time() - started < 0.05
+
+        await wait_for(lambda: len(channel.sent) == 4, timeout=0.6)
+        assert len(queue) == 0
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_retry_until_sent(self):
+        """Test that failed sends are retried with backoff until they succeed."""
+        channel = ScriptedChannel(failures=2)
+        queue = DeliveryQueue(channel, retry_base=0.01, retry_max=0.02)
+        queue.start()
+
+        queue.submit(alert("flaky"))
+
+        await wait_for(lambda: channel.sent == ["flaky"])
+        assert channel.attempts == 3
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_give_up_and_bound(self):
+        """Test that alerts are dropped after max attempts or when the queue is full."""
+        channel = ScriptedChannel(failures=100)
+        queue = DeliveryQueue(channel, max_size=2, max_attempts=3, retry_base=0.01)
+
+        assert [queue.submit(alert(f"r{i}")) for i in range(3)] == [True, True, False]
+        queue.start()
+
+        await wait_for(lambda: len(queue) == 0)
+        assert channel.attempts == 6
+        await queue.stop()
+
+    def test_backoff(self):
+        """Test exponential backoff with jitter and its cap."""
+        queue = DeliveryQueue(ScriptedChannel(), retry_base=2.0, retry_max=30.0)
+
+        assert 1.0 <= queue.backoff(1) <= 2.0
+        assert 4.0 <= queue.backoff(3) <= 8.0
+        assert 15.0 <= queue.backoff(10) <= 30.0
+
+    @pytest.mark.asyncio
+    async def test_pending_deliveries_survive_restart(self):
+        """Test that deliveries still pending at shutdown are sent by the next run."""
+        redis = FakeRedis()
+        down = ScriptedChannel(failures=100)
+        manager = AlertChannelManager(retry_base=60, journal=RedisDeliveryJournal(redis))
+        manager.add_channel(down)
+        await manager.start()
+
+        assert manager.send_alert(alert("outage")) == 1
+        await wait_for(lambda: down.attempts == 1)
+        await manager.stop(timeout=0.1)
+        assert len(redis.hashes["alerting:delivery:scripted"]) == 1
+
+        up = ScriptedChannel()
+        manager = AlertChannelManager(journal=RedisDeliveryJournal(redis))
+        manager.add_channel(up)
+        await manager.start()
+
+        await wait_for(lambda: up.sent == ["outage"])
+        await manager.stop()
+        assert redis.hashes["alerting:delivery:scripted"] == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,112 @@
+"""
+Tests for distinct-count rules.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from alert_rules import AlertRule, AlertRuleEngine
+from distinct_counter import DistinctCounter, DistinctSpec
+from rule_compiler import TagPresent
+from rule_loader import RuleValidationError, parse_rules
+
+
+class TestDistinctCounter:
+    """Test per-key distinct counting."""
+
+    def test_fires_once_on_distinct_values(self):
+        """Test that repeats do not count and the crossing is reported once."""
+        counter = DistinctCounter(DistinctSpec(field="user", threshold=3, seconds=60))
+
+        results = [counter.add("10.0.0.1", user, 100.0) for user in ["a", "a", "b", "c", "c", "d", "e"]]
+
+        assert results == [None, None, None, None, None, 4, None]
+        assert counter.count("10.0.0.1", 100.0) == 5
+
+    def test_window_slides_and_rearms(self):
+        """Test that values age out bucket by bucket."""
+        counter = DistinctCounter(DistinctSpec(field="user", threshold=2, seconds=50, buckets=5))
+        counter.add("k", "a", 100.0)
+        counter.add("k", "b", 120.0)
+        assert counter.add("k", "c", 140.0) == 3
+
+        assert counter.count("k", 155.0) == 2
+        assert counter.add("k", "d", 171.0) is None
+        assert counter.add("k", "e", 172.0) == 3
+
+    def test_memory_accounting(self):
+        """Test that sketch bytes follow adds and evictions."""
+        counter = DistinctCounter(DistinctSpec(field="user", threshold=100, seconds=60), max_keys=2)
+        for i in range(10):
+            counter.add("a", i, 100.0)
+        counter.add("b", "x", 100.0)
+
+        stats = counter.stats()
+        assert stats["keys"] == 2
+        assert stats["bytes"] == (10 + 10 + 1 + 1) * 8
+        assert stats["bytes_per_key"] == stats["bytes"] / 2
+
+        counter.add("c", "y", 100.0)
+        assert len(counter) == 2
+        assert counter.memory_bytes == 4 * 8
+
+        counter.evict_idle(1000.0)
+        assert counter.memory_bytes == 0
+
+    def test_snapshot_restore(self):
+        """Test that state survives a snapshot round trip."""
+        spec = DistinctSpec(field="dst_ip", threshold=1000, seconds=600, group_by=("hostname",))
+        counter = DistinctCounter(spec)
+        for i in range(300):
+            counter.add("web1", f"10.0.{i // 256}.{i % 256}", 100.0 + i)
+
+        restored = DistinctCounter(spec)
+        assert restored.restore(counter.snapshot()) == 1
+
+        assert restored.count("web1", 400.0) == counter.count("web1", 400.0)
+        assert restored.memory_bytes == counter.memory_bytes
+        assert DistinctCounter(DistinctSpec(field="dst_ip", threshold=1, seconds=600, buckets=3)).restore(
+            counter.snapshot()
+        ) == 0
+
+    def test_engine_distinct_rule(self):
+        """Test a distinct-count rule in the rule engine."""
+        engine = AlertRuleEngine()
+        engine.add_rule(AlertRule(
+            name="user_enumeration",
+            description="",
+            severity="high",
+            match=TagPresent("authentication"),
+            distinct=DistinctSpec(field="user", threshold=2, seconds=300),
+        ))
+        log = {"tags": ["authentication"], "source_ip": "203.0.113.7"}
+
+        fired = [
+            "user_enumeration" in [r.name for r in engine.evaluate({**log, "user": user}, now=100.0)]
+            for user in ["root", "admin", "root", "oracle"]
+        ]
+
+        assert fired == [False, False, False, True]
+        assert engine.window_count(engine.rules[-1], log, now=100.0) == 3
+        assert list(engine.distinct_counters()) == ["user_enumeration"]
+
+    def test_distinct_rules_from_file(self):
+        """Test distinct parsing and validation in the rule DSL."""
+        rules = parse_rules([{
+            "name": "fanout", "severity": "medium", "when": {"field": "dst_ip", "exists": True},
+            "distinct": {"field": "dst_ip", "threshold": 100, "seconds": 600, "group_by": ["hostname"], "error": 0.02},
+        }])
+
+        assert rules[0].distinct.precision == 12
+        with pytest.raises(RuleValidationError):
+            parse_rules([{
+                "name": "bad", "severity": "low", "when": {"tag": "a"},
+                "distinct": {"threshold": 1, "seconds": 1}, "window": {"threshold": 1, "seconds": 1},
+            }])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
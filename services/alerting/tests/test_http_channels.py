@@ -0,0 +1,110 @@
+"""
+Tests for pooled, rate-limited HTTP alert channels.
+"""
+import asyncio
+import time
+import pytest
+import sys
+import os
+from email.utils import formatdate
+from aiohttp import web
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from alert_channels import HttpTransport, PagerDutyChannel, TokenBucket, WebhookChannel, parse_retry_after
+from metrics import alert_endpoint_latency_seconds
+
+ALERT = {
+    "rule_name": "ssh_brute_force_success",
+    "description": "Successful SSH login after repeated failures",
+    "severity": "critical",
+    "timestamp": "2026-01-01T00:00:00",
+    "log_data": {"hostname": "web1", "source_ip": "10.0.0.1"},
+}
+
+
+async def start_server(responses):
+    """Serve the given (status, headers) responses in turn, recording requests."""
+    received = []
+
+    async def handle(request):
+        received.append((request.transport.get_extra_info("peername")[1], await request.json()))
+        status, headers = responses.pop(0) if responses else (200, {})
+        return web.json_response({}, status=status, headers=headers)
+
+    app = web.Application()
+    app.router.add_post("/hook", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/hook", received
+
+
+class TestHttpChannels:
+    """Test HTTP transports, rate limiting and webhook channels."""
+
+    def test_parse_retry_after(self):
+        """Test Retry-After in seconds, as an HTTP date and malformed."""
+        assert parse_retry_after("30") == 30.0
+        assert 55 <= parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+        assert parse_retry_after("soon", default=2.0) == 2.0
+        assert parse_retry_after("86400") == 3600.0
+
+    @pytest.mark.asyncio
+    async def test_token_bucket(self):
+        """Test that bursts pass at once, then calls are spaced by the rate."""
+        bucket = TokenBucket(rate=20, burst=3)
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+
+        assert 0.08 <= time.monotonic() - started < 0.3
+
+        bucket.pause(0.2)
+        started = time.monotonic()
+        await bucket.acquire()
+        assert time.monotonic() - started >= 0.2
+
+    @pytest.mark.asyncio
+    async def test_webhook_reuses_connections(self):
+        """Test that alerts share one pooled connection and latency is recorded per endpoint."""
+        runner, url, received = await start_server([])
+        channel = WebhookChannel(url, transport=HttpTransport("webhook", rate=0))
+        samples = alert_endpoint_latency_seconds.labels(channel="webhook", endpoint=url.split("/")[2])
+        try:
+            results = [await channel.send(ALERT) for _ in range(3)]
+        finally:
+            await channel.close()
+            await runner.cleanup()
+
+        assert results == [True, True, True]
+        assert len({port for port, _ in received}) == 1
+        assert received[0][1]["rule_name"] == "ssh_brute_force_success"
+        assert samples._sum.get() > 0
+
+    @pytest.mark.asyncio
+    async def test_throttled_endpoint_pauses_sends(self):
+        """Test that a 429 fails the send and holds back the next one for Retry-After."""
+        runner, url, received = await start_server([(429, {"Retry-After": "0.3"})])
+        channel = PagerDutyChannel("key123", url=url, transport=HttpTransport("pagerduty", rate=0))
+        try:
+            assert await channel.send(ALERT) is False
+            started = time.monotonic()
+            assert await channel.send(ALERT) is True
+            waited = time.monotonic() - started
+        finally:
+            await channel.close()
+            await runner.cleanup()
+
+        assert waited >= 0.3
+        body = received[1][1]
+        assert body["routing_key"] == "key123"
+        assert body["payload"]["severity"] == "critical"
+        assert body["payload"]["source"] == "web1"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
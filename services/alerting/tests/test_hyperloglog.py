@@ -0,0 +1,70 @@
+"""
+Tests for HyperLogLog sketches.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from hyperloglog import HyperLogLog, precision_for_error
+
+
+class TestHyperLogLog:
+    """Test distinct-count sketches."""
+
+    def test_sparse_phase_is_exact(self):
+        """Test that small sets are counted exactly and duplicates ignored."""
+        sketch = HyperLogLog(10)
+        for i in range(100):
+            sketch.add(f"user{i % 50}")
+
+        assert sketch.is_sparse
+        assert sketch.count() == 50
+        assert sketch.nbytes == 400
+
+    def test_dense_estimate_within_error(self):
+        """Test that large counts stay within four standard errors."""
+        sketch = HyperLogLog(10)
+        for i in range(50000):
+            sketch.add(i)
+
+        assert not sketch.is_sparse
+        assert sketch.nbytes == 1024
+        assert abs(sketch.count() / 50000 - 1) < 4 * sketch.error
+
+    def test_merge_is_union(self):
+        """Test that merging gives the count of the union."""
+        a, b = HyperLogLog(12), HyperLogLog(12)
+        for i in range(3000):
+            a.add(i)
+        for i in range(2000, 6000):
+            b.add(i)
+
+        a.merge(b)
+
+        assert abs(a.count() / 6000 - 1) < 4 * a.error
+        with pytest.raises(ValueError):
+            a.merge(HyperLogLog(10))
+
+    def test_serialization_roundtrip(self):
+        """Test that sparse and dense sketches survive serialization."""
+        sparse, dense = HyperLogLog(9), HyperLogLog(9)
+        sparse.add("a")
+        for i in range(5000):
+            dense.add(i)
+
+        for sketch in (sparse, dense):
+            restored = HyperLogLog.from_bytes(sketch.to_bytes())
+            assert restored.count() == sketch.count()
+            assert restored.is_sparse == sketch.is_sparse
+
+    def test_precision_for_error(self):
+        """Test that the chosen precision meets the requested error."""
+        for error in (0.2, 0.05, 0.02, 0.01):
+            assert 1.04 / (2 ** precision_for_error(error)) ** 0.5 <= error
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
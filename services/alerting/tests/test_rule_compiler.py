@@ -0,0 +1,193 @@
+"""
+Tests for compiled alert rule evaluation.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from alert_rules import AlertRule, AlertRuleEngine
+from metrics import RuleStatsCollector
+from rule_compiler import (
+    CompiledRules,
+    FieldEquals,
+    FieldMatches,
+    FieldRange,
+    MessageContains,
+    TagPresent,
+    TermScanner,
+    field_predicate,
+)
+
+# The default rules as lambdas, before they were made declarative
+# (error_spike and host_rate_anomaly are left out: they fire on aggregates)
+LEGACY_CONDITIONS = {
+    "critical_severity": lambda log: log.get("severity", 7) <= 2,
+    "high_threat_score": lambda log: log.get("threat_score", 0) >= 50,
+    "auth_failure": lambda log: (
+        "authentication" in log.get("tags", []) and
+        any(word in log.get("message", "").lower() for word in ["failed", "failure", "denied", "rejected"])
+    ),
+    "security_event": lambda log: "security" in log.get("tags", []) or log.get("has_threat_indicators", False),
+    "brute_force": lambda log: (
+        "brute force" in log.get("message", "").lower() or "brute_force" in log.get("threat_keywords", [])
+    ),
+    "malware_detected": lambda log: any(
+        keyword in log.get("message", "").lower() for keyword in ["malware", "ransomware", "trojan", "virus"]
+    ),
+    "unauthorized_access": lambda log: any(
+        keyword in log.get("message", "").lower() for keyword in ["unauthorized", "forbidden", "access denied"]
+    ),
+    "sql_injection": lambda log: (
+        "sql injection" in log.get("message", "").lower() or
+        "sql_injection" in log.get("threat_keywords", []) or
+        any(p in log.get("message", "").lower() for p in ["union select", "' or '1'='1", "drop table"])
+    ),
+    "ddos_attack": lambda log: "ddos" in log.get("message", "").lower() or "ddos" in log.get("threat_keywords", []),
+}
+
+SAMPLE_LOGS = [
+    {"message": "Failed password for root", "severity": 4, "tags": ["authentication"]},
+    {"message": "kernel panic", "severity": 0, "severity_name": "emergency", "hostname": "db1"},
+    {"message": "disk error", "severity": 3, "severity_name": "error", "hostname": "web1"},
+    {"message": "Ransomware note found; access denied", "threat_score": 80, "has_threat_indicators": True},
+    {"message": "GET /?id=1 UNION SELECT password FROM users", "tags": ["security"]},
+    {"message": "rate limit", "threat_keywords": ["ddos", "brute_force", "sql_injection"]},
+    {"message": "Unauthorized login, request Forbidden", "tags": ["authentication"], "severity": 5},
+    {"message": "", "severity": 6, "threat_score": 49},
+    {"severity": 7},
+]
+
+
+class TestCompiledRules:
+    """Test compiled rule evaluation."""
+
+    def test_default_rules_match_legacy_semantics(self):
+        """Test that the declarative default rules trigger exactly like the lambdas did."""
+        engine = AlertRuleEngine()
+
+        for log in SAMPLE_LOGS:
+            expected = [name for name, condition in LEGACY_CONDITIONS.items() if condition(log)]
+            assert [rule.name for rule in engine.evaluate(log)] == expected, log
+
+    def test_shared_atoms_compile_once(self):
+        """Test that identical conditions across rules share one bit."""
+        compiled = CompiledRules([
+            ("a", TagPresent("auth") & MessageContains(["failed"])),
+            ("b", TagPresent("auth") & ~MessageContains(["failed"])),
+        ])
+
+        assert compiled.atom_count == 2
+        assert compiled.matches({"tags": ["auth"], "message": "login FAILED"}) == ["a"]
+        assert compiled.matches({"tags": ["auth"], "message": "login ok"}) == ["b"]
+        assert compiled.matches({"message": "login failed"}) == []
+
+    def test_negated_conjunction(self):
+        """Test De Morgan lowering of a negated conjunction."""
+        compiled = CompiledRules([
+            ("not_both", ~(FieldEquals("app", "sshd") & FieldRange("severity", max=3))),
+        ])
+
+        assert compiled.matches({"app": "sshd", "severity": 2}) == []
+        assert compiled.matches({"app": "sshd", "severity": 5}) == ["not_both"]
+        assert compiled.matches({"app": "cron", "severity": 2}) == ["not_both"]
+
+    def test_scanner_reports_contained_terms(self):
+        """Test that a longer match also reports the terms inside it."""
+        scanner = TermScanner(["auth", "unauthorized", "author"])
+
+        assert set(scanner.scan("unauthorized user")) == {"auth", "author", "unauthorized"}
+        assert scanner.scan("nothing here") == []
+
+    def test_callable_rules_keep_rule_order(self):
+        """Test that interpreted rules are merged with compiled ones in rule order."""
+        engine = AlertRuleEngine()
+        engine.rules.insert(0, AlertRule(
+            name="custom", description="", severity="low", condition=lambda log: "kernel" in log["message"],
+        ))
+        engine.compile_rules()
+
+        triggered = engine.evaluate({"message": "kernel panic", "severity": 0})
+
+        assert [rule.name for rule in triggered] == ["custom", "critical_severity"]
+
+    def test_disable_rule_recompiles(self):
+        """Test that disabled rules no longer trigger."""
+        engine = AlertRuleEngine()
+        log = {"message": "trojan detected", "severity": 1}
+
+        assert engine.disable_rule("malware_detected")
+
+        assert [rule.name for rule in engine.evaluate(log)] == ["critical_severity"]
+
+    def test_prefilter_skips_non_candidates(self):
+        """Test that a severity rule is not evaluated for informational logs."""
+        engine = AlertRuleEngine()
+
+        engine.evaluate({"message": "session opened", "severity": 6})
+        engine.evaluate({"message": "kernel panic", "severity": 1})
+        stats = engine.rule_stats()
+
+        assert stats["critical_severity"] == {"evaluated": 1, "matched": 1}
+        assert stats["malware_detected"]["evaluated"] == 0
+
+    def test_lazy_atoms_only_for_candidates(self):
+        """Test that a regex is only run when its rule is a candidate."""
+        compiled = CompiledRules([
+            ("sshd_root", FieldEquals("app_name", "sshd") & FieldMatches("message", r"user root\b")),
+        ])
+
+        assert compiled.matches({"app_name": "cron", "message": "user root"}) == []
+        assert compiled.matches({"app_name": "sshd", "message": "user root"}) == ["sshd_root"]
+        assert compiled.evaluated == [1]
+        assert compiled.matched == [1]
+
+    def test_index_matches_unindexed_semantics(self):
+        """Test index lookups against direct evaluation of every atom."""
+        atoms = [
+            FieldRange("severity", min=2, max=4),
+            FieldRange("severity", max=2, default=7),
+            TagPresent("sec"),
+            FieldEquals("facility", 4),
+        ]
+        compiled = CompiledRules(list(enumerate(atoms)))
+        logs = [{"severity": s, "facility": s} for s in range(8)] * 2 + [
+            {}, {"severity": "high"}, {"tags": "security"}, {"tags": [["nested"], "sec"]}, {"facility": [4]},
+        ]
+
+        for log in logs:
+            expected = [key for key, atom in enumerate(atoms) if field_predicate(atom)(log)]
+            assert compiled.matches(log) == expected, log
+
+    def test_stats_survive_recompile(self):
+        """Test that per-rule counts are kept when rules change."""
+        engine = AlertRuleEngine()
+        engine.evaluate({"message": "kernel panic", "severity": 0})
+
+        engine.disable_rule("ddos_attack")
+        engine.evaluate({"message": "kernel panic", "severity": 0})
+
+        assert engine.rule_stats()["critical_severity"]["matched"] == 2
+
+    def test_stats_collector(self):
+        """Test that rule stats are exposed as counter samples."""
+        collector = RuleStatsCollector(lambda: {"r": {"evaluated": 5, "matched": 2}})
+
+        samples = {
+            (sample.name, sample.labels["rule_name"]): sample.value
+            for family in collector.collect() for sample in family.samples
+        }
+
+        assert samples[("alerting_rule_evaluations_total", "r")] == 5
+        assert samples[("alerting_rule_matches_total", "r")] == 2
+
+    def test_rule_needs_condition(self):
+        """Test that a rule without a condition or match is rejected."""
+        with pytest.raises(ValueError):
+            AlertRule(name="empty", description="", severity="low")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,136 @@
+"""
+Tests for declarative rule loading and hot reload.
+"""
+import json
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from alert_rules import AlertRuleEngine
+from rule_loader import RuleFileWatcher, RuleValidationError, load_rules_file, parse_condition, parse_rules
+
+
+RULES_YAML = """
+rules:
+  - name: root_login
+    description: Root login failure
+    severity: high
+    version: 3
+    when:
+      all:
+        - tag: authentication
+        - contains_any: [failed]
+        - regex: "user root"
+          ignore_case: true
+        - field: severity
+          gt: 1
+          lte: 5
+"""
+
+
+class TestRuleLoader:
+    """Test rule parsing, validation and hot reload."""
+
+    def test_parse_condition_forms(self):
+        """Test thresholds, list membership and negation."""
+        rules = parse_rules([{
+            "name": "mixed",
+            "severity": "low",
+            "when": {"any": [
+                {"field": "threat_score", "gt": 50},
+                {"field": "threat_keywords", "contains_any": ["ddos"]},
+                {"not": {"field": "hostname", "exists": True}},
+            ]},
+        }])
+        engine = AlertRuleEngine()
+        engine.replace_rules("test", rules)
+
+        def fired(log):
+            return "mixed" in [rule.name for rule in engine.evaluate({"hostname": "h", **log})]
+
+        assert not fired({"threat_score": 50})
+        assert fired({"threat_score": 51})
+        assert fired({"threat_keywords": ["ddos"]})
+        assert "mixed" in [rule.name for rule in engine.evaluate({})]
+
+    def test_validation_collects_all_errors(self):
+        """Test that every invalid rule is reported."""
+        with pytest.raises(RuleValidationError) as exc:
+            parse_rules([
+                {"name": "bad_severity", "severity": "urgent", "when": {"tag": "x"}},
+                {"name": "bad_regex", "severity": "low", "when": {"regex": "("}},
+                {"name": "bad_key", "severity": "low", "when": {"field": "a", "near": 1}},
+            ])
+
+        assert len(exc.value.errors) == 3
+        assert "bad_regex" in exc.value.errors[1]
+
+    def test_condition_rejects_mixed_operators(self):
+        """Test that a field check takes exactly one operator."""
+        with pytest.raises(RuleValidationError):
+            parse_condition({"field": "a", "equals": 1, "in": [1, 2]})
+
+    def test_unversioned_rules_get_content_hash(self):
+        """Test that edits change the version of unversioned rules."""
+        spec = {"name": "r", "severity": "low", "when": {"tag": "a"}}
+        first = parse_rules([spec])[0].version
+        second = parse_rules([{**spec, "when": {"tag": "b"}}])[0].version
+
+        assert first != second
+
+    def test_json_rules(self, tmp_path):
+        """Test that JSON files load with the same format."""
+        path = tmp_path / "rules.json"
+        path.write_text(json.dumps({"rules": [
+            {"name": "ddos", "severity": "critical", "when": {"contains_any": ["SYN flood"]}},
+        ]}))
+
+        rules = load_rules_file(str(path))
+
+        assert [rule.name for rule in rules] == ["ddos"]
+
+    @pytest.mark.asyncio
+    async def test_hot_reload_keeps_previous_rules_on_error(self, tmp_path):
+        """Test reload on change and that an invalid file leaves rules active."""
+        path = tmp_path / "rules.yaml"
+        path.write_text(RULES_YAML)
+        engine = AlertRuleEngine()
+        watcher = RuleFileWatcher(engine, str(path))
+        log = {"message": "Failed password for user ROOT", "tags": ["authentication"], "severity": 4}
+
+        assert await watcher.reload()
+        assert "root_login" in [rule.name for rule in engine.evaluate(log)]
+        assert {"name": "root_login", "version": "3"}.items() <= next(
+            r for r in engine.get_all_rules() if r["name"] == "root_login"
+        ).items()
+        assert not await watcher.reload()
+
+        path.write_text("rules: [{name: broken}]")
+        os.utime(path, (1, 1))
+        assert not await watcher.reload()
+        assert watcher.errors
+        assert "root_login" in [rule.name for rule in engine.evaluate(log)]
+
+        path.write_text("rules: []")
+        os.utime(path, (2, 2))
+        assert await watcher.reload()
+        assert "root_login" not in [rule.name for rule in engine.rules]
+
+    def test_file_rule_overrides_builtin(self):
+        """Test that a file rule replaces the built-in rule with the same name."""
+        engine = AlertRuleEngine()
+        count = len(engine.rules)
+        engine.replace_rules("rules.yaml", parse_rules([
+            {"name": "critical_severity", "severity": "high", "when": {"field": "severity", "equals": 0}},
+        ]))
+
+        assert len(engine.rules) == count
+        assert [rule.name for rule in engine.evaluate({"severity": 1})] == []
+        assert [rule.name for rule in engine.evaluate({"severity": 0})] == ["critical_severity"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,150 @@
+"""
+Tests for heavy-hitter (top-K) tracking.
+"""
+import json
+import pytest
+import random
+import sys
+import os
+from collections import Counter
+from wsgiref.util import setup_testing_defaults
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from alert_rules import AlertRule, AlertRuleEngine
+from metrics import _routes_app
+from rule_compiler import FieldExists
+from rule_loader import RuleValidationError, parse_rules
+from top_k import HeavyHitters, SpaceSaving, TopKSpec
+
+
+def feed(tracker, counts, now):
+    """Observe each source_ip the given number of times, returning the fired keys."""
+    fired = []
+    for key, n in counts:
+        for _ in range(n):
+            event = tracker.observe({"source_ip": key}, now)
+            if event is not None:
+                fired.append(event["key"])
+    return fired
+
+
+class TestTopK:
+    """Test Space-Saving sketches and top-k rules."""
+
+    def test_space_saving_bounds(self):
+        """Test that heavy keys are kept and true counts lie within the error."""
+        rng = random.Random(7)
+        stream = [f"heavy{i}" for i in range(5) for _ in range(500)]
+        stream += [f"noise{rng.randrange(20000)}" for _ in range(10000)]
+        rng.shuffle(stream)
+        sketch = SpaceSaving(50)
+        for key in stream:
+            sketch.add(key)
+
+        truth = Counter(stream)
+        top = sketch.top(5)
+        assert len(sketch) == 50
+        assert {key for key, _, _ in top} == {f"heavy{i}" for i in range(5)}
+        for key, count, error in sketch.top(50):
+            assert count - error <= truth[key] <= count
+
+    def test_space_saving_exact_below_capacity(self):
+        """Test that counts are exact while every key fits."""
+        sketch = SpaceSaving(10)
+        for key in "abracadabra":
+            sketch.add(key)
+
+        assert sketch.top(2) == [("a", 5, 0), ("b", 2, 0)]
+        assert sketch.count("z") == (0, 0)
+
+    def test_enter_trigger(self):
+        """Test that a value entering the top-k fires once, after warm-up."""
+        tracker = HeavyHitters(TopKSpec("source_ip", k=2, seconds=60))
+
+        assert feed(tracker, [("a", 5), ("b", 3), ("c", 1)], 0.0) == []
+        assert feed(tracker, [("a", 2), ("c", 3), ("c", 2), ("b", 9)], 60.0) == ["c"]
+        assert tracker.previous == [("a", 5, 0), ("b", 3, 0)]
+
+        # An idle interval resets the ranking
+        assert feed(tracker, [("z", 10)], 200.0) == []
+        assert tracker.warm is False
+
+    def test_change_trigger(self):
+        """Test that a changed top-k fires once on the next interval."""
+        tracker = HeavyHitters(TopKSpec("source_ip", k=2, seconds=60, trigger="change"))
+        feed(tracker, [("a", 5), ("b", 3)], 0.0)
+        feed(tracker, [("a", 5), ("b", 3)], 60.0)
+        assert feed(tracker, [("a", 5), ("c", 4)], 120.0) == []
+
+        assert feed(tracker, [("x", 1), ("y", 1)], 180.0) == [None]
+        assert tracker.last_event["entered"] == ["c"]
+        assert tracker.last_event["left"] == ["b"]
+
+    def test_rate_trigger_on_list_field(self):
+        """Test that every item of a list field is counted against the rate."""
+        tracker = HeavyHitters(TopKSpec("threat_keywords", k=5, seconds=10, trigger="rate", min_rate=0.5))
+        log = {"threat_keywords": ["ddos", "malware"]}
+
+        events = [tracker.observe(log, 1.0) for _ in range(7)]
+
+        assert [e["key"] for e in events if e] == ["ddos", "malware"]
+        assert events[5]["count"] == 6
+        assert tracker.report()["current"][0]["key"] == "ddos"
+
+    def test_engine_rules_and_dimensions(self):
+        """Test top-k rules in the engine and the dimensions report."""
+        engine = AlertRuleEngine(top_k_dimensions=("hostname",), top_k=3, top_k_interval=60)
+        engine.add_rule(AlertRule(
+            name="hot_host",
+            description="",
+            severity="low",
+            match=FieldExists("hostname"),
+            top_k=TopKSpec("hostname", k=1, seconds=60, trigger="rate", min_rate=0.05),
+        ))
+
+        fired = [
+            "hot_host" in [r.name for r in engine.evaluate({"hostname": "web1", "severity": 6}, now=5.0)]
+            for _ in range(4)
+        ]
+        report = engine.top_k_report()
+
+        assert fired == [False, False, False, True]
+        assert engine.rule_event(engine.rules[-1])["count"] == 4
+        assert report["dimensions"]["hostname"]["current"] == [
+            {"key": "web1", "count": 4, "error": 0, "rate": 0.067},
+        ]
+        assert list(report["rules"]) == ["hot_host"]
+
+    def test_loader_validation(self):
+        """Test top_k parsing and validation in the rule DSL."""
+        rules = parse_rules([{
+            "name": "talkers", "severity": "low", "when": {"field": "source_ip", "exists": True},
+            "top_k": {"field": "source_ip", "k": 20, "trigger": "change"},
+        }])
+
+        assert rules[0].top_k == TopKSpec("source_ip", k=20, seconds=60.0, trigger="change")
+        with pytest.raises(RuleValidationError) as e:
+            parse_rules([{
+                "name": "bad", "severity": "low", "when": {"tag": "a"},
+                "top_k": {"field": "x", "trigger": "rate", "capacity": 3},
+            }])
+        assert len(e.value.errors) == 2
+
+    def test_topk_endpoint(self):
+        """Test that routes are served as JSON and other paths as metrics."""
+        app = _routes_app({"/topk": lambda: {"dimensions": {}}})
+        responses = {}
+        for path in ("/topk", "/metrics"):
+            environ = {"PATH_INFO": path}
+            setup_testing_defaults(environ)
+            body = b"".join(app(environ, lambda status, headers: responses.setdefault(path, status)))
+            if path == "/topk":
+                assert json.loads(body) == {"dimensions": {}}
+
+        assert responses == {"/topk": "200 OK", "/metrics": "200 OK"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,104 @@
+"""
+Tests for sliding-window threshold rules.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from alert_rules import AlertRuleEngine
+from rule_loader import RuleValidationError, parse_rules
+from window_counter import SlidingWindowCounter, WindowSpec
+
+
+class TestSlidingWindowCounter:
+    """Test per-key window counting."""
+
+    def test_fires_once_per_crossing(self):
+        """Test that a key is reported once when it exceeds the threshold."""
+        counter = SlidingWindowCounter(WindowSpec(threshold=3, seconds=10))
+
+        results = [counter.add("web1", 100.0 + i * 0.1) for i in range(6)]
+
+        assert results == [None, None, None, 4, None, None]
+        assert counter.count("web1", 100.6) == 6
+
+    def test_window_slides(self):
+        """Test that events older than the window stop counting and re-arm the key."""
+        counter = SlidingWindowCounter(WindowSpec(threshold=2, seconds=10, buckets=10))
+        for t in (100.0, 101.0, 102.0):
+            counter.add("db1", t)
+
+        assert counter.count("db1", 111.5) == 1
+        assert counter.add("db1", 130.0) is None
+        assert counter.add("db1", 130.5) is None
+        assert counter.add("db1", 131.0) == 3
+
+    def test_late_events(self):
+        """Test that late events count within the window and are dropped outside it."""
+        counter = SlidingWindowCounter(WindowSpec(threshold=10, seconds=10))
+        counter.add("h", 100.0)
+
+        counter.add("h", 95.0)
+        counter.add("h", 50.0)
+
+        assert counter.count("h", 100.0) == 2
+
+    def test_idle_keys_evicted(self):
+        """Test that keys without events in the window are evicted."""
+        counter = SlidingWindowCounter(WindowSpec(threshold=10, seconds=10))
+        for i in range(5):
+            counter.add(f"host{i}", 100.0)
+
+        counter.add("fresh", 200.0)
+        assert len(counter) == 4
+
+        assert counter.evict_idle(200.0) == 3
+        assert len(counter) == 1
+
+    def test_capacity_cap_reuses_slots(self):
+        """Test that the stalest key is evicted at capacity and its slot reused."""
+        counter = SlidingWindowCounter(WindowSpec(threshold=10, seconds=60), max_keys=3)
+        for i in range(3):
+            counter.add(f"host{i}", 100.0 + i)
+            counter.add(f"host{i}", 100.0 + i)
+
+        counter.add("host3", 104.0)
+
+        assert len(counter) == 3
+        assert counter.count("host0", 104.0) == 0
+        assert counter.count("host3", 104.0) == 1
+        assert len(counter._epochs) == 3
+
+    def test_error_spike_needs_a_burst(self):
+        """Test that error_spike fires on many errors from one host, not on one error."""
+        engine = AlertRuleEngine(error_spike_threshold=3, error_spike_window=60)
+        log = {"severity_name": "error", "severity": 3, "hostname": "web1", "message": "disk error"}
+
+        fired = [
+            "error_spike" in [rule.name for rule in engine.evaluate(log, now=1000.0 + i)]
+            for i in range(5)
+        ]
+        other_host = engine.evaluate({**log, "hostname": "web2"}, now=1005.0)
+
+        assert fired == [False, False, False, True, False]
+        assert "error_spike" not in [rule.name for rule in other_host]
+        assert engine.window_count(engine.rules[4], log, now=1005.0) == 5
+
+    def test_window_rules_from_file(self):
+        """Test window parsing and validation in the rule DSL."""
+        rules = parse_rules([{
+            "name": "burst", "severity": "high", "when": {"tag": "authentication"},
+            "window": {"threshold": 2, "seconds": 30, "group_by": ["source_ip", "user"]},
+        }])
+
+        assert rules[0].window.key_of({"source_ip": "10.0.0.1", "user": "root"}) == "10.0.0.1|root"
+        assert rules[0].window.key_of({"source_ip": "10.0.0.1"}) is None
+        with pytest.raises(RuleValidationError):
+            parse_rules([{"name": "bad", "severity": "low", "when": {"tag": "a"}, "window": {"seconds": 0}}])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -35,6 +35,12 @@ class Settings(BaseSettings):
     opensearch_user: str = "admin"
     opensearch_password: str = "admin"
     opensearch_index_prefix: str = "cybersentinel-logs"
+    opensearch_rollup_index_prefix: str = "cybersentinel-rollups"
+
+    # Statistics: rollups for older data, raw logs only for the freshest window
+    # (and for ranges starting before the oldest rollup row)
+    api_statistics_use_rollups: bool = True
+    api_statistics_raw_window_minutes: int = 5
 
     # Redis settings
     redis_host: str = "redis"
@@ -80,6 +80,9 @@ async def startup_event():
         user=settings.opensearch_user,
         password=settings.opensearch_password,
         index_prefix=settings.opensearch_index_prefix,
+        rollup_index_prefix=settings.opensearch_rollup_index_prefix,
+        use_rollups=settings.api_statistics_use_rollups,
+        raw_window_minutes=settings.api_statistics_raw_window_minutes,
     )
 
     logger.info("api_service_started")
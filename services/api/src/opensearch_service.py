@@ -2,7 +2,7 @@
 OpenSearch service for querying logs.
 """
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from opensearchpy import OpenSearch
 from opensearchpy.exceptions import OpenSearchException
 from logger import get_logger
@@ -21,6 +21,9 @@ class OpenSearchService:
         user: str = "admin",
         password: str = "admin",
         index_prefix: str = "cybersentinel-logs",
+        rollup_index_prefix: str = "cybersentinel-rollups",
+        use_rollups: bool = True,
+        raw_window_minutes: int = 5,
     ):
         """
         Initialize OpenSearch service.
@@ -32,8 +35,15 @@ class OpenSearchService:
             user: Username for authentication
             password: Password for authentication
             index_prefix: Prefix for index names
+            rollup_index_prefix: Prefix for per-minute rollup indices
+            use_rollups: Answer statistics from rollups where possible
+            raw_window_minutes: Most recent minutes always read from raw logs
+                (rollups are flushed periodically and may lag behind)
         """
         self.index_prefix = index_prefix
+        self.rollup_index_prefix = rollup_index_prefix
+        self.use_rollups = use_rollups
+        self.raw_window_minutes = raw_window_minutes
         self.client = OpenSearch(
             hosts=[{"host": host, "port": port}],
             http_auth=(user, password),
@@ -179,6 +189,11 @@ class OpenSearchService:
         """
         Get log statistics.
 
+        With rollups enabled, everything older than the raw window is read
+        from the per-minute rollup indices and only the freshest minutes are
+        aggregated over raw logs. Ranges that start before the oldest rollup
+        row (or with no rollup index yet) are aggregated over raw logs.
+
         Args:
             start_time: Start time for statistics
             end_time: End time for statistics
@@ -191,7 +206,55 @@ class OpenSearchService:
             start_time = datetime.utcnow() - timedelta(days=1)
         if not end_time:
             end_time = datetime.utcnow()
+        # Compare as naive UTC (query parameters may carry a timezone)
+        start_time = self._naive_utc(start_time)
+        end_time = self._naive_utc(end_time)
+
+        watermark = (datetime.utcnow() - timedelta(minutes=self.raw_window_minutes)).replace(
+            second=0, microsecond=0
+        )
+        if not self.use_rollups or start_time >= watermark:
+            return self._raw_statistics(start_time, end_time)
+
+        split = min(watermark, end_time)
+        try:
+            stats = self._rollup_statistics(start_time, split)
+        except OpenSearchException as e:
+            logger.warning("opensearch_rollup_statistics_failed", error=str(e))
+            stats = None
+        if stats is None:
+            return self._raw_statistics(start_time, end_time)
+
+        if end_time > split:
+            stats = self._merge_statistics(stats, self._raw_statistics(split, end_time))
+        return stats
+
+    @staticmethod
+    def _naive_utc(value: datetime) -> datetime:
+        """
+        Convert a datetime to naive UTC.
+
+        Args:
+            value: Naive (assumed UTC) or timezone-aware datetime
+
+        Returns:
+            Naive datetime in UTC
+        """
+        if value.tzinfo is None:
+            return value
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    def _raw_statistics(self, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
+        """
+        Aggregate statistics over raw log documents.
+
+        Args:
+            start_time: Start time (inclusive)
+            end_time: End time (inclusive)
 
+        Returns:
+            Statistics data
+        """
         query_body = {
             "query": {
                 "range": {
@@ -260,6 +323,141 @@ class OpenSearchService:
             logger.error("opensearch_statistics_failed", error=str(e))
             raise
 
+    def _rollup_statistics(self, start_time: datetime, end_time: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Aggregate statistics over per-minute rollup rows.
+
+        Args:
+            start_time: Start time (inclusive)
+            end_time: End time (exclusive)
+
+        Returns:
+            Statistics data, or None if the rollups do not reach back to
+            start_time (no rollup index, or rollups started later)
+        """
+        count = {"count": {"sum": {"field": "count"}}}
+        by_count = {"count": "desc"}
+
+        query_body = {
+            "query": {
+                "range": {
+                    "minute": {
+                        "gte": start_time.isoformat(),
+                        "lt": end_time.isoformat(),
+                    }
+                }
+            },
+            "size": 0,
+            "aggs": {
+                "total": {"sum": {"field": "count"}},
+                "by_severity": {
+                    "terms": {"field": "severity_name", "order": by_count},
+                    "aggs": count,
+                },
+                "by_facility": {
+                    "terms": {"field": "facility_name", "order": by_count},
+                    "aggs": count,
+                },
+                "by_hostname": {
+                    "terms": {"field": "hostname", "size": 10, "order": by_count},
+                    "aggs": count,
+                },
+                "by_hour": {
+                    "date_histogram": {"field": "minute", "fixed_interval": "1h"},
+                    "aggs": count,
+                },
+                "threat_logs": {
+                    "filter": {"term": {"has_threat_indicators": True}},
+                    "aggs": count,
+                },
+                # Oldest row of any time, to tell a quiet period from missing rollups
+                "oldest": {
+                    "global": {},
+                    "aggs": {"minute": {"min": {"field": "minute"}}},
+                },
+            },
+        }
+
+        response = self.client.search(
+            index=f"{self.rollup_index_prefix}-*",
+            body=query_body,
+            ignore_unavailable=True,
+        )
+        aggs = response.get("aggregations")
+        if not aggs or aggs["oldest"]["minute"]["value"] is None:
+            logger.info("opensearch_rollups_missing")
+            return None
+
+        oldest = datetime.utcfromtimestamp(aggs["oldest"]["minute"]["value"] / 1000)
+        if oldest > start_time:
+            logger.info("opensearch_rollups_incomplete", oldest=oldest.isoformat())
+            return None
+
+        def total(bucket: Dict[str, Any]) -> int:
+            return int(bucket["count"]["value"] or 0)
+
+        return {
+            "total_logs": int(aggs["total"]["value"] or 0),
+            "by_severity": {
+                bucket["key"]: total(bucket) for bucket in aggs["by_severity"]["buckets"]
+            },
+            "by_facility": {
+                bucket["key"]: total(bucket) for bucket in aggs["by_facility"]["buckets"]
+            },
+            "top_hosts": [
+                {"hostname": bucket["key"], "count": total(bucket)}
+                for bucket in aggs["by_hostname"]["buckets"]
+            ],
+            "timeline": [
+                {"timestamp": bucket["key_as_string"], "count": total(bucket)}
+                for bucket in aggs["by_hour"]["buckets"]
+                if total(bucket)
+            ],
+            "threat_logs_count": total(aggs["threat_logs"]),
+        }
+
+    @staticmethod
+    def _merge_statistics(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine statistics of two adjacent time ranges.
+
+        Args:
+            older: Statistics of the earlier range
+            newer: Statistics of the later range
+
+        Returns:
+            Statistics of the combined range
+        """
+        def add(a: Dict[str, int], b: Dict[str, int]) -> Dict[str, int]:
+            merged = dict(a)
+            for key, value in b.items():
+                merged[key] = merged.get(key, 0) + value
+            return merged
+
+        hosts = add(
+            {host["hostname"]: host["count"] for host in older["top_hosts"]},
+            {host["hostname"]: host["count"] for host in newer["top_hosts"]},
+        )
+        timeline = add(
+            {point["timestamp"]: point["count"] for point in older["timeline"]},
+            {point["timestamp"]: point["count"] for point in newer["timeline"]},
+        )
+
+        return {
+            "total_logs": older["total_logs"] + newer["total_logs"],
+            "by_severity": add(older["by_severity"], newer["by_severity"]),
+            "by_facility": add(older["by_facility"], newer["by_facility"]),
+            "top_hosts": [
+                {"hostname": hostname, "count": count}
+                for hostname, count in sorted(hosts.items(), key=lambda item: -item[1])[:10]
+            ],
+            "timeline": [
+                {"timestamp": timestamp, "count": count}
+                for timestamp, count in sorted(timeline.items())
+            ],
+            "threat_logs_count": older["threat_logs_count"] + newer["threat_logs_count"],
+        }
+
     def close(self) -> None:
         """Close OpenSearch connection."""
         try:
@@ -0,0 +1,87 @@
+"""
+Tests for log statistics queries.
+"""
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from opensearch_service import OpenSearchService
+
+
+def buckets(*pairs):
+    return {"buckets": [{"key": key, "doc_count": count} for key, count in pairs]}
+
+
+def summed(*pairs):
+    return {"buckets": [{"key": key, "count": {"value": count}} for key, count in pairs]}
+
+
+class FakeClient:
+    """OpenSearch client stand-in answering raw and rollup statistics queries."""
+
+    def __init__(self, oldest_rollup):
+        self.oldest_rollup = oldest_rollup
+        self.queries = []
+
+    def search(self, index, body, **kwargs):
+        self.queries.append((index, body))
+        if index.startswith("cybersentinel-rollups"):
+            return {
+                "hits": {"total": {"value": 0}},
+                "aggregations": {
+                    "total": {"value": 10},
+                    "by_severity": summed(("info", 10)),
+                    "by_facility": summed(("daemon", 10)),
+                    "by_hostname": summed(("web01", 10)),
+                    "by_hour": {"buckets": [{"key_as_string": "2024-01-15T10:00:00", "count": {"value": 10}}]},
+                    "threat_logs": {"count": {"value": 1}},
+                    "oldest": {"minute": {"value": self.oldest_rollup.timestamp() * 1000}},
+                },
+            }
+        return {
+            "hits": {"total": {"value": 2}},
+            "aggregations": {
+                "by_severity": buckets(("info", 2)),
+                "by_facility": buckets(("daemon", 2)),
+                "by_hostname": buckets(("web01", 2)),
+                "by_hour": {"buckets": [{"key_as_string": "2024-01-15T11:00:00", "doc_count": 2}]},
+                "threat_logs": {"doc_count": 0},
+            },
+        }
+
+
+class TestStatistics:
+    """Test statistics from rollups and raw logs."""
+
+    @pytest.mark.asyncio
+    async def test_timezone_aware_range(self):
+        """Test that an aware start_time (e.g. ?start_time=...Z) is compared as UTC."""
+        service = OpenSearchService("localhost", 9200)
+        service.client = FakeClient(oldest_rollup=datetime.now(timezone.utc) - timedelta(days=2))
+
+        start_time = datetime.now(timezone.utc) - timedelta(hours=2)
+        stats = await service.get_statistics(start_time=start_time)
+
+        assert stats["total_logs"] == 12
+        assert stats["by_severity"] == {"info": 12}
+        rollup_range = service.client.queries[0][1]["query"]["range"]["minute"]
+        assert rollup_range["gte"] == start_time.replace(tzinfo=None).isoformat()
+
+    @pytest.mark.asyncio
+    async def test_raw_fallback_before_oldest_rollup(self):
+        """Test that ranges older than the rollups are read from raw logs."""
+        service = OpenSearchService("localhost", 9200)
+        service.client = FakeClient(oldest_rollup=datetime.now(timezone.utc) - timedelta(hours=1))
+
+        stats = await service.get_statistics(start_time=datetime.now(timezone.utc) - timedelta(hours=2))
+
+        assert stats["total_logs"] == 2
+        assert [index for index, _ in service.client.queries][-1] == "cybersentinel-logs-*"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
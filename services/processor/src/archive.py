@@ -0,0 +1,385 @@
+"""
+Cold archive sink writing enriched logs to time-partitioned Parquet files.
+
+Layout under the archive directory::
+
+    date=2024-01-15/hour=10/part-<writer>-<seq>.parquet
+    manifest.jsonl
+
+Rows are buffered per open file and written in large row groups, so
+dictionary encoding, compression and row-group statistics work on
+meaningful amounts of data. Files are written as ``*.parquet.inprogress``
+and renamed once closed, so readers only ever see complete files. Each closed file appends one line to
+the manifest with its row count, size and received_at range.
+
+The archive is best-effort: Kafka offsets are committed once OpenSearch and
+Kafka accepted a batch, without waiting for its file to be closed. Rows
+still buffered or in an in-progress file when the process dies are lost from
+the archive (the file has no footer); they remain in OpenSearch and the
+processed topic.
+"""
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from logger import get_logger
+from metrics import archive_rows_written_total, archive_files_closed_total, archive_bytes_written_total
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+logger = get_logger(__name__)
+
+IN_PROGRESS_SUFFIX = ".inprogress"
+MANIFEST_NAME = "manifest.jsonl"
+
+# Archived columns and their types; everything else goes to "extra" as JSON
+ARCHIVE_FIELDS = [
+    ("event_id", "string"),
+    ("received_at", "timestamp"),
+    ("timestamp", "string"),
+    ("source_ip", "string"),
+    ("hostname", "string"),
+    ("app_name", "string"),
+    ("facility", "int8"),
+    ("facility_name", "string"),
+    ("severity", "int8"),
+    ("severity_name", "string"),
+    ("format", "string"),
+    ("message", "string"),
+    ("raw", "string"),
+    ("threat_score", "int32"),
+    ("has_threat_indicators", "bool"),
+    ("tags", "list<string>"),
+    ("template_id", "string"),
+    ("template", "string"),
+    ("extra", "string"),
+]
+
+# Low-cardinality columns stored with dictionary encoding
+DICTIONARY_COLUMNS = [
+    "source_ip", "hostname", "app_name", "facility_name", "severity_name", "format",
+    "template_id", "template",
+]
+
+_ARCHIVED = {name for name, _ in ARCHIVE_FIELDS}
+
+
+def parse_received_at(value: Any) -> Optional[datetime]:
+    """
+    Parse a received_at value into an aware UTC datetime.
+
+    Args:
+        value: ISO 8601 string (naive values are UTC)
+
+    Returns:
+        Datetime, or None if the value cannot be parsed
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def partition_key(log: Dict[str, Any]) -> str:
+    """
+    Get the date/hour partition directory for a log.
+
+    Args:
+        log: Enriched log document
+
+    Returns:
+        Relative directory such as ``date=2024-01-15/hour=10``
+    """
+    received_at = parse_received_at(log.get("received_at")) or datetime.now(timezone.utc)
+    return received_at.strftime("date=%Y-%m-%d/hour=%H")
+
+
+def archive_columns(logs: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Convert enriched logs into archive columns.
+
+    Args:
+        logs: Enriched log documents
+
+    Returns:
+        Column name to list of values, in ARCHIVE_FIELDS order
+    """
+    columns: Dict[str, List[Any]] = {name: [] for name, _ in ARCHIVE_FIELDS}
+    for log in logs:
+        for name, kind in ARCHIVE_FIELDS:
+            if name == "extra":
+                extra = {k: v for k, v in log.items() if k not in _ARCHIVED}
+                value = json.dumps(extra, default=str, separators=(",", ":")) if extra else None
+            elif name == "received_at":
+                value = parse_received_at(log.get(name))
+            else:
+                value = log.get(name)
+                if value is not None and kind == "string":
+                    value = str(value)
+            columns[name].append(value)
+    return columns
+
+
+def _arrow_schema():
+    types = {
+        "string": pa.string(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "int8": pa.int8(),
+        "int32": pa.int32(),
+        "bool": pa.bool_(),
+        "list<string>": pa.list_(pa.string()),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in ARCHIVE_FIELDS])
+
+
+@dataclass
+class _OpenFile:
+    """A Parquet file currently being written."""
+    partition: str
+    path: str
+    writer: Any
+    opened_at: float
+    created_at: str
+    rows: int = 0
+    min_received_at: Optional[datetime] = None
+    max_received_at: Optional[datetime] = None
+    pending: List[Dict[str, Any]] = field(default_factory=list)  # Rows of the next row group
+
+
+class ParquetArchive:
+    """
+    Append enriched log batches to compressed, time-partitioned Parquet files.
+
+    One file is open per date/hour partition and is rolled when it reaches
+    the size or age limit. Writes run in the default executor and may come
+    from several pipelines at once.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_file_bytes: int = 128 * 1024 * 1024,
+        max_file_age: float = 3600.0,
+        compression: str = "zstd",
+        writer_id: Optional[str] = None,
+        row_group_rows: int = 65536,
+    ):
+        """
+        Initialize Parquet archive.
+
+        Args:
+            directory: Archive root (local disk or mounted storage)
+            max_file_bytes: Roll a file once it reaches this size
+            max_file_age: Roll a file after this many seconds
+            compression: Parquet compression codec
+            writer_id: Unique name of this writer, used in file names
+                (defaults to hostname and process ID)
+            row_group_rows: Rows buffered per file before a row group is
+                written (files are checked against max_file_bytes as row
+                groups are written)
+        """
+        if pa is None:
+            raise RuntimeError("pyarrow is not installed")
+
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.max_file_age = max_file_age
+        self.compression = compression
+        self.row_group_rows = row_group_rows
+        self.writer_id = writer_id or f"{socket.gethostname()}-{os.getpid()}"
+
+        self.schema = _arrow_schema()
+        self._files: Dict[str, _OpenFile] = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._report_abandoned()
+
+    @classmethod
+    def from_settings(cls, settings) -> "ParquetArchive":
+        """
+        Build an archive from service settings.
+
+        Args:
+            settings: Processor settings
+
+        Returns:
+            Configured archive
+        """
+        return cls(
+            directory=settings.processor_archive_path,
+            max_file_bytes=settings.processor_archive_max_file_mb * 1024 * 1024,
+            max_file_age=settings.processor_archive_max_file_age,
+            compression=settings.processor_archive_compression,
+            row_group_rows=settings.processor_archive_row_group_rows,
+        )
+
+    def _report_abandoned(self) -> None:
+        # Files left in progress by a crash have no footer and cannot be read
+        # (with a shared volume this also lists files other replicas have open)
+        abandoned = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(self.directory)
+            for name in names
+            if name.endswith(IN_PROGRESS_SUFFIX)
+        ]
+        if abandoned:
+            logger.warning("archive_abandoned_files", count=len(abandoned), files=abandoned[:10])
+
+    def _open(self, partition: str) -> _OpenFile:
+        self._sequence += 1
+        directory = os.path.join(self.directory, partition)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{self.writer_id}-{int(time.time())}-{self._sequence:05d}.parquet"
+        path = os.path.join(directory, name)
+
+        writer = pq.ParquetWriter(
+            path + IN_PROGRESS_SUFFIX,
+            self.schema,
+            compression=self.compression,
+            use_dictionary=DICTIONARY_COLUMNS,
+        )
+        return _OpenFile(
+            partition=partition,
+            path=path,
+            writer=writer,
+            opened_at=time.monotonic(),
+            created_at=datetime.now(timezone.utc).isoformat(),
+        )
+
+    def _write_row_group(self, open_file: _OpenFile) -> None:
+        if not open_file.pending:
+            return
+        columns = archive_columns(open_file.pending)
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+        open_file.writer.write_table(table, row_group_size=len(open_file.pending))
+        open_file.pending = []
+
+        times = [t for t in columns["received_at"] if t is not None]
+        if times:
+            low, high = min(times), max(times)
+            if open_file.min_received_at is None or low < open_file.min_received_at:
+                open_file.min_received_at = low
+            if open_file.max_received_at is None or high > open_file.max_received_at:
+                open_file.max_received_at = high
+
+    def _close(self, open_file: _OpenFile) -> None:
+        self._write_row_group(open_file)
+        open_file.writer.close()
+        os.replace(open_file.path + IN_PROGRESS_SUFFIX, open_file.path)
+        size = os.path.getsize(open_file.path)
+
+        entry = {
+            "path": os.path.relpath(open_file.path, self.directory),
+            "partition": open_file.partition,
+            "rows": open_file.rows,
+            "bytes": size,
+            "compression": self.compression,
+            "min_received_at": open_file.min_received_at.isoformat() if open_file.min_received_at else None,
+            "max_received_at": open_file.max_received_at.isoformat() if open_file.max_received_at else None,
+            "created_at": open_file.created_at,
+            "closed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        # One append per line, so concurrent writers do not interleave
+        with open(os.path.join(self.directory, MANIFEST_NAME), "a", encoding="utf-8") as manifest:
+            manifest.write(json.dumps(entry) + "\n")
+
+        archive_files_closed_total.inc()
+        archive_bytes_written_total.inc(size)
+        logger.info("archive_file_closed", path=entry["path"], rows=open_file.rows, bytes=size)
+
+    def _roll_locked(self, force: bool = False) -> None:
+        now = time.monotonic()
+        for partition, open_file in list(self._files.items()):
+            too_old = now - open_file.opened_at >= self.max_file_age
+            too_big = os.path.getsize(open_file.path + IN_PROGRESS_SUFFIX) >= self.max_file_bytes
+            if force or too_old or too_big:
+                del self._files[partition]
+                self._close(open_file)
+
+    def write_batch(self, logs: List[Dict[str, Any]]) -> int:
+        """
+        Buffer a batch of enriched logs, writing full row groups (blocking).
+
+        Args:
+            logs: Enriched log documents
+
+        Returns:
+            Number of rows accepted
+        """
+        partitions: Dict[str, List[Dict[str, Any]]] = {}
+        for log in logs:
+            partitions.setdefault(partition_key(log), []).append(log)
+
+        with self._lock:
+            for partition, partition_logs in partitions.items():
+                open_file = self._files.get(partition)
+                if open_file is None:
+                    open_file = self._files[partition] = self._open(partition)
+
+                open_file.pending.extend(partition_logs)
+                open_file.rows += len(partition_logs)
+                if len(open_file.pending) >= self.row_group_rows:
+                    self._write_row_group(open_file)
+
+            self._roll_locked()
+
+        archive_rows_written_total.inc(len(logs))
+        return len(logs)
+
+    async def write(self, logs: List[Dict[str, Any]]) -> int:
+        """
+        Write a batch of enriched logs without blocking the event loop.
+
+        Args:
+            logs: Enriched log documents
+
+        Returns:
+            Number of rows written
+        """
+        if not logs:
+            return 0
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.write_batch, logs)
+
+    def roll_expired(self) -> None:
+        """Close files that reached their size or age limit."""
+        with self._lock:
+            self._roll_locked()
+
+    async def run(self, interval: float, stop_event: Optional[asyncio.Event] = None) -> None:
+        """
+        Roll idle files periodically until cancelled or stop_event is set.
+
+        Args:
+            interval: Seconds between checks
+            stop_event: Optional event ending the loop
+        """
+        loop = asyncio.get_running_loop()
+        while stop_event is None or not stop_event.is_set():
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.roll_expired)
+            except Exception as e:
+                logger.error("archive_roll_failed", error=str(e))
+
+    def close(self) -> None:
+        """Close all open files."""
+        with self._lock:
+            self._roll_locked(force=True)
@@ -0,0 +1,135 @@
+"""
+Async circuit breaker used to apply backpressure when a sink is unhealthy.
+"""
+import asyncio
+from typing import Callable, Optional
+from logger import get_logger
+from metrics import circuit_breaker_state, circuit_breaker_transitions_total
+
+logger = get_logger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for async callers.
+
+    While open, callers wait in ``acquire`` instead of failing, so the work
+    they hold stays buffered in their (bounded) queues. After the reset
+    timeout a single caller is let through as a probe; its outcome closes
+    the circuit or re-opens it with an exponentially longer timeout.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 5.0,
+        max_reset_timeout: float = 60.0,
+        on_open: Optional[Callable[[], None]] = None,
+        on_close: Optional[Callable[[], None]] = None,
+    ):
+        """
+        Initialize circuit breaker.
+
+        Args:
+            name: Breaker name used in logs and metrics
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Initial seconds to wait before probing
+            max_reset_timeout: Upper bound for the probing backoff
+            on_open: Called when the circuit opens
+            on_close: Called when the circuit closes again
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.on_open = on_open
+        self.on_close = on_close
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._current_timeout = reset_timeout
+        self._opened_at = 0.0
+        self._probing = False
+        self._changed = asyncio.Event()
+        circuit_breaker_state.labels(breaker=name).set(0)
+
+    def _transition(self, state: str) -> None:
+        previous, self.state = self.state, state
+        circuit_breaker_state.labels(breaker=self.name).set(self._STATE_VALUES[state])
+        circuit_breaker_transitions_total.labels(breaker=self.name, state=state).inc()
+        logger.warning(
+            "circuit_breaker_transition",
+            breaker=self.name,
+            previous=previous,
+            state=state,
+            reset_timeout=self._current_timeout,
+        )
+
+        # Wake up everyone waiting for a state change
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+        if state == self.OPEN and previous == self.CLOSED and self.on_open:
+            self.on_open()
+        elif state == self.CLOSED and self.on_close:
+            self.on_close()
+
+    async def _wait_for_change(self, timeout: Optional[float]) -> None:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def acquire(self) -> bool:
+        """
+        Wait until a call may proceed.
+
+        Returns:
+            True if the caller is the half-open probe, False otherwise
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.state == self.CLOSED:
+                return False
+
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self._current_timeout - loop.time()
+                if remaining > 0:
+                    await self._wait_for_change(remaining)
+                    continue
+                self._probing = False
+                self._transition(self.HALF_OPEN)
+
+            if not self._probing:
+                self._probing = True
+                return True
+
+            await self._wait_for_change(None)
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        self._failures = 0
+        self._probing = False
+        if self.state != self.CLOSED:
+            self._current_timeout = self.reset_timeout
+            self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        """Record a failed call."""
+        self._failures += 1
+        self._probing = False
+
+        if self.state == self.HALF_OPEN:
+            self._current_timeout = min(self._current_timeout * 2, self.max_reset_timeout)
+        elif self.state == self.OPEN or self._failures < self.failure_threshold:
+            return
+
+        self._opened_at = asyncio.get_running_loop().time()
+        self._transition(self.OPEN)
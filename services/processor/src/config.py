@@ -37,6 +37,11 @@ class Settings(BaseSettings):
     opensearch_bulk_size: int = 500
     opensearch_bulk_timeout: int = 30
     opensearch_max_retries: int = 3
+    opensearch_storage_profile: str = "full"  # full, lean
+    opensearch_raw_retention: str = ""  # always, on_parse_failure, never (default: per profile)
+    opensearch_routing_enabled: bool = False
+    opensearch_routing_rules_file: str = ""  # JSON routing config (default: built-in rules)
+    opensearch_rollup_index_prefix: str = "cybersentinel-rollups"  # must not match the log index pattern
 
     # Redis settings
     redis_host: str = "redis"
@@ -46,11 +51,64 @@ class Settings(BaseSettings):
     redis_max_connections: int = 50
 
     # Processor settings
-    processor_workers: int = 4
     processor_batch_size: int = 100
+    processor_commit_interval_ms: int = 5000
+    processor_flush_timeout: int = 30
+
+    # Per-minute count rollups for dashboard statistics
+    processor_rollups_enabled: bool = True
+    processor_rollup_flush_interval: int = 10
+
+    # Field extraction (key=value and grok-style patterns)
+    processor_field_extraction_enabled: bool = True
+    processor_field_extraction_rules_file: str = ""  # JSON patterns/dispatch (default: built-in)
+
+    # Log template mining
+    processor_templates_enabled: bool = True
+    processor_template_depth: int = 4
+    processor_template_similarity: float = 0.4
+    processor_template_max_children: int = 100
+    processor_template_max_clusters: int = 10000
+    processor_template_state_file: str = ""  # e.g. /var/lib/cybersentinel/templates.json
+    processor_template_save_interval: int = 300
+
+    # Cold archive (Parquet files, requires pyarrow; best-effort, does not gate offset commits)
+    processor_archive_enabled: bool = False
+    processor_archive_path: str = "/data/archive"
+    processor_archive_max_file_mb: int = 128
+    processor_archive_max_file_age: int = 3600
+    processor_archive_roll_check_interval: int = 60  # Seconds between checks for files to roll
+    processor_archive_compression: str = "zstd"
+    processor_archive_row_group_rows: int = 65536
+
+    # OpenSearch circuit breaker (pauses consumption while the cluster is unavailable)
+    processor_breaker_failure_threshold: int = 3
+    processor_breaker_reset_timeout: float = 5.0
+    processor_breaker_max_reset_timeout: float = 60.0
+    processor_pipeline_queue_size: int = 4
+    processor_sink_retry_base: float = 1.0  # Backoff before retrying a failed index/produce
+    processor_sink_retry_max: float = 30.0
     processor_geo_ip_enabled: bool = True
     processor_threat_intel_enabled: bool = False
 
+    # Enrichment cache settings
+    processor_enrichment_cache_redis_enabled: bool = True
+    processor_enrichment_cache_local_size: int = 100000
+    processor_enrichment_cache_local_ttl: int = 300
+    processor_enrichment_cache_ttl: int = 3600
+    processor_enrichment_cache_negative_ttl: int = 300
+
+    # Reverse-DNS settings
+    processor_rdns_enabled: bool = True
+    processor_rdns_backend: str = "system"  # system, aiodns, hosts
+    processor_rdns_hosts_file: str = "/etc/hosts"
+    processor_rdns_concurrency: int = 64
+    processor_rdns_system_threads: int = 8  # Dedicated getnameinfo threads for the system backend
+    processor_rdns_deadline_ms: int = 200
+    processor_rdns_default_ttl: int = 3600
+    processor_rdns_negative_ttl: int = 300
+    processor_rdns_only_placeholder_hostnames: bool = True
+
     # Monitoring
     prometheus_port: int = 9101
 
@@ -0,0 +1,343 @@
+"""
+Asynchronous reverse-DNS (PTR) resolution for log source addresses.
+"""
+import asyncio
+import ipaddress
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+from enricher import EnrichmentLookup
+from enrichment_cache import TTLCache
+from logger import get_logger
+from metrics import rdns_lookups_total
+
+logger = get_logger(__name__)
+
+try:
+    import aiodns
+except ImportError:  # pragma: no cover - optional dependency
+    aiodns = None
+
+# Hostname values that carry no information about the sending device
+PLACEHOLDER_HOSTNAMES = {"", "-", "localhost", "unknown"}
+
+# Resolver answer: (hostname or None, ttl in seconds)
+PTRAnswer = Tuple[Optional[str], int]
+
+
+def is_ip_address(value: str) -> bool:
+    """
+    Check whether a string is an IPv4 or IPv6 address.
+
+    Args:
+        value: String to check
+
+    Returns:
+        True if value is an IP address
+    """
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+
+class SystemResolver:
+    """
+    PTR resolver backed by the system resolver (getnameinfo).
+
+    getnameinfo blocks, so queries run on a small thread pool of their own;
+    slow lookups never hold the default executor that bulk indexing and
+    archive writes use.
+    """
+
+    def __init__(self, default_ttl: int = 3600, negative_ttl: int = 300, threads: int = 8):
+        """
+        Initialize system resolver.
+
+        Args:
+            default_ttl: TTL used for answers (the system resolver hides record TTLs)
+            negative_ttl: TTL used for failed lookups
+            threads: Size of the resolver thread pool (and so the maximum
+                number of concurrent queries)
+        """
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.max_concurrency = threads
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="rdns")
+
+    async def resolve_ptr(self, ip: str) -> PTRAnswer:
+        """
+        Resolve an IP address to a hostname.
+
+        Args:
+            ip: IP address
+
+        Returns:
+            Hostname (or None) and TTL
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            host, _ = await loop.run_in_executor(
+                self._executor, socket.getnameinfo, (ip, 0), socket.NI_NAMEREQD
+            )
+            return host, self.default_ttl
+        except (socket.gaierror, socket.herror, OSError):
+            return None, self.negative_ttl
+
+
+class AiodnsResolver:
+    """PTR resolver using c-ares, which exposes the record TTL."""
+
+    def __init__(self, negative_ttl: int = 300, timeout: float = 2.0):
+        """
+        Initialize aiodns resolver.
+
+        Args:
+            negative_ttl: TTL used for failed lookups
+            timeout: Per-query timeout in seconds
+        """
+        if aiodns is None:
+            raise RuntimeError("aiodns is not installed")
+        self.negative_ttl = negative_ttl
+        self.resolver = aiodns.DNSResolver(timeout=timeout)
+
+    async def resolve_ptr(self, ip: str) -> PTRAnswer:
+        """
+        Resolve an IP address to a hostname.
+
+        Args:
+            ip: IP address
+
+        Returns:
+            Hostname (or None) and TTL
+        """
+        try:
+            reverse_name = ipaddress.ip_address(ip).reverse_pointer
+            answer = await self.resolver.query(reverse_name, "PTR")
+            return answer.name.rstrip("."), max(int(answer.ttl), 1)
+        except Exception:
+            return None, self.negative_ttl
+
+
+class HostsFileResolver:
+    """Stub PTR resolver that answers from a hosts-format file or mapping."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        entries: Optional[Dict[str, str]] = None,
+        ttl: int = 3600,
+        negative_ttl: int = 300,
+    ):
+        """
+        Initialize hosts-file resolver.
+
+        Args:
+            path: Path to a hosts-format file ("<ip> <name> [aliases...]")
+            entries: Additional IP to hostname mappings
+            ttl: TTL reported for answers
+            negative_ttl: TTL reported for unknown addresses
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries: Dict[str, str] = {}
+
+        if path:
+            self.entries.update(self.load(path))
+        if entries:
+            self.entries.update(entries)
+
+    @staticmethod
+    def load(path: str) -> Dict[str, str]:
+        """
+        Parse a hosts-format file.
+
+        Args:
+            path: File path
+
+        Returns:
+            Mapping of IP address to first hostname
+        """
+        entries: Dict[str, str] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    fields = line.split("#", 1)[0].split()
+                    if len(fields) >= 2 and fields[0] not in entries:
+                        entries[fields[0]] = fields[1]
+        except OSError as e:
+            logger.warning("hosts_file_load_failed", path=path, error=str(e))
+        return entries
+
+    async def resolve_ptr(self, ip: str) -> PTRAnswer:
+        """
+        Resolve an IP address to a hostname.
+
+        Args:
+            ip: IP address
+
+        Returns:
+            Hostname (or None) and TTL
+        """
+        host = self.entries.get(ip)
+        return (host, self.ttl) if host else (None, self.negative_ttl)
+
+
+class ReverseDNSLookup(EnrichmentLookup):
+    """
+    Batched reverse-DNS lookup of ``source_ip``.
+
+    Queries run with bounded concurrency and identical in-flight addresses
+    share a single query. A batch never waits longer than ``deadline``;
+    queries still running at the deadline keep going in the background and
+    their answers are picked up by a later batch.
+    """
+
+    name = "rdns"
+    source_field = "source_ip"
+    target_field = "resolved_hostname"
+
+    def __init__(
+        self,
+        backend: Any,
+        concurrency: int = 64,
+        deadline: float = 0.2,
+        cache_size: int = 50000,
+        only_placeholder_hostnames: bool = True,
+    ):
+        """
+        Initialize reverse-DNS lookup.
+
+        Args:
+            backend: Resolver with an async resolve_ptr(ip) -> (hostname, ttl)
+            concurrency: Maximum number of concurrent queries (capped at the
+                backend's ``max_concurrency``, if it has one)
+            deadline: Maximum time in seconds a batch waits for answers
+            cache_size: Maximum number of answers kept between batches
+            only_placeholder_hostnames: Only resolve logs whose hostname is
+                missing, a placeholder, or a bare IP address
+        """
+        self.backend = backend
+        self.deadline = deadline
+        self.only_placeholder_hostnames = only_placeholder_hostnames
+        concurrency = min(concurrency, getattr(backend, "max_concurrency", concurrency))
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._answers = TTLCache(max_size=cache_size)
+
+    @classmethod
+    def from_settings(cls, settings) -> "ReverseDNSLookup":
+        """
+        Build a reverse-DNS lookup from service settings.
+
+        Args:
+            settings: Processor settings
+
+        Returns:
+            Configured lookup
+        """
+        backend_name = settings.processor_rdns_backend
+        if backend_name == "hosts":
+            backend = HostsFileResolver(
+                path=settings.processor_rdns_hosts_file,
+                ttl=settings.processor_rdns_default_ttl,
+                negative_ttl=settings.processor_rdns_negative_ttl,
+            )
+        elif backend_name == "aiodns" and aiodns is not None:
+            backend = AiodnsResolver(negative_ttl=settings.processor_rdns_negative_ttl)
+        else:
+            if backend_name != "system":
+                logger.warning("rdns_backend_unavailable", backend=backend_name, fallback="system")
+            backend = SystemResolver(
+                default_ttl=settings.processor_rdns_default_ttl,
+                negative_ttl=settings.processor_rdns_negative_ttl,
+                threads=settings.processor_rdns_system_threads,
+            )
+
+        return cls(
+            backend=backend,
+            concurrency=settings.processor_rdns_concurrency,
+            deadline=settings.processor_rdns_deadline_ms / 1000,
+            only_placeholder_hostnames=settings.processor_rdns_only_placeholder_hostnames,
+        )
+
+    def wants(self, log: Dict[str, Any]) -> bool:
+        """Resolve only valid source IPs, optionally only for uninformative hostnames."""
+        source_ip = log.get(self.source_field)
+        if not source_ip or not is_ip_address(str(source_ip)):
+            return False
+        if not self.only_placeholder_hostnames:
+            return True
+        hostname = str(log.get("hostname") or "").strip()
+        return hostname.lower() in PLACEHOLDER_HOSTNAMES or is_ip_address(hostname)
+
+    def apply(self, log: Dict[str, Any], value: Any) -> None:
+        """Store the resolved name and replace placeholder hostnames."""
+        log[self.target_field] = value
+        hostname = str(log.get("hostname") or "").strip()
+        if hostname.lower() in PLACEHOLDER_HOSTNAMES or is_ip_address(hostname):
+            if hostname:
+                log["hostname_original"] = hostname
+            log["hostname"] = value
+
+    async def _query(self, ip: str) -> PTRAnswer:
+        async with self._semaphore:
+            try:
+                host, ttl = await self.backend.resolve_ptr(ip)
+            except Exception as e:
+                logger.debug("rdns_query_failed", ip=ip, error=str(e))
+                rdns_lookups_total.labels(result="error").inc()
+                return None, 60
+
+        rdns_lookups_total.labels(result="resolved" if host else "not_found").inc()
+        self._answers.set(ip, (host, ttl), ttl)
+        return host, ttl
+
+    def _start(self, ip: str) -> asyncio.Task:
+        task = self._in_flight.get(ip)
+        if task is None:
+            task = asyncio.create_task(self._query(ip))
+            self._in_flight[ip] = task
+            task.add_done_callback(lambda _t, key=ip: self._in_flight.pop(key, None))
+        else:
+            rdns_lookups_total.labels(result="coalesced").inc()
+        return task
+
+    async def resolve_many(
+        self, keys: List[str]
+    ) -> Tuple[Dict[str, Optional[Any]], Optional[Dict[str, int]]]:
+        """
+        Resolve a batch of IP addresses within the configured deadline.
+
+        Args:
+            keys: Unique IP addresses
+
+        Returns:
+            Mapping of answered IPs to hostname (None if no PTR record),
+            with addresses still pending at the deadline omitted, and the
+            record TTLs so the shared cache does not outlive them
+        """
+        results: Dict[str, Optional[Any]] = {}
+        ttls: Dict[str, int] = {}
+        pending: Dict[asyncio.Task, str] = {}
+
+        for ip in keys:
+            answer = self._answers.get(ip)
+            if answer is not None:
+                results[ip], ttls[ip] = answer
+            else:
+                pending[self._start(ip)] = ip
+
+        if not pending:
+            return results, ttls
+
+        done, not_done = await asyncio.wait(pending.keys(), timeout=self.deadline)
+        for task in done:
+            ip = pending[task]
+            results[ip], ttls[ip] = task.result()
+
+        if not_done:
+            rdns_lookups_total.labels(result="deadline_exceeded").inc(len(not_done))
+
+        return results, ttls
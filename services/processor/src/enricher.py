@@ -1,49 +1,115 @@
 """
 Log enrichment with GeoIP and additional metadata.
 """
-import re
 import hashlib
-from typing import Dict, Any, Optional
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
+from enrichment_cache import EnrichmentCache
+from template_miner import TemplateMiner
+from field_extraction import FieldExtractor
+from message_features import MessageFeatureExtractor
 from logger import get_logger
 from metrics import enrichment_duration_seconds
 
 logger = get_logger(__name__)
 
 
+class EnrichmentLookup(ABC):
+    """
+    Base class for expensive, cacheable per-key lookups.
+
+    A lookup maps the value of ``source_field`` (e.g. ``source_ip``) to a
+    result stored under ``target_field``. Subclasses implement
+    ``resolve_many``, which receives only the keys missing from the cache.
+    """
+
+    name: str = "lookup"
+    source_field: str = "source_ip"
+    target_field: str = ""
+
+    @abstractmethod
+    async def resolve_many(
+        self, keys: List[str]
+    ) -> Tuple[Dict[str, Optional[Any]], Optional[Dict[str, int]]]:
+        """
+        Resolve a batch of keys.
+
+        Args:
+            keys: Unique keys not found in the cache
+
+        Returns:
+            Tuple of the mapping of key to result (None when nothing was
+            found) and optional per-key cache TTLs in seconds (None to use
+            cache defaults). Keys omitted from the results are treated as
+            unresolved and not cached.
+        """
+        raise NotImplementedError
+
+    def wants(self, log: Dict[str, Any]) -> bool:
+        """
+        Check whether a log needs this lookup.
+
+        Args:
+            log: Enriched log document
+
+        Returns:
+            True if the lookup should be applied
+        """
+        return bool(log.get(self.source_field))
+
+    def apply(self, log: Dict[str, Any], value: Any) -> None:
+        """
+        Store a lookup result on a log.
+
+        Args:
+            log: Enriched log document
+            value: Non-empty lookup result
+        """
+        log[self.target_field] = value
+
+
 class LogEnricher:
     """Enrich log messages with additional metadata."""
 
-    def __init__(self, geo_ip_enabled: bool = True):
+    def __init__(
+        self,
+        geo_ip_enabled: bool = True,
+        cache: Optional[EnrichmentCache] = None,
+        lookups: Optional[List[EnrichmentLookup]] = None,
+        template_miner: Optional[TemplateMiner] = None,
+        field_extractor: Optional[FieldExtractor] = None,
+    ):
         """
         Initialize log enricher.
 
         Args:
             geo_ip_enabled: Whether to enable GeoIP enrichment
+            cache: Shared cache for lookup results
+            lookups: Batched lookups applied by apply_lookups
+            template_miner: Assigns template_id/template to each message
+            field_extractor: Extracts structured fields from messages
         """
         self.geo_ip_enabled = geo_ip_enabled
-        self.ip_pattern = re.compile(
-            r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-        )
-
-        # Common threat indicators
-        self.threat_keywords = [
-            "exploit", "malware", "ransomware", "trojan", "backdoor",
-            "injection", "xss", "sql injection", "ddos", "brute force",
-            "unauthorized", "breach", "intrusion", "anomaly"
-        ]
+        self.cache = cache or EnrichmentCache()
+        self.lookups = lookups or []
+        self.template_miner = template_miner
+        self.field_extractor = field_extractor
+        # One pass over the message feeds every enrichment step
+        self.features = MessageFeatureExtractor()
+        self.threat_keywords = list(self.features.threat_keywords)
 
     def extract_ips(self, message: str) -> list[str]:
         """
-        Extract IP addresses from message.
+        Extract valid IPv4/IPv6 addresses from message.
 
         Args:
             message: Log message
 
         Returns:
-            List of IP addresses found
+            Unique IP addresses found, in order of appearance
         """
-        return self.ip_pattern.findall(message)
+        return self.features.ip_extractor.extract(message)[0]
 
     def detect_threat_indicators(self, message: str) -> Dict[str, Any]:
         """
@@ -55,12 +121,10 @@ class LogEnricher:
         Returns:
             Dictionary with threat detection results
         """
-        message_lower = message.lower()
-        detected_threats = [
-            keyword for keyword in self.threat_keywords
-            if keyword in message_lower
-        ]
+        return self._threat_info(self.features.extract(message).threat_keywords)
 
+    @staticmethod
+    def _threat_info(detected_threats: List[str]) -> Dict[str, Any]:
         return {
             "has_threat_indicators": len(detected_threats) > 0,
             "threat_keywords": detected_threats,
@@ -108,6 +172,35 @@ class LogEnricher:
         fingerprint_str = "|".join(str(v) for v in fingerprint_data.values())
         return hashlib.sha256(fingerprint_str.encode()).hexdigest()
 
+    def generate_event_id(self, log_data: Dict[str, Any], fingerprint: str) -> Optional[str]:
+        """
+        Generate a deterministic document ID for idempotent indexing.
+
+        The ID only depends on the source, receive time, content fingerprint
+        and Kafka position, so retries and replays of the same record map to
+        the same document.
+
+        Args:
+            log_data: Log data with kafka_partition/kafka_offset metadata
+            fingerprint: Content fingerprint
+
+        Returns:
+            Hex document ID, or None without Kafka metadata
+        """
+        partition = log_data.get("kafka_partition")
+        offset = log_data.get("kafka_offset")
+        if partition is None or offset is None:
+            return None
+
+        id_str = "|".join(str(v) for v in (
+            log_data.get("source_ip", ""),
+            log_data.get("received_at", ""),
+            fingerprint,
+            partition,
+            offset,
+        ))
+        return hashlib.blake2b(id_str.encode(), digest_size=16).hexdigest()
+
     def enrich(self, log_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Enrich log data with additional metadata.
@@ -126,24 +219,50 @@ class LogEnricher:
 
             # Extract IPs from message
             message = log_data.get("message", "")
-            extracted_ips = self.extract_ips(message)
-            if extracted_ips:
-                enriched["extracted_ips"] = extracted_ips
+            features = self.features.extract(message)
+            if features.ips:
+                enriched["extracted_ips"] = features.ips
+                enriched["ip_classes"] = sorted(set(features.ip_classes.values()))
+                public_ips = features.public_ips
+                if public_ips:
+                    enriched["public_ips"] = public_ips
+
+            # Extract structured fields
+            if self.field_extractor is not None:
+                with enrichment_duration_seconds.labels(enrichment_type="fields").time():
+                    fields = self.field_extractor.extract(log_data, message)
+                if fields:
+                    enriched["fields"] = fields
+                    enriched.update(self.field_extractor.normalize(fields))
+
+            # Cluster the message into a template
+            if self.template_miner is not None:
+                with enrichment_duration_seconds.labels(enrichment_type="template").time():
+                    template_id, template, params = self.template_miner.add(message, features.tokens)
+                enriched["template_id"] = template_id
+                enriched["template"] = template
+                if params:
+                    enriched["template_params"] = params
 
             # Add severity category
             severity = log_data.get("severity", 5)
             enriched["severity_category"] = self.categorize_severity(severity)
 
             # Detect threat indicators
-            threat_info = self.detect_threat_indicators(message)
+            threat_info = self._threat_info(features.threat_keywords)
             enriched.update({
                 "has_threat_indicators": threat_info["has_threat_indicators"],
                 "threat_keywords": threat_info["threat_keywords"],
                 "threat_score": threat_info["threat_score"],
             })
 
-            # Generate fingerprint
+            # Generate fingerprint and deterministic document ID
             enriched["fingerprint"] = self.generate_fingerprint(log_data)
+            event_id = self.generate_event_id(log_data, enriched["fingerprint"])
+            if event_id:
+                enriched["event_id"] = event_id
+            enriched.pop("kafka_partition", None)
+            enriched.pop("kafka_offset", None)
 
             # Add tags based on content
             tags = []
@@ -151,9 +270,9 @@ class LogEnricher:
                 tags.append("security")
             if severity <= 3:
                 tags.append("critical")
-            if "error" in message.lower() or "fail" in message.lower():
+            if features.has_error:
                 tags.append("error")
-            if "auth" in message.lower() or "login" in message.lower():
+            if features.has_auth:
                 tags.append("authentication")
 
             enriched["tags"] = tags
@@ -182,3 +301,39 @@ class LogEnricher:
             enriched["_index_date"] = datetime.utcnow().strftime("%Y.%m.%d")
 
             return enriched
+
+    async def apply_lookups(self, logs: List[Dict[str, Any]]) -> None:
+        """
+        Apply all registered lookups to a batch of enriched logs in place.
+
+        Each lookup costs one cache round trip for the whole batch; only keys
+        missing from the cache are resolved and written back.
+
+        Args:
+            logs: Enriched log documents
+        """
+        if not self.lookups or not logs:
+            return
+
+        for lookup in self.lookups:
+            with enrichment_duration_seconds.labels(enrichment_type=lookup.name).time():
+                wanted = [log for log in logs if lookup.wants(log)]
+                if not wanted:
+                    continue
+                keys = [str(log[lookup.source_field]) for log in wanted]
+
+                try:
+                    results = await self.cache.get_many(lookup.name, keys)
+                    missing = [key for key in dict.fromkeys(keys) if key not in results]
+                    if missing:
+                        resolved, ttls = await lookup.resolve_many(missing)
+                        await self.cache.set_many(lookup.name, resolved, ttls=ttls)
+                        results.update(resolved)
+                except Exception as e:
+                    logger.error("enrichment_lookup_failed", lookup=lookup.name, error=str(e))
+                    continue
+
+                for log in wanted:
+                    value = results.get(str(log[lookup.source_field]))
+                    if value is not None:
+                        lookup.apply(log, value)
@@ -0,0 +1,290 @@
+"""
+Two-tier cache for enrichment lookups (in-process TTL LRU in front of Redis).
+"""
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+import redis.asyncio as aioredis
+from logger import get_logger
+from metrics import enrichment_cache_requests_total, enrichment_cache_hit_ratio
+
+logger = get_logger(__name__)
+
+# Marker stored for keys whose lookup returned nothing (negative caching)
+_NEGATIVE = object()
+_NEGATIVE_REDIS_VALUE = "\x00"
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a per-entry TTL."""
+
+    def __init__(self, max_size: int = 100000, default_ttl: float = 300.0):
+        """
+        Initialize TTL cache.
+
+        Args:
+            max_size: Maximum number of entries kept in memory
+            default_ttl: Default time-to-live in seconds
+        """
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a value, refreshing its LRU position.
+
+        Args:
+            key: Cache key
+            default: Value returned when the key is missing or expired
+
+        Returns:
+            Cached value or default
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time-to-live in seconds (defaults to default_ttl)
+        """
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value."""
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._data.clear()
+
+
+class EnrichmentCache:
+    """
+    Shared cache for enrichment lookup results.
+
+    Lookups are answered from an in-process TTL LRU first; the remaining keys
+    of a batch are fetched from Redis with a single MGET and written back with
+    a single pipeline, so a batch costs at most one round trip per direction.
+    Missing results are cached too (with a shorter TTL) so that unresolvable
+    keys are not retried by every worker.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[aioredis.Redis] = None,
+        key_prefix: str = "enrich",
+        local_max_size: int = 100000,
+        local_ttl: int = 300,
+        ttl: int = 3600,
+        negative_ttl: int = 300,
+    ):
+        """
+        Initialize enrichment cache.
+
+        Args:
+            redis_client: Async Redis client (None for local-only caching)
+            key_prefix: Prefix for Redis keys
+            local_max_size: Maximum entries in the in-process tier
+            local_ttl: Upper bound for the in-process TTL in seconds
+            ttl: TTL for positive results in seconds
+            negative_ttl: TTL for negative (not found) results in seconds
+        """
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self.local_ttl = local_ttl
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local = TTLCache(max_size=local_max_size, default_ttl=local_ttl)
+
+        self._hits = {"local": 0, "redis": 0}
+        self._lookups = {"local": 0, "redis": 0}
+
+    @classmethod
+    def from_settings(cls, settings) -> "EnrichmentCache":
+        """
+        Build a cache from service settings.
+
+        Args:
+            settings: Processor settings
+
+        Returns:
+            Configured enrichment cache
+        """
+        redis_client = None
+        if settings.processor_enrichment_cache_redis_enabled:
+            pool = aioredis.ConnectionPool(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                db=settings.redis_db,
+                password=settings.redis_password or None,
+                max_connections=settings.redis_max_connections,
+                decode_responses=True,
+                socket_timeout=2,
+                socket_connect_timeout=2,
+            )
+            redis_client = aioredis.Redis(connection_pool=pool)
+
+        return cls(
+            redis_client=redis_client,
+            local_max_size=settings.processor_enrichment_cache_local_size,
+            local_ttl=settings.processor_enrichment_cache_local_ttl,
+            ttl=settings.processor_enrichment_cache_ttl,
+            negative_ttl=settings.processor_enrichment_cache_negative_ttl,
+        )
+
+    def _redis_key(self, namespace: str, key: str) -> str:
+        return f"{self.key_prefix}:{namespace}:{key}"
+
+    def _record(self, tier: str, hits: int, lookups: int) -> None:
+        if not lookups:
+            return
+        self._hits[tier] += hits
+        self._lookups[tier] += lookups
+        enrichment_cache_requests_total.labels(tier=tier, result="hit").inc(hits)
+        enrichment_cache_requests_total.labels(tier=tier, result="miss").inc(lookups - hits)
+        enrichment_cache_hit_ratio.labels(tier=tier).set(
+            self._hits[tier] / self._lookups[tier]
+        )
+
+    async def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Optional[Any]]:
+        """
+        Look up a batch of keys.
+
+        Args:
+            namespace: Lookup namespace (e.g. "rdns")
+            keys: Keys to look up
+
+        Returns:
+            Mapping of found keys to values; negative entries map to None and
+            keys absent from both tiers are omitted
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        found: Dict[str, Optional[Any]] = {}
+        missing = []
+
+        for key in unique_keys:
+            value = self.local.get((namespace, key), default=None)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = None if value is _NEGATIVE else value
+        self._record("local", len(unique_keys) - len(missing), len(unique_keys))
+
+        if not missing or self.redis is None:
+            return found
+
+        try:
+            raw_values = await self.redis.mget(
+                [self._redis_key(namespace, key) for key in missing]
+            )
+        except Exception as e:
+            logger.warning("enrichment_cache_redis_get_failed", error=str(e), namespace=namespace)
+            enrichment_cache_requests_total.labels(tier="redis", result="error").inc(len(missing))
+            return found
+
+        redis_hits = 0
+        for key, raw in zip(missing, raw_values):
+            if raw is None:
+                continue
+            redis_hits += 1
+            if raw == _NEGATIVE_REDIS_VALUE:
+                found[key] = None
+                self.local.set((namespace, key), _NEGATIVE, min(self.local_ttl, self.negative_ttl))
+            else:
+                value = json.loads(raw)
+                found[key] = value
+                self.local.set((namespace, key), value, min(self.local_ttl, self.ttl))
+        self._record("redis", redis_hits, len(missing))
+
+        return found
+
+    async def set_many(
+        self,
+        namespace: str,
+        values: Dict[str, Optional[Any]],
+        ttls: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        Store a batch of lookup results in both tiers.
+
+        Args:
+            namespace: Lookup namespace
+            values: Mapping of keys to values; None marks a negative result
+            ttls: Optional per-key TTLs in seconds, capped at the cache TTLs
+        """
+        if not values:
+            return
+
+        entries = []
+        for key, value in values.items():
+            default_ttl = self.negative_ttl if value is None else self.ttl
+            ttl = max(1, min(default_ttl, (ttls or {}).get(key, default_ttl)))
+            entries.append((key, value, ttl))
+
+            local_value = _NEGATIVE if value is None else value
+            self.local.set((namespace, key), local_value, min(self.local_ttl, ttl))
+
+        if self.redis is None:
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value, ttl in entries:
+                    raw = _NEGATIVE_REDIS_VALUE if value is None else json.dumps(value)
+                    pipe.set(self._redis_key(namespace, key), raw, ex=ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("enrichment_cache_redis_set_failed", error=str(e), namespace=namespace)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Hit ratio per tier and local cache size
+        """
+        return {
+            "local_size": len(self.local),
+            "hit_ratio": {
+                tier: (self._hits[tier] / self._lookups[tier]) if self._lookups[tier] else 0.0
+                for tier in self._lookups
+            },
+        }
+
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        if self.redis is None:
+            return
+        try:
+            await self.redis.aclose()
+        except Exception as e:
+            logger.error("enrichment_cache_close_failed", error=str(e))
@@ -0,0 +1,255 @@
+"""
+Structured field extraction from log messages (key=value and grok-style patterns).
+"""
+import ipaddress
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Pattern
+from logger import get_logger
+from metrics import field_extraction_duration_seconds, field_extractions_total
+
+logger = get_logger(__name__)
+
+# Building blocks for grok-style %{NAME:field} expressions
+GROK_BASE_PATTERNS: Dict[str, str] = {
+    "INT": r"[+-]?\d+",
+    "NUMBER": r"[+-]?\d+(?:\.\d+)?",
+    "WORD": r"\w+",
+    "NOTSPACE": r"\S+",
+    "DATA": r".*?",
+    "GREEDYDATA": r".*",
+    "QUOTEDSTRING": r"\"[^\"]*\"",
+    "USER": r"[\w.@$-]+",
+    "IPV4": r"(?:\d{1,3}\.){3}\d{1,3}",
+    "IPV6": r"[0-9A-Fa-f:]*:[0-9A-Fa-f:.]+",
+    "IP": r"(?:(?:\d{1,3}\.){3}\d{1,3}|[0-9A-Fa-f:]*:[0-9A-Fa-f:.]+)",
+    "HOSTNAME": r"[\w.-]+",
+    "URI": r"\S+",
+    "HTTPMETHOD": r"[A-Z]+",
+}
+
+# Named message patterns available to the dispatch table
+DEFAULT_PATTERNS: Dict[str, str] = {
+    "sshd_auth": (
+        r"%{WORD:action} %{WORD:auth_method} for (?:invalid user )?%{USER:user} "
+        r"from %{IP:src_ip} port %{INT:src_port}"
+    ),
+    "sshd_invalid_user": r"Invalid user %{USER:user} from %{IP:src_ip}(?: port %{INT:src_port})?",
+    "sudo": r"%{USER:user} : .*?USER=%{USER:target_user} ; COMMAND=%{GREEDYDATA:command}",
+    "squid_access": (
+        r"%{NUMBER:duration_ms} %{IP:src_ip} %{NOTSPACE:cache_result}/%{INT:status} "
+        r"%{INT:bytes} %{HTTPMETHOD:method} %{URI:url} %{NOTSPACE:user}"
+    ),
+}
+
+# Extractors applied to everything not matched by a more specific entry
+DEFAULT_DISPATCH: Dict[str, Any] = {
+    "default": ["kv"],
+    "app_name": {
+        "sshd": ["sshd_auth", "sshd_invalid_user"],
+        "sudo": ["sudo"],
+        "squid": ["squid_access"],
+    },
+    "source_ip": {},
+}
+
+# Vendor spellings of common fields, mapped to top-level document fields
+FIELD_ALIASES: Dict[str, str] = {
+    "src": "src_ip", "srcip": "src_ip", "src_ip": "src_ip", "source_address": "src_ip",
+    "dst": "dst_ip", "dstip": "dst_ip", "dst_ip": "dst_ip", "destination_address": "dst_ip",
+    "spt": "src_port", "sport": "src_port", "srcport": "src_port", "src_port": "src_port",
+    "dpt": "dst_port", "dport": "dst_port", "dstport": "dst_port", "dst_port": "dst_port",
+    "user": "user", "usr": "user", "username": "user", "suser": "user",
+    "action": "action", "act": "action",
+    "proto": "network_protocol", "protocol": "network_protocol",
+}
+
+IP_FIELDS = {"src_ip", "dst_ip"}
+PORT_FIELDS = {"src_port", "dst_port"}
+
+_GROK_REFERENCE = re.compile(r"%\{(\w+)(?::(\w+))?\}")
+
+# key=value, key="quoted value" or key='quoted value'
+_KV_PATTERN = re.compile(r"""([A-Za-z_][\w.-]*)=(?:"([^"]*)"|'([^']*)'|([^\s,;]*))""")
+
+
+def compile_grok(expression: str) -> Pattern:
+    """
+    Compile a grok-style expression into a regular expression.
+
+    Args:
+        expression: Pattern using %{NAME} and %{NAME:field} references
+
+    Returns:
+        Compiled regex with a named group per field
+
+    Raises:
+        ValueError: If the expression references an unknown base pattern
+    """
+    def replace(match: "re.Match") -> str:
+        base, field = match.group(1), match.group(2)
+        if base not in GROK_BASE_PATTERNS:
+            raise ValueError(f"Unknown grok pattern: {base}")
+        body = GROK_BASE_PATTERNS[base]
+        return f"(?P<{field}>{body})" if field else f"(?:{body})"
+
+    return re.compile(_GROK_REFERENCE.sub(replace, expression))
+
+
+def extract_kv(message: str) -> Dict[str, str]:
+    """
+    Extract key=value pairs from a message.
+
+    Args:
+        message: Log message
+
+    Returns:
+        Lower-cased keys mapped to their (unquoted) values
+    """
+    if "=" not in message:
+        return {}
+    fields = {}
+    for key, double_quoted, single_quoted, bare in _KV_PATTERN.findall(message):
+        value = double_quoted or single_quoted or bare
+        if value:
+            fields[key.lower()] = value
+    return fields
+
+
+class FieldExtractor:
+    """
+    Extract structured fields using extractors selected per source.
+
+    Patterns are compiled once. For each log the dispatch table picks the
+    extractors for its source_ip, else its app_name, else the default list;
+    ``kv`` is the built-in key=value tokenizer and any other name refers to
+    a grok-style pattern. Every extractor is timed separately.
+    """
+
+    KV = "kv"
+
+    def __init__(
+        self,
+        patterns: Optional[Dict[str, str]] = None,
+        dispatch: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Initialize field extractor.
+
+        Args:
+            patterns: Additional or overriding named grok-style patterns
+            dispatch: Extractor lists under default, app_name and source_ip
+        """
+        expressions = dict(DEFAULT_PATTERNS)
+        expressions.update(patterns or {})
+        self.patterns: Dict[str, Pattern] = {
+            name: compile_grok(expression) for name, expression in expressions.items()
+        }
+
+        dispatch = dispatch or DEFAULT_DISPATCH
+        self.default: List[str] = list(dispatch.get("default", []))
+        self.by_app: Dict[str, List[str]] = dict(dispatch.get("app_name", {}))
+        self.by_source: Dict[str, List[str]] = dict(dispatch.get("source_ip", {}))
+
+        for names in [self.default, *self.by_app.values(), *self.by_source.values()]:
+            for name in names:
+                if name != self.KV and name not in self.patterns:
+                    raise ValueError(f"Field extraction dispatch uses unknown pattern {name}")
+
+    @classmethod
+    def from_settings(cls, settings) -> "FieldExtractor":
+        """
+        Build a field extractor from service settings.
+
+        Args:
+            settings: Processor settings
+
+        Returns:
+            Configured field extractor
+        """
+        if not settings.processor_field_extraction_rules_file:
+            return cls()
+
+        with open(settings.processor_field_extraction_rules_file, encoding="utf-8") as f:
+            config = json.load(f)
+        extractor = cls(patterns=config.get("patterns"), dispatch=config.get("dispatch"))
+        logger.info(
+            "field_extraction_configured",
+            patterns=list(extractor.patterns),
+            apps=list(extractor.by_app),
+            sources=list(extractor.by_source),
+        )
+        return extractor
+
+    def extractors_for(self, log: Dict[str, Any]) -> List[str]:
+        """
+        Get the extractor names for a log.
+
+        Args:
+            log: Log document
+
+        Returns:
+            Extractor names in the order they are applied
+        """
+        extractors = self.by_source.get(log.get("source_ip") or "")
+        if extractors is None:
+            extractors = self.by_app.get(log.get("app_name") or "")
+        return self.default if extractors is None else extractors
+
+    def extract(self, log: Dict[str, Any], message: str) -> Dict[str, str]:
+        """
+        Run the extractors selected for a log.
+
+        Args:
+            log: Log document (source_ip and app_name select extractors)
+            message: Log message
+
+        Returns:
+            Extracted fields; earlier extractors win on conflicts
+        """
+        fields: Dict[str, str] = {}
+        for name in self.extractors_for(log):
+            started = time.perf_counter()
+            if name == self.KV:
+                found = extract_kv(message)
+            else:
+                match = self.patterns[name].search(message)
+                found = {k: v for k, v in match.groupdict().items() if v} if match else {}
+            field_extraction_duration_seconds.labels(pattern=name).observe(time.perf_counter() - started)
+            field_extractions_total.labels(pattern=name, result="matched" if found else "miss").inc()
+
+            for key, value in found.items():
+                fields.setdefault(key, value)
+        return fields
+
+    @staticmethod
+    def normalize(fields: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Map well-known fields to typed top-level document fields.
+
+        Values that do not fit the target type (e.g. an invalid IP address)
+        are left out, so they cannot break indexing.
+
+        Args:
+            fields: Extracted fields
+
+        Returns:
+            Document fields such as src_ip, dst_port, user and action
+        """
+        normalized: Dict[str, Any] = {}
+        for key, value in fields.items():
+            target = FIELD_ALIASES.get(key)
+            if target is None or target in normalized:
+                continue
+            if target in IP_FIELDS:
+                try:
+                    value = str(ipaddress.ip_address(value))
+                except ValueError:
+                    continue
+            elif target in PORT_FIELDS:
+                if not value.isdigit() or int(value) > 65535:
+                    continue
+                value = int(value)
+            normalized[target] = value
+        return normalized
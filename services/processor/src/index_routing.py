@@ -0,0 +1,161 @@
+"""
+Routing of documents to index families by severity, facility and tags.
+"""
+import json
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from logger import get_logger
+from metrics import documents_routed_total
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class IndexFamily:
+    """A group of indices sharing a name suffix and index settings."""
+    name: str
+    suffix: str = ""
+    shards: int = 2
+    replicas: int = 1
+    refresh_interval: str = "30s"
+
+
+@dataclass
+class RoutingRule:
+    """Send matching documents to a family, optionally sampling them."""
+    name: str
+    family: str
+    severities: List[int] = field(default_factory=list)
+    facilities: List[Any] = field(default_factory=list)  # numbers or names
+    tags: List[str] = field(default_factory=list)
+    app_names: List[str] = field(default_factory=list)
+    sample_rate: float = 1.0
+
+    def matches(self, log: Dict[str, Any]) -> bool:
+        """
+        Check whether a log matches every configured condition.
+
+        Args:
+            log: Enriched log document
+
+        Returns:
+            True if the rule applies
+        """
+        if self.severities and log.get("severity") not in self.severities:
+            return False
+        if self.facilities and (
+            log.get("facility") not in self.facilities
+            and log.get("facility_name") not in self.facilities
+        ):
+            return False
+        if self.tags and not any(tag in self.tags for tag in log.get("tags", [])):
+            return False
+        if self.app_names and log.get("app_name") not in self.app_names:
+            return False
+        return True
+
+
+# Security-relevant logs stay hot; informational and debug chatter goes to
+# a single-shard, replica-free family with its own (short) ISM retention.
+DEFAULT_ROUTING: Dict[str, Any] = {
+    "default_family": "hot",
+    "families": {
+        "hot": {"suffix": "", "shards": 2, "replicas": 1},
+        "low": {"suffix": "low", "shards": 1, "replicas": 0, "refresh_interval": "60s"},
+    },
+    "rules": [
+        {"name": "security", "family": "hot", "tags": ["security", "authentication", "critical"]},
+        {"name": "low_severity", "family": "low", "severities": [6, 7]},
+    ],
+}
+
+
+class IndexRouter:
+    """
+    Pick the index family for each document.
+
+    Rules are evaluated in order and the first match wins. Sampling is
+    deterministic per document, so a replayed record gets the same decision.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize index router.
+
+        Args:
+            config: Routing configuration (families, rules, default_family);
+                None routes everything to a single default family
+        """
+        config = config or {"default_family": "hot", "families": {"hot": {}}, "rules": []}
+
+        self.families: Dict[str, IndexFamily] = {
+            name: IndexFamily(name=name, **options)
+            for name, options in config.get("families", {}).items()
+        }
+        self.default_family = self.families[config.get("default_family", "hot")]
+
+        self.rules: List[RoutingRule] = []
+        for options in config.get("rules", []):
+            rule = RoutingRule(**options)
+            if rule.family not in self.families:
+                raise ValueError(f"Routing rule {rule.name} uses unknown family {rule.family}")
+            if not 0.0 <= rule.sample_rate <= 1.0:
+                raise ValueError(f"Routing rule {rule.name} has invalid sample_rate {rule.sample_rate}")
+            self.rules.append(rule)
+
+    @classmethod
+    def from_settings(cls, settings) -> "IndexRouter":
+        """
+        Build a router from service settings.
+
+        Args:
+            settings: Processor settings
+
+        Returns:
+            Configured router
+        """
+        if not settings.opensearch_routing_enabled:
+            return cls()
+
+        if settings.opensearch_routing_rules_file:
+            with open(settings.opensearch_routing_rules_file, encoding="utf-8") as f:
+                config = json.load(f)
+        else:
+            config = DEFAULT_ROUTING
+
+        router = cls(config)
+        logger.info(
+            "index_routing_configured",
+            families=list(router.families),
+            rules=[rule.name for rule in router.rules],
+        )
+        return router
+
+    @staticmethod
+    def _sampled_in(log: Dict[str, Any], rate: float) -> bool:
+        if rate >= 1.0:
+            return True
+        key = log.get("event_id") or f"{log.get('fingerprint', '')}|{log.get('received_at', '')}"
+        return zlib.crc32(key.encode()) / 0xFFFFFFFF < rate
+
+    def route(self, log: Dict[str, Any]) -> Optional[IndexFamily]:
+        """
+        Get the index family for a document.
+
+        Args:
+            log: Enriched log document
+
+        Returns:
+            Index family, or None if the document was sampled out
+        """
+        for rule in self.rules:
+            if rule.matches(log):
+                if not self._sampled_in(log, rule.sample_rate):
+                    documents_routed_total.labels(family=rule.family, result="sampled_out").inc()
+                    return None
+                documents_routed_total.labels(family=rule.family, result="indexed").inc()
+                return self.families[rule.family]
+
+        documents_routed_total.labels(family=self.default_family.name, result="indexed").inc()
+        return self.default_family
@@ -0,0 +1,140 @@
+"""
+Validated IPv4/IPv6 address extraction and classification.
+"""
+import ipaddress
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+
+# Only valid dotted quads: no octet above 255, no leading zeros, and not part
+# of a longer dotted number such as a version string. The leading (?=\d)
+# lets the engine skip non-digit positions cheaply.
+IPV4_PATTERN = re.compile(rf"(?=\d)(?<![\d.]){_OCTET}(?:\.{_OCTET}){{3}}(?!\.?\d)")
+
+# Anything shaped like an IPv6 address (validated afterwards)
+IPV6_CANDIDATE_PATTERN = re.compile(
+    r"(?<![\w:.])(?:[0-9A-Fa-f]{0,4}:){2,7}(?:[0-9A-Fa-f]{1,4}|(?:\d{1,3}\.){3}\d{1,3})?(?![\w:.])"
+)
+
+PRIVATE = "private"
+PUBLIC = "public"
+LOOPBACK = "loopback"
+LINK_LOCAL = "link_local"
+MULTICAST = "multicast"
+RESERVED = "reserved"
+
+
+def classify_ipv4(ip: str) -> str:
+    """
+    Classify a valid dotted-quad IPv4 address.
+
+    Args:
+        ip: IPv4 address
+
+    Returns:
+        Address class (private, public, loopback, link_local, multicast, reserved)
+    """
+    first, second, *_ = ip.split(".", 2)
+    a = int(first)
+    b = int(second)
+    if a == 10 or (a == 172 and 16 <= b <= 31) or (a == 192 and b == 168) or (a == 100 and 64 <= b <= 127):
+        return PRIVATE
+    if a == 127:
+        return LOOPBACK
+    if a == 169 and b == 254:
+        return LINK_LOCAL
+    if 224 <= a <= 239:
+        return MULTICAST
+    if a == 0 or a >= 240:
+        return RESERVED
+    return PUBLIC
+
+
+@lru_cache(maxsize=4096)
+def parse_ipv6(candidate: str) -> Optional[Tuple[str, str]]:
+    """
+    Validate and classify an IPv6 candidate.
+
+    Args:
+        candidate: Text shaped like an IPv6 address
+
+    Returns:
+        Compressed address and its class, or None if it is not valid
+    """
+    if candidate == "::" or ("::" not in candidate and candidate.count(":") != 7 and "." not in candidate):
+        return None
+    try:
+        address = ipaddress.IPv6Address(candidate)
+    except ValueError:
+        return None
+
+    if address.ipv4_mapped:
+        mapped = str(address.ipv4_mapped)
+        return mapped, classify_ipv4(mapped)
+    if address.is_loopback:
+        cls = LOOPBACK
+    elif address.is_link_local:
+        cls = LINK_LOCAL
+    elif address.is_multicast:
+        cls = MULTICAST
+    elif address.is_unspecified or address.is_reserved:
+        cls = RESERVED
+    elif address.is_private:
+        cls = PRIVATE
+    else:
+        cls = PUBLIC
+    return address.compressed, cls
+
+
+class IPExtractor:
+    """
+    Extract valid IPv4 and IPv6 addresses from messages.
+
+    IPv4 octets are validated by the pattern itself and classified from the
+    octets, so the common case never builds ``ipaddress`` objects. IPv6 needs
+    a real parse, which is only done for colon-rich candidates and cached.
+    Results are deduplicated, keeping the order of first occurrence.
+    """
+
+    def __init__(self, ipv6: bool = True):
+        """
+        Initialize IP extractor.
+
+        Args:
+            ipv6: Whether to look for IPv6 addresses as well
+        """
+        self.ipv6 = ipv6
+
+    def extract(self, message: str) -> Tuple[List[str], Dict[str, str], List[Tuple[int, int]]]:
+        """
+        Extract addresses from a message.
+
+        Args:
+            message: Log message
+
+        Returns:
+            Unique addresses, a mapping of address to class, and the spans of
+            every valid occurrence
+        """
+        found: List[Tuple[int, int, str, str]] = []
+
+        if "." in message:
+            for match in IPV4_PATTERN.finditer(message):
+                ip = match.group()
+                found.append((match.start(), match.end(), ip, classify_ipv4(ip)))
+
+        if self.ipv6 and ("::" in message or message.count(":") >= 7):
+            ipv4_count = len(found)
+            for match in IPV6_CANDIDATE_PATTERN.finditer(message):
+                parsed = parse_ipv6(match.group())
+                if parsed is not None:
+                    found.append((match.start(), match.end(), *parsed))
+            if ipv4_count and len(found) > ipv4_count:
+                found.sort()
+
+        classes: Dict[str, str] = {}
+        for _, _, ip, cls in found:
+            classes.setdefault(ip, cls)
+        return list(classes), classes, [(start, end) for start, end, _, _ in found]
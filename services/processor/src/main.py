@@ -4,8 +4,8 @@ Main entry point for Log Processor Service.
 import asyncio
 import signal
 import sys
-from typing import Optional, List, Dict, Any
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from typing import Optional, List
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, TopicPartition
 from aiokafka.errors import KafkaError
 import json
 from config import settings
@@ -13,12 +13,21 @@ from logger import configure_logging, get_logger
 from metrics import (
     start_metrics_server,
     messages_consumed_total,
-    messages_processed_total,
     processing_duration_seconds,
-    batch_size,
 )
 from enricher import LogEnricher
+from enrichment_cache import EnrichmentCache
+from dns_resolver import ReverseDNSLookup
+from pipeline import ProcessingPipeline
+from circuit_breaker import CircuitBreaker
+from partition_manager import PartitionManager, PartitionRebalanceListener
 from opensearch_client import OpenSearchClient
+from storage_profile import StorageProfile
+from index_routing import IndexRouter
+from rollups import RollupAggregator
+from archive import ParquetArchive
+from template_miner import TemplateMiner
+from field_extraction import FieldExtractor
 
 # Configure logging
 configure_logging(settings.log_level)
@@ -34,6 +43,12 @@ class LogProcessorService:
         self.producer: Optional[AIOKafkaProducer] = None
         self.opensearch: Optional[OpenSearchClient] = None
         self.enricher: Optional[LogEnricher] = None
+        self.enrichment_cache: Optional[EnrichmentCache] = None
+        self.partitions: Optional[PartitionManager] = None
+        self.indexing_breaker: Optional[CircuitBreaker] = None
+        self.rollups: Optional[RollupAggregator] = None
+        self.archive: Optional[ParquetArchive] = None
+        self.template_miner: Optional[TemplateMiner] = None
         self.shutdown_event = asyncio.Event()
         self._processing_tasks: List[asyncio.Task] = []
 
@@ -45,17 +60,24 @@ class LogProcessorService:
         while retry_count < max_retries:
             try:
                 self.consumer = AIOKafkaConsumer(
-                    settings.kafka_topic_raw_logs,
                     bootstrap_servers=settings.kafka_servers_list,
                     group_id=settings.kafka_consumer_group_processor,
                     auto_offset_reset="earliest",
-                    enable_auto_commit=True,
-                    auto_commit_interval_ms=5000,
+                    enable_auto_commit=False,
                     value_deserializer=lambda m: json.loads(m.decode("utf-8")),
                     max_poll_records=settings.processor_batch_size,
                     session_timeout_ms=30000,
                     heartbeat_interval_ms=10000,
                 )
+                self.partitions = PartitionManager(
+                    self.consumer,
+                    self._create_pipeline,
+                    flush_timeout=settings.processor_flush_timeout,
+                )
+                self.consumer.subscribe(
+                    [settings.kafka_topic_raw_logs],
+                    listener=PartitionRebalanceListener(self.partitions),
+                )
                 await self.consumer.start()
                 logger.info("kafka_consumer_started", topic=settings.kafka_topic_raw_logs)
                 return
@@ -103,72 +125,69 @@ class LogProcessorService:
                 else:
                     raise
 
-    async def process_batch(self, messages: List[Dict[str, Any]]) -> None:
+    def _create_pipeline(self, tp: TopicPartition) -> ProcessingPipeline:
         """
-        Process a batch of messages.
+        Build the processing pipeline for one partition.
 
         Args:
-            messages: List of raw log messages
-        """
-        if not messages:
-            return
+            tp: Assigned topic partition
 
-        with processing_duration_seconds.labels(operation="batch_processing").time():
-            batch_size.observe(len(messages))
-
-            # Enrich messages
-            enriched_messages = []
-            for msg in messages:
-                try:
-                    enriched = self.enricher.enrich(msg)
-                    enriched_messages.append(enriched)
-                    messages_processed_total.labels(status="success").inc()
-                except Exception as e:
-                    logger.error("message_enrichment_failed", error=str(e), message=str(msg)[:100])
-                    messages_processed_total.labels(status="failed").inc()
-
-            if not enriched_messages:
-                return
-
-            # Index to OpenSearch
-            try:
-                indexed_count = await self.opensearch.index_logs(enriched_messages)
-                logger.info(
-                    "batch_indexed",
-                    total=len(enriched_messages),
-                    indexed=indexed_count,
-                )
-            except Exception as e:
-                logger.error("batch_indexing_failed", error=str(e))
-
-            # Send to processed logs topic
-            try:
-                for enriched in enriched_messages:
-                    await self.producer.send(
-                        settings.kafka_topic_processed_logs,
-                        value=enriched,
-                    )
-            except Exception as e:
-                logger.error("batch_kafka_send_failed", error=str(e))
+        Returns:
+            Unstarted processing pipeline
+        """
+        return ProcessingPipeline(
+            enricher=self.enricher,
+            opensearch=self.opensearch,
+            producer=self.producer,
+            topic=settings.kafka_topic_processed_logs,
+            queue_size=settings.processor_pipeline_queue_size,
+            name=f"{tp.topic}-{tp.partition}",
+            breaker=self.indexing_breaker,
+            rollups=self.rollups,
+            archive=self.archive,
+            retry_base=settings.processor_sink_retry_base,
+            retry_max=settings.processor_sink_retry_max,
+        )
+
+    def _pause_consumption(self) -> None:
+        """Pause all partitions while the indexing circuit is open."""
+        if self.partitions:
+            self.partitions.pause_all()
+
+    def _resume_consumption(self) -> None:
+        """Resume all partitions once the indexing circuit closes."""
+        if self.partitions:
+            self.partitions.resume_all()
 
     async def consume_and_process(self) -> None:
         """Main consumption loop."""
         logger.info("starting_consumption_loop")
 
-        try:
-            async for msg_batch in self.consumer:
-                if self.shutdown_event.is_set():
-                    break
+        loop = asyncio.get_running_loop()
+        commit_interval = settings.processor_commit_interval_ms / 1000
+        next_commit = loop.time() + commit_interval
 
-                messages_consumed_total.labels(status="success").inc()
+        try:
+            while not self.shutdown_event.is_set():
+                records = await self.consumer.getmany(
+                    timeout_ms=1000,
+                    max_records=settings.processor_batch_size,
+                )
 
-                # Process message
+                # Hand records to their partition pipelines
                 try:
-                    message_data = msg_batch.value
-                    await self.process_batch([message_data])
+                    with processing_duration_seconds.labels(operation="batch_dispatch").time():
+                        await self.partitions.dispatch(records)
                 except Exception as e:
                     logger.error("message_processing_failed", error=str(e))
-                    messages_consumed_total.labels(status="failed").inc()
+                    messages_consumed_total.labels(status="failed").inc(
+                        sum(len(r) for r in records.values())
+                    )
+
+                # Commit offsets of fully delivered batches
+                if loop.time() >= next_commit:
+                    await self.partitions.commit()
+                    next_commit = loop.time() + commit_interval
 
         except KafkaError as e:
             logger.error("kafka_consumption_error", error=str(e))
@@ -184,8 +203,24 @@ class LogProcessorService:
             start_metrics_server(settings.prometheus_port)
 
             # Initialize components
+            self.enrichment_cache = EnrichmentCache.from_settings(settings)
+            lookups = []
+            if settings.processor_rdns_enabled:
+                lookups.append(ReverseDNSLookup.from_settings(settings))
+
+            if settings.processor_templates_enabled:
+                self.template_miner = TemplateMiner.from_settings(settings)
+
+            field_extractor = None
+            if settings.processor_field_extraction_enabled:
+                field_extractor = FieldExtractor.from_settings(settings)
+
             self.enricher = LogEnricher(
-                geo_ip_enabled=settings.processor_geo_ip_enabled
+                geo_ip_enabled=settings.processor_geo_ip_enabled,
+                cache=self.enrichment_cache,
+                lookups=lookups,
+                template_miner=self.template_miner,
+                field_extractor=field_extractor,
             )
 
             self.opensearch = OpenSearchClient(
@@ -199,19 +234,54 @@ class LogProcessorService:
                 bulk_size=settings.opensearch_bulk_size,
                 bulk_timeout=settings.opensearch_bulk_timeout,
                 max_retries=settings.opensearch_max_retries,
+                storage_profile=StorageProfile(
+                    settings.opensearch_storage_profile,
+                    raw_retention=settings.opensearch_raw_retention or None,
+                ),
+                router=IndexRouter.from_settings(settings),
             )
 
-            # Start Kafka components
-            await self.start_consumer()
+            if settings.processor_rollups_enabled:
+                self.rollups = RollupAggregator(
+                    self.opensearch,
+                    index_prefix=settings.opensearch_rollup_index_prefix,
+                )
+
+            if settings.processor_archive_enabled:
+                self.archive = ParquetArchive.from_settings(settings)
+
+            # Pause consumption while OpenSearch cannot take writes
+            self.indexing_breaker = CircuitBreaker(
+                name="opensearch",
+                failure_threshold=settings.processor_breaker_failure_threshold,
+                reset_timeout=settings.processor_breaker_reset_timeout,
+                max_reset_timeout=settings.processor_breaker_max_reset_timeout,
+                on_open=self._pause_consumption,
+                on_close=self._resume_consumption,
+            )
+
+            # Start Kafka components (producer first: pipelines start on assignment)
             await self.start_producer()
+            await self.start_consumer()
+
+            task = asyncio.create_task(self.consume_and_process())
+            self._processing_tasks.append(task)
 
-            # Start processing workers
-            for i in range(settings.processor_workers):
-                task = asyncio.create_task(self.consume_and_process())
+            if self.rollups:
+                task = asyncio.create_task(self.rollups.run(settings.processor_rollup_flush_interval))
                 self._processing_tasks.append(task)
-                logger.info("processing_worker_started", worker_id=i)
 
-            logger.info("service_started", workers=settings.processor_workers)
+            if self.archive:
+                task = asyncio.create_task(self.archive.run(settings.processor_archive_roll_check_interval))
+                self._processing_tasks.append(task)
+
+            if self.template_miner and self.template_miner.state_file:
+                task = asyncio.create_task(
+                    self.template_miner.run(settings.processor_template_save_interval)
+                )
+                self._processing_tasks.append(task)
+
+            logger.info("service_started")
 
         except Exception as e:
             logger.error("service_start_failed", error=str(e))
@@ -230,6 +300,21 @@ class LogProcessorService:
             if self._processing_tasks:
                 await asyncio.gather(*self._processing_tasks, return_exceptions=True)
 
+            # Drain partition pipelines and commit before closing their sinks
+            if self.partitions:
+                await self.partitions.stop()
+
+            # Write the counts of the drained batches
+            if self.rollups:
+                await self.rollups.flush()
+
+            # Complete open archive files
+            if self.archive:
+                self.archive.close()
+
+            if self.template_miner:
+                await self.template_miner.save()
+
             # Stop Kafka components
             if self.consumer:
                 await self.consumer.stop()
@@ -241,6 +326,10 @@ class LogProcessorService:
             if self.opensearch:
                 self.opensearch.close()
 
+            # Close enrichment cache
+            if self.enrichment_cache:
+                await self.enrichment_cache.close()
+
             logger.info("service_stopped")
 
         except Exception as e:
@@ -0,0 +1,158 @@
+"""
+Single-pass feature extraction for log messages.
+
+Run as a script for a micro-benchmark against the previous per-step scans:
+
+    python message_features.py [iterations]
+"""
+import re
+import sys
+import timeit
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from ip_extraction import PUBLIC, IPExtractor
+
+# Common threat indicators
+THREAT_KEYWORDS = (
+    "exploit", "malware", "ransomware", "trojan", "backdoor",
+    "injection", "xss", "sql injection", "ddos", "brute force",
+    "unauthorized", "breach", "intrusion", "anomaly",
+)
+
+# Substrings that set content tags
+ERROR_TERMS = ("error", "fail")
+AUTH_TERMS = ("auth", "login")
+
+# Unvalidated dotted quads, as matched before IPExtractor (benchmark only)
+_LEGACY_IPV4_PATTERN = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")
+
+
+@dataclass(slots=True)
+class MessageFeatures:
+    """Everything the enrichment steps need to know about a message."""
+    message: str
+    lower: str
+    tokens: List[str]
+    ips: List[str] = field(default_factory=list)
+    ip_classes: Dict[str, str] = field(default_factory=dict)
+    ip_spans: List[Tuple[int, int]] = field(default_factory=list)
+    threat_keywords: List[str] = field(default_factory=list)
+    has_error: bool = False
+    has_auth: bool = False
+
+    @property
+    def public_ips(self) -> List[str]:
+        """Addresses classified as public."""
+        return [ip for ip in self.ips if self.ip_classes[ip] == PUBLIC]
+
+
+class MessageFeatureExtractor:
+    """
+    Compute MessageFeatures with one lower-casing and one IP scan.
+
+    Term lookups are plain substring tests on the shared lower-cased text;
+    in CPython these run in C and beat a single regex alternation over all
+    terms, so "one pass" means no repeated lower-casing or re-scanning by
+    later steps rather than one regex.
+    """
+
+    def __init__(
+        self,
+        threat_keywords: Sequence[str] = THREAT_KEYWORDS,
+        ip_extractor: Optional[IPExtractor] = None,
+    ):
+        """
+        Initialize feature extractor.
+
+        Args:
+            threat_keywords: Lower-case threat indicator terms
+            ip_extractor: Validating IP extractor (IPv4 and IPv6 by default)
+        """
+        self.threat_keywords = tuple(threat_keywords)
+        self.ip_extractor = ip_extractor or IPExtractor()
+
+    def extract(self, message: str) -> MessageFeatures:
+        """
+        Compute the features of a message.
+
+        Args:
+            message: Log message
+
+        Returns:
+            Message features
+        """
+        lower = message.lower()
+        threats = [keyword for keyword in self.threat_keywords if keyword in lower]
+
+        ips, classes, spans = self.ip_extractor.extract(message)
+
+        return MessageFeatures(
+            message,
+            lower,
+            message.split(),
+            ips,
+            classes,
+            spans,
+            threats,
+            "error" in lower or "fail" in lower,
+            "auth" in lower or "login" in lower,
+        )
+
+
+def _legacy_features(message: str) -> Tuple[List[str], List[str], bool, bool, List[str]]:
+    """Per-step scans as LogEnricher.enrich did them before MessageFeatures."""
+    from template_miner import WILDCARD, _VARIABLE_TOKEN
+
+    ips = _LEGACY_IPV4_PATTERN.findall(message)
+    message_lower = message.lower()
+    threats = [keyword for keyword in THREAT_KEYWORDS if keyword in message_lower]
+    has_error = "error" in message.lower() or "fail" in message.lower()
+    has_auth = "auth" in message.lower() or "login" in message.lower()
+    # Template mining split the message twice and regex-tested every token
+    message.split()
+    masked = [WILDCARD if _VARIABLE_TOKEN.fullmatch(token) else token for token in message.split()]
+    return ips, threats, has_error, has_auth, masked
+
+
+SAMPLE_MESSAGES = [
+    "Accepted password for alice from 192.168.1.10 port 52211 ssh2",
+    "Failed password for invalid user admin from 203.0.113.7 port 4242 ssh2",
+    "kernel: IN=eth0 OUT= SRC=198.51.100.23 DST=10.0.0.5 PROTO=TCP SPT=443 DPT=51515",
+    "GET /index.html HTTP/1.1 200 5120 \"-\" \"Mozilla/5.0 (X11; Linux x86_64)\"",
+    "Possible SQL injection attempt blocked: id=1 OR 1=1 from 10.1.2.3",
+    "systemd[1]: Started Session 42 of user root.",
+    "Disk usage on /var at 91% - cleanup job scheduled",
+    "unauthorized access to /admin denied for 172.16.0.4",
+]
+
+
+def main(iterations: int = 20000) -> None:
+    """
+    Print per-message CPU time of the legacy scans and of one feature pass
+    (both including the template miner's token masking).
+
+    Args:
+        iterations: Passes over the sample messages
+    """
+    from template_miner import TemplateMiner
+
+    extractor = MessageFeatureExtractor()
+    mask = TemplateMiner.mask
+    messages = SAMPLE_MESSAGES
+
+    def legacy():
+        for message in messages:
+            _legacy_features(message)
+
+    def single_pass():
+        for message in messages:
+            mask(extractor.extract(message).tokens)
+
+    count = iterations * len(messages)
+    for name, func in (("legacy", legacy), ("single_pass", single_pass)):
+        seconds = min(timeit.repeat(func, number=iterations, repeat=5))
+        print(f"{name:12s} {seconds / count * 1e6:8.2f} us/message")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -43,6 +43,113 @@ enrichment_duration_seconds = Histogram(
     ["enrichment_type"]
 )
 
+enrichment_cache_requests_total = Counter(
+    "processor_enrichment_cache_requests_total",
+    "Total number of enrichment cache lookups",
+    ["tier", "result"]
+)
+
+enrichment_cache_hit_ratio = Gauge(
+    "processor_enrichment_cache_hit_ratio",
+    "Cumulative enrichment cache hit ratio",
+    ["tier"]
+)
+
+rdns_lookups_total = Counter(
+    "processor_rdns_lookups_total",
+    "Total number of reverse-DNS queries by outcome",
+    ["result"]
+)
+
+pipeline_queue_depth = Gauge(
+    "processor_pipeline_queue_depth",
+    "Number of batches waiting in a pipeline stage queue",
+    ["stage"]
+)
+
+pipeline_stage_duration_seconds = Histogram(
+    "processor_pipeline_stage_duration_seconds",
+    "Time spent handling one batch in a pipeline stage",
+    ["stage"]
+)
+
+pipeline_sink_retries_total = Counter(
+    "processor_pipeline_sink_retries_total",
+    "Total number of failed batch deliveries retried per sink",
+    ["sink"]
+)
+
+partition_workers = Gauge(
+    "processor_partition_workers",
+    "Number of partition pipelines currently running",
+)
+
+circuit_breaker_state = Gauge(
+    "processor_circuit_breaker_state",
+    "Circuit breaker state (0=closed, 1=half-open, 2=open)",
+    ["breaker"]
+)
+
+circuit_breaker_transitions_total = Counter(
+    "processor_circuit_breaker_transitions_total",
+    "Total number of circuit breaker state transitions",
+    ["breaker", "state"]
+)
+
+documents_routed_total = Counter(
+    "processor_documents_routed_total",
+    "Total number of documents routed to an index family",
+    ["family", "result"]
+)
+
+rollup_rows_flushed_total = Counter(
+    "processor_rollup_rows_flushed_total",
+    "Total number of rollup rows upserted into OpenSearch"
+)
+
+rollup_pending_rows = Gauge(
+    "processor_rollup_pending_rows",
+    "Number of rollup rows waiting for the next flush"
+)
+
+archive_rows_written_total = Counter(
+    "processor_archive_rows_written_total",
+    "Total number of logs written to the cold archive"
+)
+
+archive_files_closed_total = Counter(
+    "processor_archive_files_closed_total",
+    "Total number of archive files completed"
+)
+
+archive_bytes_written_total = Counter(
+    "processor_archive_bytes_written_total",
+    "Total size of completed archive files in bytes"
+)
+
+template_clusters = Gauge(
+    "processor_template_clusters",
+    "Number of log templates currently known"
+)
+
+template_cluster_evictions_total = Counter(
+    "processor_template_cluster_evictions_total",
+    "Total number of log templates evicted from the bounded table"
+)
+
+field_extraction_duration_seconds = Histogram(
+    "processor_field_extraction_duration_seconds",
+    "Time spent per field extraction pattern",
+    ["pattern"],
+    buckets=[0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01]
+)
+
+field_extractions_total = Counter(
+    "processor_field_extractions_total",
+    "Total number of field extraction attempts",
+    ["pattern", "result"]
+)
+
 opensearch_errors = Counter(
     "opensearch_errors_total",
     "Total number of OpenSearch errors",
@@ -2,15 +2,28 @@
 OpenSearch client for indexing logs.
 """
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 from opensearchpy import OpenSearch, helpers
-from opensearchpy.exceptions import OpenSearchException
+from opensearchpy.exceptions import (
+    OpenSearchException,
+    ConnectionError as OpenSearchConnectionError,
+    TransportError,
+)
 from logger import get_logger
 from metrics import messages_indexed_total, opensearch_errors
+from storage_profile import StorageProfile
+from index_routing import IndexRouter, IndexFamily
 
 logger = get_logger(__name__)
 
+# HTTP statuses meaning the cluster cannot take writes right now
+UNAVAILABLE_STATUSES = {429, 502, 503, 504}
+
+
+class OpenSearchUnavailableError(Exception):
+    """Raised when the cluster cannot accept a bulk request at all."""
+
 
 class OpenSearchClient:
     """Manages OpenSearch connection and indexing."""
@@ -27,6 +40,8 @@ class OpenSearchClient:
         bulk_size: int = 500,
         bulk_timeout: int = 30,
         max_retries: int = 3,
+        storage_profile: Optional[StorageProfile] = None,
+        router: Optional[IndexRouter] = None,
     ):
         """
         Initialize OpenSearch client.
@@ -42,6 +57,8 @@ class OpenSearchClient:
             bulk_size: Number of documents per bulk request
             bulk_timeout: Timeout for bulk operations in seconds
             max_retries: Maximum number of retry attempts
+            storage_profile: Controls stored fields and raw mapping
+            router: Picks the index family for each document
         """
         self.host = host
         self.port = port
@@ -51,6 +68,8 @@ class OpenSearchClient:
         self.bulk_size = bulk_size
         self.bulk_timeout = bulk_timeout
         self.max_retries = max_retries
+        self.storage_profile = storage_profile or StorageProfile()
+        self.router = router or IndexRouter()
 
         self.client = OpenSearch(
             hosts=[{"host": host, "port": port}],
@@ -65,12 +84,13 @@ class OpenSearchClient:
 
         self._index_cache = set()
 
-    def _get_index_name(self, date: datetime = None) -> str:
+    def _get_index_name(self, date: datetime = None, family: Optional[IndexFamily] = None) -> str:
         """
         Get index name based on rotation strategy.
 
         Args:
             date: Date for index (defaults to now)
+            family: Index family (adds its suffix after the prefix)
 
         Returns:
             Index name
@@ -87,14 +107,17 @@ class OpenSearchClient:
         else:
             suffix = "default"
 
+        if family is not None and family.suffix:
+            return f"{self.index_prefix}-{family.suffix}-{suffix}"
         return f"{self.index_prefix}-{suffix}"
 
-    def _ensure_index_exists(self, index_name: str) -> None:
+    def _ensure_index_exists(self, index_name: str, family: Optional[IndexFamily] = None) -> None:
         """
         Ensure index exists with proper mapping.
 
         Args:
             index_name: Index name
+            family: Index family providing shard/replica settings
         """
         if index_name in self._index_cache:
             return
@@ -129,22 +152,37 @@ class OpenSearchClient:
                             "proc_id": {"type": "keyword"},
                             "format": {"type": "keyword"},
                             "extracted_ips": {"type": "ip"},
+                            "ip_classes": {"type": "keyword"},
+                            "public_ips": {"type": "ip"},
                             "has_threat_indicators": {"type": "boolean"},
                             "threat_keywords": {"type": "keyword"},
                             "threat_score": {"type": "integer"},
                             "tags": {"type": "keyword"},
                             "fingerprint": {"type": "keyword"},
+                            "event_id": {"type": "keyword"},
+                            "template_id": {"type": "keyword"},
+                            "template": {"type": "keyword", "ignore_above": 1024},
+                            "template_params": {"type": "keyword", "ignore_above": 256},
+                            "fields": {"type": "flat_object"},
+                            "src_ip": {"type": "ip"},
+                            "dst_ip": {"type": "ip"},
+                            "src_port": {"type": "integer"},
+                            "dst_port": {"type": "integer"},
+                            "user": {"type": "keyword"},
+                            "action": {"type": "keyword"},
+                            "network_protocol": {"type": "keyword"},
                         }
                     },
                     "settings": {
-                        "number_of_shards": 2,
-                        "number_of_replicas": 1,
-                        "refresh_interval": "30s",
+                        "number_of_shards": family.shards if family else 2,
+                        "number_of_replicas": family.replicas if family else 1,
+                        "refresh_interval": family.refresh_interval if family else "30s",
                         "index.codec": "best_compression",
                         "index.query.default_field": ["message", "hostname", "app_name"],
                     },
                 }
 
+                mapping = self.storage_profile.apply_mapping(mapping)
                 self.client.indices.create(index=index_name, body=mapping)
                 logger.info("opensearch_index_created", index=index_name)
 
@@ -163,21 +201,34 @@ class OpenSearchClient:
 
         Returns:
             Number of successfully indexed documents
+
+        Raises:
+            OpenSearchUnavailableError: If the cluster is unreachable or
+                rejected any document as overloaded (429/5xx). The whole
+                batch must be retried; documents already indexed come back
+                as duplicates thanks to their deterministic IDs
         """
         if not logs:
             return 0
 
-        index_name = self._get_index_name()
-        self._ensure_index_exists(index_name)
-
         # Prepare bulk actions
-        actions = [
-            {
-                "_index": index_name,
-                "_source": log,
-            }
-            for log in logs
-        ]
+        actions = []
+        for log in logs:
+            family = self.router.route(log)
+            if family is None:
+                continue  # Sampled out of indexing (still published to Kafka)
+            index_name = self._get_index_name(self._document_date(log), family)
+            self._ensure_index_exists(index_name, family)
+
+            action = {"_index": index_name, "_source": self.storage_profile.prepare(log)}
+            if log.get("event_id"):
+                # Deterministic ID: a replayed document conflicts instead of duplicating
+                action["_op_type"] = "create"
+                action["_id"] = log["event_id"]
+            actions.append(action)
+
+        if not actions:
+            return 0
 
         try:
             # Run bulk operation in thread pool (opensearch-py is sync)
@@ -194,6 +245,14 @@ class OpenSearchClient:
             )
 
             messages_indexed_total.labels(status="success").inc(success)
+
+            # 409 on create means the document already exists (retry or replay)
+            duplicates = [item for item in failed if self._item_status(item) == 409]
+            if duplicates:
+                failed = [item for item in failed if self._item_status(item) != 409]
+                messages_indexed_total.labels(status="duplicate").inc(len(duplicates))
+                logger.info("opensearch_bulk_duplicates_skipped", duplicates=len(duplicates))
+
             if failed:
                 messages_indexed_total.labels(status="failed").inc(len(failed))
                 # Log first few errors for debugging
@@ -210,19 +269,129 @@ class OpenSearchClient:
                     failed=len(failed),
                 )
 
+            # Only rejections the cluster may accept later are retried; mapping
+            # and other 4xx errors would fail again and are dropped
+            retryable = [item for item in failed if self._is_retryable(self._item_status(item))]
+            if retryable:
+                raise OpenSearchUnavailableError(f"{len(retryable)} bulk items rejected")
+
             return success
 
+        except OpenSearchUnavailableError:
+            opensearch_errors.labels(error_type="unavailable").inc()
+            raise
+        except TransportError as e:
+            status = getattr(e, "status_code", None)
+            if isinstance(e, OpenSearchConnectionError) or status in UNAVAILABLE_STATUSES or status == "N/A":
+                logger.error("opensearch_unavailable", error=str(e), status=status)
+                opensearch_errors.labels(error_type="unavailable").inc()
+                messages_indexed_total.labels(status="failed").inc(len(actions))
+                raise OpenSearchUnavailableError(str(e)) from e
+            logger.error("opensearch_bulk_failed", error=str(e))
+            opensearch_errors.labels(error_type="bulk_operation").inc()
+            messages_indexed_total.labels(status="failed").inc(len(actions))
+            return 0
         except OpenSearchException as e:
             logger.error("opensearch_bulk_failed", error=str(e))
             opensearch_errors.labels(error_type="bulk_operation").inc()
-            messages_indexed_total.labels(status="failed").inc(len(logs))
+            messages_indexed_total.labels(status="failed").inc(len(actions))
             return 0
         except Exception as e:
             logger.error("opensearch_unexpected_error", error=str(e))
             opensearch_errors.labels(error_type="unexpected").inc()
-            messages_indexed_total.labels(status="failed").inc(len(logs))
+            messages_indexed_total.labels(status="failed").inc(len(actions))
             return 0
 
+    def ensure_index(self, index_name: str, body: Dict[str, Any]) -> None:
+        """
+        Create an index with the given body unless it already exists.
+
+        Args:
+            index_name: Index name
+            body: Index creation body (mappings and settings)
+        """
+        if index_name in self._index_cache:
+            return
+
+        try:
+            if not self.client.indices.exists(index=index_name):
+                self.client.indices.create(index=index_name, body=body)
+                logger.info("opensearch_index_created", index=index_name)
+            self._index_cache.add(index_name)
+        except Exception as e:
+            logger.error("opensearch_index_creation_failed", error=str(e), index=index_name)
+            opensearch_errors.labels(error_type="index_creation").inc()
+
+    async def bulk(self, actions: List[Dict[str, Any]]) -> int:
+        """
+        Run prepared bulk actions (used for auxiliary indices such as rollups).
+
+        Args:
+            actions: Bulk actions
+
+        Returns:
+            Number of successful actions
+        """
+        if not actions:
+            return 0
+
+        loop = asyncio.get_running_loop()
+        success, failed = await loop.run_in_executor(
+            None,
+            lambda: helpers.bulk(
+                self.client,
+                actions,
+                chunk_size=self.bulk_size,
+                request_timeout=self.bulk_timeout,
+                raise_on_error=False,
+            ),
+        )
+        if failed:
+            opensearch_errors.labels(error_type="bulk_item").inc(len(failed))
+            logger.warning("opensearch_bulk_partial_failure", success=success, failed=len(failed))
+        return success
+
+    @staticmethod
+    def _document_date(log: Dict[str, Any]) -> datetime:
+        """Get the date that selects a document's index (stable across replays)."""
+        received_at = log.get("received_at")
+        if received_at:
+            try:
+                return datetime.fromisoformat(str(received_at).replace("Z", "+00:00"))
+            except ValueError:
+                pass
+        return datetime.utcnow()
+
+    @staticmethod
+    def _is_retryable(status: Any) -> bool:
+        return status == 429 or (isinstance(status, int) and status >= 500)
+
+    @staticmethod
+    def _item_status(item: Any) -> Any:
+        if isinstance(item, dict):
+            for result in item.values():
+                if isinstance(result, dict):
+                    return result.get("status")
+        return None
+
+    async def is_available(self) -> bool:
+        """
+        Check whether the cluster can accept writes.
+
+        Returns:
+            True if the cluster responds and is not red
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            health = await loop.run_in_executor(
+                None,
+                lambda: self.client.cluster.health(request_timeout=5),
+            )
+            return health.get("status") != "red"
+        except Exception as e:
+            logger.warning("opensearch_health_check_failed", error=str(e))
+            return False
+
     def close(self) -> None:
         """Close OpenSearch connection."""
         try:
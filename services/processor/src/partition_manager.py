@@ -0,0 +1,218 @@
+"""
+Partition-aware worker management for the processor consumer.
+"""
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+from aiokafka import ConsumerRebalanceListener, TopicPartition
+from logger import get_logger
+from metrics import partition_workers, messages_consumed_total
+from pipeline import ProcessingPipeline
+
+logger = get_logger(__name__)
+
+
+class PartitionManager:
+    """
+    Run one processing pipeline per assigned Kafka partition.
+
+    Records of a partition are always handled by the same pipeline, so
+    per-partition (and therefore per-source) ordering is preserved while
+    partitions are processed in parallel. Offsets are committed manually,
+    only after a batch has been delivered to every sink.
+    """
+
+    def __init__(
+        self,
+        consumer: Any,
+        pipeline_factory: Callable[[TopicPartition], ProcessingPipeline],
+        flush_timeout: float = 30.0,
+    ):
+        """
+        Initialize partition manager.
+
+        Args:
+            consumer: Started AIOKafkaConsumer (manual commits)
+            pipeline_factory: Builds an unstarted pipeline for a partition
+            flush_timeout: Maximum seconds to wait for pipelines to drain on
+                revoke; undelivered batches stay uncommitted and are replayed
+        """
+        self.consumer = consumer
+        self.pipeline_factory = pipeline_factory
+        self.flush_timeout = flush_timeout
+        self.pipelines: Dict[TopicPartition, ProcessingPipeline] = {}
+        self._committed: Dict[TopicPartition, int] = {}
+        self._blocked: Dict[TopicPartition, asyncio.Task] = {}
+        self._backpressure = False
+
+    def _pipeline_for(self, tp: TopicPartition) -> ProcessingPipeline:
+        pipeline = self.pipelines.get(tp)
+        if pipeline is None:
+            pipeline = self.pipeline_factory(tp)
+            pipeline.start()
+            self.pipelines[tp] = pipeline
+            partition_workers.set(len(self.pipelines))
+            if self._backpressure:
+                self.consumer.pause(tp)
+            logger.info("partition_worker_started", topic=tp.topic, partition=tp.partition)
+        return pipeline
+
+    def pause_all(self) -> None:
+        """Stop fetching from every assigned partition (sink backpressure)."""
+        self._backpressure = True
+        if self.pipelines:
+            self.consumer.pause(*self.pipelines)
+        logger.warning("consumption_paused", partitions=len(self.pipelines))
+
+    def resume_all(self) -> None:
+        """Resume fetching, except for partitions still waiting on their pipeline."""
+        self._backpressure = False
+        resumable = [tp for tp in self.pipelines if tp not in self._blocked]
+        if resumable:
+            self.consumer.resume(*resumable)
+        logger.info("consumption_resumed", partitions=len(resumable))
+
+    def assign(self, partitions: List[TopicPartition]) -> None:
+        """
+        Start pipelines for newly assigned partitions.
+
+        Args:
+            partitions: Assigned partitions
+        """
+        for tp in partitions:
+            self._pipeline_for(tp)
+
+    async def dispatch(self, records: Dict[TopicPartition, List[Any]]) -> None:
+        """
+        Hand fetched records to their partition pipelines.
+
+        A partition whose pipeline is full is paused until its batch has been
+        queued, so one slow partition does not stall the others.
+
+        Args:
+            records: Records returned by consumer.getmany()
+        """
+        for tp, partition_records in records.items():
+            if not partition_records:
+                continue
+
+            messages = []
+            for record in partition_records:
+                message = record.value
+                # Kafka position feeds the deterministic document ID
+                message["kafka_partition"] = tp.partition
+                message["kafka_offset"] = record.offset
+                messages.append(message)
+            next_offset = partition_records[-1].offset + 1
+            messages_consumed_total.labels(status="success").inc(len(messages))
+
+            pipeline = self._pipeline_for(tp)
+            if not pipeline.full():
+                await pipeline.submit(messages, offset=next_offset)
+                continue
+
+            self.consumer.pause(tp)
+            self._blocked[tp] = asyncio.create_task(
+                self._submit_blocked(tp, pipeline, messages, next_offset)
+            )
+
+    async def _submit_blocked(
+        self,
+        tp: TopicPartition,
+        pipeline: ProcessingPipeline,
+        messages: List[Dict[str, Any]],
+        next_offset: int,
+    ) -> None:
+        try:
+            await pipeline.submit(messages, offset=next_offset)
+        finally:
+            self._blocked.pop(tp, None)
+            if tp in self.pipelines and not self._backpressure:
+                self.consumer.resume(tp)
+
+    def _completed_offsets(self, partitions: Optional[List[TopicPartition]] = None) -> Dict[TopicPartition, int]:
+        offsets = {}
+        for tp in partitions if partitions is not None else list(self.pipelines):
+            pipeline = self.pipelines.get(tp)
+            if pipeline is None or pipeline.completed_offset is None:
+                continue
+            if pipeline.completed_offset != self._committed.get(tp):
+                offsets[tp] = pipeline.completed_offset
+        return offsets
+
+    async def commit(self, partitions: Optional[List[TopicPartition]] = None) -> None:
+        """
+        Commit offsets of fully delivered batches.
+
+        Args:
+            partitions: Partitions to commit (defaults to all assigned)
+        """
+        offsets = self._completed_offsets(partitions)
+        if not offsets:
+            return
+
+        try:
+            await self.consumer.commit(offsets)
+        except Exception as e:
+            logger.error("offset_commit_failed", error=str(e))
+            return
+
+        self._committed.update(offsets)
+        for tp, offset in offsets.items():
+            pipeline = self.pipelines.get(tp)
+            if pipeline is not None:
+                pipeline.committed(offset)
+
+    async def revoke(self, partitions: List[TopicPartition]) -> None:
+        """
+        Flush and commit revoked partitions, then stop their pipelines.
+
+        Args:
+            partitions: Revoked partitions
+        """
+        revoked = [tp for tp in partitions if tp in self.pipelines]
+        blocked = [self._blocked[tp] for tp in partitions if tp in self._blocked]
+
+        async def drain() -> None:
+            await asyncio.gather(*blocked, return_exceptions=True)
+            await asyncio.gather(*(self.pipelines[tp].flush() for tp in revoked))
+
+        try:
+            await asyncio.wait_for(drain(), timeout=self.flush_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("partition_flush_timeout", partitions=[str(tp) for tp in revoked])
+            for task in blocked:
+                task.cancel()
+        await self.commit(revoked)
+
+        for tp in revoked:
+            await self.pipelines.pop(tp).stop(flush=False)
+            self._committed.pop(tp, None)
+            logger.info("partition_worker_stopped", topic=tp.topic, partition=tp.partition)
+        partition_workers.set(len(self.pipelines))
+
+    async def stop(self) -> None:
+        """Flush, commit and stop all pipelines."""
+        await self.revoke(list(self.pipelines))
+
+
+class PartitionRebalanceListener(ConsumerRebalanceListener):
+    """Keep partition pipelines in step with consumer group rebalances."""
+
+    def __init__(self, manager: PartitionManager):
+        """
+        Initialize rebalance listener.
+
+        Args:
+            manager: Partition manager to notify
+        """
+        self.manager = manager
+
+    async def on_partitions_revoked(self, revoked) -> None:
+        """Flush and commit before partitions move to another consumer."""
+        logger.info("partitions_revoked", partitions=[str(tp) for tp in revoked])
+        await self.manager.revoke(list(revoked))
+
+    async def on_partitions_assigned(self, assigned) -> None:
+        """Start pipelines for the new assignment."""
+        logger.info("partitions_assigned", partitions=[str(tp) for tp in assigned])
+        self.manager.assign(list(assigned))
@@ -0,0 +1,334 @@
+"""
+Staged processing pipeline: enrich, then fan out to OpenSearch and Kafka.
+"""
+import asyncio
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from circuit_breaker import CircuitBreaker
+from logger import get_logger
+from opensearch_client import OpenSearchUnavailableError
+from metrics import (
+    messages_processed_total,
+    batch_size,
+    pipeline_queue_depth,
+    pipeline_sink_retries_total,
+    pipeline_stage_duration_seconds,
+)
+
+logger = get_logger(__name__)
+
+Batch = List[Dict[str, Any]]
+
+
+@dataclass
+class PipelineBatch:
+    """A batch moving through the pipeline."""
+    logs: Batch
+    offset: Optional[int] = None  # Next Kafka offset to commit once delivered
+    pending_sinks: int = 0
+    rollup_counts: Optional[Counter] = None
+
+
+class PipelineStage:
+    """A worker task draining a bounded queue of batches."""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[PipelineBatch], Awaitable[None]],
+        queue_size: int,
+    ):
+        """
+        Initialize pipeline stage.
+
+        Args:
+            name: Stage name used in logs and metrics
+            handler: Coroutine called for each batch
+            queue_size: Maximum number of batches waiting in the queue
+        """
+        self.name = name
+        self.handler = handler
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the stage worker."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def full(self) -> bool:
+        """Check whether the stage queue is full."""
+        return self.queue.full()
+
+    async def put(self, batch: PipelineBatch) -> None:
+        """
+        Enqueue a batch, waiting while the queue is full.
+
+        Args:
+            batch: Pipeline batch
+        """
+        await self.queue.put(batch)
+        pipeline_queue_depth.labels(stage=self.name).inc()
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self.queue.get()
+            pipeline_queue_depth.labels(stage=self.name).dec()
+            start = time.perf_counter()
+            try:
+                await self.handler(batch)
+            except Exception as e:
+                logger.error("pipeline_stage_failed", stage=self.name, error=str(e))
+            finally:
+                pipeline_stage_duration_seconds.labels(stage=self.name).observe(
+                    time.perf_counter() - start
+                )
+                self.queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every queued batch has been handled."""
+        await self.queue.join()
+
+    async def stop(self) -> None:
+        """Cancel the stage worker."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+class ProcessingPipeline:
+    """
+    Enrich batches and deliver them to OpenSearch and Kafka concurrently.
+
+    Stages are connected by bounded queues, so a slow sink applies
+    backpressure to enrichment and, through ``submit``, to consumption.
+    A failed delivery is retried with exponential backoff (``retry_base``
+    seconds doubling up to ``retry_max``) and holds its sink meanwhile, so
+    a batch only counts as completed once every sink accepted it.
+    """
+
+    def __init__(
+        self,
+        enricher: Any,
+        opensearch: Any,
+        producer: Any,
+        topic: str,
+        queue_size: int = 4,
+        name: str = "default",
+        breaker: Optional[CircuitBreaker] = None,
+        rollups: Optional[Any] = None,
+        archive: Optional[Any] = None,
+        retry_base: float = 1.0,
+        retry_max: float = 30.0,
+    ):
+        """
+        Initialize processing pipeline.
+
+        Args:
+            enricher: LogEnricher instance
+            opensearch: OpenSearchClient instance
+            producer: Started AIOKafkaProducer
+            topic: Topic for processed logs
+            queue_size: Maximum number of batches queued per stage
+            name: Pipeline name used in logs (e.g. the Kafka partition)
+            breaker: Circuit breaker guarding the OpenSearch sink (may be
+                shared by several pipelines)
+            rollups: RollupAggregator counting enriched logs (may be shared);
+                counts are added once the batch offset is committed
+            archive: ParquetArchive receiving enriched batches (may be
+                shared); best-effort, it does not hold back commits
+            retry_base: Delay before retrying a failed delivery in seconds
+            retry_max: Maximum delay between delivery retries in seconds
+        """
+        self.name = name
+        self.breaker = breaker
+        self.rollups = rollups
+        self.archive = archive
+        self.enricher = enricher
+        self.opensearch = opensearch
+        self.producer = producer
+        self.topic = topic
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+        self.enrich_stage = PipelineStage("enrich", self._enrich, queue_size)
+        self.index_stage = PipelineStage("index", self._index, queue_size)
+        self.produce_stage = PipelineStage("produce", self._produce, queue_size)
+        self.stages = [self.enrich_stage, self.index_stage, self.produce_stage]
+        self.sinks = [self.index_stage, self.produce_stage]
+        # Archived rows sit in an unreadable in-progress file until it is
+        # rolled, so the archive is not a sink that completes batches
+        self.archive_stage: Optional[PipelineStage] = None
+        if archive is not None:
+            self.archive_stage = PipelineStage("archive", self._archive, queue_size)
+            self.stages.append(self.archive_stage)
+
+        # Highest offset whose batch (and all earlier ones) left every sink
+        self.completed_offset: Optional[int] = None
+        # Rollup counts of completed batches waiting for their offset commit
+        self._uncommitted_rollups: Deque[Tuple[int, Counter]] = deque()
+
+    def start(self) -> None:
+        """Start all stage workers."""
+        for stage in self.stages:
+            stage.start()
+
+    def full(self) -> bool:
+        """Check whether submit would have to wait."""
+        return self.enrich_stage.full()
+
+    async def submit(self, messages: Batch, offset: Optional[int] = None) -> None:
+        """
+        Submit a batch of raw messages, waiting while the pipeline is full.
+
+        Args:
+            messages: Raw log messages
+            offset: Kafka offset to report as completed once delivered
+        """
+        if messages:
+            await self.enrich_stage.put(PipelineBatch(logs=messages, offset=offset))
+
+    async def flush(self) -> None:
+        """Wait until all submitted batches are indexed and produced."""
+        for stage in self.stages:
+            await stage.join()
+
+    async def stop(self, flush: bool = True) -> None:
+        """
+        Stop all stage workers.
+
+        Args:
+            flush: Wait for outstanding batches to be delivered first
+        """
+        try:
+            if flush:
+                await self.flush()
+        finally:
+            for stage in self.stages:
+                await stage.stop()
+
+    def committed(self, offset: int) -> None:
+        """
+        Add the rollup counts of batches whose offsets were committed.
+
+        Counting only committed batches keeps a replay after a crash or
+        rebalance from counting logs twice (a crash before the next rollup
+        flush loses them instead).
+
+        Args:
+            offset: Committed Kafka offset
+        """
+        while self._uncommitted_rollups and self._uncommitted_rollups[0][0] <= offset:
+            self.rollups.add_counts(self._uncommitted_rollups.popleft()[1])
+
+    def _complete(self, batch: PipelineBatch) -> None:
+        # Each sink handles batches in order, so batches complete in order
+        if batch.rollup_counts:
+            if batch.offset is None:
+                self.rollups.add_counts(batch.rollup_counts)
+            else:
+                self._uncommitted_rollups.append((batch.offset, batch.rollup_counts))
+        if batch.offset is not None:
+            self.completed_offset = batch.offset
+
+    async def _enrich(self, batch: PipelineBatch) -> None:
+        messages = batch.logs
+        batch_size.observe(len(messages))
+
+        enriched_messages = []
+        for msg in messages:
+            try:
+                enriched_messages.append(self.enricher.enrich(msg))
+                messages_processed_total.labels(status="success").inc()
+            except Exception as e:
+                logger.error("message_enrichment_failed", error=str(e), message=str(msg)[:100])
+                messages_processed_total.labels(status="failed").inc()
+
+        # Batched lookups (one cache round trip per lookup per batch)
+        await self.enricher.apply_lookups(enriched_messages)
+
+        # Count before routing, so sampled-out logs are still in the statistics
+        if self.rollups is not None:
+            batch.rollup_counts = self.rollups.count(enriched_messages)
+
+        # Fan out to both sinks (empty batches too, to keep completions in order)
+        batch.logs = enriched_messages
+        batch.pending_sinks = len(self.sinks)
+        await asyncio.gather(*(sink.put(batch) for sink in self.sinks))
+        if self.archive_stage is not None and enriched_messages:
+            await self.archive_stage.put(batch)
+
+    def _sink_done(self, batch: PipelineBatch) -> None:
+        batch.pending_sinks -= 1
+        if batch.pending_sinks == 0:
+            self._complete(batch)
+
+    async def _deliver(self, sink: str, send: Callable[[], Awaitable[Any]]) -> Any:
+        # Retry until the sink accepts the batch; it stays uncommitted meanwhile
+        delay = self.retry_base
+        while True:
+            try:
+                return await send()
+            except Exception as e:
+                pipeline_sink_retries_total.labels(sink=sink).inc()
+                logger.error("batch_delivery_failed", pipeline=self.name, sink=sink, error=str(e), retry_in=delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.retry_max)
+
+    async def _index(self, batch: PipelineBatch) -> None:
+        if batch.logs:
+            indexed_count = await self._deliver("index", lambda: self._index_guarded(batch.logs))
+            logger.info(
+                "batch_indexed",
+                pipeline=self.name,
+                total=len(batch.logs),
+                indexed=indexed_count,
+            )
+        self._sink_done(batch)
+
+    async def _index_guarded(self, logs: Batch) -> int:
+        if self.breaker is None:
+            return await self.opensearch.index_logs(logs)
+
+        # Hold the batch while the circuit is open; it stays uncommitted
+        while True:
+            is_probe = await self.breaker.acquire()
+            try:
+                if is_probe and not await self.opensearch.is_available():
+                    self.breaker.record_failure()
+                    continue
+                indexed_count = await self.opensearch.index_logs(logs)
+            except OpenSearchUnavailableError:
+                self.breaker.record_failure()
+                continue
+            except BaseException:
+                # A cancelled or crashed probe must release the shared breaker,
+                # or every other pipeline keeps waiting for its outcome
+                if is_probe:
+                    self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+            return indexed_count
+
+    async def _archive(self, batch: PipelineBatch) -> None:
+        try:
+            await self.archive.write(batch.logs)
+        except Exception as e:
+            logger.error("batch_archive_failed", pipeline=self.name, error=str(e))
+
+    async def _send_all(self, logs: Batch) -> None:
+        # Enqueue the whole batch first, then wait for delivery once
+        deliveries = [await self.producer.send(self.topic, value=enriched) for enriched in logs]
+        await asyncio.gather(*deliveries)
+
+    async def _produce(self, batch: PipelineBatch) -> None:
+        # A retry resends the whole batch, so a partial failure may duplicate records
+        await self._deliver("produce", lambda: self._send_all(batch.logs))
+        self._sink_done(batch)
@@ -0,0 +1,176 @@
+"""
+Streaming per-minute rollups of log counts for cheap dashboard statistics.
+"""
+import asyncio
+import hashlib
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from logger import get_logger
+from metrics import rollup_rows_flushed_total, rollup_pending_rows
+
+logger = get_logger(__name__)
+
+# Dimensions counted per minute, in rollup key order
+ROLLUP_DIMENSIONS = ("hostname", "severity_name", "facility_name", "has_threat_indicators", "app_name")
+
+RollupKey = Tuple[str, str, str, str, bool, str]
+
+ROLLUP_MAPPING = {
+    "mappings": {
+        "properties": {
+            "minute": {"type": "date"},
+            "hostname": {"type": "keyword"},
+            "severity_name": {"type": "keyword"},
+            "facility_name": {"type": "keyword"},
+            "has_threat_indicators": {"type": "boolean"},
+            "app_name": {"type": "keyword"},
+            "count": {"type": "long"},
+        }
+    },
+    "settings": {
+        "number_of_shards": 1,
+        "number_of_replicas": 1,
+        "refresh_interval": "30s",
+        "index.codec": "best_compression",
+    },
+}
+
+
+class RollupAggregator:
+    """
+    Count logs per minute by host, severity, facility, threat flag and app.
+
+    Counts accumulate in memory and are flushed periodically as scripted
+    upserts, so each (minute, dimensions) combination is a single document
+    no matter how many processors or flushes contributed to it. Upserts add
+    to the stored count, so callers should only add logs that will not be
+    replayed (see ``ProcessingPipeline.committed``).
+    """
+
+    def __init__(self, opensearch: Any, index_prefix: str = "cybersentinel-rollups"):
+        """
+        Initialize rollup aggregator.
+
+        Args:
+            opensearch: OpenSearchClient used to write rollups
+            index_prefix: Prefix for monthly rollup indices
+        """
+        self.opensearch = opensearch
+        self.index_prefix = index_prefix
+        self._counts: Counter = Counter()
+
+    @staticmethod
+    def _minute(log: Dict[str, Any]) -> str:
+        received_at = str(log.get("received_at") or "")
+        if len(received_at) >= 16:
+            return received_at[:16] + ":00"
+        return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:00")
+
+    def count(self, logs: Iterable[Dict[str, Any]]) -> Counter:
+        """
+        Count a batch of enriched logs without adding them yet.
+
+        Args:
+            logs: Enriched log documents
+
+        Returns:
+            Counts per rollup key, for ``add_counts``
+        """
+        counts: Counter = Counter()
+        for log in logs:
+            counts[(
+                self._minute(log),
+                str(log.get("hostname") or "unknown"),
+                str(log.get("severity_name") or "unknown"),
+                str(log.get("facility_name") or "unknown"),
+                bool(log.get("has_threat_indicators", False)),
+                str(log.get("app_name") or "unknown"),
+            )] += 1
+        return counts
+
+    def add_counts(self, counts: Counter) -> None:
+        """
+        Add counts returned by ``count`` to the next flush.
+
+        Args:
+            counts: Counts per rollup key
+        """
+        self._counts.update(counts)
+        rollup_pending_rows.set(len(self._counts))
+
+    def add_many(self, logs: Iterable[Dict[str, Any]]) -> None:
+        """
+        Count a batch of enriched logs.
+
+        Args:
+            logs: Enriched log documents
+        """
+        self.add_counts(self.count(logs))
+
+    def _index_name(self, minute: str) -> str:
+        return f"{self.index_prefix}-{minute[:4]}.{minute[5:7]}"
+
+    @staticmethod
+    def _row_id(key: RollupKey) -> str:
+        return hashlib.blake2b("|".join(map(str, key)).encode(), digest_size=16).hexdigest()
+
+    def _actions(self, counts: Dict[RollupKey, int]) -> List[Dict[str, Any]]:
+        actions = []
+        for key, count in counts.items():
+            row = dict(zip(("minute",) + ROLLUP_DIMENSIONS, key))
+            row["count"] = count
+            actions.append({
+                "_op_type": "update",
+                "_index": self._index_name(key[0]),
+                "_id": self._row_id(key),
+                "retry_on_conflict": 5,
+                "script": {
+                    "source": "ctx._source.count += params.count",
+                    "lang": "painless",
+                    "params": {"count": count},
+                },
+                "upsert": row,
+            })
+        return actions
+
+    async def flush(self) -> int:
+        """
+        Write accumulated counts to the rollup indices.
+
+        Returns:
+            Number of rollup rows written; if the request fails, counts are
+            kept for the next flush
+        """
+        counts, self._counts = self._counts, Counter()
+        rollup_pending_rows.set(0)
+        if not counts:
+            return 0
+
+        actions = self._actions(counts)
+        for index_name in {action["_index"] for action in actions}:
+            self.opensearch.ensure_index(index_name, ROLLUP_MAPPING)
+
+        try:
+            written = await self.opensearch.bulk(actions)
+        except Exception as e:
+            logger.error("rollup_flush_failed", error=str(e), rows=len(counts))
+            self._counts.update(counts)
+            rollup_pending_rows.set(len(self._counts))
+            return 0
+
+        rollup_rows_flushed_total.inc(written)
+        logger.debug("rollups_flushed", rows=written)
+        return written
+
+    async def run(self, interval: float, stop_event: Optional[asyncio.Event] = None) -> None:
+        """
+        Flush periodically until cancelled or stop_event is set.
+
+        Args:
+            interval: Seconds between flushes
+            stop_event: Optional event ending the loop
+        """
+        while stop_event is None or not stop_event.is_set():
+            await asyncio.sleep(interval)
+            await self.flush()
@@ -0,0 +1,186 @@
+"""
+Storage profiles controlling which fields are stored in OpenSearch.
+
+Run as a script to compare document sizes for a corpus of raw logs:
+
+    python storage_profile.py raw-logs.jsonl
+"""
+import copy
+import json
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+# Fields that only duplicate other fields of the document
+REDUNDANT_FIELDS = ["timestamp_normalized", "_index_date"]
+
+# raw retention policies
+RAW_ALWAYS = "always"
+RAW_ON_PARSE_FAILURE = "on_parse_failure"
+RAW_NEVER = "never"
+
+
+class StorageProfile:
+    """
+    Shape documents and mappings for a storage profile.
+
+    ``full`` stores documents as produced by the enricher. ``lean`` drops
+    redundant fields, keeps ``raw`` only when parsing failed, and stores
+    ``raw`` without indexing it or building doc values.
+    """
+
+    PROFILES = {
+        "full": RAW_ALWAYS,
+        "lean": RAW_ON_PARSE_FAILURE,
+    }
+
+    def __init__(self, name: str = "full", raw_retention: Optional[str] = None):
+        """
+        Initialize storage profile.
+
+        Args:
+            name: Profile name (full or lean)
+            raw_retention: Override for raw retention (always,
+                on_parse_failure, never); defaults to the profile's policy
+        """
+        if name not in self.PROFILES:
+            raise ValueError(f"Unknown storage profile: {name}")
+        if raw_retention and raw_retention not in (RAW_ALWAYS, RAW_ON_PARSE_FAILURE, RAW_NEVER):
+            raise ValueError(f"Unknown raw retention policy: {raw_retention}")
+
+        self.name = name
+        self.raw_retention = raw_retention or self.PROFILES[name]
+
+    @property
+    def is_lean(self) -> bool:
+        """Check whether documents are trimmed."""
+        return self.name == "lean"
+
+    def apply_mapping(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Adjust an index creation body for this profile.
+
+        Args:
+            body: Index body with mappings and settings
+
+        Returns:
+            Adjusted copy of the body
+        """
+        if not self.is_lean:
+            return body
+
+        body = copy.deepcopy(body)
+        mappings = body.setdefault("mappings", {})
+        properties = mappings.setdefault("properties", {})
+
+        # raw is only ever read back, never searched or aggregated
+        properties["raw"] = {"type": "keyword", "index": False, "doc_values": False}
+        mappings["_source"] = {"excludes": list(REDUNDANT_FIELDS)}
+        return body
+
+    def keep_raw(self, log: Dict[str, Any]) -> bool:
+        """
+        Check whether the raw message is stored for a log.
+
+        Args:
+            log: Enriched log document
+
+        Returns:
+            True if raw should be kept
+        """
+        if self.raw_retention == RAW_ALWAYS:
+            return True
+        if self.raw_retention == RAW_ON_PARSE_FAILURE:
+            return log.get("format") == "unknown"
+        return False
+
+    def prepare(self, log: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the document stored in OpenSearch.
+
+        Args:
+            log: Enriched log document
+
+        Returns:
+            Document for the bulk request (the input is not modified)
+        """
+        if not self.is_lean and self.raw_retention == RAW_ALWAYS:
+            return log
+
+        doc = dict(log)
+        if not self.keep_raw(log):
+            doc.pop("raw", None)
+        if self.is_lean:
+            for field in REDUNDANT_FIELDS:
+                doc.pop(field, None)
+        return doc
+
+
+def document_size(doc: Dict[str, Any]) -> int:
+    """
+    Get the serialized size of a document in bytes.
+
+    Args:
+        doc: Document
+
+    Returns:
+        Size of the compact JSON encoding
+    """
+    return len(json.dumps(doc, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def compare_profiles(logs: Iterable[Dict[str, Any]], profiles: List[StorageProfile]) -> Dict[str, Any]:
+    """
+    Compare average document size per profile.
+
+    Args:
+        logs: Enriched log documents
+        profiles: Profiles to compare
+
+    Returns:
+        Document count and average bytes per document for each profile
+    """
+    totals = {profile.name: 0 for profile in profiles}
+    count = 0
+    for log in logs:
+        count += 1
+        for profile in profiles:
+            totals[profile.name] += document_size(profile.prepare(log))
+
+    return {
+        "documents": count,
+        "avg_bytes_per_document": {
+            name: (total / count if count else 0.0) for name, total in totals.items()
+        },
+    }
+
+
+def main(paths: List[str]) -> None:
+    """
+    Print before/after bytes per document for JSON-lines corpora of raw logs.
+
+    Args:
+        paths: Files with one raw-logs message (JSON) per line
+    """
+    from enricher import LogEnricher
+
+    enricher = LogEnricher()
+
+    def enriched_logs():
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield enricher.enrich(json.loads(line))
+
+    report = compare_profiles(enriched_logs(), [StorageProfile("full"), StorageProfile("lean")])
+    full = report["avg_bytes_per_document"]["full"]
+    lean = report["avg_bytes_per_document"]["lean"]
+    report["reduction_percent"] = round((1 - lean / full) * 100, 1) if full else 0.0
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python storage_profile.py <raw-logs.jsonl> [...]")
+        sys.exit(1)
+    main(sys.argv[1:])
@@ -0,0 +1,290 @@
+"""
+Online log template mining (Drain-style fixed-depth parse tree).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import socket
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from logger import get_logger
+from metrics import template_clusters, template_cluster_evictions_total
+
+logger = get_logger(__name__)
+
+WILDCARD = "<*>"
+
+# Tokens that are variables on their own: numbers, IPs, times, dates, hex IDs
+_VARIABLE_TOKEN = re.compile(
+    r"[\[(<'\"]?(?:[-+]?\d[\d.:,/_-]*|0x[0-9a-fA-F]+|[0-9a-fA-F]{16,}|"
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})[\])>'\",;:]?"
+)
+
+# (template_id, template, parameters)
+TemplateMatch = Tuple[str, str, List[str]]
+
+
+class _Cluster:
+    """A template and the leaf it lives in."""
+
+    __slots__ = ("tokens", "size", "leaf", "template", "template_id")
+
+    def __init__(self, tokens: List[str], leaf: List[int], size: int = 1):
+        self.tokens = tokens
+        self.size = size
+        self.leaf = leaf
+        self.refresh()
+
+    def refresh(self) -> None:
+        self.template = " ".join(self.tokens)
+        self.template_id = hashlib.blake2b(self.template.encode(), digest_size=8).hexdigest()
+
+
+class _Node:
+    """Inner node of the parse tree; leaves hold cluster IDs."""
+
+    __slots__ = ("children", "clusters")
+
+    def __init__(self):
+        self.children: Dict[Any, "_Node"] = {}
+        self.clusters: List[int] = []
+
+
+class TemplateMiner:
+    """
+    Cluster log messages into templates with the Drain algorithm.
+
+    Messages are routed by token count and their first ``depth - 2`` tokens
+    to a leaf, where they join the most similar template or start a new one.
+    Positions where clustered messages differ become ``<*>`` and their
+    values are returned as parameters. Template IDs are a hash of the
+    template text, so every processor assigns the same ID to a template.
+
+    The table keeps at most ``max_clusters`` templates, evicting the least
+    recently matched one, and can be saved to and restored from a JSON file.
+    """
+
+    def __init__(
+        self,
+        depth: int = 4,
+        similarity: float = 0.4,
+        max_children: int = 100,
+        max_clusters: int = 10000,
+        state_file: str = "",
+    ):
+        """
+        Initialize template miner.
+
+        Args:
+            depth: Parse tree depth (including the root and length levels)
+            similarity: Minimum share of matching tokens to join a template
+            max_children: Maximum children per tree node before tokens are
+                routed to a wildcard child
+            max_clusters: Maximum number of templates kept in memory
+            state_file: JSON file the template table is saved to (optional)
+        """
+        self.depth = max(depth, 3)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.state_file = state_file
+
+        self._root = _Node()
+        self._clusters: "OrderedDict[int, _Cluster]" = OrderedDict()
+        self._next_id = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> "TemplateMiner":
+        """
+        Build a template miner from service settings and load saved state.
+
+        Args:
+            settings: Processor settings
+
+        Returns:
+            Configured template miner
+        """
+        miner = cls(
+            depth=settings.processor_template_depth,
+            similarity=settings.processor_template_similarity,
+            max_children=settings.processor_template_max_children,
+            max_clusters=settings.processor_template_max_clusters,
+            state_file=settings.processor_template_state_file,
+        )
+        miner.load()
+        return miner
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+    @staticmethod
+    def mask(tokens: List[str]) -> List[str]:
+        """
+        Replace tokens that are obvious variables with the wildcard.
+
+        Args:
+            tokens: Message tokens (split on whitespace)
+
+        Returns:
+            Masked tokens
+        """
+        variable = _VARIABLE_TOKEN.fullmatch
+        # Purely alphabetic tokens can never be variables; skip the regex for them
+        return [WILDCARD if not token.isalpha() and variable(token) else token for token in tokens]
+
+    def _leaf(self, tokens: List[str]) -> _Node:
+        node = self._root.children.setdefault(len(tokens), _Node())
+        for token in tokens[:self.depth - 2]:
+            child = node.children.get(token)
+            if child is None:
+                # Keep the last slot for the wildcard child
+                key = token if len(node.children) < self.max_children - 1 else WILDCARD
+                child = node.children.setdefault(key, _Node())
+            node = child
+        return node
+
+    @staticmethod
+    def _similarity(template: List[str], tokens: List[str]) -> Tuple[float, int]:
+        if not tokens:
+            return 1.0, 0
+        same = 0
+        wildcards = 0
+        for template_token, token in zip(template, tokens):
+            if template_token == WILDCARD:
+                wildcards += 1
+            elif template_token == token:
+                same += 1
+        return same / len(tokens), wildcards
+
+    def _best_match(self, leaf: _Node, tokens: List[str]) -> Optional[_Cluster]:
+        best = None
+        best_score = (-1.0, -1)
+        for cluster_id in leaf.clusters:
+            cluster = self._clusters[cluster_id]
+            score = self._similarity(cluster.tokens, tokens)
+            if score > best_score:
+                best, best_score = cluster_id, score
+        if best is None or best_score[0] < self.similarity:
+            return None
+        self._clusters.move_to_end(best)
+        return self._clusters[best]
+
+    def _create(self, tokens: List[str], leaf: _Node, size: int = 1) -> _Cluster:
+        cluster_id = self._next_id
+        self._next_id += 1
+        cluster = _Cluster(tokens, leaf.clusters, size)
+        self._clusters[cluster_id] = cluster
+        leaf.clusters.append(cluster_id)
+
+        if len(self._clusters) > self.max_clusters:
+            evicted_id, evicted = self._clusters.popitem(last=False)
+            evicted.leaf.remove(evicted_id)
+            template_cluster_evictions_total.inc()
+        template_clusters.set(len(self._clusters))
+        return cluster
+
+    def add(self, message: str, raw_tokens: Optional[List[str]] = None) -> TemplateMatch:
+        """
+        Match a message to its template, learning new templates on the way.
+
+        Args:
+            message: Log message
+            raw_tokens: Message already split on whitespace (optional)
+
+        Returns:
+            Template ID, template text and the parameter values
+        """
+        if raw_tokens is None:
+            raw_tokens = message.split()
+        tokens = self.mask(raw_tokens)
+        leaf = self._leaf(tokens)
+
+        cluster = self._best_match(leaf, tokens)
+        if cluster is None:
+            cluster = self._create(tokens, leaf)
+        else:
+            cluster.size += 1
+            merged = [t if t == m else WILDCARD for t, m in zip(cluster.tokens, tokens)]
+            if merged != cluster.tokens:
+                cluster.tokens = merged
+                cluster.refresh()
+
+        params = [
+            raw for raw, template_token in zip(raw_tokens, cluster.tokens)
+            if template_token == WILDCARD
+        ]
+        return cluster.template_id, cluster.template, params
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the template table in its persisted form.
+
+        Returns:
+            Templates (least recently used first) with their sizes
+        """
+        return {
+            "version": 1,
+            "templates": [
+                {"tokens": cluster.tokens, "size": cluster.size}
+                for cluster in self._clusters.values()
+            ],
+        }
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        """
+        Add templates from a snapshot.
+
+        Args:
+            state: Snapshot returned by snapshot()
+        """
+        for entry in state.get("templates", []):
+            tokens = list(entry["tokens"])
+            leaf = self._leaf(tokens)
+            self._create(tokens, leaf, size=int(entry.get("size", 1)))
+
+    def load(self) -> None:
+        """Load the template table from the state file, if there is one."""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                self.restore(json.load(f))
+            logger.info("templates_loaded", templates=len(self._clusters), path=self.state_file)
+        except Exception as e:
+            logger.error("templates_load_failed", error=str(e), path=self.state_file)
+
+    @staticmethod
+    def _write(path: str, state: Dict[str, Any]) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{socket.gethostname()}-{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    async def save(self) -> None:
+        """Save the template table to the state file without blocking the loop."""
+        if not self.state_file:
+            return
+        state = self.snapshot()
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write, self.state_file, state)
+            logger.debug("templates_saved", templates=len(state["templates"]), path=self.state_file)
+        except Exception as e:
+            logger.error("templates_save_failed", error=str(e), path=self.state_file)
+
+    async def run(self, interval: float, stop_event: Optional[asyncio.Event] = None) -> None:
+        """
+        Save periodically until cancelled or stop_event is set.
+
+        Args:
+            interval: Seconds between saves
+            stop_event: Optional event ending the loop
+        """
+        while stop_event is None or not stop_event.is_set():
+            await asyncio.sleep(interval)
+            await self.save()
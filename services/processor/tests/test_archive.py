@@ -0,0 +1,83 @@
+"""
+Tests for the Parquet cold archive.
+"""
+import json
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from archive import archive_columns, partition_key
+
+
+LOG = {
+    "event_id": "abc",
+    "received_at": "2024-01-15T10:30:42.123456",
+    "hostname": "web01",
+    "severity": 6,
+    "severity_name": "info",
+    "message": "User logged in",
+    "tags": ["authentication"],
+    "geo_location": {"country": "US"},
+}
+
+
+class TestParquetArchive:
+    """Test archive partitioning, columns and file rolling."""
+
+    def test_partition_key(self):
+        """Test that logs are partitioned by UTC date and hour."""
+        assert partition_key(LOG) == "date=2024-01-15/hour=10"
+        assert partition_key({"received_at": "2024-01-15T23:30:00+02:00"}) == "date=2024-01-15/hour=21"
+
+    def test_columns_keep_unknown_fields_as_json(self):
+        """Test column conversion of known and extra fields."""
+        columns = archive_columns([LOG])
+
+        assert columns["hostname"] == ["web01"]
+        assert columns["severity"] == [6]
+        assert columns["app_name"] == [None]
+        assert columns["received_at"][0].hour == 10
+        assert json.loads(columns["extra"][0]) == {"geo_location": {"country": "US"}}
+
+    def test_files_roll_and_are_listed_in_manifest(self, tmp_path):
+        """Test that closed files are renamed and recorded in the manifest."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        from archive import ParquetArchive
+
+        archive = ParquetArchive(str(tmp_path), writer_id="test")
+        archive.write_batch([LOG, dict(LOG, event_id="def")])
+        archive.write_batch([dict(LOG, received_at="2024-01-15T11:00:00")])
+        archive.close()
+
+        with open(tmp_path / "manifest.jsonl") as f:
+            entries = [json.loads(line) for line in f]
+
+        assert sorted(entry["rows"] for entry in entries) == [1, 2]
+        first = next(entry for entry in entries if entry["rows"] == 2)
+        assert first["path"].startswith("date=2024-01-15/hour=10/part-test-")
+        assert pq.read_table(tmp_path / first["path"]).column("event_id").to_pylist() == ["abc", "def"]
+
+    def test_rows_are_buffered_into_row_groups(self, tmp_path):
+        """Test that small batches are combined into full row groups."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        from archive import ParquetArchive
+
+        archive = ParquetArchive(str(tmp_path), writer_id="test", row_group_rows=3)
+        for i in range(5):
+            archive.write_batch([dict(LOG, event_id=f"e{i}")])
+        archive.close()
+
+        with open(tmp_path / "manifest.jsonl") as f:
+            entry = json.loads(f.readline())
+
+        parquet_file = pq.ParquetFile(tmp_path / entry["path"])
+        assert entry["rows"] == 5
+        assert [parquet_file.metadata.row_group(i).num_rows for i in range(parquet_file.num_row_groups)] == [3, 2]
+        assert entry["min_received_at"].startswith("2024-01-15T10:30:42")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,142 @@
+"""
+Tests for the indexing circuit breaker.
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import opensearch_client
+from circuit_breaker import CircuitBreaker
+from enricher import LogEnricher
+from opensearch_client import OpenSearchClient, OpenSearchUnavailableError
+from pipeline import ProcessingPipeline
+
+
+class FlakyIndexer:
+    """OpenSearch stand-in that is unavailable until told otherwise."""
+
+    def __init__(self):
+        self.available = False
+        self.calls = 0
+        self.indexed = []
+
+    async def index_logs(self, logs):
+        self.calls += 1
+        if not self.available:
+            raise OpenSearchUnavailableError("cluster red")
+        self.indexed.extend(logs)
+        return len(logs)
+
+    async def is_available(self):
+        return self.available
+
+
+class HangingIndexer(FlakyIndexer):
+    """OpenSearch stand-in whose health check never answers."""
+
+    async def is_available(self):
+        await asyncio.Event().wait()
+
+
+class NullProducer:
+    """Kafka producer stand-in."""
+
+    async def send(self, topic, value=None):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+
+class TestCircuitBreaker:
+    """Test breaker transitions and buffering."""
+
+    @pytest.mark.asyncio
+    async def test_opens_after_threshold_and_probes(self):
+        """Test open, half-open probe and close transitions."""
+        events = []
+        breaker = CircuitBreaker(
+            "test", failure_threshold=2, reset_timeout=0.01,
+            on_open=lambda: events.append("open"), on_close=lambda: events.append("close"),
+        )
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+        assert await breaker.acquire() is True
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        breaker.record_success()
+
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert events == ["open", "close"]
+
+    @pytest.mark.asyncio
+    async def test_batches_are_held_while_open(self):
+        """Test that batches wait for recovery instead of being dropped."""
+        indexer = FlakyIndexer()
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01, max_reset_timeout=0.02)
+        pipeline = ProcessingPipeline(LogEnricher(), indexer, NullProducer(), "out", breaker=breaker)
+        pipeline.start()
+
+        await pipeline.submit([{"message": "a", "received_at": "2024-01-15T10:30:00"}], offset=1)
+        await asyncio.sleep(0.1)
+
+        assert breaker.state != CircuitBreaker.CLOSED
+        assert pipeline.completed_offset is None
+        calls_while_open = indexer.calls
+        await asyncio.sleep(0.05)
+        assert indexer.calls - calls_while_open <= 3
+
+        indexer.available = True
+        await asyncio.wait_for(pipeline.stop(), timeout=1)
+
+        assert [log["message"] for log in indexer.indexed] == ["a"]
+        assert pipeline.completed_offset == 1
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_releases_breaker(self):
+        """Test that stopping a pipeline mid-probe lets another pipeline probe."""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01, max_reset_timeout=0.02)
+        breaker.record_failure()
+        stuck = ProcessingPipeline(LogEnricher(), HangingIndexer(), NullProducer(), "out", breaker=breaker)
+        healthy_indexer = FlakyIndexer()
+        healthy_indexer.available = True
+        healthy = ProcessingPipeline(LogEnricher(), healthy_indexer, NullProducer(), "out", breaker=breaker)
+        stuck.start()
+        healthy.start()
+
+        await stuck.submit([{"message": "a", "received_at": "2024-01-15T10:30:00"}], offset=1)
+        await asyncio.sleep(0.05)
+        await healthy.submit([{"message": "b", "received_at": "2024-01-15T10:30:00"}], offset=1)
+        await asyncio.sleep(0.05)
+        assert healthy.completed_offset is None
+
+        await stuck.stop(flush=False)
+        await asyncio.wait_for(healthy.stop(), timeout=1)
+
+        assert healthy.completed_offset == 1
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_partial_rejection_is_retryable(self, monkeypatch):
+        """Test that any 429 item fails the batch while mapping errors are dropped."""
+        client = OpenSearchClient("localhost", 9200)
+        monkeypatch.setattr(client, "_ensure_index_exists", lambda index_name, family=None: None)
+        logs = [{"message": "a", "event_id": "e1"}, {"message": "b", "event_id": "e2"}]
+
+        monkeypatch.setattr(opensearch_client.helpers, "bulk", lambda *a, **k: (1, [{"create": {"status": 429}}]))
+        with pytest.raises(OpenSearchUnavailableError):
+            await client.index_logs(logs)
+
+        monkeypatch.setattr(opensearch_client.helpers, "bulk", lambda *a, **k: (1, [{"create": {"status": 400}}]))
+        assert await client.index_logs(logs) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,111 @@
+"""
+Tests for reverse-DNS enrichment.
+"""
+import asyncio
+import socket
+import threading
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dns_resolver import HostsFileResolver, ReverseDNSLookup, SystemResolver
+from enricher import LogEnricher
+
+
+class SlowResolver:
+    """Resolver that counts queries and answers after a delay."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.queries = []
+
+    async def resolve_ptr(self, ip):
+        self.queries.append(ip)
+        await asyncio.sleep(self.delay)
+        return f"host-{ip}", 120
+
+
+class TestReverseDNSLookup:
+    """Test reverse-DNS lookup stage."""
+
+    def test_hosts_file_parsing(self, tmp_path):
+        """Test parsing of a hosts-format file."""
+        hosts = tmp_path / "hosts"
+        hosts.write_text("# comment\n10.0.0.5 fw01 fw01.corp\n10.0.0.6\tsw01 # switch\n")
+
+        resolver = HostsFileResolver(path=str(hosts))
+
+        assert resolver.entries == {"10.0.0.5": "fw01", "10.0.0.6": "sw01"}
+
+    @pytest.mark.asyncio
+    async def test_placeholder_hostnames_are_replaced(self):
+        """Test that '-' and bare-IP hostnames are replaced by the PTR name."""
+        lookup = ReverseDNSLookup(HostsFileResolver(entries={"10.0.0.5": "fw01"}))
+        enricher = LogEnricher(lookups=[lookup])
+        logs = [
+            {"source_ip": "10.0.0.5", "hostname": "-"},
+            {"source_ip": "10.0.0.5", "hostname": "10.0.0.5"},
+            {"source_ip": "10.0.0.5", "hostname": "webserver"},
+            {"source_ip": "10.0.0.9", "hostname": "-"},
+        ]
+
+        await enricher.apply_lookups(logs)
+
+        assert logs[0]["hostname"] == "fw01"
+        assert logs[1]["hostname"] == "fw01"
+        assert logs[1]["hostname_original"] == "10.0.0.5"
+        assert logs[2]["hostname"] == "webserver"
+        assert "resolved_hostname" not in logs[2]
+        assert logs[3]["hostname"] == "-"
+
+    @pytest.mark.asyncio
+    async def test_deadline_and_coalescing(self):
+        """Test that slow queries do not block the batch and are coalesced."""
+        resolver = SlowResolver(delay=0.05)
+        lookup = ReverseDNSLookup(resolver, deadline=0.01)
+
+        first, _ = await lookup.resolve_many(["10.0.0.1"])
+        second, _ = await lookup.resolve_many(["10.0.0.1"])
+        assert first == {} and second == {}
+
+        await asyncio.sleep(0.06)
+        third, ttls = await lookup.resolve_many(["10.0.0.1"])
+
+        assert third == {"10.0.0.1": "host-10.0.0.1"}
+        assert ttls == {"10.0.0.1": 120}
+        assert resolver.queries == ["10.0.0.1"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_batches_keep_their_ttls(self):
+        """Test that concurrent batches each get the TTLs of their own answers."""
+        lookup = ReverseDNSLookup(SlowResolver(delay=0.01), deadline=0.1)
+
+        (a, a_ttls), (b, b_ttls) = await asyncio.gather(
+            lookup.resolve_many(["10.0.0.1"]), lookup.resolve_many(["10.0.0.2"])
+        )
+
+        assert a_ttls == {"10.0.0.1": 120}
+        assert b_ttls == {"10.0.0.2": 120}
+
+    @pytest.mark.asyncio
+    async def test_system_backend_uses_own_threads(self, monkeypatch):
+        """Test that system lookups run on the resolver's own pool, which caps concurrency."""
+        threads = []
+
+        def getnameinfo(address, flags):
+            threads.append(threading.current_thread().name)
+            return "fw01", "0"
+
+        monkeypatch.setattr(socket, "getnameinfo", getnameinfo)
+        resolver = SystemResolver(default_ttl=600, threads=2)
+        lookup = ReverseDNSLookup(resolver, concurrency=64)
+
+        assert await resolver.resolve_ptr("10.0.0.5") == ("fw01", 600)
+        assert threads[0].startswith("rdns")
+        assert lookup._semaphore._value == 2
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,45 @@
+"""
+Tests for log enrichment.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from enricher import LogEnricher
+
+
+class TestLogEnricher:
+    """Test log enrichment."""
+
+    def test_event_id_is_deterministic(self):
+        """Test that the same Kafka record always gets the same document ID."""
+        enricher = LogEnricher()
+        log = {
+            "source_ip": "10.0.0.1",
+            "received_at": "2024-01-15T10:30:00",
+            "message": "User logged in",
+            "kafka_partition": 3,
+            "kafka_offset": 42,
+        }
+
+        first = enricher.enrich(dict(log))
+        second = enricher.enrich(dict(log))
+        other = enricher.enrich(dict(log, kafka_offset=43))
+
+        assert first["event_id"] == second["event_id"]
+        assert first["event_id"] != other["event_id"]
+        assert "kafka_partition" not in first
+        assert "kafka_offset" not in first
+
+    def test_no_event_id_without_kafka_metadata(self):
+        """Test that logs without a Kafka position keep auto-generated IDs."""
+        enriched = LogEnricher().enrich({"message": "hello", "received_at": "2024-01-15T10:30:00"})
+
+        assert "event_id" not in enriched
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,130 @@
+"""
+Tests for the two-tier enrichment cache.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from enrichment_cache import TTLCache, EnrichmentCache
+from enricher import EnrichmentLookup, LogEnricher
+
+
+class FakePipeline:
+    """Minimal stand-in for an async Redis pipeline."""
+
+    def __init__(self, store):
+        self.store = store
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value))
+
+    async def execute(self):
+        for key, value in self.commands:
+            self.store[key] = value
+
+
+class FakeRedis:
+    """In-memory Redis that counts round trips."""
+
+    def __init__(self):
+        self.store = {}
+        self.round_trips = 0
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.store.get(k) for k in keys]
+
+    def pipeline(self, transaction=False):
+        self.round_trips += 1
+        return FakePipeline(self.store)
+
+
+class CountingLookup(EnrichmentLookup):
+    """Lookup that records every key it resolves."""
+
+    name = "owner"
+    source_field = "source_ip"
+    target_field = "owner"
+
+    def __init__(self, table):
+        self.table = table
+        self.calls = []
+
+    async def resolve_many(self, keys):
+        self.calls.append(list(keys))
+        return {key: self.table.get(key) for key in keys}, None
+
+
+class TestTTLCache:
+    """Test the in-process tier."""
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted."""
+        cache = TTLCache(max_size=2, default_ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_expiry(self):
+        """Test that expired entries are not returned."""
+        cache = TTLCache(max_size=10, default_ttl=60)
+        cache.set("a", 1, ttl=-1)
+
+        assert cache.get("a") is None
+        assert "a" not in cache
+
+
+class TestEnrichmentCache:
+    """Test the two-tier cache and batched lookups."""
+
+    @pytest.mark.asyncio
+    async def test_negative_results_are_cached(self):
+        """Test that missing results are remembered in both tiers."""
+        redis = FakeRedis()
+        cache = EnrichmentCache(redis_client=redis)
+        await cache.set_many("owner", {"10.0.0.1": "alice", "10.0.0.2": None})
+
+        cache.local.clear()
+        found = await cache.get_many("owner", ["10.0.0.1", "10.0.0.2", "10.0.0.3"])
+
+        assert found == {"10.0.0.1": "alice", "10.0.0.2": None}
+
+    @pytest.mark.asyncio
+    async def test_batch_costs_one_round_trip(self):
+        """Test that a batch is resolved with one MGET and one pipeline."""
+        redis = FakeRedis()
+        lookup = CountingLookup({"10.0.0.1": "alice"})
+        enricher = LogEnricher(cache=EnrichmentCache(redis_client=redis), lookups=[lookup])
+        logs = [{"source_ip": "10.0.0.1"}, {"source_ip": "10.0.0.2"}, {"source_ip": "10.0.0.1"}]
+
+        await enricher.apply_lookups(logs)
+
+        assert redis.round_trips == 2
+        assert lookup.calls == [["10.0.0.1", "10.0.0.2"]]
+        assert logs[0]["owner"] == "alice"
+        assert "owner" not in logs[1]
+
+        # Second batch is served from the local tier
+        await enricher.apply_lookups([{"source_ip": "10.0.0.2"}])
+        assert redis.round_trips == 2
+        assert len(lookup.calls) == 1
+        assert enricher.cache.stats()["hit_ratio"]["local"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
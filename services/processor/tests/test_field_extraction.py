@@ -0,0 +1,75 @@
+"""
+Tests for field extraction.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from field_extraction import FieldExtractor, compile_grok, extract_kv
+
+
+class TestFieldExtraction:
+    """Test key=value tokenizing, grok patterns and dispatch."""
+
+    def test_extract_kv(self):
+        """Test bare, quoted and upper-case keys."""
+        fields = extract_kv('action=deny SRC=10.0.0.1 dst=8.8.8.8 msg="port scan detected" user=\'bob\'')
+
+        assert fields == {
+            "action": "deny",
+            "src": "10.0.0.1",
+            "dst": "8.8.8.8",
+            "msg": "port scan detected",
+            "user": "bob",
+        }
+
+    def test_compile_grok(self):
+        """Test that grok references become named groups."""
+        pattern = compile_grok("from %{IP:src_ip} port %{INT:src_port}")
+
+        match = pattern.search("connection from 192.168.1.5 port 2222")
+        assert match.groupdict() == {"src_ip": "192.168.1.5", "src_port": "2222"}
+
+        with pytest.raises(ValueError):
+            compile_grok("%{NOPE:x}")
+
+    def test_dispatch_by_app_name(self):
+        """Test that sshd logs use the sshd patterns instead of key=value."""
+        extractor = FieldExtractor()
+        log = {"app_name": "sshd", "source_ip": "10.0.0.9"}
+
+        fields = extractor.extract(log, "Failed password for invalid user admin from 203.0.113.7 port 4242 ssh2")
+
+        assert fields["user"] == "admin"
+        assert fields["src_ip"] == "203.0.113.7"
+        assert extractor.extractors_for({"app_name": "kernel"}) == ["kv"]
+
+    def test_source_ip_overrides_app_name(self):
+        """Test that per-source entries win over per-app entries."""
+        extractor = FieldExtractor(dispatch={
+            "default": [],
+            "app_name": {"sshd": ["sshd_auth"]},
+            "source_ip": {"10.0.0.1": ["kv"]},
+        })
+
+        assert extractor.extractors_for({"app_name": "sshd", "source_ip": "10.0.0.1"}) == ["kv"]
+        assert extractor.extractors_for({"app_name": "other"}) == []
+
+    def test_normalize_drops_invalid_values(self):
+        """Test that only valid IPs and ports become typed fields."""
+        normalized = FieldExtractor.normalize({
+            "src": "999.1.1.1",
+            "dst": "8.8.8.8",
+            "dpt": "443",
+            "spt": "70000",
+            "act": "allow",
+        })
+
+        assert normalized == {"dst_ip": "8.8.8.8", "dst_port": 443, "action": "allow"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,47 @@
+"""
+Tests for index family routing.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from index_routing import IndexRouter, DEFAULT_ROUTING
+
+
+class TestIndexRouter:
+    """Test routing rules and sampling."""
+
+    def test_default_routing(self):
+        """Test that security logs stay hot and chatter goes to the low family."""
+        router = IndexRouter(DEFAULT_ROUTING)
+
+        assert router.route({"severity": 7, "tags": ["security"]}).name == "hot"
+        assert router.route({"severity": 6, "tags": []}).name == "low"
+        assert router.route({"severity": 3, "tags": []}).name == "hot"
+        assert router.families["low"].replicas == 0
+
+    def test_sampling_is_deterministic(self):
+        """Test that sampling keeps roughly the configured share, per document."""
+        router = IndexRouter({
+            "default_family": "hot",
+            "families": {"hot": {}, "low": {"suffix": "low"}},
+            "rules": [{"name": "debug", "family": "low", "severities": [7], "sample_rate": 0.25}],
+        })
+        logs = [{"severity": 7, "event_id": f"id-{i}"} for i in range(2000)]
+
+        kept = [log for log in logs if router.route(log) is not None]
+
+        assert 400 < len(kept) < 600
+        assert all(router.route(log) is not None for log in kept)
+
+    def test_unknown_family_is_rejected(self):
+        """Test validation of rule families."""
+        with pytest.raises(ValueError):
+            IndexRouter({"families": {"hot": {}}, "rules": [{"name": "x", "family": "cold"}]})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
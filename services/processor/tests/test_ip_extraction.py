@@ -0,0 +1,66 @@
+"""
+Tests for IP extraction.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ip_extraction import IPExtractor, classify_ipv4
+
+
+class TestIPExtractor:
+    """Test validated IPv4/IPv6 extraction."""
+
+    def test_rejects_invalid_ipv4(self):
+        """Test that out-of-range, zero-padded and version-like quads are skipped."""
+        ips, _, _ = IPExtractor().extract(
+            "from 999.1.1.1 and 010.0.0.1 via 1.2.3.4.5 to 192.168.1.300 ok 8.8.8.8."
+        )
+
+        assert ips == ["8.8.8.8"]
+
+    def test_dedupes_and_classifies(self):
+        """Test order-preserving deduplication and classification."""
+        ips, classes, spans = IPExtractor().extract(
+            "10.0.0.1 -> 8.8.8.8, retry 10.0.0.1 -> 127.0.0.1"
+        )
+
+        assert ips == ["10.0.0.1", "8.8.8.8", "127.0.0.1"]
+        assert classes == {"10.0.0.1": "private", "8.8.8.8": "public", "127.0.0.1": "loopback"}
+        assert len(spans) == 4
+
+    def test_ipv6(self):
+        """Test IPv6 addresses, including compressed and mapped forms."""
+        ips, classes, _ = IPExtractor().extract(
+            "conn [2001:4860:4860:0:0:0:0:8888]:443 from fe80::1 and ::ffff:10.1.2.3 at 10:30:42"
+        )
+
+        assert ips == ["2001:4860:4860::8888", "fe80::1", "10.1.2.3"]
+        assert classes["2001:4860:4860::8888"] == "public"
+        assert classes["fe80::1"] == "link_local"
+        assert classes["10.1.2.3"] == "private"
+
+    def test_ignores_non_addresses(self):
+        """Test that times, MAC addresses and C++ scopes are not addresses."""
+        ips, _, _ = IPExtractor().extract("12:30:45 mac 00:1a:2b:3c:4d:5e std::vector :: done")
+
+        assert ips == []
+
+    @pytest.mark.parametrize("ip,expected", [
+        ("172.16.5.4", "private"),
+        ("172.32.0.1", "public"),
+        ("100.64.0.1", "private"),
+        ("169.254.1.1", "link_local"),
+        ("239.1.1.1", "multicast"),
+        ("0.0.0.0", "reserved"),
+    ])
+    def test_classify_ipv4(self, ip, expected):
+        """Test IPv4 classes computed from octets."""
+        assert classify_ipv4(ip) == expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
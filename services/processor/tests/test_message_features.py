@@ -0,0 +1,51 @@
+"""
+Tests for single-pass message features.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from message_features import MessageFeatureExtractor, _legacy_features, SAMPLE_MESSAGES
+from enricher import LogEnricher
+
+
+class TestMessageFeatures:
+    """Test the shared feature pass."""
+
+    def test_features(self):
+        """Test IPs, keywords and tag flags of one message."""
+        features = MessageFeatureExtractor().extract(
+            "Unauthorized login failed: SQL injection from 10.0.0.1 to 10.0.0.2"
+        )
+
+        assert features.ips == ["10.0.0.1", "10.0.0.2"]
+        assert features.ip_spans[0] == (46, 54)
+        assert features.threat_keywords == ["injection", "sql injection", "unauthorized"]
+        assert features.has_error
+        assert features.has_auth
+        assert features.tokens[0] == "Unauthorized"
+
+    @pytest.mark.parametrize("message", SAMPLE_MESSAGES)
+    def test_matches_legacy_scans(self, message):
+        """Test that the single pass finds what the per-step scans found."""
+        features = MessageFeatureExtractor().extract(message)
+        ips, threats, has_error, has_auth, _ = _legacy_features(message)
+
+        assert (features.ips, features.threat_keywords, features.has_error, features.has_auth) == (
+            ips, threats, has_error, has_auth
+        )
+
+    def test_enrich_uses_features(self):
+        """Test that enrichment output is built from the features."""
+        enriched = LogEnricher().enrich({"message": "login error from 192.168.0.1", "severity": 6})
+
+        assert enriched["extracted_ips"] == ["192.168.0.1"]
+        assert enriched["tags"] == ["error", "authentication"]
+        assert enriched["has_threat_indicators"] is False
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,131 @@
+"""
+Tests for partition-aware pipelines.
+"""
+import asyncio
+import pytest
+import sys
+import os
+from collections import namedtuple
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from aiokafka import TopicPartition
+from enricher import LogEnricher
+from partition_manager import PartitionManager
+from pipeline import ProcessingPipeline
+from rollups import RollupAggregator
+
+Record = namedtuple("Record", ["offset", "value"])
+
+
+class FakeConsumer:
+    """Consumer stand-in recording commits and pauses."""
+
+    def __init__(self):
+        self.commits = []
+        self.paused = set()
+        self.fail = False
+
+    async def commit(self, offsets):
+        if self.fail:
+            raise ConnectionError("coordinator unavailable")
+        self.commits.append(dict(offsets))
+
+    def pause(self, *partitions):
+        self.paused.update(partitions)
+
+    def resume(self, *partitions):
+        self.paused.difference_update(partitions)
+
+
+class OrderedIndexer:
+    """OpenSearch stand-in recording message order per source."""
+
+    def __init__(self):
+        self.indexed = []
+
+    async def index_logs(self, logs):
+        await asyncio.sleep(0)
+        self.indexed.extend(log["message"] for log in logs)
+        return len(logs)
+
+
+class NullProducer:
+    """Kafka producer stand-in."""
+
+    async def send(self, topic, value=None):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+
+class RecordingRollups(RollupAggregator):
+    """Rollup aggregator recording how many logs were added."""
+
+    def __init__(self):
+        super().__init__(None)
+        self.added = []
+
+    def add_counts(self, counts):
+        self.added.append(sum(counts.values()))
+
+
+def records(partition_offsets):
+    return [Record(offset, {"message": f"m{offset}", "received_at": "2024-01-15T10:30:00"})
+            for offset in partition_offsets]
+
+
+class TestPartitionManager:
+    """Test per-partition pipelines and manual commits."""
+
+    @pytest.mark.asyncio
+    async def test_ordering_and_commit_on_revoke(self):
+        """Test that a partition keeps its order and commits on revoke."""
+        consumer = FakeConsumer()
+        indexer = OrderedIndexer()
+        manager = PartitionManager(
+            consumer,
+            lambda tp: ProcessingPipeline(LogEnricher(), indexer, NullProducer(), "out", queue_size=1),
+        )
+        tp0, tp1 = TopicPartition("raw", 0), TopicPartition("raw", 1)
+        manager.assign([tp0, tp1])
+
+        for start in range(0, 6, 2):
+            await manager.dispatch({tp0: records([start, start + 1]), tp1: records([100 + start])})
+
+        await manager.revoke([tp0, tp1])
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+        p0 = [m for m in indexer.indexed if int(m[1:]) < 100]
+        assert p0 == [f"m{i}" for i in range(6)]
+        assert consumer.commits[-1] == {tp0: 6, tp1: 105}
+        assert manager.pipelines == {}
+
+    @pytest.mark.asyncio
+    async def test_rollups_count_committed_batches_only(self):
+        """Test that rollup counts wait for the offset commit of their batch."""
+        consumer = FakeConsumer()
+        rollups = RecordingRollups()
+        manager = PartitionManager(
+            consumer,
+            lambda tp: ProcessingPipeline(LogEnricher(), OrderedIndexer(), NullProducer(), "out", rollups=rollups),
+        )
+        tp0 = TopicPartition("raw", 0)
+        manager.assign([tp0])
+
+        await manager.dispatch({tp0: records([0, 1])})
+        await manager.pipelines[tp0].flush()
+        consumer.fail = True
+        await manager.commit()
+        assert rollups.added == []
+
+        consumer.fail = False
+        await manager.commit()
+        assert rollups.added == [2]
+        await manager.stop()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
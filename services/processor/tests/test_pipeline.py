@@ -0,0 +1,139 @@
+"""
+Tests for the staged processing pipeline.
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from enricher import LogEnricher
+from pipeline import ProcessingPipeline
+
+
+class SlowIndexer:
+    """OpenSearch stand-in that records indexed batches."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.batches = []
+
+    async def index_logs(self, logs):
+        await asyncio.sleep(self.delay)
+        self.batches.append(logs)
+        return len(logs)
+
+
+class RecordingProducer:
+    """Kafka producer stand-in returning delivery futures."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, topic, value=None):
+        self.sent.append((topic, value))
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+
+class FlakyProducer(RecordingProducer):
+    """Kafka producer stand-in whose first deliveries fail."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    async def send(self, topic, value=None):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("broker unavailable")
+        return await super().send(topic, value=value)
+
+
+class BrokenArchive:
+    """Archive stand-in whose writes always fail."""
+
+    def __init__(self):
+        self.attempts = 0
+
+    async def write(self, logs):
+        self.attempts += 1
+        raise OSError("disk full")
+
+
+class TestProcessingPipeline:
+    """Test enrich / index / produce stages."""
+
+    @pytest.mark.asyncio
+    async def test_batches_reach_both_sinks(self):
+        """Test that each batch is enriched and delivered to both sinks."""
+        indexer = SlowIndexer(delay=0)
+        producer = RecordingProducer()
+        pipeline = ProcessingPipeline(LogEnricher(), indexer, producer, "processed-logs")
+        pipeline.start()
+
+        await pipeline.submit([{"message": "login failed", "severity": 4, "received_at": "2024-01-15T10:30:00"}])
+        await pipeline.stop()
+
+        assert len(indexer.batches) == 1
+        assert indexer.batches[0][0]["tags"] == ["error", "authentication"]
+        assert [topic for topic, _ in producer.sent] == ["processed-logs"]
+
+    @pytest.mark.asyncio
+    async def test_produce_does_not_wait_for_indexing(self):
+        """Test that a slow indexer does not delay the Kafka sink."""
+        indexer = SlowIndexer(delay=0.2)
+        producer = RecordingProducer()
+        pipeline = ProcessingPipeline(LogEnricher(), indexer, producer, "processed-logs")
+        pipeline.start()
+
+        await pipeline.submit([{"message": "hello", "received_at": "2024-01-15T10:30:00"}] * 3)
+        await asyncio.sleep(0.05)
+
+        assert len(producer.sent) == 3
+        assert indexer.batches == []
+
+        await pipeline.stop()
+        assert len(indexer.batches) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_delivery_is_retried_before_completing(self):
+        """Test that a batch only completes once the failing sink accepted it."""
+        indexer = SlowIndexer(delay=0)
+        producer = FlakyProducer(failures=2)
+        pipeline = ProcessingPipeline(
+            LogEnricher(), indexer, producer, "processed-logs", retry_base=0.05, retry_max=0.1
+        )
+        pipeline.start()
+
+        await pipeline.submit([{"message": "hello", "received_at": "2024-01-15T10:30:00"}], offset=8)
+        await asyncio.sleep(0.02)
+
+        assert len(indexer.batches) == 1
+        assert pipeline.completed_offset is None
+
+        await pipeline.stop()
+        assert len(producer.sent) == 1
+        assert pipeline.completed_offset == 8
+
+    @pytest.mark.asyncio
+    async def test_archive_does_not_gate_completion(self):
+        """Test that the best-effort archive neither holds nor fails a batch."""
+        archive = BrokenArchive()
+        pipeline = ProcessingPipeline(
+            LogEnricher(), SlowIndexer(delay=0), RecordingProducer(), "processed-logs", archive=archive
+        )
+        pipeline.start()
+
+        await pipeline.submit([{"message": "hello", "received_at": "2024-01-15T10:30:00"}], offset=3)
+        await pipeline.stop()
+
+        assert archive.attempts == 1
+        assert pipeline.completed_offset == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
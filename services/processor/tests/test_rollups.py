@@ -0,0 +1,91 @@
+"""
+Tests for streaming rollups.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from rollups import RollupAggregator
+
+
+class FakeOpenSearch:
+    """Records rollup writes."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.indices = []
+        self.actions = []
+
+    def ensure_index(self, index_name, body):
+        self.indices.append(index_name)
+
+    async def bulk(self, actions):
+        if self.fail:
+            raise ConnectionError("unavailable")
+        self.actions.extend(actions)
+        return len(actions)
+
+
+def log(minute="10:30", hostname="web01", severity="info"):
+    return {
+        "received_at": f"2024-01-15T{minute}:42.123456",
+        "hostname": hostname,
+        "severity_name": severity,
+        "facility_name": "daemon",
+        "has_threat_indicators": False,
+        "app_name": "nginx",
+    }
+
+
+class TestRollupAggregator:
+    """Test per-minute rollup aggregation."""
+
+    @pytest.mark.asyncio
+    async def test_counts_per_minute_and_dimensions(self):
+        """Test that identical minute/dimension combinations share a row."""
+        opensearch = FakeOpenSearch()
+        rollups = RollupAggregator(opensearch)
+
+        rollups.add_many([log(), log(), log(hostname="web02"), log(minute="10:31")])
+        written = await rollups.flush()
+
+        assert written == 3
+        assert opensearch.indices == ["cybersentinel-rollups-2024.01"]
+        counts = sorted(action["script"]["params"]["count"] for action in opensearch.actions)
+        assert counts == [1, 1, 2]
+        row = next(a["upsert"] for a in opensearch.actions if a["script"]["params"]["count"] == 2)
+        assert row["minute"] == "2024-01-15T10:30:00"
+        assert row["hostname"] == "web01"
+
+    @pytest.mark.asyncio
+    async def test_row_ids_are_stable(self):
+        """Test that later flushes upsert into the same document."""
+        opensearch = FakeOpenSearch()
+        rollups = RollupAggregator(opensearch)
+
+        rollups.add_many([log()])
+        await rollups.flush()
+        rollups.add_many([log()])
+        await rollups.flush()
+
+        assert opensearch.actions[0]["_id"] == opensearch.actions[1]["_id"]
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_counts(self):
+        """Test that counts survive a failed flush."""
+        opensearch = FakeOpenSearch(fail=True)
+        rollups = RollupAggregator(opensearch)
+
+        rollups.add_many([log(), log()])
+        assert await rollups.flush() == 0
+
+        opensearch.fail = False
+        assert await rollups.flush() == 1
+        assert opensearch.actions[0]["script"]["params"]["count"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
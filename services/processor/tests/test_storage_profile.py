@@ -0,0 +1,71 @@
+"""
+Tests for storage profiles.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from storage_profile import StorageProfile, compare_profiles
+
+
+PARSED = {
+    "message": "User logged in",
+    "raw": "<134>1 2024-01-15T10:30:00Z web nginx - - - User logged in",
+    "format": "rfc5424",
+    "timestamp": "2024-01-15T10:30:00+00:00",
+    "timestamp_normalized": "2024-01-15T10:30:00+00:00",
+    "_index_date": "2024.01.15",
+}
+
+
+class TestStorageProfile:
+    """Test lean and full storage profiles."""
+
+    def test_full_profile_keeps_documents(self):
+        """Test that the full profile stores documents unchanged."""
+        assert StorageProfile("full").prepare(PARSED) is PARSED
+
+    def test_lean_profile_drops_redundant_fields(self):
+        """Test that lean documents keep raw only for unparsed logs."""
+        profile = StorageProfile("lean")
+
+        parsed = profile.prepare(PARSED)
+        unparsed = profile.prepare(dict(PARSED, format="unknown"))
+
+        assert "raw" not in parsed
+        assert "timestamp_normalized" not in parsed
+        assert "_index_date" not in parsed
+        assert unparsed["raw"] == PARSED["raw"]
+        assert "raw" in PARSED
+
+    def test_lean_mapping(self):
+        """Test that raw is neither indexed nor given doc values."""
+        body = {"mappings": {"properties": {"raw": {"type": "text"}}}}
+
+        mapped = StorageProfile("lean").apply_mapping(body)
+
+        assert mapped["mappings"]["properties"]["raw"] == {
+            "type": "keyword", "index": False, "doc_values": False,
+        }
+        assert "timestamp_normalized" in mapped["mappings"]["_source"]["excludes"]
+        assert body["mappings"]["properties"]["raw"] == {"type": "text"}
+
+    def test_compare_profiles(self):
+        """Test the before/after size report."""
+        report = compare_profiles([PARSED], [StorageProfile("full"), StorageProfile("lean")])
+
+        sizes = report["avg_bytes_per_document"]
+        assert report["documents"] == 1
+        assert sizes["lean"] < sizes["full"]
+
+    def test_unknown_profile(self):
+        """Test that unknown profiles are rejected."""
+        with pytest.raises(ValueError):
+            StorageProfile("tiny")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,69 @@
+"""
+Tests for log template mining.
+"""
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from template_miner import TemplateMiner
+
+
+class TestTemplateMiner:
+    """Test Drain-style template clustering."""
+
+    def test_similar_messages_share_template(self):
+        """Test that differing tokens become wildcards and parameters."""
+        miner = TemplateMiner()
+
+        first_id, _, _ = miner.add("Accepted password for alice from 10.0.0.1 port 22")
+        template_id, template, params = miner.add("Accepted password for bob from 10.0.0.2 port 51234")
+
+        assert template == "Accepted password for <*> from <*> port <*>"
+        assert params == ["bob", "10.0.0.2", "51234"]
+        assert len(miner) == 1
+        # The template generalized, so its ID changed with it
+        assert template_id != first_id
+        assert miner.add("Accepted password for carol from 10.0.0.3 port 22")[0] == template_id
+
+    def test_different_messages_get_different_templates(self):
+        """Test that unrelated messages are not merged."""
+        miner = TemplateMiner()
+
+        a = miner.add("Connection closed by remote host")
+        b = miner.add("Disk quota exceeded on volume data")
+
+        assert a[0] != b[0]
+        assert len(miner) == 2
+
+    def test_table_is_bounded(self):
+        """Test that the least recently used template is evicted."""
+        miner = TemplateMiner(max_clusters=2)
+
+        miner.add("alpha service started")
+        miner.add("beta worker crashed badly")
+        miner.add("alpha service started")
+        miner.add("gamma queue is full now ok")
+
+        templates = {entry["tokens"][0] for entry in miner.snapshot()["templates"]}
+        assert templates == {"alpha", "gamma"}
+
+    def test_snapshot_round_trip(self, tmp_path):
+        """Test that saved templates are restored with the same IDs."""
+        state_file = str(tmp_path / "templates.json")
+        miner = TemplateMiner(state_file=state_file)
+        miner.add("User login succeeded for alice")
+        template_id, _, _ = miner.add("User login succeeded for bob")
+        miner._write(state_file, miner.snapshot())
+
+        restored = TemplateMiner(state_file=state_file)
+        restored.load()
+
+        assert len(restored) == 1
+        assert restored.add("User login succeeded for carol")[0] == template_id
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -55,6 +55,7 @@ class KafkaProducerManager:
                     max_batch_size=self.batch_size,
                     linger_ms=self.linger_ms,
                     value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+                    key_serializer=lambda k: k.encode("utf-8") if k else None,
                     acks="all",
                     enable_idempotence=True,
                     request_timeout_ms=30000,
@@ -99,7 +100,12 @@ class KafkaProducerManager:
 
         for attempt in range(retries):
             try:
-                await self.producer.send_and_wait(self.topic, value=message)
+                # Key by source so each device's logs stay in one partition (ordering)
+                await self.producer.send_and_wait(
+                    self.topic,
+                    value=message,
+                    key=message.get("source_ip"),
+                )
                 messages_sent_kafka_total.labels(status="success").inc()
                 return True
             except KafkaError as e: